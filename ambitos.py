@@ -0,0 +1,191 @@
+# ambitos.py
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import ast_nodes as ast
+from interpreter import Entorno, Valor
+
+# Resolución estática de variables para los motores compilados.
+#
+# Cada función, cada `para cada` y el cuerpo del programa forman un ámbito
+# cuyas variables se conocen antes de ejecutar: los parámetros, la variable
+# del bucle y todo lo que se declara con `variable` dentro (aunque sea en un
+# `si` o un `mientras`, que no abren ámbito). El Resolutor numera esas
+# variables y da a cada uso una dirección (saltos, posición): cuántos ámbitos
+# hay que subir y en qué posición de la lista de valores está.
+#
+# El lenguaje tiene ámbito dinámico: el entorno de una función cuelga del de
+# quien la llama, y una variable puede no estar declarada todavía cuando se
+# usa. Por eso una posición puede estar VACIA, y los nombres que no están en
+# ningún ámbito estático se buscan por nombre subiendo por la cadena, como en
+# Entorno.obtener_variable.
+
+class Vacia:
+    # Marca de una variable del ámbito que todavía no se ha declarado
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return 'VACIA'
+
+VACIA = Vacia()
+
+# Dirección de un uso: (saltos, posición), o None si se busca por nombre
+Direccion = Optional[Tuple[int, int]]
+
+class Ambito:
+    # Disposición de un ámbito: sus nombres y la posición de cada uno
+    __slots__ = ('nombres', 'posiciones', 'plantilla')
+
+    def __init__(self):
+        self.nombres: List[str] = []
+        self.posiciones: Dict[str, int] = {}
+        self.plantilla: List[Any] = []
+
+    def declarar(self, nombre: str) -> int:
+        posicion = self.posiciones.get(nombre)
+        if posicion is None:
+            posicion = self.posiciones[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+            self.plantilla.append(VACIA)
+        return posicion
+
+class EntornoSlots:
+    # Entorno de un ámbito resuelto: los valores en una lista de tamaño fijo.
+    # Las funciones declaradas van en un diccionario que sólo se crea si hace
+    # falta. `padre` puede ser otro EntornoSlots o un Entorno normal (el del
+    # intérprete, del que cuelga el programa). `memorias` son las tablas de
+    # memoria.py de la ejecución y `profundidad`, el número de llamadas en
+    # curso; los entornos interiores los copian de su padre.
+    __slots__ = ('valores', 'posiciones', 'padre', 'funciones', 'memorias', 'profundidad')
+
+    def __init__(self, ambito: Ambito, padre: Union['EntornoSlots', Entorno, None], memorias: Optional[Dict[Any, Any]] = None,
+                 profundidad: int = 0):
+        self.valores = ambito.plantilla.copy()
+        self.posiciones = ambito.posiciones
+        self.padre = padre
+        self.funciones: Optional[Dict[str, Any]] = None
+        self.memorias = memorias
+        self.profundidad = profundidad
+
+    def definir_funcion(self, nombre: str, funcion: Any) -> None:
+        if self.funciones is None:
+            self.funciones = {}
+        self.funciones[nombre] = funcion
+
+# Búsqueda por nombre subiendo por la cadena, para los usos sin dirección y
+# para cuando la posición resuelta todavía está vacía
+
+def leer_variable(entorno: Union[EntornoSlots, Entorno, None], nombre: str) -> Valor:
+    while entorno is not None:
+        if type(entorno) is EntornoSlots:
+            posicion = entorno.posiciones.get(nombre)
+            if posicion is not None and entorno.valores[posicion] is not VACIA:
+                return entorno.valores[posicion]
+        elif nombre in entorno.variables:
+            return entorno.variables[nombre]
+        entorno = entorno.padre
+    raise NameError(f"Variable '{nombre}' no definida")
+
+def asignar_variable(entorno: Union[EntornoSlots, Entorno, None], nombre: str, valor: Valor) -> None:
+    while entorno is not None:
+        if type(entorno) is EntornoSlots:
+            posicion = entorno.posiciones.get(nombre)
+            if posicion is not None and entorno.valores[posicion] is not VACIA:
+                entorno.valores[posicion] = valor
+                return
+        elif nombre in entorno.variables:
+            entorno.variables[nombre] = valor
+            return
+        entorno = entorno.padre
+    raise NameError(f"Variable '{nombre}' no definida")
+
+def obtener_funcion(entorno: Union[EntornoSlots, Entorno, None], nombre: str) -> Any:
+    while entorno is not None:
+        if entorno.funciones and nombre in entorno.funciones:
+            return entorno.funciones[nombre]
+        entorno = entorno.padre
+    raise NameError(f"Función '{nombre}' no definida")
+
+def volcar(entorno: EntornoSlots, ambito: Ambito, destino: Entorno) -> None:
+    # Copia al Entorno del intérprete lo declarado en el ámbito del programa,
+    # para que quede como si el programa se hubiera ejecutado sobre él
+    for nombre, valor in zip(ambito.nombres, entorno.valores):
+        if valor is not VACIA:
+            destino.variables[nombre] = valor
+    if entorno.funciones:
+        destino.funciones.update(entorno.funciones)
+
+class Resolucion:
+    # Resultado del Resolutor: el ámbito de cada Programa, DeclaracionFuncion
+    # y BucleForEach, y la dirección de cada Identificador, AsignacionVariable
+    # y DeclaracionVariable (por identidad del nodo)
+    def __init__(self):
+        self.ambitos: Dict[ast.Nodo, Ambito] = {}
+        self.direcciones: Dict[ast.Nodo, Direccion] = {}
+
+class Resolutor:
+    def resolver(self, programa: ast.Programa) -> Resolucion:
+        self.resolucion = Resolucion()
+        self.ambito(programa, programa.cuerpo, [], [])
+        return self.resolucion
+
+    def ambito(self, nodo: ast.Nodo, cuerpo: List[ast.Nodo], cadena: List[Ambito], nombres: List[str]) -> None:
+        # `cadena` son los ámbitos estáticos que rodean a este dentro de la
+        # misma función; `nombres`, los que se declaran al entrar
+        ambito = Ambito()
+        for nombre in nombres:
+            ambito.declarar(nombre)
+        self.recoger_declaraciones(cuerpo, ambito)
+        self.resolucion.ambitos[nodo] = ambito
+
+        cadena = cadena + [ambito]
+        pendientes: List[Any] = list(reversed(cuerpo))
+        while pendientes:
+            valor = pendientes.pop()
+            if isinstance(valor, ast.BucleForEach):
+                pendientes.append(valor.iterable)
+                self.ambito(valor, valor.cuerpo, cadena, [valor.variable])
+                continue
+            if isinstance(valor, ast.DeclaracionFuncion):
+                # El cuerpo de una función empieza una cadena nueva: lo que
+                # haya fuera depende de quién la llame
+                self.ambito(valor, valor.cuerpo, [], [parametro['nombre'] for parametro in valor.parametros])
+                continue
+            if isinstance(valor, ast.DeclaracionVariable):
+                self.resolucion.direcciones[valor] = (0, ambito.posiciones[valor.nombre])
+            elif isinstance(valor, (ast.Identificador, ast.AsignacionVariable)):
+                self.resolucion.direcciones[valor] = self.direccion(valor.nombre, cadena)
+            self.agregar_hijos(valor, pendientes)
+
+    def direccion(self, nombre: str, cadena: List[Ambito]) -> Direccion:
+        for saltos, ambito in enumerate(reversed(cadena)):
+            if nombre in ambito.posiciones:
+                return saltos, ambito.posiciones[nombre]
+        return None
+
+    def recoger_declaraciones(self, cuerpo: List[ast.Nodo], ambito: Ambito) -> None:
+        # Variables declaradas en este ámbito, sin entrar en los que abren
+        # los `para cada` y las funciones
+        pendientes: List[Any] = list(reversed(cuerpo))
+        while pendientes:
+            valor = pendientes.pop()
+            if isinstance(valor, (ast.BucleForEach, ast.DeclaracionFuncion)):
+                continue
+            if isinstance(valor, ast.DeclaracionVariable):
+                ambito.declarar(valor.nombre)
+            self.agregar_hijos(valor, pendientes)
+
+    @staticmethod
+    def agregar_hijos(valor: Any, pendientes: List[Any]) -> None:
+        # Hijos en orden inverso, para recorrerlos en el orden del código
+        if isinstance(valor, ast.Nodo):
+            hijos = [getattr(valor, campo) for campo in valor.campos]
+        elif isinstance(valor, (list, tuple)):
+            hijos = list(valor)
+        elif isinstance(valor, dict):
+            hijos = list(valor.values())
+        else:
+            return
+        pendientes.extend(reversed(hijos))
+
+def resolver(programa: ast.Programa) -> Resolucion:
+    return Resolutor().resolver(programa)
@@ -0,0 +1,306 @@
+# arena_ast.py
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ast_nodes as ast
+from valores import constante
+
+# Cómo se guarda cada campo de un nodo en la arena
+NODO = 0       # índice de otra fila (-1 si es None)
+LISTA = 1      # posición en `hijos`: longitud seguida de los índices
+TEXTO = 2      # índice en la tabla de textos (-1 si es None)
+CONSTANTE = 3  # índice en la tabla de constantes
+OBJETO = 4     # índice en la tabla de objetos sin nodos (-1 si es None)
+PARES = 5      # posición en `hijos`: longitud seguida de pares clave, valor
+MAPA = 6       # posición en `hijos`: longitud seguida de pares texto, nodo
+
+# Tipo de almacenamiento de cada campo, en el orden de `campos` de la clase
+esquemas: Dict[type, Tuple[int, ...]] = {
+    ast.Programa: (LISTA,),
+    ast.DeclaracionVariable: (TEXTO, TEXTO, NODO),
+    ast.AsignacionVariable: (TEXTO, NODO),
+    ast.ValorLiteral: (CONSTANTE, TEXTO),
+    ast.Identificador: (TEXTO,),
+    ast.OperacionBinaria: (NODO, TEXTO, NODO),
+    ast.OperacionUnaria: (TEXTO, NODO),
+    ast.Condicional: (NODO, LISTA, LISTA),
+    ast.BucleWhile: (NODO, LISTA),
+    ast.BucleFor: (NODO, NODO, NODO, LISTA),
+    ast.BucleForEach: (TEXTO, NODO, LISTA),
+    ast.DeclaracionFuncion: (TEXTO, OBJETO, TEXTO, LISTA, OBJETO),
+    ast.LlamadaFuncion: (TEXTO, LISTA),
+    ast.RetornoFuncion: (NODO,),
+    ast.ListaValores: (LISTA,),
+    ast.Diccionario: (PARES,),
+    ast.ElementoHTML: (TEXTO, MAPA, LISTA),
+    ast.EstiloCSS: (TEXTO, OBJETO),
+}
+
+# Tipo de Python del valor de un ValorLiteral, según su `tipo`
+TIPOS_LITERAL: Dict[str, type] = {
+    'entero': int,
+    'decimal': float,
+    'cadena': str,
+    'booleano': bool,
+    'nulo': type(None),
+}
+
+clases = tuple(esquemas)
+id_clase = {clase: i for i, clase in enumerate(clases)}
+MAX_CAMPOS = max(len(esquema) for esquema in esquemas.values())
+
+class ArenaAST:
+    # Árbol guardado como filas de arrays tipados: la clase de cada nodo,
+    # hasta MAX_CAMPOS columnas enteras, donde los hijos son índices de fila
+    # en lugar de referencias, y la línea y la columna del nodo en la fuente
+    # (-1 si no tiene posición). Los textos se internan; las listas de hijos
+    # van seguidas en un único array `hijos`.
+    #
+    # arena.vista(indice) devuelve un objeto con la misma interfaz que el
+    # nodo original (es una subclase suya), de modo que el intérprete y el
+    # serializador de /ast pueden recorrer la arena sin cambios.
+    def __init__(self):
+        self.clases = array('B')
+        self.columnas = [array('i') for _ in range(MAX_CAMPOS)]
+        self.lineas = array('i')
+        self.columnas_fuente = array('i')
+        self.hijos = array('i')
+        self.textos: List[str] = []
+        self.id_texto: Dict[str, int] = {}
+        self.constantes: List[Any] = []
+        self.id_constante: Dict[Tuple[type, Any], int] = {}
+        self.objetos: List[Any] = []
+
+    @classmethod
+    def desde_arbol(cls, raiz: ast.Nodo) -> Tuple['ArenaAST', int]:
+        arena = cls()
+        return arena, arena.agregar(raiz)
+
+    def texto(self, texto: Optional[str]) -> int:
+        if texto is None:
+            return -1
+        indice = self.id_texto.get(texto)
+        if indice is None:
+            indice = self.id_texto[texto] = len(self.textos)
+            self.textos.append(texto)
+        return indice
+
+    def constante(self, valor: Any) -> int:
+        clave = (type(valor), valor)
+        indice = self.id_constante.get(clave)
+        if indice is None:
+            indice = self.id_constante[clave] = len(self.constantes)
+            self.constantes.append(valor)
+        return indice
+
+    def reservar_hijos(self, cantidad: int, ancho: int = 1) -> int:
+        posicion = len(self.hijos)
+        self.hijos.append(cantidad)
+        self.hijos.extend(array('i', [-1]) * (cantidad * ancho))
+        return posicion
+
+    def agregar(self, raiz: ast.Nodo) -> int:
+        # Recorrido con pila explícita: cada pendiente indica en qué array y
+        # posición hay que escribir el índice de la fila que se cree
+        columnas = self.columnas
+        hijos = self.hijos
+        raiz_indice = len(self.clases)
+        pendientes: List[Tuple[ast.Nodo, Optional[array], int]] = [(raiz, None, 0)]
+        while pendientes:
+            nodo, destino, posicion = pendientes.pop()
+            indice = len(self.clases)
+            if destino is not None:
+                destino[posicion] = indice
+
+            clase = type(nodo)
+            self.clases.append(id_clase[clase])
+            for columna in columnas:
+                columna.append(-1)
+            self.lineas.append(getattr(nodo, 'linea', -1))
+            self.columnas_fuente.append(getattr(nodo, 'columna', -1))
+
+            for k, (campo, almacenamiento) in enumerate(zip(clase.campos, esquemas[clase])):
+                valor = getattr(nodo, campo)
+                if almacenamiento == CONSTANTE:
+                    columnas[k][indice] = self.constante(valor)
+                elif valor is None:
+                    continue
+                elif almacenamiento == TEXTO:
+                    columnas[k][indice] = self.texto(valor)
+                elif almacenamiento == NODO:
+                    pendientes.append((valor, columnas[k], indice))
+                elif almacenamiento == OBJETO:
+                    columnas[k][indice] = len(self.objetos)
+                    self.objetos.append(valor)
+                elif almacenamiento == LISTA:
+                    inicio = columnas[k][indice] = self.reservar_hijos(len(valor))
+                    for j, hijo in enumerate(valor):
+                        pendientes.append((hijo, hijos, inicio + 1 + j))
+                elif almacenamiento == PARES:
+                    inicio = columnas[k][indice] = self.reservar_hijos(len(valor), 2)
+                    for j, (clave, hijo) in enumerate(valor):
+                        pendientes.append((clave, hijos, inicio + 1 + 2 * j))
+                        pendientes.append((hijo, hijos, inicio + 2 + 2 * j))
+                elif almacenamiento == MAPA:
+                    inicio = columnas[k][indice] = self.reservar_hijos(len(valor), 2)
+                    for j, (nombre, hijo) in enumerate(valor.items()):
+                        hijos[inicio + 1 + 2 * j] = self.texto(nombre)
+                        pendientes.append((hijo, hijos, inicio + 2 + 2 * j))
+        return raiz_indice
+
+    def vista(self, indice: int) -> Optional[ast.Nodo]:
+        if indice < 0:
+            return None
+        return vistas[self.clases[indice]](self, indice)
+
+    def arbol(self, raiz: int) -> ast.Nodo:
+        # Reconstruye los nodos normales a partir de la fila `raiz`. Los hijos
+        # siempre están en filas posteriores a su padre, así que basta con
+        # recorrer las filas de atrás hacia delante. Como la arena puede venir
+        # de un archivo, se comprueba cada índice: los negativos aquí y los
+        # demasiado grandes con el IndexError al usarlos. El valor de cada
+        # literal tiene que ser del tipo que dice el nodo.
+        total = len(self.clases)
+        if not 0 <= raiz < total:
+            raise ValueError(f"Raíz fuera de la arena: {raiz}")
+        columnas = self.columnas
+        hijos = self.hijos
+        textos = self.textos
+        lineas, columnas_fuente = self.lineas, self.columnas_fuente
+        nodos: List[Optional[ast.Nodo]] = [None] * total
+        planes = [(clase, tuple(enumerate(esquemas[clase]))) for clase in clases]
+
+        def error(fila: int) -> ValueError:
+            return ValueError(f"Referencia inválida en la fila {fila} de la arena")
+
+        def tramo(fila: int, inicio: int, ancho: int) -> array:
+            if inicio < 0 or not 0 <= hijos[inicio] <= (len(hijos) - inicio - 1) // ancho:
+                raise error(fila)
+            elementos = hijos[inicio + 1:inicio + 1 + ancho * hijos[inicio]]
+            if elementos and min(elementos[ancho - 1::ancho]) <= fila:
+                raise error(fila)
+            return elementos
+
+        try:
+            for fila in range(total - 1, raiz - 1, -1):
+                clase, plan = planes[self.clases[fila]]
+                argumentos = []
+                for k, almacenamiento in plan:
+                    valor = columnas[k][fila]
+                    if valor < 0:
+                        if valor != -1 or almacenamiento == CONSTANTE:
+                            raise error(fila)
+                        argumentos.append(None)
+                    elif almacenamiento == NODO:
+                        if valor <= fila:
+                            raise error(fila)
+                        argumentos.append(nodos[valor])
+                    elif almacenamiento == TEXTO:
+                        argumentos.append(textos[valor])
+                    elif almacenamiento == CONSTANTE:
+                        argumentos.append(self.constantes[valor])
+                    elif almacenamiento == OBJETO:
+                        argumentos.append(self.objetos[valor])
+                    elif almacenamiento == LISTA:
+                        argumentos.append([nodos[i] for i in tramo(fila, valor, 1)])
+                    else:
+                        elementos = tramo(fila, valor, 2)
+                        claves, valores = elementos[::2], elementos[1::2]
+                        if almacenamiento == PARES:
+                            if claves and min(claves) <= fila:
+                                raise error(fila)
+                            argumentos.append([(nodos[a], nodos[b]) for a, b in zip(claves, valores)])
+                        else:
+                            if claves and min(claves) < 0:
+                                raise error(fila)
+                            argumentos.append({textos[a]: nodos[b] for a, b in zip(claves, valores)})
+                if clase is ast.ValorLiteral and type(argumentos[0]) is not TIPOS_LITERAL.get(argumentos[1]):
+                    raise ValueError(f"Literal inválido en la fila {fila} de la arena")
+                nodo = nodos[fila] = clase(*argumentos)
+                if lineas[fila] >= 0:
+                    nodo.linea, nodo.columna = lineas[fila], columnas_fuente[fila]
+        except IndexError:
+            raise ValueError(f"Referencia fuera de la arena en la fila {fila}") from None
+        return nodos[raiz]
+
+    def nbytes(self) -> int:
+        # Memoria de los arrays (sin contar las tablas de textos y constantes)
+        arrays = [self.clases, self.hijos, self.lineas, self.columnas_fuente] + self.columnas
+        return sum(datos.itemsize * len(datos) for datos in arrays)
+
+    def __len__(self) -> int:
+        return len(self.clases)
+
+def crear_lector(k: int, almacenamiento: int) -> Callable[[Any], Any]:
+    if almacenamiento == NODO:
+        def leer(self):
+            return self.arena.vista(self.arena.columnas[k][self.indice])
+    elif almacenamiento == TEXTO:
+        def leer(self):
+            indice = self.arena.columnas[k][self.indice]
+            return self.arena.textos[indice] if indice >= 0 else None
+    elif almacenamiento == CONSTANTE:
+        def leer(self):
+            return self.arena.constantes[self.arena.columnas[k][self.indice]]
+    elif almacenamiento == OBJETO:
+        def leer(self):
+            indice = self.arena.columnas[k][self.indice]
+            return self.arena.objetos[indice] if indice >= 0 else None
+    elif almacenamiento == LISTA:
+        def leer(self):
+            arena = self.arena
+            inicio = arena.columnas[k][self.indice]
+            if inicio < 0:
+                return None
+            fin = inicio + 1 + arena.hijos[inicio]
+            return [arena.vista(hijo) for hijo in arena.hijos[inicio + 1:fin]]
+    elif almacenamiento == PARES:
+        def leer(self):
+            arena = self.arena
+            inicio = arena.columnas[k][self.indice]
+            elementos = arena.hijos[inicio + 1:inicio + 1 + 2 * arena.hijos[inicio]]
+            return [(arena.vista(clave), arena.vista(valor)) for clave, valor in zip(elementos[::2], elementos[1::2])]
+    else:
+        def leer(self):
+            arena = self.arena
+            inicio = arena.columnas[k][self.indice]
+            elementos = arena.hijos[inicio + 1:inicio + 1 + 2 * arena.hijos[inicio]]
+            return {arena.textos[nombre]: arena.vista(valor) for nombre, valor in zip(elementos[::2], elementos[1::2])}
+    return leer
+
+def iniciar_vista(self, arena: ArenaAST, indice: int) -> None:
+    self.arena = arena
+    self.indice = indice
+
+# Cada lectura crea una vista nueva; las de la misma fila son el mismo nodo
+# para las tablas que el intérprete indexa por nodo (Interprete.sitios)
+def misma_vista(self, otro: Any) -> bool:
+    return type(otro) is type(self) and otro.arena is self.arena and otro.indice == self.indice
+
+def hash_vista(self) -> int:
+    return hash((id(self.arena), self.indice))
+
+def leer_posicion(posiciones: str) -> Callable[[Any], int]:
+    # Como en los nodos, leer la posición de uno que no la tiene es un
+    # AttributeError (getattr(nodo, 'linea', None) da None)
+    def leer(self):
+        valor = getattr(self.arena, posiciones)[self.indice]
+        if valor < 0:
+            raise AttributeError('linea' if posiciones == 'lineas' else 'columna')
+        return valor
+    return leer
+
+def crear_vista(clase: type) -> type:
+    # Subclase del nodo con el mismo nombre cuyos campos se leen de la arena
+    atributos: Dict[str, Any] = {
+        '__slots__': ('arena', 'indice'), '__init__': iniciar_vista, '__eq__': misma_vista, '__hash__': hash_vista,
+        'linea': property(leer_posicion('lineas')), 'columna': property(leer_posicion('columnas_fuente')),
+    }
+    for k, (campo, almacenamiento) in enumerate(zip(clase.campos, esquemas[clase])):
+        atributos[campo] = property(crear_lector(k, almacenamiento))
+    if clase is ast.ValorLiteral:
+        # El Valor del literal no se guarda en la arena: se construye al leerlo
+        atributos['constante'] = property(lambda self: constante(self.tipo, self.valor))
+    return type(clase.__name__, (clase,), atributos)
+
+vistas = tuple(crear_vista(clase) for clase in clases)
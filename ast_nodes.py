@@ -1,58 +1,97 @@
 # ast_nodes.py
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+from valores import constante
 
 
 class Nodo:
-    pass
+    # Cada subclase declara sus atributos en `campos` (y como __slots__, para
+    # que los nodos no lleven un __dict__ por instancia).
+    # `linea` y `columna` son la posición en la fuente; las fija el parser en
+    # las sentencias, las llamadas y las operaciones, y los nodos creados de
+    # otra forma no las tienen (se leen con getattr).
+    __slots__ = ('linea', 'columna')
+    campos: Tuple[str, ...] = ()
 
 class Programa(Nodo):
-    def __init__(self, cuerpo: List[Nodo]):
+    # Con `origenes`, la línea y la columna en que empieza cada sentencia de
+    # `cuerpo`; las posiciones de sus nodos son entonces relativas a ese
+    # inicio, como si la sentencia empezara en la línea 1, columna 1. Así las
+    # guarda incremental.DocumentoIncremental, para que una edición no tenga
+    # que cambiar los nodos de las sentencias que sólo se desplazan.
+    campos = ('cuerpo',)
+    __slots__ = campos + ('origenes',)
+    
+    def __init__(self, cuerpo: List[Nodo], origenes: Optional[Sequence[Tuple[int, int]]] = None):
         self.cuerpo = cuerpo
+        self.origenes = origenes
 
 class DeclaracionVariable(Nodo):
+    __slots__ = campos = ('nombre', 'tipo', 'valor')
+    
     def __init__(self, nombre: str, tipo: Optional[str], valor: Nodo):
         self.nombre = nombre
         self.tipo = tipo
         self.valor = valor
 
 class AsignacionVariable(Nodo):
+    __slots__ = campos = ('nombre', 'valor')
+    
     def __init__(self, nombre: str, valor: Nodo):
         self.nombre = nombre
         self.valor = valor
 
 class ValorLiteral(Nodo):
+    # `constante` es el Valor del literal, construido una vez al crear el nodo
+    # y compartido por todas sus evaluaciones
+    campos = ('valor', 'tipo')
+    __slots__ = campos + ('constante',)
+    
     def __init__(self, valor: Any, tipo: str):
         self.valor = valor
         self.tipo = tipo
+        self.constante = constante(tipo, valor)
 
 class Identificador(Nodo):
+    __slots__ = campos = ('nombre',)
+    
     def __init__(self, nombre: str):
         self.nombre = nombre
 
 class OperacionBinaria(Nodo):
+    __slots__ = campos = ('izquierda', 'operador', 'derecha')
+    
     def __init__(self, izquierda: Nodo, operador: str, derecha: Nodo):
         self.izquierda = izquierda
         self.operador = operador
         self.derecha = derecha
 
 class OperacionUnaria(Nodo):
+    __slots__ = campos = ('operador', 'operando')
+    
     def __init__(self, operador: str, operando: Nodo):
         self.operador = operador
         self.operando = operando
 
 class Condicional(Nodo):
+    __slots__ = campos = ('condicion', 'cuerpo', 'sino')
+    
     def __init__(self, condicion: Nodo, cuerpo: List[Nodo], sino: Optional[List[Nodo]]):
         self.condicion = condicion
         self.cuerpo = cuerpo
         self.sino = sino
 
 class BucleWhile(Nodo):
+    __slots__ = campos = ('condicion', 'cuerpo')
+    
     def __init__(self, condicion: Nodo, cuerpo: List[Nodo]):
         self.condicion = condicion
         self.cuerpo = cuerpo
 
 class BucleFor(Nodo):
+    __slots__ = campos = ('inicializacion', 'condicion', 'incremento', 'cuerpo')
+    
     def __init__(self, inicializacion: Nodo, condicion: Nodo, incremento: Nodo, cuerpo: List[Nodo]):
         self.inicializacion = inicializacion
         self.condicion = condicion
@@ -60,42 +99,61 @@ class BucleFor(Nodo):
         self.cuerpo = cuerpo
 
 class BucleForEach(Nodo):
+    __slots__ = campos = ('variable', 'iterable', 'cuerpo')
+    
     def __init__(self, variable: str, iterable: Nodo, cuerpo: List[Nodo]):
         self.variable = variable
         self.iterable = iterable
         self.cuerpo = cuerpo
 
 class DeclaracionFuncion(Nodo):
-    def __init__(self, nombre: str, parametros: List[Dict[str, str]], tipo_retorno: Optional[str], cuerpo: List[Nodo]):
+    # `memorizar` es lo que pide el código (`memorizada` True, `sin_memoria`
+    # False, None si no dice nada; memoria.py)
+    __slots__ = campos = ('nombre', 'parametros', 'tipo_retorno', 'cuerpo', 'memorizar')
+    
+    def __init__(self, nombre: str, parametros: List[Dict[str, str]], tipo_retorno: Optional[str], cuerpo: List[Nodo], memorizar: Optional[bool] = None):
         self.nombre = nombre
         self.parametros = parametros
         self.tipo_retorno = tipo_retorno
         self.cuerpo = cuerpo
+        self.memorizar = memorizar
 
 class LlamadaFuncion(Nodo):
+    __slots__ = campos = ('nombre', 'argumentos')
+    
     def __init__(self, nombre: str, argumentos: List[Nodo]):
         self.nombre = nombre
         self.argumentos = argumentos
 
 class RetornoFuncion(Nodo):
+    __slots__ = campos = ('valor',)
+    
     def __init__(self, valor: Optional[Nodo] = None):
         self.valor = valor
 
 class ListaValores(Nodo):
+    __slots__ = campos = ('valores',)
+    
     def __init__(self, valores: List[Nodo]):
         self.valores = valores
 
 class Diccionario(Nodo):
+    __slots__ = campos = ('pares',)
+    
     def __init__(self, pares: List[Tuple[Nodo, Nodo]]):
         self.pares = pares
 
 class ElementoHTML(Nodo):
+    __slots__ = campos = ('tipo', 'atributos', 'contenido')
+    
     def __init__(self, tipo: str, atributos: Dict[str, Nodo], contenido: List[Nodo]):
         self.tipo = tipo
         self.atributos = atributos
         self.contenido = contenido
 
 class EstiloCSS(Nodo):
+    __slots__ = campos = ('selector', 'propiedades')
+    
     def __init__(self, selector: str, propiedades: Dict[str, str]):
         self.selector = selector
         self.propiedades = propiedades
\ No newline at end of file
@@ -0,0 +1,939 @@
+# benchmarks.py
+# Comparativas de rendimiento. Uso: python benchmarks.py [nombre ...]
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from lexer import Lexer, Token
+from parser import Parser, ParserCompacto
+
+
+def generar_programa(lineas: int) -> str:
+    # Programa sintético con declaraciones, expresiones, cadenas y comentarios
+    bloque = [
+        'variable a{i}: entero = {i} + 2 * (3 - 1)',
+        'variable b{i} = "texto {i}" + \'otro\'',
+        'si (a{i} >= 10) {{ a{i} + 1 }} sino {{ a{i} }}  # comentario {i}',
+        'funcion f{i}(x: entero, z): entero {{ devolver x + z }}',
+        'variable c{i} = [1, 2.5, verdadero, nulo]',
+    ]
+    return '\n'.join(bloque[i % len(bloque)].format(i=i) for i in range(lineas))
+
+
+def medir(funcion: Callable[[], object], repeticiones: int = 3) -> float:
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def tokenizar_secuencial(codigo: str) -> List[Token]:
+    # Bucle original de Lexer.tokenizar: recompila y recorre cada patrón
+    # en cada posición. Se conserva sólo como referencia.
+    lexer = Lexer()
+    patrones = [(p, None if t in lexer.ignorados else t) for p, t in lexer.patrones]
+    tokens = []
+    linea = 1
+    columna = 1
+    i = 0
+    while i < len(codigo):
+        match = None
+        for patron, tipo in patrones:
+            regex = re.compile(patron)
+            match = regex.match(codigo, i)
+            if match:
+                texto = match.group(0)
+                if tipo:
+                    if tipo == 'IDENTIFICADOR' and texto in lexer.palabras_clave:
+                        tokens.append(Token(lexer.palabras_clave[texto], texto, linea, columna))
+                    else:
+                        tokens.append(Token(tipo, texto, linea, columna))
+                if tipo == 'SALTO_LINEA':
+                    linea += 1
+                    columna = 1
+                else:
+                    columna += len(texto)
+                i = match.end()
+                break
+        if not match:
+            raise SyntaxError(f"Carácter no reconocido: '{codigo[i]}' en línea {linea}, columna {columna}")
+    tokens.append(Token('EOF', '', linea, columna))
+    return tokens
+
+
+def bench_lexer() -> None:
+    for lineas in (500, 5000):
+        codigo = generar_programa(lineas)
+        kb = len(codigo) / 1024
+        t_antes = medir(lambda: tokenizar_secuencial(codigo), 1)
+        t_ahora = medir(lambda: Lexer().tokenizar(codigo))
+        print(f"lexer {kb:8.1f} KB  secuencial {kb / t_antes:9.1f} KB/s  "
+              f"regex única {kb / t_ahora:9.1f} KB/s  x{t_antes / t_ahora:.1f}")
+
+
+def pico_memoria(funcion: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        funcion()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_stream() -> None:
+    # Memoria máxima de lexer + recorrido del parser, desde un archivo
+    def recorrer(tokens) -> None:
+        parser = Parser(tokens)
+        while parser.token_actual and parser.token_actual.tipo != 'EOF':
+            parser.avanzar()
+    
+    for lineas in (2000, 20000, 100000):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as archivo:
+            archivo.write(generar_programa(lineas))
+        try:
+            def con_lista() -> None:
+                with open(archivo.name) as f:
+                    recorrer(Lexer().tokenizar(f.read()))
+            
+            def con_stream() -> None:
+                with open(archivo.name) as f:
+                    recorrer(Lexer().tokenizar_stream(f))
+            
+            kb = os.path.getsize(archivo.name) / 1024
+            print(f"stream {kb:8.1f} KB  lista {pico_memoria(con_lista) / 1024:9.1f} KB pico  "
+                  f"stream {pico_memoria(con_stream) / 1024:9.1f} KB pico")
+        finally:
+            os.unlink(archivo.name)
+
+
+def bench_compacto() -> None:
+    codigo = generar_programa(20000)
+    lexer = Lexer()
+    
+    tokens = lexer.tokenizar(codigo)
+    bytes_lista = pico_memoria(lambda: lexer.tokenizar(codigo))
+    bytes_buffer = pico_memoria(lambda: lexer.tokenizar_compacto(codigo))
+    print(f"compacto {len(tokens)} tokens  Token {bytes_lista / len(tokens):6.1f} B/token  "
+          f"BufferTokens {bytes_buffer / len(tokens):6.1f} B/token")
+    
+    buffer = lexer.tokenizar_compacto(codigo)
+    t_lex_lista = medir(lambda: lexer.tokenizar(codigo))
+    t_lex_buffer = medir(lambda: lexer.tokenizar_compacto(codigo))
+    t_parse_lista = medir(lambda: Parser(tokens).analizar())
+    t_parse_buffer = medir(lambda: ParserCompacto(buffer).analizar())
+    print(f"compacto lexer  Token {len(tokens) / t_lex_lista:10.0f} tok/s  "
+          f"BufferTokens {len(tokens) / t_lex_buffer:10.0f} tok/s")
+    print(f"compacto parser Token {len(tokens) / t_parse_lista:10.0f} tok/s  "
+          f"BufferTokens {len(tokens) / t_parse_buffer:10.0f} tok/s")
+
+
+def bench_cache() -> None:
+    from cache_ast import CacheAST
+    
+    codigo = generar_programa(2000)
+    cache = CacheAST()
+    t_sin = medir(lambda: Parser(Lexer().tokenizar_stream(codigo)).analizar())
+    cache.obtener(codigo)
+    t_con = medir(lambda: cache.obtener(codigo))
+    print(f"cache {len(codigo) / 1024:.1f} KB  lexer+parser {t_sin * 1000:8.2f} ms  "
+          f"acierto {t_con * 1000:8.3f} ms  x{t_sin / t_con:.0f}")
+
+
+def bench_expresiones() -> None:
+    # Expresiones largas con paréntesis y unarios, y anidamientos profundos
+    aleatorio = random.Random(1)
+    operadores = ['+', '-', '*', '/', '==', '<', '^', 'y', 'o']
+    lineas = []
+    for _ in range(2000):
+        expresion = 'x'
+        for _ in range(10):
+            expresion += f" {aleatorio.choice(operadores)} {aleatorio.choice(['1', 'b', '(a + 2)', '-z'])}"
+        lineas.append(expresion)
+    tokens = Lexer().tokenizar('\n'.join(lineas))
+    t = medir(lambda: Parser(tokens).analizar())
+    print(f"expresiones {len(tokens)} tokens  {t * 1e9 / len(tokens):7.0f} ns/token")
+    
+    for profundidad in (1000, 100000):
+        parentesis = '(' * profundidad + '1' + ')' * profundidad
+        unarios = '- ' * profundidad + 'x'
+        t_parentesis = medir(lambda: Parser(Lexer().tokenizar(parentesis)).analizar(), 1)
+        t_unarios = medir(lambda: Parser(Lexer().tokenizar(unarios)).analizar(), 1)
+        print(f"expresiones profundidad {profundidad:6d}  paréntesis {t_parentesis * 1000:8.1f} ms  "
+              f"unarios {t_unarios * 1000:8.1f} ms")
+
+
+def bench_incremental() -> None:
+    from incremental import DocumentoIncremental
+    
+    for lineas in (500, 5000):
+        codigo = generar_programa(lineas)
+        documento = DocumentoIncremental(codigo)
+        t_completo = medir(lambda: Parser(Lexer().tokenizar_stream(codigo)).analizar())
+        
+        # Teclear y borrar un carácter en mitad del archivo
+        medio = documento.inicio(len(documento.cuerpo) // 2) + 9
+        def teclear() -> None:
+            documento.editar(medio, 0, 'x')
+            documento.editar(medio, 1, '')
+        t_edicion = medir(teclear, 20) / 2
+        print(f"incremental {lineas:5d} líneas  análisis completo {t_completo * 1000:8.2f} ms  "
+              f"edición {t_edicion * 1000:6.3f} ms  ({documento.sentencias_reanalizadas} sentencias, "
+              f"{documento.caracteres_reanalizados} caracteres reanalizados)")
+
+
+def bench_arena() -> None:
+    import ast_nodes as ast
+    from arena_ast import ArenaAST
+    
+    # Las mismas clases sin __slots__, como eran antes, para comparar
+    con_dict = {clase: type(clase.__name__, (), {'__init__': clase.__init__, 'campos': clase.campos})
+                for clase in ast.Nodo.__subclasses__()}
+    
+    con_slots = {clase: clase for clase in con_dict}
+    
+    def copiar(valor, clases):
+        if isinstance(valor, ast.Nodo):
+            return clases[type(valor)](*(copiar(getattr(valor, campo), clases) for campo in valor.campos))
+        if isinstance(valor, list):
+            return [copiar(elemento, clases) for elemento in valor]
+        if isinstance(valor, tuple):
+            return tuple(copiar(elemento, clases) for elemento in valor)
+        if isinstance(valor, dict):
+            return {clave: copiar(elemento, clases) for clave, elemento in valor.items()}
+        return valor
+    
+    def recorrer(nodo) -> int:
+        # Número de nodos, leyendo todos los campos por atributo
+        total = 0
+        pendientes = [nodo]
+        while pendientes:
+            valor = pendientes.pop()
+            if isinstance(valor, (list, tuple)):
+                pendientes.extend(valor)
+            elif isinstance(valor, dict):
+                pendientes.extend(valor.values())
+            elif hasattr(valor, 'campos'):
+                total += 1
+                pendientes.extend(getattr(valor, campo) for campo in valor.campos)
+        return total
+    
+    for lineas in (2000, 20000):
+        programa = Parser(Lexer().tokenizar(generar_programa(lineas))).analizar()
+        arena, raiz = ArenaAST.desde_arbol(programa)
+        vista = arena.vista(raiz)
+        nodos = len(arena)
+        
+        # Memoria de construir cada representación a partir del mismo árbol
+        b_dict = pico_memoria(lambda: copiar(programa, con_dict))
+        b_slots = pico_memoria(lambda: copiar(programa, con_slots))
+        b_arena = pico_memoria(lambda: ArenaAST.desde_arbol(programa))
+        print(f"arena {nodos} nodos  __dict__ {b_dict / nodos:6.1f} B/nodo  __slots__ {b_slots / nodos:6.1f} B/nodo  "
+              f"arena {b_arena / nodos:6.1f} B/nodo ({arena.nbytes() / nodos:.1f} en arrays)")
+        
+        objetos = copiar(programa, con_dict)
+        t_dict = medir(lambda: recorrer(objetos))
+        t_slots = medir(lambda: recorrer(programa))
+        t_vista = medir(lambda: recorrer(vista))
+        print(f"arena recorrido  __dict__ {t_dict * 1e9 / nodos:6.0f} ns/nodo  __slots__ {t_slots * 1e9 / nodos:6.0f} ns/nodo  "
+              f"vistas {t_vista * 1e9 / nodos:6.0f} ns/nodo")
+
+
+def bench_compilado() -> None:
+    from compilado import analizar_archivo, serializar
+    
+    # Biblioteca de scripts en un directorio: primera ejecución (analiza y
+    # guarda en __compilados__) frente a las siguientes (lee y decodifica)
+    with tempfile.TemporaryDirectory() as directorio:
+        rutas = []
+        for i in range(20):
+            rutas.append(os.path.join(directorio, f"script{i}.txt"))
+            with open(rutas[-1], 'w', encoding='utf-8') as archivo:
+                archivo.write(generar_programa(500 + 100 * i))
+        
+        def analizar_todo() -> None:
+            for ruta in rutas:
+                with open(ruta, encoding='utf-8') as archivo:
+                    Parser(Lexer().tokenizar_stream(archivo.read())).analizar()
+        
+        def cargar_todo() -> None:
+            for ruta in rutas:
+                analizar_archivo(ruta)
+        
+        t_analisis = medir(analizar_todo)
+        t_primera = medir(cargar_todo, 1)
+        t_compilado = medir(cargar_todo)
+        fuente = sum(os.path.getsize(ruta) for ruta in rutas)
+        compilado = sum(os.path.getsize(os.path.join(directorio, '__compilados__', f"script{i}.txt.lpc")) for i in range(20))
+        print(f"compilado {len(rutas)} scripts {fuente / 1024:.0f} KB ({compilado / 1024:.0f} KB compilados)  "
+              f"lexer+parser {t_analisis * 1000:7.1f} ms  primera {t_primera * 1000:7.1f} ms  "
+              f"compilado {t_compilado * 1000:7.1f} ms  x{t_analisis / t_compilado:.1f}")
+
+
+def bench_optimizador() -> None:
+    from interpreter import Interprete
+    from optimizador import optimizar
+    
+    # Bucle con aritmética literal y condiciones constantes en el cuerpo
+    elementos = ', '.join(str(i) for i in range(2000))
+    codigo = f"""
+    para cada e en [{elementos}] {{
+        variable a = 60 * 60 * 24 + 2 * (3 - 1)
+        variable b = "id-" + 10 / 3
+        si (1 < 2 y no falso) {{ variable c = a + 1.5 }} sino {{ variable c = 0 }}
+        mientras (falso) {{ variable d = 1 }}
+    }}
+    """
+    programa = Parser(Lexer().tokenizar(codigo)).analizar()
+    optimizado, informe = optimizar(programa)
+    t_optimizar = medir(lambda: optimizar(programa))
+    t_sin = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+    t_con = medir(lambda: Interprete().evaluar(optimizado, Interprete().entorno_global))
+    print(f"optimizador {len(informe.cambios)} reescrituras en {t_optimizar * 1000:.2f} ms  "
+          f"sin optimizar {t_sin * 1000:8.1f} ms  optimizado {t_con * 1000:8.1f} ms  x{t_sin / t_con:.1f}")
+
+
+def bench_despacho() -> None:
+    from interpreter import Interprete
+    
+    class InterpreteIsinstance(Interprete):
+        # Despacho como la antigua cadena de isinstance, en el mismo orden
+        def evaluar(self, nodo, entorno):
+            for tipo, manejador in self.manejadores.items():
+                if isinstance(nodo, tipo):
+                    return manejador(self, nodo, entorno)
+            raise NotImplementedError(f"Tipo de nodo no implementado: {type(nodo).__name__}")
+    
+    class InterpreteContador(Interprete):
+        visitas = 0
+        
+        def evaluar(self, nodo, entorno):
+            InterpreteContador.visitas += 1
+            return super().evaluar(nodo, entorno)
+    
+    elementos = ', '.join(str(i) for i in range(2000))
+    codigo = f"""
+    funcion doble(n) {{ devolver n * 2 }}
+    para cada e en [{elementos}] {{
+        variable a = e * 2 + 1
+        variable l = [a, e, "x"]
+        variable d = {{"a": a, "e": e}}
+        si (a > 10 y no (e == 3)) {{ doble(a) }} sino {{ a - 1 }}
+    }}
+    """
+    programa = Parser(Lexer().tokenizar(codigo)).analizar()
+    InterpreteContador().evaluar(programa, Interprete().entorno_global)
+    visitas = InterpreteContador.visitas
+    
+    for nombre, clase in (('isinstance', InterpreteIsinstance), ('tabla', Interprete)):
+        t = medir(lambda: clase().evaluar(programa, Interprete().entorno_global))
+        print(f"despacho {nombre:10s} {visitas} visitas  {visitas / t:10.0f} nodos/s")
+
+
+# Bucles anidados con aritmética, comparaciones y llamadas
+PROGRAMA_BUCLES = """
+funcion cuadrado(n: entero): entero { devolver n * n }
+variable total = 0
+para (variable i = 0; i < 60; i = i + 1) {
+    variable j = 0
+    mientras (j < 60) {
+        si (j % 3 == 0) { total = total + cuadrado(j) } sino { total = total - i }
+        j = j + 1
+    }
+}
+total
+"""
+
+
+def bench_cierres() -> None:
+    from cierres import compilar_programa
+    from interpreter import Interprete
+    
+    programa = Parser(Lexer().tokenizar(PROGRAMA_BUCLES)).analizar()
+    t_compilar = medir(lambda: compilar_programa(programa))
+    compilado = compilar_programa(programa)
+    t_arbol = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+    t_cierres = medir(lambda: compilado(Interprete().entorno_global))
+    print(f"cierres bucles anidados  árbol {t_arbol * 1000:8.1f} ms  cierres {t_cierres * 1000:8.1f} ms  "
+          f"x{t_arbol / t_cierres:.1f}  (compilar {t_compilar * 1000:.2f} ms)")
+
+
+def bench_bytecode() -> None:
+    import bytecode
+    from cierres import compilar_programa
+    from interpreter import Interprete
+    from maquina import MaquinaVirtual
+    
+    programa = Parser(Lexer().tokenizar(PROGRAMA_BUCLES)).analizar()
+    t_compilar = medir(lambda: bytecode.compilar_programa(programa))
+    codigo = bytecode.compilar_programa(programa)
+    cierres = compilar_programa(programa)
+    t_arbol = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+    t_cierres = medir(lambda: cierres(Interprete().entorno_global))
+    t_maquina = medir(lambda: MaquinaVirtual().ejecutar(codigo, Interprete().entorno_global))
+    print(f"bytecode bucles anidados  árbol {t_arbol * 1000:8.1f} ms  cierres {t_cierres * 1000:8.1f} ms  "
+          f"máquina {t_maquina * 1000:8.1f} ms  x{t_arbol / t_maquina:.1f} frente al árbol  "
+          f"({len(codigo)} instrucciones, compilar {t_compilar * 1000:.2f} ms)")
+    
+    # Recursión de usuario: la máquina sólo depende de max_marcos
+    profundidad = 5000
+    recursiva = Parser(Lexer().tokenizar(
+        "funcion cuenta(n: entero): entero { si (n == 0) { devolver 0 } cuenta(n - 1) + 1 }\n"
+        f"cuenta({profundidad})"
+    )).analizar()
+    inicio = time.perf_counter()
+    resultado = MaquinaVirtual(profundidad + 1).ejecutar(bytecode.compilar_programa(recursiva), Interprete().entorno_global)
+    t_profunda = time.perf_counter() - inicio
+    print(f"bytecode recursión {profundidad}  máquina {resultado.valor} en {t_profunda * 1000:.1f} ms")
+
+
+# Variables de varios niveles leídas dentro de un para cada y de una función
+PROGRAMA_AMBITOS = """
+funcion acumular(a: entero, b: entero): entero {
+    variable c = a * 2
+    devolver c + b
+}
+variable base = 3
+variable total = 0
+para (variable i = 0; i < 20; i = i + 1) {
+    para cada e en [1, 2, 3, 4, 5, 6, 7, 8, 9, 10] {
+        variable doble = e + base
+        para cada f en [1, 2, 3, 4, 5] {
+            total = acumular(total % 1000, doble + f) - i
+        }
+    }
+}
+total
+"""
+
+
+def bench_ambitos() -> None:
+    from cierres import compilar_programa
+    from interpreter import Interprete
+    
+    programa = Parser(Lexer().tokenizar(PROGRAMA_AMBITOS)).analizar()
+    t_compilar = medir(lambda: compilar_programa(programa))
+    compilado = compilar_programa(programa)
+    t_arbol = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+    t_cierres = medir(lambda: compilado(Interprete().entorno_global))
+    print(f"ámbitos para cada y llamadas  árbol {t_arbol * 1000:8.1f} ms  cierres {t_cierres * 1000:8.1f} ms  "
+          f"x{t_arbol / t_cierres:.1f}  (resolver y compilar {t_compilar * 1000:.2f} ms)")
+
+
+# Llamadas recursivas con `devolver` en cada rama
+PROGRAMA_FIB = """
+funcion fib(n: entero): entero {
+    si (n < 2) { devolver n }
+    devolver fib(n - 1) + fib(n - 2)
+}
+fib(18)
+"""
+
+
+def bench_llamadas() -> None:
+    from interpreter import Interprete
+    
+    programa = Parser(Lexer().tokenizar(PROGRAMA_FIB)).analizar()
+    t_fib = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+    print(f"llamadas fib(18) árbol {t_fib * 1000:8.1f} ms")
+    
+    # Las llamadas más allá de interpreter.LLAMADAS_RECURSIVAS siguen en el
+    # trampolín, sin depender del límite de recursión de Python
+    for profundidad in (1000, 100000):
+        recursiva = Parser(Lexer().tokenizar(
+            "funcion cuenta(n: entero): entero { si (n == 0) { devolver 0 } cuenta(n - 1) + 1 }\n"
+            f"cuenta({profundidad})"
+        )).analizar()
+        inicio = time.perf_counter()
+        resultado = Interprete().evaluar(recursiva, Interprete().entorno_global)
+        t_profunda = time.perf_counter() - inicio
+        print(f"llamadas recursión {profundidad:6d}  árbol {resultado.valor} en {t_profunda * 1000:.1f} ms")
+
+
+# El mismo bucle con enteros pequeños (los de valores.ENTEROS), con enteros
+# fuera de esa tabla y con decimales y cadenas, que no se comparten
+PROGRAMAS_VALORES = {
+    'enteros pequeños': """
+variable i = 0
+variable total = 0
+mientras (i < {vueltas}) {{
+    si (i % 3 == 0 y total >= 0) {{ total = total + 2 }} sino {{ total = total - 1 }}
+    i = i + 1
+}}
+total
+""",
+    'enteros grandes': """
+variable i = 100000
+variable total = 1000000
+mientras (i < 100000 + {vueltas}) {{
+    si (i % 3 == 0 y total >= 0) {{ total = total + 2000 }} sino {{ total = total - 1000 }}
+    i = i + 1
+}}
+total
+""",
+    'decimales y cadenas': """
+variable i = 0.5
+variable total = ""
+mientras (i < {vueltas}) {{
+    si (i % 3 == 0.5 y total != "x") {{ total = "a" + i }} sino {{ total = total + "b" }}
+    i = i + 1.0
+}}
+total
+""",
+}
+
+
+def bench_valores() -> None:
+    import tracemalloc
+    from interpreter import Interprete
+    
+    class InterpreteRetenedor(Interprete):
+        # Guarda el resultado de cada visita: así tracemalloc ve todos los
+        # objetos que crea la evaluación, no sólo los que siguen vivos al final
+        def evaluar(self, nodo, entorno):
+            resultado = super().evaluar(nodo, entorno)
+            self.resultados.append(resultado)
+            return resultado
+    
+    vueltas = 1000
+    for nombre, codigo in PROGRAMAS_VALORES.items():
+        programa = Parser(Lexer().tokenizar(codigo.format(vueltas=vueltas))).analizar()
+        t = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+        
+        interprete = InterpreteRetenedor()
+        interprete.resultados = []
+        tracemalloc.start()
+        antes = tracemalloc.take_snapshot()
+        interprete.evaluar(programa, interprete.entorno_global)
+        despues = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        # Sin la lista de resultados, que crece en este archivo
+        filtros = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        diferencias = despues.filter_traces(filtros).compare_to(antes.filter_traces(filtros), 'filename')
+        bloques = sum(diferencia.count_diff for diferencia in diferencias)
+        tamano = sum(diferencia.size_diff for diferencia in diferencias)
+        print(f"valores {nombre:20s} {vueltas} vueltas  {bloques / vueltas:5.1f} objetos por vuelta  "
+              f"{tamano / vueltas:6.0f} bytes por vuelta  ({t * 1000:.1f} ms)")
+
+
+# Aritmética y construcción de cadenas
+PROGRAMA_CADENAS = """
+funcion etiqueta(n: entero): cadena {
+    si (n % 2 == 0) { devolver "par-" + n } sino { devolver "impar-" + n }
+}
+variable texto = ""
+variable suma = 0.5
+para (variable i = 0; i < 400; i = i + 1) {
+    texto = texto + etiqueta(i) + ","
+    suma = suma + i * 1.5 - i / 3
+}
+texto + suma
+"""
+
+
+def bench_python() -> None:
+    from interpreter import Interprete
+    from transpilador import cache_codigo, traducir_programa
+    
+    for nombre, codigo in (('bucles', PROGRAMA_BUCLES), ('cadenas', PROGRAMA_CADENAS)):
+        programa = Parser(Lexer().tokenizar(codigo)).analizar()
+        t_traducir = medir(lambda: traducir_programa(programa))
+        traducido = traducir_programa(programa)
+        t_arbol = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+        t_python = medir(lambda: traducido.ejecutar(Interprete().entorno_global))
+        print(f"python {nombre:8s} árbol {t_arbol * 1000:8.1f} ms  python {t_python * 1000:8.1f} ms  "
+              f"x{t_arbol / t_python:.1f}  (traducir {t_traducir * 1000:.2f} ms)")
+    print(f"python caché de código  {cache_codigo.aciertos} aciertos  {cache_codigo.fallos} compilaciones")
+
+
+def bench_especializacion() -> None:
+    from interpreter import Interprete, informe_especializacion, operar_binario
+    
+    class InterpreteGeneral(Interprete):
+        # Sin especializar: siempre la función general del operador
+        def evaluar_operacion_binaria(self, nodo, entorno):
+            return operar_binario(nodo.operador, self.evaluar(nodo.izquierda, entorno), self.evaluar(nodo.derecha, entorno))
+    
+    for nombre, codigo in (('bucles', PROGRAMA_BUCLES), ('cadenas', PROGRAMA_CADENAS)):
+        programa = Parser(Lexer().tokenizar(codigo)).analizar()
+        t_general = medir(lambda: InterpreteGeneral().evaluar(programa, Interprete().entorno_global))
+        t_especializado = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+        interprete = Interprete()
+        interprete.evaluar(programa, interprete.entorno_global)
+        sitios = informe_especializacion(programa, interprete.sitios)
+        aciertos = sum(sitio['aciertos'] for sitio in sitios)
+        total = aciertos + sum(sitio['fallos'] for sitio in sitios)
+        print(f"especialización {nombre:8s} general {t_general * 1000:8.1f} ms  especializado {t_especializado * 1000:8.1f} ms  "
+              f"x{t_general / t_especializado:.2f}  ({len(sitios)} sitios, {aciertos / total:.1%} aciertos)")
+        for sitio in sitios:
+            tipos = ' '.join(sitio['tipos'] or ['-'])
+            print(f"    {sitio['operador']:14s} {tipos:18s} {sitio['tasa_aciertos']:7.1%}  "
+                  f"{sitio['aciertos']:6d} aciertos {sitio['fallos']:4d} fallos {sitio['cambios']} cambios")
+
+
+def bench_listas() -> None:
+    import listas
+    from interpreter import Interprete, multiplicar, sumar
+    from valores import Valor, entero
+    
+    representacion = 'NumPy' if listas.numpy is not None else 'listas de Python'
+    for tipo, numeros in (('entero', list(range(5000))), ('decimal', [i * 0.5 for i in range(5000)])):
+        valores = [entero(n) if tipo == 'entero' else listas.decimal(n) for n in numeros]
+        general = Valor('lista', valores)
+        numerica = listas.crear_lista(valores)
+        tres, uno = entero(3), entero(1)
+        t_general = medir(lambda: sumar(multiplicar(general, tres), uno))
+        t_numerica = medir(lambda: sumar(multiplicar(numerica, tres), uno))
+        print(f"listas {tipo:8s} lista * 3 + 1  general {t_general * 1000:7.2f} ms  numérica {t_numerica * 1000:7.2f} ms  "
+              f"x{t_general / t_numerica:.1f}  ({representacion})")
+    
+    # Suma de una lista con un bucle del lenguaje y con la reducción
+    codigo = 'variable datos = [' + ', '.join(str(i) for i in range(5000)) + ']\n'
+    programa = Parser(Lexer().tokenizar(codigo + 'variable total = 0\npara cada x en datos { total = total + x }\ntotal')).analizar()
+    t_bucle = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+    interprete = Interprete()
+    interprete.evaluar(Parser(Lexer().tokenizar(codigo)).analizar(), interprete.entorno_global)
+    datos = interprete.entorno_global.obtener_variable('datos')
+    t_suma = medir(lambda: listas.suma(datos))
+    print(f"listas suma de 5000  para cada {t_bucle * 1000:7.2f} ms  suma {t_suma * 1000:7.3f} ms  x{t_bucle / t_suma:.0f}")
+
+
+# Bucle que llama a una función pura con pocos argumentos distintos
+PROGRAMA_PURA = """
+funcion coste(n: entero): entero {
+    variable total = 0
+    para (variable i = 0; i < n; i = i + 1) { total = total + i * i }
+    devolver total
+}
+variable acumulado = 0
+para (variable j = 0; j < 300; j = j + 1) { acumulado = acumulado + coste(j % 10 + 40) }
+acumulado
+"""
+
+
+def bench_memoria() -> None:
+    import memoria
+    from interpreter import Interprete
+    
+    def ejecutar(programa: object, memorizar: bool, motor: str) -> Interprete:
+        # Cada ejecución empieza con sus tablas vacías
+        interprete = Interprete()
+        interprete.preparar_memoria(memoria.memorizables(programa) if memorizar else [])
+        if motor == 'arbol':
+            interprete.evaluar(programa, interprete.entorno_global)
+        else:
+            interprete.ejecutar_compilado(interprete.compilar(programa, motor), motor)
+        return interprete
+    
+    for nombre, codigo in (('fib(18)', PROGRAMA_FIB), ('pura', PROGRAMA_PURA)):
+        programa = Parser(Lexer().tokenizar(codigo)).analizar()
+        for motor in ('arbol', 'bytecode'):
+            t_sin = medir(lambda: ejecutar(programa, False, motor))
+            t_con = medir(lambda: ejecutar(programa, True, motor))
+            print(f"memoria {nombre:8s} {motor:8s} sin memoria {t_sin * 1000:8.1f} ms  memorizada {t_con * 1000:7.2f} ms  x{t_sin / t_con:.1f}")
+    
+    programa = Parser(Lexer().tokenizar(PROGRAMA_PURA)).analizar()
+    for informe in ejecutar(programa, True, 'arbol').informe_memoria():
+        print(f"memoria informe {informe}")
+
+
+# Las mismas operaciones escritas en el lenguaje y con la función nativa
+PROGRAMAS_BIBLIOTECA = (
+    ('longitud', """
+variable n = 0
+para cada x en datos { n = n + 1 }
+n
+""", "longitud(datos)"),
+    ('suma', """
+variable total = 0
+para cada x en datos { total = total + x }
+total
+""", "suma(datos)"),
+    ('maximo', """
+variable mayor = 0
+para cada x en datos { si (x > mayor) { mayor = x } }
+mayor
+""", "maximo(datos)"),
+    ('unir', """
+variable texto = ""
+para cada x en datos { texto = texto + x + "," }
+texto
+""", 'unir(datos, ",")'),
+    ('contiene', """
+variable esta = falso
+para cada x en datos { si (x == 1500) { esta = verdadero } }
+esta
+""", "contiene(datos, 1500)"),
+)
+
+
+def bench_biblioteca() -> None:
+    from interpreter import Interprete
+    
+    datos = 'variable datos = [' + ', '.join(str((i * 7919) % 2000) for i in range(2000)) + ']\n'
+    interprete = Interprete()
+    interprete.evaluar(Parser(Lexer().tokenizar(datos)).analizar(), interprete.entorno_global)
+    for nombre, bucle, nativa in PROGRAMAS_BIBLIOTECA:
+        programa_bucle = Parser(Lexer().tokenizar(bucle)).analizar()
+        programa_nativa = Parser(Lexer().tokenizar(nativa)).analizar()
+        t_bucle = medir(lambda: interprete.evaluar(programa_bucle, interprete.entorno_global))
+        t_nativa = medir(lambda: interprete.evaluar(programa_nativa, interprete.entorno_global))
+        print(f"biblioteca {nombre:9s} bucle {t_bucle * 1000:8.2f} ms  nativa {t_nativa * 1000:7.3f} ms  x{t_bucle / t_nativa:.0f}")
+    
+    # `para cada` sobre rango(n) no crea la lista; sobre una lista, sí
+    vueltas = 100000
+    por_rango = Parser(Lexer().tokenizar(f"variable t = 0\npara cada i en rango({vueltas}) {{ t = t + i }}\nt")).analizar()
+    por_lista = Parser(Lexer().tokenizar(f"variable t = 0\npara cada i en rango({vueltas}) * 1 {{ t = t + i }}\nt")).analizar()
+    for nombre, programa in (('rango', por_rango), ('lista', por_lista)):
+        t = medir(lambda: Interprete().evaluar(programa, Interprete().entorno_global), repeticiones=1)
+        pico = pico_memoria(lambda: Interprete().evaluar(programa, Interprete().entorno_global))
+        print(f"biblioteca para cada {nombre:5s} {vueltas} vueltas {t * 1000:8.1f} ms  pico de memoria {pico / 1024:8.1f} KiB")
+
+
+# Programa que ocupa la CPU un rato
+PROGRAMA_CPU = """
+variable i = 0
+variable total = 0
+mientras (i < 30000) {
+    total = total + i % 7
+    i = i + 1
+}
+total
+"""
+
+
+def bench_ejecutor() -> None:
+    import asyncio
+    from ejecutor import PROCESOS, Ejecutor, interpretar
+    
+    peticiones = 16
+    t_directo = medir(lambda: [interpretar(PROGRAMA_CPU) for _ in range(peticiones)], repeticiones=1)
+    print(f"ejecutor {peticiones} programas en el propio proceso {t_directo * 1000:8.1f} ms")
+    
+    async def con_procesos(procesos: int) -> None:
+        ejecutor = Ejecutor(procesos=procesos, cola=peticiones)
+        inicio = time.perf_counter()
+        await ejecutor.iniciar()
+        t_arranque = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        await asyncio.gather(*(ejecutor.ejecutar(PROGRAMA_CPU) for _ in range(peticiones)))
+        t_total = time.perf_counter() - inicio
+        print(f"ejecutor {peticiones} programas con {procesos:2d} procesos {t_total * 1000:8.1f} ms  "
+              f"{peticiones / t_total:6.1f} programas/s  (arranque {t_arranque * 1000:.0f} ms)")
+        ejecutor.cerrar()
+    
+    for procesos in sorted({1, PROCESOS}):
+        asyncio.run(con_procesos(procesos))
+    
+    async def con_bucle_infinito() -> None:
+        # Un programa que no termina no retrasa a los demás: ocupa un proceso
+        # hasta el tiempo límite, y luego se sustituye
+        ejecutor = Ejecutor(procesos=2, tiempo_limite=1.0)
+        await ejecutor.iniciar()
+        infinito = asyncio.ensure_future(ejecutor.ejecutar("mientras (verdadero) { 1 }"))
+        inicio = time.perf_counter()
+        await ejecutor.ejecutar("1 + 1")
+        t_corto = time.perf_counter() - inicio
+        respuesta = await infinito
+        t_infinito = time.perf_counter() - inicio
+        print(f"ejecutor con un bucle infinito  otro programa {t_corto * 1000:6.1f} ms  "
+              f"el infinito se corta a los {t_infinito * 1000:.0f} ms: {respuesta['error']}")
+        ejecutor.cerrar()
+    
+    asyncio.run(con_bucle_infinito())
+
+
+def bench_lote() -> None:
+    import asyncio
+    import json
+    from ejecutor import PROCESOS, Ejecutor
+    
+    # Programas pequeños, como los de una corrección automática: 400 envíos
+    # de 100 programas distintos
+    programas = [f"variable x = {i % 100}\nvariable t = 0\npara cada i en rango(x) {{ t = t + i * 2 }}\nt" for i in range(400)]
+    peticiones = [{'codigo': codigo, 'optimizar': True, 'motor': 'arbol', 'verificar': False} for codigo in programas]
+    
+    async def comparar() -> None:
+        ejecutor = Ejecutor(procesos=PROCESOS, cola=len(peticiones))
+        await ejecutor.iniciar()
+        
+        # Uno a uno, esperando cada respuesta y codificándola como JSON
+        inicio = time.perf_counter()
+        for peticion in peticiones:
+            json.dumps(await ejecutor.ejecutar(**peticion))
+        t_sueltas = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        json.dumps(await ejecutor.ejecutar_lote(peticiones))
+        t_lote = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        primero = None
+        async for indices, respuesta in ejecutor.lote(peticiones):
+            for indice in indices:
+                json.dumps({"indice": indice, **respuesta})
+            if primero is None:
+                primero = time.perf_counter() - inicio
+        t_flujo = time.perf_counter() - inicio
+        
+        print(f"lote {len(peticiones)} programas ({len(set(programas))} distintos, {PROCESOS} procesos)  "
+              f"sueltos {t_sueltas * 1000:7.1f} ms  lote {t_lote * 1000:7.1f} ms  x{t_sueltas / t_lote:.1f}")
+        print(f"lote en flujo NDJSON {t_flujo * 1000:7.1f} ms  primer resultado a los {primero * 1000:.1f} ms")
+        ejecutor.cerrar()
+    
+    asyncio.run(comparar())
+
+PROGRAMA_PROGRESO = """
+variable i = 0
+mientras (i < 10) {
+    mostrar("paso", i)
+    variable j = 0
+    mientras (j < 20000) { j = j + 1 }
+    i = i + 1
+}
+i
+"""
+
+def bench_salida() -> None:
+    import asyncio
+    from ejecutor import Ejecutor
+    from interpreter import Interprete
+    from salida import Salida
+    
+    # Coste de `mostrar` dentro del proceso: escribir en el búfer y, pasado
+    # el límite, sólo contar las líneas descartadas
+    escribir = "para cada i en rango(50000) { mostrar(\"linea\", i, [i, i + 1]) }"
+    for max_total in (10 ** 9, 4096):
+        def ejecutar() -> None:
+            interprete = Interprete()
+            interprete.salida = Salida(max_total=max_total)
+            interprete.ejecutar(escribir, motor='bytecode')
+        pico = pico_memoria(ejecutar)
+        print(f"salida 50000 líneas, límite {max_total:>10} caracteres  {medir(ejecutar) * 1000:7.1f} ms  pico {pico / 1024:8.1f} KiB")
+    
+    async def comparar() -> None:
+        # Cuándo ve el cliente la primera línea de un programa que tarda:
+        # con la respuesta completa o en flujo
+        ejecutor = Ejecutor(procesos=1)
+        await ejecutor.iniciar()
+        inicio = time.perf_counter()
+        await ejecutor.ejecutar(PROGRAMA_PROGRESO, motor='bytecode')
+        t_completa = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        primera = None
+        async for _ in ejecutor.flujo(PROGRAMA_PROGRESO, motor='bytecode'):
+            if primera is None:
+                primera = time.perf_counter() - inicio
+        t_flujo = time.perf_counter() - inicio
+        print(f"salida respuesta completa {t_completa * 1000:7.1f} ms  "
+              f"flujo {t_flujo * 1000:7.1f} ms  primera línea a los {primera * 1000:.1f} ms")
+        ejecutor.cerrar()
+    
+    asyncio.run(comparar())
+
+
+PROGRAMA_LARGO = """
+variable t = 0
+para (variable i = 0; i < 40000; i = i + 1) { t = t + i % 7 }
+t
+"""
+
+PROGRAMA_CORTO = """
+funcion doble(x) { devolver x * 2 }
+variable t = 0
+para cada i en rango(20) { t = t + doble(i) }
+t
+"""
+
+def bench_cooperativo() -> None:
+    import asyncio
+    from cooperativo import QUANTUM, REBANADA, interpretar as interpretar_cooperativo
+    from ejecutor import interpretar
+    
+    # Latencia de programas cortos que llegan cada 2 ms mientras 8 largos
+    # ocupan el mismo bucle de eventos: sin ceder (cada programa bloquea el
+    # bucle hasta terminar) y en modo cooperativo con varios repartos
+    largos, cortos, cadencia = 8, 200, 0.002
+    
+    async def simular(quantum, rebanada) -> None:
+        async def ejecutar(codigo: str, llegada: float) -> float:
+            # Desde que el programa llega, aunque el bucle esté ocupado
+            if quantum is None:
+                interpretar(codigo)
+            else:
+                await interpretar_cooperativo(codigo, quantum=quantum, rebanada=rebanada)
+            return time.perf_counter() - llegada
+        
+        inicio = time.perf_counter()
+        tareas_largas = [asyncio.ensure_future(ejecutar(PROGRAMA_LARGO, inicio)) for _ in range(largos)]
+        tareas_cortas = []
+        while len(tareas_cortas) < cortos:
+            # Todos los que ya han llegado, como las peticiones que el
+            # servidor recibe en una vuelta del bucle
+            llegada = inicio + len(tareas_cortas) * cadencia
+            while len(tareas_cortas) < cortos and llegada <= time.perf_counter():
+                tareas_cortas.append(asyncio.ensure_future(ejecutar(PROGRAMA_CORTO, llegada)))
+                llegada += cadencia
+            await asyncio.sleep(max(llegada - time.perf_counter(), 0))
+        latencias = sorted(await asyncio.gather(*tareas_cortas))
+        await asyncio.gather(*tareas_largas)
+        total = time.perf_counter() - inicio
+        
+        def percentil(p: float) -> float:
+            return latencias[min(int(p * len(latencias)), len(latencias) - 1)] * 1000
+        reparto = "sin ceder" if quantum is None else f"quantum {quantum:>5} rebanada {rebanada * 1000:4g} ms"
+        print(f"cooperativo {reparto:<34} cortos p50 {percentil(0.5):7.2f} ms  p99 {percentil(0.99):7.2f} ms  "
+              f"máx {latencias[-1] * 1000:7.2f} ms  total {total:5.2f} s")
+    
+    # Un programa de cada para que el árbol ya esté en la caché
+    interpretar(PROGRAMA_LARGO)
+    interpretar(PROGRAMA_CORTO)
+    for quantum, rebanada in ((None, None), (1000, 0.0), (100, 0.0), (10, 0.0), (100, 0.001), (100, 0.005)):
+        asyncio.run(simular(quantum, rebanada))
+    
+    # Lo que cuesta ceder: un programa largo solo
+    t_arbol = medir(lambda: interpretar(PROGRAMA_LARGO))
+    for quantum, rebanada in ((QUANTUM, REBANADA), (10, 0.0)):
+        t_cooperativo = medir(lambda: asyncio.run(interpretar_cooperativo(PROGRAMA_LARGO, quantum=quantum, rebanada=rebanada)))
+        print(f"cooperativo un programa largo: árbol {t_arbol * 1000:7.1f} ms  "
+              f"quantum {quantum} rebanada {rebanada * 1000:g} ms {t_cooperativo * 1000:7.1f} ms  x{t_cooperativo / t_arbol:.2f}")
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {
+    'lexer': bench_lexer,
+    'stream': bench_stream,
+    'compacto': bench_compacto,
+    'cache': bench_cache,
+    'expresiones': bench_expresiones,
+    'incremental': bench_incremental,
+    'arena': bench_arena,
+    'compilado': bench_compilado,
+    'optimizador': bench_optimizador,
+    'despacho': bench_despacho,
+    'cierres': bench_cierres,
+    'bytecode': bench_bytecode,
+    'python': bench_python,
+    'ambitos': bench_ambitos,
+    'llamadas': bench_llamadas,
+    'valores': bench_valores,
+    'especializacion': bench_especializacion,
+    'listas': bench_listas,
+    'memoria': bench_memoria,
+    'biblioteca': bench_biblioteca,
+    'ejecutor': bench_ejecutor,
+    'lote': bench_lote,
+    'salida': bench_salida,
+    'cooperativo': bench_cooperativo,
+}
+
+
+if __name__ == "__main__":
+    for nombre in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[nombre]()
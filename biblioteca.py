@@ -0,0 +1,226 @@
+# biblioteca.py
+import inspect
+from typing import Callable, Dict, List, Optional
+
+import listas
+from listas import ListaNumerica, Rango, crear_lista, empaquetar
+from salida import SALIDA, texto
+from valores import NULO, Valor, booleano, entero
+
+# Funciones nativas del lenguaje, escritas en Python. Cada una es una
+# Primitiva que Interprete.inicializar_entorno_global declara en el entorno
+# global, donde las llamadas la encuentran como a las funciones del programa:
+# una función declarada con el mismo nombre la tapa. Los motores reconocen
+# las Primitiva por su clase y las llaman con los argumentos ya evaluados, sin
+# crear entorno. Se declaran con @primitiva; GET /biblioteca las describe.
+#
+# Ninguna modifica sus argumentos: las que transforman una lista o una cadena
+# devuelven otra. Todas son puras (memoria.py puede memorizar las funciones
+# que las llaman) salvo las declaradas con pura=False, como `mostrar`, que
+# escribe en la salida.
+
+# Tipos que aceptan los argumentos, para los mensajes de error
+DESCRIPCIONES = {
+    'lista': 'una lista',
+    'cadena': 'una cadena',
+    'diccionario': 'un diccionario',
+    'entero': 'un entero',
+}
+
+# Tipos de las claves de un diccionario
+CLAVES = ('entero', 'decimal', 'cadena', 'booleano')
+
+class Primitiva:
+    # Lo que se guarda en Entorno.funciones para una función nativa. Acepta
+    # entre `minimo` y `maximo` argumentos (sin máximo si la función recibe
+    # *argumentos); `retorno` es el tipo del resultado si es siempre el mismo
+    # (para tipos.verificar)
+    __slots__ = ('nombre', 'funcion', 'minimo', 'maximo', 'retorno', 'descripcion', 'pura')
+
+    def __init__(self, nombre: str, funcion: Callable[..., Valor], retorno: Optional[str], descripcion: str, pura: bool = True):
+        self.nombre = nombre
+        self.funcion = funcion
+        codigo = funcion.__code__
+        self.minimo = codigo.co_argcount - len(funcion.__defaults__ or ())
+        self.maximo = None if codigo.co_flags & inspect.CO_VARARGS else codigo.co_argcount
+        self.retorno = retorno
+        self.descripcion = descripcion
+        self.pura = pura
+
+    def acepta(self, cantidad: int) -> bool:
+        return self.minimo <= cantidad and (self.maximo is None or cantidad <= self.maximo)
+
+    def comprobar(self, cantidad: int) -> None:
+        # Se comprueba antes de evaluar los argumentos, como con las
+        # funciones del programa
+        if not self.acepta(cantidad):
+            raise TypeError(f"Función '{self.nombre}' espera {self.esperados()} argumentos, pero se proporcionaron {cantidad}")
+
+    def esperados(self) -> str:
+        if self.minimo == self.maximo:
+            return str(self.minimo)
+        if self.maximo is None:
+            return f"al menos {self.minimo}"
+        return f"entre {self.minimo} y {self.maximo}"
+
+    def llamar(self, argumentos: List[Valor]) -> Valor:
+        return self.funcion(*argumentos)
+
+    def como_dict(self) -> Dict[str, object]:
+        return {
+            'nombre': self.nombre,
+            'argumentos': self.esperados(),
+            'retorno': self.retorno,
+            'descripcion': self.descripcion,
+        }
+
+PRIMITIVAS: Dict[str, Primitiva] = {}
+
+def primitiva(nombre: str, retorno: Optional[str], descripcion: str, pura: bool = True) -> Callable:
+    # Registra la función decorada como la función nativa `nombre`. Sus
+    # argumentos opcionales (con valor por defecto) lo son también en el
+    # lenguaje.
+    def decorar(funcion: Callable[..., Valor]) -> Callable[..., Valor]:
+        PRIMITIVAS[nombre] = Primitiva(nombre, funcion, retorno, descripcion, pura)
+        return funcion
+    return decorar
+
+def esperar(nombre: str, valor: Valor, *tipos: str) -> None:
+    if valor.tipo not in tipos:
+        descripciones = [DESCRIPCIONES[tipo] for tipo in tipos]
+        esperado = descripciones[-1] if len(tipos) == 1 else f"{', '.join(descripciones[:-1])} o {descripciones[-1]}"
+        raise TypeError(f"'{nombre}' espera {esperado}, no '{valor.tipo}'")
+
+# Colecciones
+
+@primitiva('longitud', 'entero', "Número de elementos de una lista, caracteres de una cadena o claves de un diccionario")
+def longitud(coleccion: Valor) -> Valor:
+    esperar('longitud', coleccion, 'lista', 'cadena', 'diccionario')
+    return entero(len(coleccion.valor))
+
+@primitiva('rango', 'lista', "rango(fin), rango(inicio, fin) o rango(inicio, fin, paso): los enteros de inicio (0) a fin, sin incluirlo; la lista no se crea")
+def rango(inicio: Valor, fin: Optional[Valor] = None, paso: Optional[Valor] = None) -> Valor:
+    if fin is None:
+        inicio, fin = entero(0), inicio
+    if paso is None:
+        paso = entero(1)
+    for valor in (inicio, fin, paso):
+        esperar('rango', valor, 'entero')
+    if paso.valor == 0:
+        raise ValueError("'rango' con paso 0")
+    return Valor('lista', Rango(range(inicio.valor, fin.valor, paso.valor)))
+
+@primitiva('contiene', 'booleano', "Si una lista tiene un elemento igual, una cadena contiene otra o un diccionario tiene una clave")
+def contiene(coleccion: Valor, elemento: Valor) -> Valor:
+    esperar('contiene', coleccion, 'lista', 'cadena', 'diccionario')
+    valor = coleccion.valor
+    if coleccion.tipo == 'cadena':
+        esperar('contiene', elemento, 'cadena')
+        return booleano(elemento.valor in valor)
+    if coleccion.tipo == 'diccionario':
+        return booleano(elemento.tipo in CLAVES and elemento.valor in valor)
+    if isinstance(valor, ListaNumerica):
+        # Los números se comparan por valor, como con ==
+        numeros = valor.datos if type(valor) is Rango else valor.numeros()
+        return booleano(elemento.tipo in listas.NUMERICOS and elemento.valor in numeros)
+    from interpreter import son_iguales
+    return booleano(any(son_iguales(otro, elemento) for otro in valor))
+
+@primitiva('invertir', None, "La lista o la cadena al revés")
+def invertir(coleccion: Valor) -> Valor:
+    esperar('invertir', coleccion, 'lista', 'cadena')
+    valor = coleccion.valor
+    if type(valor) is Rango:
+        return Valor('lista', Rango(valor.datos[::-1]))
+    if type(valor) is ListaNumerica:
+        return Valor('lista', ListaNumerica(valor.tipo, valor.datos[::-1]))
+    return Valor(coleccion.tipo, valor[::-1])
+
+@primitiva('ordenar', 'lista', "La lista de números o de cadenas ordenada de menor a mayor")
+def ordenar(lista: Valor) -> Valor:
+    esperar('ordenar', lista, 'lista')
+    valor = lista.valor
+    if type(valor) is Rango:
+        return lista if valor.datos.step > 0 else Valor('lista', Rango(valor.datos[::-1]))
+    if type(valor) is ListaNumerica:
+        datos = valor.datos
+        if type(datos) is list:
+            return Valor('lista', empaquetar(valor.tipo, sorted(datos)))
+        return Valor('lista', ListaNumerica(valor.tipo, listas.numpy.sort(datos, kind='stable')))
+    tipos = {elemento.tipo for elemento in valor}
+    if not (tipos <= set(listas.NUMERICOS) or tipos == {'cadena'}):
+        raise TypeError("'ordenar' espera una lista de números o de cadenas")
+    # Estable: los enteros y decimales iguales quedan en su orden
+    return Valor('lista', sorted(valor, key=lambda elemento: elemento.valor))
+
+# Reducciones de listas.py
+
+for nombre, retorno, descripcion in (
+    ('suma', None, "Suma de una lista de números (0 si está vacía)"),
+    ('minimo', None, "El menor número de una lista no vacía"),
+    ('maximo', None, "El mayor número de una lista no vacía"),
+    ('media', 'decimal', "Media de una lista de números no vacía"),
+):
+    primitiva(nombre, retorno, descripcion)(listas.REDUCCIONES[nombre])
+
+# Cadenas
+
+@primitiva('unir', 'cadena', "Los elementos de una lista, como texto, separados por una cadena")
+def unir(lista: Valor, separador: Valor) -> Valor:
+    esperar('unir', lista, 'lista')
+    esperar('unir', separador, 'cadena')
+    valor = lista.valor
+    # Cada elemento como al concatenarlo a una cadena con +
+    partes = map(str, valor.numeros()) if isinstance(valor, ListaNumerica) else (str(elemento.valor) for elemento in valor)
+    return Valor('cadena', separador.valor.join(partes))
+
+@primitiva('separar', 'lista', "Las partes de una cadena entre cada separador (por defecto, los espacios)")
+def separar(cadena: Valor, separador: Optional[Valor] = None) -> Valor:
+    esperar('separar', cadena, 'cadena')
+    if separador is not None:
+        esperar('separar', separador, 'cadena')
+        if not separador.valor:
+            raise ValueError("'separar' con un separador vacío")
+    partes = cadena.valor.split(None if separador is None else separador.valor)
+    return Valor('lista', [Valor('cadena', parte) for parte in partes])
+
+@primitiva('mayusculas', 'cadena', "La cadena en mayúsculas")
+def mayusculas(cadena: Valor) -> Valor:
+    esperar('mayusculas', cadena, 'cadena')
+    return Valor('cadena', cadena.valor.upper())
+
+@primitiva('minusculas', 'cadena', "La cadena en minúsculas")
+def minusculas(cadena: Valor) -> Valor:
+    esperar('minusculas', cadena, 'cadena')
+    return Valor('cadena', cadena.valor.lower())
+
+@primitiva('reemplazar', 'cadena', "La cadena con cada aparición de la segunda cambiada por la tercera")
+def reemplazar(cadena: Valor, buscada: Valor, nueva: Valor) -> Valor:
+    for valor in (cadena, buscada, nueva):
+        esperar('reemplazar', valor, 'cadena')
+    return Valor('cadena', cadena.valor.replace(buscada.valor, nueva.valor))
+
+# Diccionarios
+
+@primitiva('claves', 'lista', "Las claves de un diccionario, como cadenas (como las recorre `para cada`)")
+def claves(diccionario: Valor) -> Valor:
+    esperar('claves', diccionario, 'diccionario')
+    return Valor('lista', [Valor('cadena', clave) for clave in diccionario.valor])
+
+@primitiva('valores', 'lista', "Los valores de un diccionario")
+def valores(diccionario: Valor) -> Valor:
+    esperar('valores', diccionario, 'diccionario')
+    return crear_lista(list(diccionario.valor.values()))
+
+# Salida
+
+@primitiva('mostrar', 'nulo', "Escribe los valores, separados por espacios, como una línea de la salida del programa", pura=False)
+def mostrar(*valores: Valor) -> Valor:
+    salida = SALIDA.get()
+    if salida is None:
+        print(texto(valores))
+    else:
+        # Con un carácter más de los que caben, para que la Salida sepa que
+        # ha recortado la línea
+        salida.escribir(texto(valores, salida.restante() + 1))
+    return NULO
@@ -0,0 +1,345 @@
+# bytecode.py
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ast_nodes as ast
+from interpreter import NINGUNA, OPERACIONES_BINARIAS, OPERACIONES_UNARIAS, Demostradas, Valor
+from valores import NULO
+
+# Código de bytes para la máquina virtual de maquina.py. Cada instrucción
+# ocupa dos enteros seguidos en `Codigo.instrucciones`: el código de operación
+# y su argumento (0 si no lo usa). Los saltos llevan la posición absoluta de
+# la instrucción de destino dentro de ese array.
+#
+# Cada sentencia y cada expresión deja exactamente un Valor en la pila; los
+# bloques sacan el de todas sus sentencias menos la última, así que el valor
+# de un bloque es el de su última sentencia, como en Interprete.evaluar.
+
+CONSTANTE = 0          # apila constantes[arg]
+CARGAR = 1             # apila la variable nombres[arg]
+DECLARAR = 2           # define nombres[arg] con la cima (sin sacarla)
+ASIGNAR = 3            # asigna la cima a nombres[arg] (sin sacarla)
+COMPROBAR_TIPO = 4     # comprueba que la cima es de tipo constantes[arg]
+SACAR = 5              # descarta la cima
+BINARIA = 6            # operador binario OPERADORES_BINARIOS[arg]
+UNARIA = 7             # operador unario OPERADORES_UNARIOS[arg]
+SALTAR = 8             # salta a arg
+SALTAR_SI_FALSO = 9    # saca la condición (debe ser booleano); si es falsa salta a arg
+GUARDAR_RESULTADO = 10 # saca la cima y la guarda como resultado del bucle en pila[-arg]
+ITERAR = 11            # cambia la cima (lista, cadena o diccionario) por un iterador de Valor
+SIGUIENTE = 12         # apila el siguiente elemento; si no hay, saca el iterador y salta a arg
+ENTRAR = 13            # abre un entorno hijo con nombres[arg] = cima (que se saca)
+SALIR = 14             # vuelve al entorno padre
+DEFINIR_FUNCION = 15   # define la función funciones[arg] en el entorno
+BUSCAR_FUNCION = 16    # apila la función de la llamada constantes[arg] = (nombre, argumentos)
+LLAMAR = 17            # llama a la función con los arg valores de encima
+DEVOLVER = 18          # sale de la función con la cima (devolver)
+FIN = 19               # final del código: valor de la función o del programa
+LISTA = 20             # cambia los arg valores de encima por una lista
+COMPROBAR_CLAVE = 21   # comprueba que la clave (debajo de la cima) es inmutable
+DICCIONARIO = 22       # cambia los arg pares de encima por un diccionario
+ELEMENTO_HTML = 23     # elemento constantes[arg] = (tipo, atributos, cantidad de contenido)
+ESTILO_CSS = 24        # estilo constantes[arg] = (selector, propiedades)
+
+NOMBRES_OPERACIONES = (
+    'CONSTANTE', 'CARGAR', 'DECLARAR', 'ASIGNAR', 'COMPROBAR_TIPO', 'SACAR', 'BINARIA', 'UNARIA',
+    'SALTAR', 'SALTAR_SI_FALSO', 'GUARDAR_RESULTADO', 'ITERAR', 'SIGUIENTE', 'ENTRAR', 'SALIR',
+    'DEFINIR_FUNCION', 'BUSCAR_FUNCION', 'LLAMAR', 'DEVOLVER', 'FIN', 'LISTA', 'COMPROBAR_CLAVE',
+    'DICCIONARIO', 'ELEMENTO_HTML', 'ESTILO_CSS',
+)
+
+# El argumento de BINARIA y UNARIA es la posición del operador aquí
+OPERADORES_BINARIOS = tuple(OPERACIONES_BINARIAS)
+OPERADORES_UNARIOS = tuple(OPERACIONES_UNARIAS)
+
+class Codigo:
+    # Código compilado del programa o de una función, con sus tablas.
+    # `tipo_retorno` es el que se comprueba al llegar a FIN: None si no se
+    # declaró o si tipos.verificar ha demostrado que siempre es ese.
+    # `declaracion` es el nodo de la función (None en el programa), con el
+    # que la máquina busca su tabla en las memorias de la ejecución.
+    __slots__ = ('nombre', 'parametros', 'tipo_retorno', 'instrucciones', 'constantes', 'nombres', 'funciones', 'declaracion')
+
+    def __init__(self, nombre: Optional[str] = None, parametros: Optional[List[Dict[str, Optional[str]]]] = None, tipo_retorno: Optional[str] = None,
+                 declaracion: Optional[ast.DeclaracionFuncion] = None):
+        self.nombre = nombre
+        self.parametros = parametros or []
+        self.tipo_retorno = tipo_retorno
+        self.declaracion = declaracion
+        self.instrucciones = array('i')
+        self.constantes: List[Any] = []
+        self.nombres: List[str] = []
+        self.funciones: List['Codigo'] = []
+
+    def __len__(self) -> int:
+        return len(self.instrucciones) // 2
+
+def compila(tipo: type) -> Callable:
+    # Marca un método de CompiladorBytecode como compilador de la clase `tipo`
+    def decorar(metodo: Callable) -> Callable:
+        metodo.tipo_nodo = tipo
+        return metodo
+    return decorar
+
+class CompiladorBytecode:
+    # Compila un Programa (o el cuerpo de una función) a un Codigo. Las
+    # funciones declaradas dentro se compilan con otro compilador a su propio
+    # Codigo, que queda en `funciones`.
+    compiladores: Dict[type, Callable[['CompiladorBytecode', ast.Nodo], None]] = {}
+
+    def __init__(self, codigo: Codigo, omitir: Demostradas = NINGUNA):
+        self.codigo = codigo
+        self.omitir = omitir
+        self.id_constante: Dict[Any, int] = {}
+        self.id_nombre: Dict[str, int] = {}
+
+    def emitir(self, operacion: int, argumento: int = 0) -> int:
+        # Devuelve la posición de la instrucción, para corregir saltos
+        posicion = len(self.codigo.instrucciones)
+        self.codigo.instrucciones.extend((operacion, argumento))
+        return posicion
+
+    def posicion(self) -> int:
+        return len(self.codigo.instrucciones)
+
+    def corregir_salto(self, instruccion: int, destino: int) -> None:
+        self.codigo.instrucciones[instruccion + 1] = destino
+
+    def constante(self, valor: Any) -> int:
+        # Los Valor se internan por tipo y valor (1, 1.0 y verdadero son
+        # distintos); el resto son datos de una instrucción (tipos, tuplas)
+        clave = ('valor', valor.tipo, type(valor.valor), valor.valor) if isinstance(valor, Valor) else ('otra', valor)
+        try:
+            indice = self.id_constante.get(clave)
+        except TypeError:
+            indice = None
+            clave = None
+        if indice is None:
+            indice = len(self.codigo.constantes)
+            self.codigo.constantes.append(valor)
+            if clave is not None:
+                self.id_constante[clave] = indice
+        return indice
+
+    def nombre(self, nombre: str) -> int:
+        indice = self.id_nombre.get(nombre)
+        if indice is None:
+            indice = self.id_nombre[nombre] = len(self.codigo.nombres)
+            self.codigo.nombres.append(nombre)
+        return indice
+
+    def nulo(self) -> None:
+        self.emitir(CONSTANTE, self.constante(NULO))
+
+    def compilar(self, nodo: ast.Nodo) -> None:
+        tipo = type(nodo)
+        for base in tipo.__mro__:
+            if base in self.compiladores:
+                self.compiladores[base](self, nodo)
+                return
+        raise NotImplementedError(f"Tipo de nodo no implementado: {tipo.__name__}")
+
+    def compilar_bloque(self, sentencias: List[ast.Nodo]) -> bool:
+        # Deja el valor de la última sentencia; devuelve False (sin dejar nada)
+        # si el bloque está vacío
+        for i, sentencia in enumerate(sentencias):
+            if i:
+                self.emitir(SACAR)
+            self.compilar(sentencia)
+        return bool(sentencias)
+
+    def compilar_cuerpo_bucle(self, sentencias: List[ast.Nodo], profundidad: int) -> None:
+        # El resultado del bucle está en la pila, `profundidad` posiciones
+        # por debajo de la cima; cada vuelta lo sustituye por el del cuerpo
+        if self.compilar_bloque(sentencias):
+            self.emitir(GUARDAR_RESULTADO, profundidad)
+
+    @compila(ast.Programa)
+    def compilar_programa(self, nodo: ast.Programa) -> None:
+        if not self.compilar_bloque(nodo.cuerpo):
+            self.nulo()
+        self.emitir(FIN)
+
+    @compila(ast.DeclaracionVariable)
+    def compilar_declaracion_variable(self, nodo: ast.DeclaracionVariable) -> None:
+        self.compilar(nodo.valor)
+        if nodo.tipo and nodo not in self.omitir.declaraciones:
+            self.emitir(COMPROBAR_TIPO, self.constante(nodo.tipo))
+        self.emitir(DECLARAR, self.nombre(nodo.nombre))
+
+    @compila(ast.AsignacionVariable)
+    def compilar_asignacion_variable(self, nodo: ast.AsignacionVariable) -> None:
+        self.compilar(nodo.valor)
+        self.emitir(ASIGNAR, self.nombre(nodo.nombre))
+
+    @compila(ast.ValorLiteral)
+    def compilar_valor_literal(self, nodo: ast.ValorLiteral) -> None:
+        # Los operadores nunca modifican sus operandos, así que el mismo Valor
+        # sirve para todas las ejecuciones
+        self.emitir(CONSTANTE, self.constante(nodo.constante))
+
+    @compila(ast.Identificador)
+    def compilar_identificador(self, nodo: ast.Identificador) -> None:
+        self.emitir(CARGAR, self.nombre(nodo.nombre))
+
+    @compila(ast.OperacionBinaria)
+    def compilar_operacion_binaria(self, nodo: ast.OperacionBinaria) -> None:
+        if nodo.operador not in OPERACIONES_BINARIAS:
+            raise NotImplementedError(f"Operador no implementado: {nodo.operador}")
+        self.compilar(nodo.izquierda)
+        self.compilar(nodo.derecha)
+        self.emitir(BINARIA, OPERADORES_BINARIOS.index(nodo.operador))
+
+    @compila(ast.OperacionUnaria)
+    def compilar_operacion_unaria(self, nodo: ast.OperacionUnaria) -> None:
+        if nodo.operador not in OPERACIONES_UNARIAS:
+            raise NotImplementedError(f"Operador no implementado: {nodo.operador}")
+        self.compilar(nodo.operando)
+        self.emitir(UNARIA, OPERADORES_UNARIOS.index(nodo.operador))
+
+    @compila(ast.Condicional)
+    def compilar_condicional(self, nodo: ast.Condicional) -> None:
+        self.compilar(nodo.condicion)
+        salto_sino = self.emitir(SALTAR_SI_FALSO)
+        if not self.compilar_bloque(nodo.cuerpo):
+            self.nulo()
+        salto_fin = self.emitir(SALTAR)
+        self.corregir_salto(salto_sino, self.posicion())
+        if not self.compilar_bloque(nodo.sino or []):
+            self.nulo()
+        self.corregir_salto(salto_fin, self.posicion())
+
+    @compila(ast.BucleWhile)
+    def compilar_bucle_while(self, nodo: ast.BucleWhile) -> None:
+        self.nulo()
+        inicio = self.posicion()
+        self.compilar(nodo.condicion)
+        salida = self.emitir(SALTAR_SI_FALSO)
+        self.compilar_cuerpo_bucle(nodo.cuerpo, 1)
+        self.emitir(SALTAR, inicio)
+        self.corregir_salto(salida, self.posicion())
+
+    @compila(ast.BucleFor)
+    def compilar_bucle_for(self, nodo: ast.BucleFor) -> None:
+        self.compilar(nodo.inicializacion)
+        self.emitir(SACAR)
+        self.nulo()
+        inicio = self.posicion()
+        self.compilar(nodo.condicion)
+        salida = self.emitir(SALTAR_SI_FALSO)
+        self.compilar_cuerpo_bucle(nodo.cuerpo, 1)
+        self.compilar(nodo.incremento)
+        self.emitir(SACAR)
+        self.emitir(SALTAR, inicio)
+        self.corregir_salto(salida, self.posicion())
+
+    @compila(ast.BucleForEach)
+    def compilar_bucle_foreach(self, nodo: ast.BucleForEach) -> None:
+        # En la pila: el resultado y, encima, el iterador
+        self.nulo()
+        self.compilar(nodo.iterable)
+        self.emitir(ITERAR)
+        inicio = self.emitir(SIGUIENTE)
+        self.emitir(ENTRAR, self.nombre(nodo.variable))
+        self.compilar_cuerpo_bucle(nodo.cuerpo, 2)
+        self.emitir(SALIR)
+        self.emitir(SALTAR, inicio)
+        self.corregir_salto(inicio, self.posicion())
+
+    @compila(ast.DeclaracionFuncion)
+    def compilar_declaracion_funcion(self, nodo: ast.DeclaracionFuncion) -> None:
+        tipo_retorno = None if nodo in self.omitir.retornos else nodo.tipo_retorno
+        funcion = Codigo(nodo.nombre, nodo.parametros, tipo_retorno, nodo)
+        compilador = type(self)(funcion, self.omitir)
+        if not compilador.compilar_bloque(nodo.cuerpo):
+            compilador.nulo()
+        compilador.emitir(FIN)
+
+        self.codigo.funciones.append(funcion)
+        self.emitir(DEFINIR_FUNCION, len(self.codigo.funciones) - 1)
+
+    @compila(ast.LlamadaFuncion)
+    def compilar_llamada_funcion(self, nodo: ast.LlamadaFuncion) -> None:
+        # La función (y su número de parámetros) se comprueba antes de
+        # evaluar los argumentos, como en el intérprete
+        self.emitir(BUSCAR_FUNCION, self.constante((nodo.nombre, len(nodo.argumentos))))
+        for argumento in nodo.argumentos:
+            self.compilar(argumento)
+        self.emitir(LLAMAR, len(nodo.argumentos))
+
+    @compila(ast.RetornoFuncion)
+    def compilar_retorno_funcion(self, nodo: ast.RetornoFuncion) -> None:
+        if nodo.valor is None:
+            self.nulo()
+        else:
+            self.compilar(nodo.valor)
+        self.emitir(DEVOLVER)
+
+    @compila(ast.ListaValores)
+    def compilar_lista_valores(self, nodo: ast.ListaValores) -> None:
+        for elemento in nodo.valores:
+            self.compilar(elemento)
+        self.emitir(LISTA, len(nodo.valores))
+
+    @compila(ast.Diccionario)
+    def compilar_diccionario(self, nodo: ast.Diccionario) -> None:
+        for clave, valor in nodo.pares:
+            self.compilar(clave)
+            self.compilar(valor)
+            self.emitir(COMPROBAR_CLAVE)
+        self.emitir(DICCIONARIO, len(nodo.pares))
+
+    @compila(ast.ElementoHTML)
+    def compilar_elemento_html(self, nodo: ast.ElementoHTML) -> None:
+        for valor in nodo.atributos.values():
+            self.compilar(valor)
+        for item in nodo.contenido:
+            self.compilar(item)
+        descripcion = (nodo.tipo, tuple(nodo.atributos), len(nodo.contenido))
+        self.emitir(ELEMENTO_HTML, self.constante(descripcion))
+
+    @compila(ast.EstiloCSS)
+    def compilar_estilo_css(self, nodo: ast.EstiloCSS) -> None:
+        # Las propiedades son un diccionario: no se internan
+        self.codigo.constantes.append((nodo.selector, nodo.propiedades))
+        self.emitir(ESTILO_CSS, len(self.codigo.constantes) - 1)
+
+CompiladorBytecode.compiladores = {
+    metodo.tipo_nodo: metodo for metodo in vars(CompiladorBytecode).values() if hasattr(metodo, 'tipo_nodo')
+}
+
+def compilar_programa(programa: ast.Programa, omitir: Demostradas = NINGUNA) -> Codigo:
+    codigo = Codigo()
+    CompiladorBytecode(codigo, omitir).compilar(programa)
+    return codigo
+
+def describir_argumento(codigo: Codigo, operacion: int, argumento: int) -> str:
+    if operacion in (CONSTANTE, COMPROBAR_TIPO, BUSCAR_FUNCION, ELEMENTO_HTML, ESTILO_CSS):
+        constante = codigo.constantes[argumento]
+        if isinstance(constante, Valor):
+            return f"{constante.tipo} {constante.valor!r}"
+        return repr(constante)
+    if operacion in (CARGAR, DECLARAR, ASIGNAR, ENTRAR):
+        return codigo.nombres[argumento]
+    if operacion == BINARIA:
+        return OPERADORES_BINARIOS[argumento]
+    if operacion == UNARIA:
+        return OPERADORES_UNARIOS[argumento]
+    if operacion == DEFINIR_FUNCION:
+        return codigo.funciones[argumento].nombre
+    return ''
+
+def desensamblar(codigo: Codigo) -> str:
+    # Listado legible del código y, detrás, el de cada función que declara
+    titulo = 'programa' if codigo.nombre is None else f"funcion {codigo.nombre}"
+    lineas = [f"{titulo}:"]
+    instrucciones = codigo.instrucciones
+    for posicion in range(0, len(instrucciones), 2):
+        operacion, argumento = instrucciones[posicion], instrucciones[posicion + 1]
+        descripcion = describir_argumento(codigo, operacion, argumento)
+        linea = f"{posicion:6d} {NOMBRES_OPERACIONES[operacion]:18s} {argumento:5d}"
+        lineas.append(f"{linea}  ({descripcion})" if descripcion else linea)
+    for funcion in codigo.funciones:
+        lineas.append('')
+        lineas.append(desensamblar(funcion))
+    return '\n'.join(lineas)
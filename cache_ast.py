@@ -0,0 +1,132 @@
+# cache_ast.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import ast_nodes as ast
+from compilado import CacheDisco
+from lexer import Lexer
+from parser import Parser
+
+class CacheAST:
+    # Caché LRU de árboles ast.Programa indexada por el hash del código fuente.
+    # El tamaño de cada entrada se estima con los bytes de la fuente en UTF-8.
+    #
+    # Los árboles se comparten entre peticiones: quien los recibe no debe
+    # modificarlos. El intérprete sólo los lee; cualquier pasada que reescriba
+    # el árbol debe trabajar sobre una copia.
+    #
+    # Con `disco`, los fallos buscan primero el programa ya compilado en ese
+    # directorio y, si no está, lo guardan allí tras analizarlo.
+    #
+    # Cada entrada guarda además los derivados del árbol (árbol optimizado,
+    # cierres compilados...), que se desalojan junto con él. No cuentan para
+    # max_bytes.
+    def __init__(self, max_entradas: int = 256, max_bytes: int = 16 * 1024 * 1024,
+                 disco: Optional[CacheDisco] = None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.entradas: 'OrderedDict[bytes, Tuple[ast.Programa, int, Dict[Any, Any]]]' = OrderedDict()
+        self.bytes_totales = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.disco = disco
+        self.bloqueo = threading.Lock()
+
+    @staticmethod
+    def clave(codigo: str) -> bytes:
+        return hashlib.blake2b(codigo.encode('utf-8'), digest_size=16).digest()
+
+    def obtener(self, codigo: str) -> ast.Programa:
+        clave = self.clave(codigo)
+        with self.bloqueo:
+            entrada = self.entradas.get(clave)
+            if entrada is not None:
+                self.entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+
+        # Analizar fuera del bloqueo; los errores de sintaxis no se guardan
+        programa = self.disco.cargar(clave.hex(), codigo) if self.disco else None
+        if programa is None:
+            programa = Parser(Lexer().tokenizar_stream(codigo)).analizar()
+            if self.disco:
+                self.disco.guardar(clave.hex(), programa, codigo)
+        self.guardar(clave, programa, len(codigo.encode('utf-8')))
+        return programa
+
+    def guardar(self, clave: bytes, programa: ast.Programa, tamano: int) -> None:
+        if tamano > self.max_bytes or self.max_entradas <= 0:
+            return
+        with self.bloqueo:
+            anterior = self.entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes_totales -= anterior[1]
+            self.entradas[clave] = (programa, tamano, {})
+            self.bytes_totales += tamano
+            self.desalojar_sobrantes()
+
+    def desalojar_sobrantes(self) -> None:
+        # Debe llamarse con el bloqueo adquirido
+        while self.entradas and (len(self.entradas) > self.max_entradas or self.bytes_totales > self.max_bytes):
+            _, (_, tamano, _) = self.entradas.popitem(last=False)
+            self.bytes_totales -= tamano
+            self.desalojos += 1
+
+    def derivado(self, codigo: str, nombre: Any, construir: Callable[[ast.Programa], Any]) -> Any:
+        # construir(programa), calculado una vez por fuente mientras la
+        # entrada siga en la caché
+        clave = self.clave(codigo)
+        with self.bloqueo:
+            entrada = self.entradas.get(clave)
+            if entrada is not None and nombre in entrada[2]:
+                self.entradas.move_to_end(clave)
+                return entrada[2][nombre]
+
+        programa = self.obtener(codigo)
+        resultado = construir(programa)
+        with self.bloqueo:
+            entrada = self.entradas.get(clave)
+            if entrada is not None and entrada[0] is programa:
+                entrada[2][nombre] = resultado
+        return resultado
+
+    def configurar(self, max_entradas: int, max_bytes: int) -> None:
+        with self.bloqueo:
+            self.max_entradas = max_entradas
+            self.max_bytes = max_bytes
+            self.desalojar_sobrantes()
+
+    def limpiar(self) -> None:
+        with self.bloqueo:
+            self.entradas.clear()
+            self.bytes_totales = 0
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self.bloqueo:
+            return {
+                'entradas': len(self.entradas),
+                'bytes': self.bytes_totales,
+                'max_entradas': self.max_entradas,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'cargas_disco': self.disco.cargas if self.disco else 0,
+                'escrituras_disco': self.disco.escrituras if self.disco else 0,
+            }
+
+# Caché compartida por todo el proceso; los límites se ajustan por entorno.
+# CACHE_AST_DIRECTORIO activa además la caché de programas compilados en disco.
+cache_global = CacheAST(
+    max_entradas=int(os.environ.get('CACHE_AST_MAX_ENTRADAS', 256)),
+    max_bytes=int(os.environ.get('CACHE_AST_MAX_BYTES', 16 * 1024 * 1024)),
+    disco=CacheDisco(os.environ['CACHE_AST_DIRECTORIO']) if os.environ.get('CACHE_AST_DIRECTORIO') else None,
+)
+
+def analizar_codigo(codigo: str) -> ast.Programa:
+    return cache_global.obtener(codigo)
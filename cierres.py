@@ -0,0 +1,456 @@
+# cierres.py
+from typing import Callable, Dict, List, Optional, Tuple
+
+import ast_nodes as ast
+from ambitos import (
+    VACIA, Ambito, Direccion, EntornoSlots, Resolucion, asignar_variable, leer_variable, obtener_funcion, resolver,
+    volcar,
+)
+from biblioteca import Primitiva
+from interpreter import (
+    ENTEROS_RAPIDOS, NINGUNA, Demostradas, Entorno, RetornoExcepcion, Valor, iterar_valores, operacion_binaria,
+    operacion_unaria,
+)
+from listas import crear_lista
+from memoria import Memoria
+from valores import NULO
+
+# Motor de ejecución alternativo: cada nodo se compila una sola vez en una
+# función de Python (un cierre) que recibe el Entorno y devuelve el Valor.
+# Las decisiones que Interprete.evaluar repite en cada visita (clase del
+# nodo, operador, si hay bloque 'sino', si hay tipos declarados...) se toman
+# al compilar. La semántica y los mensajes de error son los del intérprete.
+#
+# Las variables se guardan en entornos de ambitos.py: cada uso lleva la
+# dirección (saltos, posición) que le ha dado el Resolutor, así que leer o
+# escribir no depende de cuántos entornos haya en la cadena.
+
+Cierre = Callable[[EntornoSlots], Valor]
+
+def compila(tipo: type) -> Callable:
+    # Marca un método de CompiladorCierres como compilador de la clase `tipo`
+    def decorar(metodo: Callable) -> Callable:
+        metodo.tipo_nodo = tipo
+        return metodo
+    return decorar
+
+def invocar(funcion: 'FuncionCompilada', nombre: str, valores_args: List[Valor], entorno: EntornoSlots, comprobar: bool) -> Valor:
+    # Ejecuta una llamada con los argumentos ya evaluados; `comprobar` indica
+    # si hay que comprobar sus tipos
+    entorno_funcion = EntornoSlots(funcion.ambito, entorno, entorno.memorias, entorno.profundidad + 1)
+    valores = entorno_funcion.valores
+    for param, posicion, valor in zip(funcion.parametros, funcion.posiciones, valores_args):
+        if comprobar and param['tipo'] and param['tipo'] != valor.tipo:
+            raise TypeError(f"Parámetro '{param['nombre']}' espera tipo '{param['tipo']}', pero se proporcionó '{valor.tipo}'")
+        valores[posicion] = valor
+
+    try:
+        resultado = funcion.cuerpo(entorno_funcion) or NULO
+    except RetornoExcepcion as r:
+        return r.valor or NULO
+
+    if funcion.comprobar_retorno and resultado.tipo != funcion.tipo_retorno:
+        raise TypeError(f"Función '{nombre}' debe retornar tipo '{funcion.tipo_retorno}', pero retornó '{resultado.tipo}'")
+    return resultado
+
+class FuncionCompilada:
+    # Lo que el motor guarda en Entorno.funciones en lugar del nodo
+    # DeclaracionFuncion: la misma interfaz más el cuerpo ya compilado
+    __slots__ = ('nombre', 'parametros', 'tipo_retorno', 'cuerpo', 'ambito', 'posiciones', 'declaracion', 'comprobar_retorno')
+
+    def __init__(self, declaracion: ast.DeclaracionFuncion, cuerpo: Callable[[EntornoSlots], Optional[Valor]], ambito: Ambito,
+                 comprobar_retorno: Optional[str]):
+        self.nombre = declaracion.nombre
+        self.parametros = declaracion.parametros
+        self.tipo_retorno = declaracion.tipo_retorno
+        self.cuerpo = cuerpo
+        self.ambito = ambito
+        # El nodo, para las llamadas que tipos.verificar ha demostrado contra
+        # él y para buscar su tabla en las memorias de la ejecución, y el
+        # tipo de retorno que queda por comprobar
+        self.declaracion = declaracion
+        self.comprobar_retorno = comprobar_retorno
+        # Posición de cada parámetro en el entorno de la llamada
+        self.posiciones = [ambito.posiciones[parametro['nombre']] for parametro in self.parametros]
+
+class CompiladorCierres:
+    # Los nodos deben ser los mismos objetos que recibió el Resolutor (las
+    # vistas de arena_ast crean uno nuevo en cada lectura: hay que pasar el
+    # árbol de ArenaAST.arbol)
+    compiladores: Dict[type, Callable[['CompiladorCierres', ast.Nodo], Cierre]] = {}
+
+    def __init__(self, resolucion: Resolucion, omitir: Demostradas = NINGUNA):
+        self.resolucion = resolucion
+        self.omitir = omitir
+
+    def compilar(self, nodo: ast.Nodo) -> Cierre:
+        tipo = type(nodo)
+        for base in tipo.__mro__:
+            if base in self.compiladores:
+                return self.compiladores[base](self, nodo)
+        raise NotImplementedError(f"Tipo de nodo no implementado: {tipo.__name__}")
+
+    def compilar_bloque(self, sentencias: List[ast.Nodo]) -> Callable[[EntornoSlots], Optional[Valor]]:
+        # Ejecuta las sentencias en orden y devuelve el valor de la última
+        # (None si el bloque está vacío)
+        cierres = [self.compilar(sentencia) for sentencia in sentencias]
+        if not cierres:
+            return lambda entorno: None
+        if len(cierres) == 1:
+            return cierres[0]
+        if len(cierres) == 2:
+            primera, segunda = cierres
+            def bloque(entorno: EntornoSlots) -> Valor:
+                primera(entorno)
+                return segunda(entorno)
+            return bloque
+        iniciales, ultima = cierres[:-1], cierres[-1]
+        def bloque(entorno: EntornoSlots) -> Valor:
+            for cierre in iniciales:
+                cierre(entorno)
+            return ultima(entorno)
+        return bloque
+
+    def compilar_operando(self, nodo: ast.Nodo) -> Tuple[Cierre, Optional[Valor]]:
+        # El Valor de los literales ya está construido en el nodo
+        if isinstance(nodo, ast.ValorLiteral):
+            return None, nodo.constante
+        return self.compilar(nodo), None
+
+    def compilar_condicion(self, nodo: ast.Nodo) -> Callable[[EntornoSlots], bool]:
+        # Las comparaciones siempre dan un booleano, así que la condición se
+        # calcula directamente como bool de Python
+        if isinstance(nodo, ast.OperacionBinaria) and nodo.operador in ENTEROS_RAPIDOS \
+                and ENTEROS_RAPIDOS[nodo.operador][1] == 'booleano':
+            comparar = ENTEROS_RAPIDOS[nodo.operador][0]
+            operar = operacion_binaria(nodo.operador)
+            izquierda = self.compilar(nodo.izquierda)
+            derecha, constante = self.compilar_operando(nodo.derecha)
+            if constante is not None:
+                def comparar_constante(entorno: EntornoSlots) -> bool:
+                    a = izquierda(entorno)
+                    if a.tipo == 'entero' and constante.tipo == 'entero':
+                        return comparar(a.valor, constante.valor)
+                    return operar(a, constante).valor
+                return comparar_constante
+            def comparar_variables(entorno: EntornoSlots) -> bool:
+                a = izquierda(entorno)
+                b = derecha(entorno)
+                if a.tipo == 'entero' and b.tipo == 'entero':
+                    return comparar(a.valor, b.valor)
+                return operar(a, b).valor
+            return comparar_variables
+
+        condicion = self.compilar(nodo)
+        def comprobar(entorno: EntornoSlots) -> bool:
+            valor = condicion(entorno)
+            if valor.tipo != 'booleano':
+                raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{valor.tipo}'")
+            return valor.valor
+        return comprobar
+
+    @compila(ast.Programa)
+    def compilar_programa(self, nodo: ast.Programa) -> Callable[..., Valor]:
+        # El programa recibe el Entorno del intérprete y las memorias de la
+        # ejecución: sus variables van en un EntornoSlots que cuelga de él y
+        # se copian en él al terminar
+        ambito = self.resolucion.ambitos[nodo]
+        bloque = self.compilar_bloque(nodo.cuerpo)
+        def programa(entorno: Entorno, memorias: Optional[Dict[ast.DeclaracionFuncion, Memoria]] = None) -> Valor:
+            raiz = EntornoSlots(ambito, entorno, memorias)
+            try:
+                return bloque(raiz) or NULO
+            finally:
+                volcar(raiz, ambito, entorno)
+        return programa
+
+    @compila(ast.DeclaracionVariable)
+    def compilar_declaracion_variable(self, nodo: ast.DeclaracionVariable) -> Cierre:
+        # Siempre en el ámbito actual (saltos == 0)
+        _, posicion = self.resolucion.direcciones[nodo]
+        tipo = None if nodo in self.omitir.declaraciones else nodo.tipo
+        expresion = self.compilar(nodo.valor)
+        if not tipo:
+            def declarar(entorno: EntornoSlots) -> Valor:
+                valor = entorno.valores[posicion] = expresion(entorno)
+                return valor
+            return declarar
+        def declarar_con_tipo(entorno: EntornoSlots) -> Valor:
+            valor = expresion(entorno)
+            if tipo != valor.tipo:
+                raise TypeError(f"Se esperaba tipo '{tipo}' pero se obtuvo '{valor.tipo}'")
+            entorno.valores[posicion] = valor
+            return valor
+        return declarar_con_tipo
+
+    @compila(ast.AsignacionVariable)
+    def compilar_asignacion_variable(self, nodo: ast.AsignacionVariable) -> Cierre:
+        nombre = nodo.nombre
+        expresion = self.compilar(nodo.valor)
+        direccion = self.resolucion.direcciones[nodo]
+        if direccion is None:
+            def asignar_por_nombre(entorno: EntornoSlots) -> Valor:
+                valor = expresion(entorno)
+                asignar_variable(entorno, nombre, valor)
+                return valor
+            return asignar_por_nombre
+
+        # Si la variable aún no se ha declarado en su ámbito, la asignación
+        # es para la que haya más arriba
+        saltos, posicion = direccion
+        if saltos == 0:
+            def asignar_local(entorno: EntornoSlots) -> Valor:
+                valor = expresion(entorno)
+                valores = entorno.valores
+                if valores[posicion] is VACIA:
+                    asignar_variable(entorno.padre, nombre, valor)
+                else:
+                    valores[posicion] = valor
+                return valor
+            return asignar_local
+        def asignar(entorno: EntornoSlots) -> Valor:
+            valor = expresion(entorno)
+            for _ in range(saltos):
+                entorno = entorno.padre
+            valores = entorno.valores
+            if valores[posicion] is VACIA:
+                asignar_variable(entorno.padre, nombre, valor)
+            else:
+                valores[posicion] = valor
+            return valor
+        return asignar
+
+    @compila(ast.ValorLiteral)
+    def compilar_valor_literal(self, nodo: ast.ValorLiteral) -> Cierre:
+        constante = nodo.constante
+        return lambda entorno: constante
+
+    @compila(ast.Identificador)
+    def compilar_identificador(self, nodo: ast.Identificador) -> Cierre:
+        nombre = nodo.nombre
+        direccion = self.resolucion.direcciones[nodo]
+        if direccion is None:
+            return lambda entorno: leer_variable(entorno, nombre)
+
+        saltos, posicion = direccion
+        if saltos == 0:
+            def leer_local(entorno: EntornoSlots) -> Valor:
+                valor = entorno.valores[posicion]
+                if valor is VACIA:
+                    return leer_variable(entorno.padre, nombre)
+                return valor
+            return leer_local
+        if saltos == 1:
+            def leer_padre(entorno: EntornoSlots) -> Valor:
+                entorno = entorno.padre
+                valor = entorno.valores[posicion]
+                if valor is VACIA:
+                    return leer_variable(entorno.padre, nombre)
+                return valor
+            return leer_padre
+        def leer(entorno: EntornoSlots) -> Valor:
+            for _ in range(saltos):
+                entorno = entorno.padre
+            valor = entorno.valores[posicion]
+            if valor is VACIA:
+                return leer_variable(entorno.padre, nombre)
+            return valor
+        return leer
+
+    @compila(ast.OperacionBinaria)
+    def compilar_operacion_binaria(self, nodo: ast.OperacionBinaria) -> Cierre:
+        operar = operacion_binaria(nodo.operador)
+        izquierda = self.compilar(nodo.izquierda)
+        derecha, constante = self.compilar_operando(nodo.derecha)
+
+        if nodo.operador not in ENTEROS_RAPIDOS:
+            if constante is not None:
+                return lambda entorno: operar(izquierda(entorno), constante)
+            return lambda entorno: operar(izquierda(entorno), derecha(entorno))
+
+        rapida, caja = ENTEROS_RAPIDOS[nodo.operador]
+        if constante is not None:
+            if constante.tipo != 'entero':
+                return lambda entorno: operar(izquierda(entorno), constante)
+            valor_constante = constante.valor
+            def operar_constante(entorno: EntornoSlots) -> Valor:
+                a = izquierda(entorno)
+                if a.tipo == 'entero':
+                    return caja(rapida(a.valor, valor_constante))
+                return operar(a, constante)
+            return operar_constante
+        def operar_variables(entorno: EntornoSlots) -> Valor:
+            a = izquierda(entorno)
+            b = derecha(entorno)
+            if a.tipo == 'entero' and b.tipo == 'entero':
+                return caja(rapida(a.valor, b.valor))
+            return operar(a, b)
+        return operar_variables
+
+    @compila(ast.OperacionUnaria)
+    def compilar_operacion_unaria(self, nodo: ast.OperacionUnaria) -> Cierre:
+        operando = self.compilar(nodo.operando)
+        operar = operacion_unaria(nodo.operador)
+        return lambda entorno: operar(operando(entorno))
+
+    @compila(ast.Condicional)
+    def compilar_condicional(self, nodo: ast.Condicional) -> Cierre:
+        condicion = self.compilar_condicion(nodo.condicion)
+        cuerpo = self.compilar_bloque(nodo.cuerpo)
+        if not nodo.sino:
+            def si(entorno: EntornoSlots) -> Valor:
+                if condicion(entorno):
+                    return cuerpo(entorno) or NULO
+                return NULO
+            return si
+        sino = self.compilar_bloque(nodo.sino)
+        def si_sino(entorno: EntornoSlots) -> Valor:
+            if condicion(entorno):
+                return cuerpo(entorno) or NULO
+            return sino(entorno) or NULO
+        return si_sino
+
+    @compila(ast.BucleWhile)
+    def compilar_bucle_while(self, nodo: ast.BucleWhile) -> Cierre:
+        condicion = self.compilar_condicion(nodo.condicion)
+        cuerpo = self.compilar_bloque(nodo.cuerpo)
+        def mientras(entorno: EntornoSlots) -> Valor:
+            resultado = NULO
+            while condicion(entorno):
+                resultado = cuerpo(entorno) or resultado
+            return resultado
+        return mientras
+
+    @compila(ast.BucleFor)
+    def compilar_bucle_for(self, nodo: ast.BucleFor) -> Cierre:
+        inicializacion = self.compilar(nodo.inicializacion)
+        condicion = self.compilar_condicion(nodo.condicion)
+        incremento = self.compilar(nodo.incremento)
+        cuerpo = self.compilar_bloque(nodo.cuerpo)
+        def para(entorno: EntornoSlots) -> Valor:
+            inicializacion(entorno)
+            resultado = NULO
+            while condicion(entorno):
+                resultado = cuerpo(entorno) or resultado
+                incremento(entorno)
+            return resultado
+        return para
+
+    @compila(ast.BucleForEach)
+    def compilar_bucle_foreach(self, nodo: ast.BucleForEach) -> Cierre:
+        ambito = self.resolucion.ambitos[nodo]
+        posicion = ambito.posiciones[nodo.variable]
+        plantilla = ambito.plantilla
+        # Sólo hace falta vaciar el entorno entre vueltas si el cuerpo
+        # declara variables además de la del bucle
+        reiniciar = len(ambito.nombres) > 1
+        iterable = self.compilar(nodo.iterable)
+        cuerpo = self.compilar_bloque(nodo.cuerpo)
+        def para_cada(entorno: EntornoSlots) -> Valor:
+            coleccion = iterable(entorno)
+            resultado = NULO
+
+            # Un único entorno para todas las vueltas, que empieza cada una
+            # como si fuera nuevo
+            interior = EntornoSlots(ambito, entorno, entorno.memorias, entorno.profundidad)
+            valores = interior.valores
+            for valor in iterar_valores(coleccion):
+                if reiniciar:
+                    valores[:] = plantilla
+                interior.funciones = None
+                valores[posicion] = valor
+                resultado = cuerpo(interior) or resultado
+            return resultado
+        return para_cada
+
+    @compila(ast.DeclaracionFuncion)
+    def compilar_declaracion_funcion(self, nodo: ast.DeclaracionFuncion) -> Cierre:
+        ambito = self.resolucion.ambitos[nodo]
+        comprobar_retorno = None if nodo in self.omitir.retornos else nodo.tipo_retorno
+        funcion = FuncionCompilada(nodo, self.compilar_bloque(nodo.cuerpo), ambito, comprobar_retorno)
+        nombre = nodo.nombre
+        def declarar(entorno: EntornoSlots) -> Valor:
+            entorno.definir_funcion(nombre, funcion)
+            return Valor('funcion', nombre)
+        return declarar
+
+    @compila(ast.LlamadaFuncion)
+    def compilar_llamada_funcion(self, nodo: ast.LlamadaFuncion) -> Cierre:
+        nombre = nodo.nombre
+        argumentos = [self.compilar(argumento) for argumento in nodo.argumentos]
+        cantidad = len(argumentos)
+        verificada = self.omitir.llamadas.get(nodo)
+        def llamar(entorno: EntornoSlots) -> Valor:
+            funcion = obtener_funcion(entorno, nombre)
+            if type(funcion) is Primitiva:
+                funcion.comprobar(cantidad)
+                return funcion.llamar([argumento(entorno) for argumento in argumentos])
+
+            parametros = funcion.parametros
+            comprobar = funcion.declaracion is not verificada
+            if comprobar and cantidad != len(parametros):
+                raise TypeError(f"Función '{nombre}' espera {len(parametros)} argumentos, pero se proporcionaron {cantidad}")
+
+            valores_args = [argumento(entorno) for argumento in argumentos]
+            memorias = entorno.memorias
+            if memorias:
+                memoria = memorias.get(funcion.declaracion)
+                if memoria is not None:
+                    return memoria.llamar(valores_args, entorno.profundidad, invocar, funcion, nombre, valores_args, entorno, comprobar)
+            return invocar(funcion, nombre, valores_args, entorno, comprobar)
+        return llamar
+
+    @compila(ast.RetornoFuncion)
+    def compilar_retorno_funcion(self, nodo: ast.RetornoFuncion) -> Cierre:
+        if nodo.valor is None:
+            def devolver_nulo(entorno: EntornoSlots) -> Valor:
+                raise RetornoExcepcion(NULO)
+            return devolver_nulo
+        expresion = self.compilar(nodo.valor)
+        def devolver(entorno: EntornoSlots) -> Valor:
+            raise RetornoExcepcion(expresion(entorno))
+        return devolver
+
+    @compila(ast.ListaValores)
+    def compilar_lista_valores(self, nodo: ast.ListaValores) -> Cierre:
+        elementos = [self.compilar(elemento) for elemento in nodo.valores]
+        return lambda entorno: crear_lista([elemento(entorno) for elemento in elementos])
+
+    @compila(ast.Diccionario)
+    def compilar_diccionario(self, nodo: ast.Diccionario) -> Cierre:
+        pares = [(self.compilar(clave), self.compilar(valor)) for clave, valor in nodo.pares]
+        def diccionario(entorno: EntornoSlots) -> Valor:
+            resultado = {}
+            for clave, valor in pares:
+                clave_eval = clave(entorno)
+                valor_eval = valor(entorno)
+                if clave_eval.tipo not in ['entero', 'decimal', 'cadena', 'booleano']:
+                    raise TypeError(f"La clave del diccionario debe ser inmutable, no '{clave_eval.tipo}'")
+                resultado[clave_eval.valor] = valor_eval
+            return Valor('diccionario', resultado)
+        return diccionario
+
+    @compila(ast.ElementoHTML)
+    def compilar_elemento_html(self, nodo: ast.ElementoHTML) -> Cierre:
+        tipo = nodo.tipo
+        atributos = [(nombre, self.compilar(valor)) for nombre, valor in nodo.atributos.items()]
+        contenido = [self.compilar(item) for item in nodo.contenido]
+        def elemento(entorno: EntornoSlots) -> Valor:
+            return Valor('html', {
+                'tipo': tipo,
+                'atributos': {nombre: valor(entorno) for nombre, valor in atributos},
+                'contenido': [item(entorno) for item in contenido],
+            })
+        return elemento
+
+    @compila(ast.EstiloCSS)
+    def compilar_estilo_css(self, nodo: ast.EstiloCSS) -> Cierre:
+        selector, propiedades = nodo.selector, nodo.propiedades
+        return lambda entorno: Valor('css', {'selector': selector, 'propiedades': propiedades})
+
+CompiladorCierres.compiladores = {
+    metodo.tipo_nodo: metodo for metodo in vars(CompiladorCierres).values() if hasattr(metodo, 'tipo_nodo')
+}
+
+def compilar_programa(programa: ast.Programa, omitir: Demostradas = NINGUNA) -> Callable[..., Valor]:
+    return CompiladorCierres(resolver(programa), omitir).compilar(programa)
@@ -0,0 +1,274 @@
+# compilado.py
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, List, Optional, Tuple
+
+import ast_nodes as ast
+from arena_ast import ArenaAST, MAX_CAMPOS, clases, esquemas
+
+# Formato binario de un Programa ya analizado (little-endian):
+#
+#   cabecera   'LPRG', versión (u16), MAX_CAMPOS (u16), huella del esquema
+#              (8 bytes), hash de la fuente (16 bytes), raíz (u32)
+#   textos     cantidad (u32), longitudes (u32 cada una), UTF-8 seguidos
+#   valores    cantidad de constantes (u32) y de objetos (u32), y después
+#              cada valor con una etiqueta de tipo
+#   filas      cantidad (u32), clase (u8 cada una), MAX_CAMPOS columnas,
+#              línea y columna en la fuente (-1 si el nodo no tiene)
+#   hijos      cantidad (u32) y un array
+#
+# Cada array de enteros va precedido de su typecode ('b', 'h' o 'i'): se usa
+# el más pequeño en el que caben sus valores.
+#
+# Es el contenido de una ArenaAST. No se usa pickle: al cargar sólo se crean
+# nodos de ast_nodes y valores simples, y se validan todos los índices, así
+# que un archivo corrupto o manipulado sólo produce un ValueError.
+
+MAGIA = b'LPRG'
+VERSION = 2
+
+# Cambia si cambian las clases de nodos, sus campos, cómo se guardan o los
+# atributos de posición
+HUELLA = hashlib.blake2b(
+    repr([(clase.__name__, clase.campos, esquemas[clase]) for clase in clases] + [ast.Nodo.__slots__]).encode('utf-8'),
+    digest_size=8,
+).digest()
+
+CABECERA = struct.Struct('<4sHH8s16sI')
+U32 = struct.Struct('<I')
+I64 = struct.Struct('<q')
+F64 = struct.Struct('<d')
+
+def hash_fuente(codigo: str) -> bytes:
+    return hashlib.blake2b(codigo.encode('utf-8'), digest_size=16).digest()
+
+def a_little_endian(datos: array) -> bytes:
+    if sys.byteorder == 'big':
+        datos = array(datos.typecode, datos)
+        datos.byteswap()
+    return datos.tobytes()
+
+def array_minimo(datos: array) -> bytes:
+    for tipo, limite in (('b', 2 ** 7), ('h', 2 ** 15)):
+        if not datos or (min(datos) >= -limite and max(datos) < limite):
+            return tipo.encode('ascii') + a_little_endian(array(tipo, datos))
+    return b'i' + a_little_endian(datos)
+
+def escribir_valor(salida: List[bytes], valor: Any) -> None:
+    # bool antes que int: True es también un int
+    if valor is None:
+        salida.append(b'N')
+    elif valor is True:
+        salida.append(b'V')
+    elif valor is False:
+        salida.append(b'F')
+    elif isinstance(valor, int):
+        if -2 ** 63 <= valor < 2 ** 63:
+            salida.append(b'I' + I64.pack(valor))
+        else:
+            texto = str(valor).encode('ascii')
+            salida.append(b'G' + U32.pack(len(texto)) + texto)
+    elif isinstance(valor, float):
+        salida.append(b'R' + F64.pack(valor))
+    elif isinstance(valor, str):
+        texto = valor.encode('utf-8')
+        salida.append(b'S' + U32.pack(len(texto)) + texto)
+    elif isinstance(valor, list):
+        salida.append(b'L' + U32.pack(len(valor)))
+        for elemento in valor:
+            escribir_valor(salida, elemento)
+    elif isinstance(valor, dict):
+        salida.append(b'D' + U32.pack(len(valor)))
+        for clave, elemento in valor.items():
+            escribir_valor(salida, clave)
+            escribir_valor(salida, elemento)
+    else:
+        raise TypeError(f"Valor no serializable en el programa compilado: {type(valor).__name__}")
+
+class Lector:
+    def __init__(self, datos: bytes):
+        self.datos = memoryview(datos)
+        self.posicion = 0
+
+    def leer(self, cantidad: int) -> memoryview:
+        fin = self.posicion + cantidad
+        if cantidad < 0 or fin > len(self.datos):
+            raise ValueError("Programa compilado truncado")
+        trozo = self.datos[self.posicion:fin]
+        self.posicion = fin
+        return trozo
+
+    def u32(self) -> int:
+        return U32.unpack(self.leer(4))[0]
+
+    def array(self, tipo: str, cantidad: int) -> array:
+        datos = array(tipo)
+        datos.frombytes(self.leer(cantidad * datos.itemsize))
+        if sys.byteorder == 'big':
+            datos.byteswap()
+        return datos
+
+    def array_minimo(self, cantidad: int) -> array:
+        tipo = str(self.leer(1), 'ascii')
+        if tipo not in ('b', 'h', 'i'):
+            raise ValueError(f"Tipo de array desconocido: {tipo!r}")
+        return self.array(tipo, cantidad)
+
+    def valor(self, profundidad: int = 0) -> Any:
+        if profundidad > 64:
+            raise ValueError("Valor demasiado anidado en el programa compilado")
+        etiqueta = bytes(self.leer(1))
+        if etiqueta == b'N':
+            return None
+        if etiqueta == b'V':
+            return True
+        if etiqueta == b'F':
+            return False
+        if etiqueta == b'I':
+            return I64.unpack(self.leer(8))[0]
+        if etiqueta == b'G':
+            return int(str(self.leer(self.u32()), 'ascii'))
+        if etiqueta == b'R':
+            return F64.unpack(self.leer(8))[0]
+        if etiqueta == b'S':
+            return str(self.leer(self.u32()), 'utf-8')
+        if etiqueta == b'L':
+            return [self.valor(profundidad + 1) for _ in range(self.u32())]
+        if etiqueta == b'D':
+            resultado = {}
+            for _ in range(self.u32()):
+                clave = self.valor(profundidad + 1)
+                if not isinstance(clave, (str, int, float, bool, type(None))):
+                    raise ValueError("Clave inválida en el programa compilado")
+                resultado[clave] = self.valor(profundidad + 1)
+            return resultado
+        raise ValueError(f"Etiqueta de valor desconocida: {etiqueta!r}")
+
+def serializar(programa: ast.Programa, codigo: str = '') -> bytes:
+    arena, raiz = ArenaAST.desde_arbol(programa)
+    salida = [CABECERA.pack(MAGIA, VERSION, MAX_CAMPOS, HUELLA, hash_fuente(codigo), raiz)]
+
+    textos = [texto.encode('utf-8') for texto in arena.textos]
+    salida.append(U32.pack(len(textos)))
+    salida.append(a_little_endian(array('I', map(len, textos))))
+    salida.extend(textos)
+
+    # Primero las constantes y detrás los objetos
+    salida.append(U32.pack(len(arena.constantes)))
+    salida.append(U32.pack(len(arena.objetos)))
+    for valor in arena.constantes + arena.objetos:
+        escribir_valor(salida, valor)
+
+    salida.append(U32.pack(len(arena.clases)))
+    salida.append(arena.clases.tobytes())
+    for columna in arena.columnas + [arena.lineas, arena.columnas_fuente]:
+        salida.append(array_minimo(columna))
+
+    salida.append(U32.pack(len(arena.hijos)))
+    salida.append(array_minimo(arena.hijos))
+    return b''.join(salida)
+
+def leer_cabecera(datos: bytes) -> Tuple[bytes, int]:
+    # Devuelve el hash de la fuente y la raíz, o lanza ValueError si el
+    # archivo no es de esta versión del formato
+    if len(datos) < CABECERA.size:
+        raise ValueError("Programa compilado truncado")
+    magia, version, campos, huella, fuente, raiz = CABECERA.unpack_from(datos)
+    if magia != MAGIA:
+        raise ValueError("No es un programa compilado")
+    if version != VERSION or campos != MAX_CAMPOS or huella != HUELLA:
+        raise ValueError("Programa compilado con otra versión del formato")
+    return fuente, raiz
+
+def deserializar(datos: bytes, codigo: Optional[str] = None) -> ast.Programa:
+    # Con `codigo`, además se comprueba que el archivo corresponde a esa fuente
+    fuente, raiz = leer_cabecera(datos)
+    if codigo is not None and fuente != hash_fuente(codigo):
+        raise ValueError("El programa compilado no corresponde a la fuente")
+
+    lector = Lector(datos)
+    lector.posicion = CABECERA.size
+    arena = ArenaAST()
+
+    longitudes = lector.array('I', lector.u32())
+    arena.textos = [str(lector.leer(longitud), 'utf-8') for longitud in longitudes]
+
+    constantes = lector.u32()
+    objetos = lector.u32()
+    arena.constantes = [lector.valor() for _ in range(constantes)]
+    arena.objetos = [lector.valor() for _ in range(objetos)]
+
+    filas = lector.u32()
+    arena.clases = lector.array('B', filas)
+    arena.columnas = [lector.array_minimo(filas) for _ in range(MAX_CAMPOS)]
+    arena.lineas = lector.array_minimo(filas)
+    arena.columnas_fuente = lector.array_minimo(filas)
+    arena.hijos = lector.array_minimo(lector.u32())
+    if lector.posicion != len(datos):
+        raise ValueError("Datos sobrantes al final del programa compilado")
+
+    programa = arena.arbol(raiz)
+    if not isinstance(programa, ast.Programa):
+        raise ValueError("La raíz del programa compilado no es un Programa")
+    return programa
+
+class CacheDisco:
+    # Directorio de programas compilados, al estilo de __pycache__. Cada
+    # archivo lleva el hash de su fuente, así que una entrada desactualizada
+    # se detecta al cargarla y se reemplaza. Los fallos de lectura o escritura
+    # nunca impiden ejecutar: sólo hacen que se vuelva a analizar.
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self.cargas = 0
+        self.escrituras = 0
+
+    def ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, f"{nombre}.lpc")
+
+    def cargar(self, nombre: str, codigo: str) -> Optional[ast.Programa]:
+        # Un archivo ilegible o dañado es como si no estuviera: el programa
+        # se vuelve a analizar y el archivo se sobrescribe
+        try:
+            with open(self.ruta(nombre), 'rb') as archivo:
+                programa = deserializar(archivo.read(), codigo)
+        except (OSError, ValueError, TypeError):
+            return None
+        self.cargas += 1
+        return programa
+
+    def guardar(self, nombre: str, programa: ast.Programa, codigo: str) -> None:
+        # Escritura atómica: otro proceso nunca ve un archivo a medias
+        try:
+            datos = serializar(programa, codigo)
+            os.makedirs(self.directorio, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as archivo:
+                    archivo.write(datos)
+                os.replace(temporal, self.ruta(nombre))
+            except BaseException:
+                os.unlink(temporal)
+                raise
+        except (OSError, TypeError):
+            return
+        self.escrituras += 1
+
+def analizar_archivo(ruta: str) -> ast.Programa:
+    # Programa de un archivo fuente, usando `__compilados__/<nombre>.lpc`
+    # junto a él si está al día
+    from lexer import Lexer
+    from parser import Parser
+
+    with open(ruta, encoding='utf-8') as archivo:
+        codigo = archivo.read()
+    directorio, nombre = os.path.split(os.path.abspath(ruta))
+    cache = CacheDisco(os.path.join(directorio, '__compilados__'))
+    programa = cache.cargar(nombre, codigo)
+    if programa is None:
+        programa = Parser(Lexer().tokenizar_stream(codigo)).analizar()
+        cache.guardar(nombre, programa, codigo)
+    return programa
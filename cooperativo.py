@@ -0,0 +1,149 @@
+# cooperativo.py
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import ast_nodes as ast
+from ejecutor import CAMPOS, TIEMPO_LIMITE, EjecutorBase, anotar_salida, error, exito, fallo
+from interpreter import Entorno, Interprete, Valor
+from salida import INTERVALO, MAX_TOTAL, Salida
+from trampolin import evaluar, recorrer
+
+# Modo cooperativo: muchos programas a la vez en un bucle de eventos, sin
+# hilos ni procesos. El programa se recorre con los generadores de
+# trampolin.py (todas las llamadas en el trampolín, sin la pila de Python) y
+# recorrer() cuenta los pasos: cada vuelta de un bucle y cada llamada a una
+# función del programa. Cada `quantum` pasos, si el programa lleva `rebanada`
+# segundos o más sin ceder, cede el bucle de eventos (asyncio.sleep(0)): los
+# demás programas, en la cola de tareas listas del bucle, avanzan un turno
+# cada uno antes de que vuelva. `quantum` es cada cuánto se mira el reloj y
+# `rebanada` el reparto: con 0 se cede cada `quantum` pasos, lo más equitativo
+# y lo que más cuesta. Las funciones nativas cuentan como un paso, aunque
+# ordenen una lista enorme. Recorrer el árbol con generadores cuesta casi el
+# doble que con Interprete.evaluar: el modo sirve para muchos programas
+# cortos a la vez, no para uno largo.
+#
+# El análisis, la optimización y la verificación de tipos
+# (Interprete.preparar) no ceden: se hacen en un hilo (asyncio.to_thread)
+# para que un programa largo de analizar no pare a los demás.
+#
+# Como el programa cede, asyncio.wait_for puede cortarlo si pasa del tiempo
+# límite (si lo corta mientras se prepara, el hilo termina de prepararlo y el
+# resultado queda en la caché). EjecutorCooperativo lo usa para atender las
+# peticiones del servidor (INTERPRETE_MODO=cooperativo en main.py).
+
+# Pasos entre dos miradas al reloj
+QUANTUM = 100
+
+# Segundos que un programa puede ocupar el bucle de eventos sin ceder
+REBANADA = 0.001
+
+# Programas que se ejecutan a la vez por defecto
+SESIONES = 1000
+
+async def evaluar_cooperativo(interprete: Interprete, programa: ast.Programa, entorno: Entorno,
+                              quantum: Optional[int] = None, rebanada: Optional[float] = None) -> Valor:
+    quantum = QUANTUM if quantum is None else quantum
+    rebanada = REBANADA if rebanada is None else rebanada
+    if quantum < 1:
+        raise ValueError("El quantum debe ser de al menos un paso")
+
+    llamadas = interprete.llamadas
+    pasos = recorrer(interprete, evaluar(interprete, programa, entorno), quantum)
+    reloj = time.perf_counter
+    inicio = reloj()
+    try:
+        while True:
+            try:
+                next(pasos)
+            except StopIteration as fin:
+                return fin.value
+            if reloj() - inicio >= rebanada:
+                await asyncio.sleep(0)
+                inicio = reloj()
+    finally:
+        # También si se cancela mientras espera su turno
+        pasos.close()
+        interprete.llamadas = llamadas
+
+async def interpretar(codigo: str, optimizar: bool = False, motor: str = 'arbol', verificar: bool = False,
+                      salida: Optional[Salida] = None, quantum: Optional[int] = None,
+                      rebanada: Optional[float] = None) -> Dict[str, Any]:
+    # Como ejecutor.interpretar, en el bucle de eventos
+    if salida is None:
+        salida = Salida()
+    try:
+        if motor != 'arbol':
+            raise ValueError(f"El modo cooperativo sólo recorre el árbol (motor 'arbol'), no '{motor}'")
+        interprete = Interprete()
+        interprete.salida = salida
+        resultado = await interprete.ejecutar_cooperativo(codigo, optimizar, verificar, quantum, rebanada)
+        respuesta = exito(interprete, resultado)
+    except Exception as e:
+        respuesta = fallo(e)
+    return anotar_salida(respuesta, salida)
+
+class EjecutorCooperativo(EjecutorBase):
+    # Un ejecutor (ejecutar, flujo, lote, estadisticas) sin procesos: ejecuta
+    # `sesiones` programas a la vez en el bucle de eventos, turnándose según
+    # `quantum` y `rebanada`, con `cola` más esperando. Sólo el motor 'arbol'.
+    def __init__(self, sesiones: int = SESIONES, cola: Optional[int] = None, tiempo_limite: float = TIEMPO_LIMITE,
+                 quantum: int = QUANTUM, rebanada: float = REBANADA, max_salida: int = MAX_TOTAL,
+                 intervalo_salida: float = INTERVALO):
+        super().__init__(sesiones, cola, tiempo_limite, max_salida, intervalo_salida)
+        if quantum < 1:
+            raise ValueError("El quantum debe ser de al menos un paso")
+        self.quantum = quantum
+        self.rebanada = rebanada
+        self.turnos: Optional[asyncio.Semaphore] = None
+        self.en_curso = 0
+
+    async def iniciar(self) -> None:
+        self.turnos = asyncio.Semaphore(self.procesos)
+
+    async def despachar(self, peticion: Dict[str, Any], al_escribir: Optional[Callable[[List[str]], None]] = None) -> Dict[str, Any]:
+        try:
+            async with self.turnos:
+                self.en_curso += 1
+                try:
+                    return await self.atender(peticion, al_escribir)
+                finally:
+                    self.en_curso -= 1
+        finally:
+            self.pendientes -= 1
+
+    async def atender(self, peticion: Dict[str, Any], al_escribir: Optional[Callable[[List[str]], None]]) -> Dict[str, Any]:
+        salida = Salida(al_escribir, **self.opciones_salida)
+        # En flujo, las líneas escritas se envían aunque el programa no
+        # vuelva a escribir
+        vaciado = asyncio.ensure_future(self.vaciar_periodicamente(salida)) if al_escribir is not None else None
+        try:
+            respuesta = await asyncio.wait_for(
+                interpretar(**{campo: peticion[campo] for campo in CAMPOS}, salida=salida,
+                            quantum=self.quantum, rebanada=self.rebanada),
+                self.tiempo_limite)
+        except asyncio.TimeoutError:
+            self.agotadas += 1
+            return error(f"El programa superó el tiempo límite de {self.tiempo_limite:g} s")
+        finally:
+            if vaciado is not None:
+                vaciado.cancel()
+                salida.vaciar()
+        self.completadas += 1
+        return respuesta
+
+    @staticmethod
+    async def vaciar_periodicamente(salida: Salida) -> None:
+        while True:
+            await asyncio.sleep(salida.intervalo)
+            salida.vaciar()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        estadisticas = super().estadisticas()
+        estadisticas.update({
+            'modo': 'cooperativo',
+            'libres': self.procesos - self.en_curso,
+            'quantum': self.quantum,
+            'rebanada': self.rebanada,
+        })
+        return estadisticas
@@ -0,0 +1,495 @@
+# ejecutor.py
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from salida import INTERVALO, MAX_TOTAL, Salida, texto, vaciando
+
+# Ejecución de los programas fuera del bucle de eventos del servidor. Cada
+# programa se ejecuta en uno de un grupo de procesos trabajadores que ya han
+# importado el intérprete y ejecutado un programa de prueba con cada motor
+# (y preparado los programas de `precalentar`, que quedan en su cache_global).
+# Un programa que pasa del tiempo límite se corta matando su proceso, que se
+# sustituye por otro nuevo. Las peticiones que llegan con todos los procesos
+# ocupados esperan en una cola acotada; con la cola llena, Ejecutor.ejecutar
+# lanza Saturado (429 en main.py). Ejecutor.lote ejecuta muchos programas de
+# una vez: cada programa distinto una sola vez, repartidos entre los procesos.
+# La salida de `mostrar` llega con la respuesta o, con Ejecutor.flujo, según
+# el proceso la va vaciando (salida.py). cooperativo.EjecutorCooperativo
+# tiene la misma interfaz (EjecutorBase) pero ejecuta los programas en el
+# propio bucle de eventos, turnándose.
+#
+# El bucle de eventos no se bloquea nunca: la espera de cada respuesta (y la
+# creación de procesos) se hace en un hilo. Los procesos se crean con 'spawn'
+# también donde hay fork: no heredan el estado del servidor.
+#
+# Si el proceso que sustituye a otro no arranca, se vuelve a intentar cada
+# vez más tarde (y se anota en el registro): el grupo no se queda con un
+# proceso menos. Aun así, una petición no espera un proceso libre más de lo
+# que tardarían en terminar, con todo su tiempo límite, las que pueden tener
+# delante.
+
+registro = logging.getLogger(__name__)
+
+# Procesos por defecto: uno por núcleo
+PROCESOS = os.cpu_count() or 1
+
+# Peticiones que pueden esperar en cola por cada proceso
+COLA_POR_PROCESO = 4
+
+# Segundos que puede tardar un programa
+TIEMPO_LIMITE = 10.0
+
+# Segundos hasta el primer reintento cuando un proceso nuevo no arranca; se
+# doblan en cada fallo hasta MAX_ESPERA_REPOSICION
+ESPERA_REPOSICION = 0.1
+MAX_ESPERA_REPOSICION = 30.0
+
+# Lo que manda un proceso cuando está preparado
+LISTO = 'listo'
+
+# Mensajes de un proceso durante una petición: (LINEAS, líneas de salida)
+# mientras se ejecuta, sólo en las peticiones con 'flujo', y (RESPUESTA,
+# respuesta) al terminar
+LINEAS = 'lineas'
+RESPUESTA = 'respuesta'
+
+# Campos de una petición, que son los argumentos de interpretar()
+CAMPOS = ('codigo', 'optimizar', 'motor', 'verificar')
+
+# Programas por lote como máximo
+MAX_LOTE = 10000
+
+# Caracteres del resultado en la respuesta; el resto se recorta sin llegar a
+# escribirlo (una lista de `rango` puede tener millones de elementos)
+MAX_RESULTADO = 64 * 1024
+
+# Programa que cada proceso ejecuta con cada motor al arrancar
+PROGRAMA_CALENTAMIENTO = """
+funcion doble(x: entero): entero { devolver x * 2 }
+variable total = 0
+para cada i en rango(10) { total = total + doble(i) }
+si (total > 0) { [total, "listo", {"a": 1}] } sino { nulo }
+"""
+
+class Saturado(Exception):
+    # Todos los procesos ocupados y la cola llena
+    pass
+
+def interpretar(codigo: str, optimizar: bool = False, motor: str = 'arbol', verificar: bool = False,
+                salida: Optional[Salida] = None) -> Dict[str, Any]:
+    # La respuesta de POST /interpretar para un programa: el resultado y los
+    # informes o, si falla, el error. Las líneas que escribe el programa
+    # (también si falla) van en la respuesta salvo si `salida` tiene destino.
+    from interpreter import Interprete
+
+    if salida is None:
+        salida = Salida()
+    try:
+        interprete = Interprete()
+        interprete.salida = salida
+        resultado = interprete.ejecutar(codigo, optimizar=optimizar, motor=motor, verificar=verificar)
+        respuesta = exito(interprete, resultado)
+    except Exception as e:
+        respuesta = fallo(e)
+    return anotar_salida(respuesta, salida)
+
+def exito(interprete: Any, resultado: Any) -> Dict[str, Any]:
+    # La respuesta de un programa que ha terminado: el resultado y los
+    # informes que ha dejado `interprete`
+    from html_renderer import HTMLRenderer
+
+    # Construir respuesta
+    respuesta = {
+        "estado": "exito",
+        "resultado": texto([resultado], MAX_RESULTADO + 1) if resultado else "nulo",
+        "tipo": resultado.tipo if resultado else "nulo"
+    }
+    if len(respuesta["resultado"]) > MAX_RESULTADO:
+        respuesta["resultado"] = respuesta["resultado"][:MAX_RESULTADO]
+        respuesta["resultado_recortado"] = True
+
+    if interprete.informe_optimizacion is not None:
+        respuesta["optimizaciones"] = interprete.informe_optimizacion.como_dict()
+
+    if interprete.informe_tipos is not None:
+        respuesta["tipos"] = interprete.informe_tipos.como_dict()
+
+    if interprete.informe_traduccion is not None:
+        respuesta["traduccion"] = interprete.informe_traduccion
+
+    if interprete.memorizadas:
+        respuesta["memoria"] = interprete.informe_memoria()
+
+    # Si el resultado es HTML o CSS, incluirlo
+    if resultado and resultado.tipo == 'html':
+        respuesta["html"] = HTMLRenderer.convertir_a_html(resultado)
+    elif resultado and resultado.tipo == 'css':
+        respuesta["css"] = HTMLRenderer.convertir_a_css(resultado)
+    return respuesta
+
+def fallo(e: Exception) -> Dict[str, Any]:
+    # La respuesta de un programa que ha fallado con `e`; se llama desde el
+    # `except` que la captura, para tener su traceback
+    traceback_str = traceback.format_exc()
+    # Extraer información relevante para un mensaje de error amigable
+    mensaje_error = str(e)
+
+    # Buscar información de línea y columna en el mensaje de error
+    linea = None
+    columna = None
+    if hasattr(e, 'linea') and hasattr(e, 'columna'):
+        linea = e.linea
+        columna = e.columna
+
+    return error(mensaje_error, traceback_str, linea, columna)
+
+def anotar_salida(respuesta: Dict[str, Any], salida: Salida) -> Dict[str, Any]:
+    if salida.destino is None and salida.lineas:
+        respuesta["salida"] = salida.lineas
+    if salida.recortada:
+        respuesta["salida_recortada"] = True
+        respuesta["lineas_descartadas"] = salida.descartadas
+    return respuesta
+
+def error(mensaje: str, traceback_str: Optional[str] = None, linea: Optional[int] = None, columna: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "estado": "error",
+        "error": mensaje,
+        "traceback": traceback_str,
+        "linea": linea,
+        "columna": columna
+    }
+
+def trabajar(conexion: Any, precalentar: List[str], opciones_salida: Dict[str, Any]) -> None:
+    # Bucle de un proceso trabajador: atiende peticiones hasta recibir None o
+    # hasta que se cierra la tubería. `opciones_salida` son los límites de la
+    # Salida de cada programa.
+    # Ctrl+C llega a todo el grupo de procesos: lo atiende el servidor, que
+    # luego cierra los trabajadores
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from interpreter import MOTORES, Interprete
+
+    for motor in MOTORES:
+        interpretar(PROGRAMA_CALENTAMIENTO, optimizar=True, motor=motor, verificar=True)
+    for codigo in precalentar:
+        for motor in MOTORES:
+            try:
+                Interprete().preparar(codigo, optimizar=True, motor=motor)
+            except Exception:
+                # Sus errores se verán al ejecutarlo
+                pass
+    conexion.send(LISTO)
+
+    while True:
+        try:
+            peticion = conexion.recv()
+        except EOFError:
+            break
+        if peticion is None:
+            break
+        if peticion.pop('flujo', False):
+            salida = Salida(lambda lineas: conexion.send((LINEAS, lineas)), **opciones_salida)
+            with vaciando(salida):
+                respuesta = interpretar(**peticion, salida=salida)
+        else:
+            respuesta = interpretar(**peticion, salida=Salida(**opciones_salida))
+        conexion.send((RESPUESTA, respuesta))
+
+class Trabajador:
+    # Un proceso trabajador y el extremo de la tubería por el que recibe
+    # peticiones y devuelve respuestas. Sus métodos bloquean: el Ejecutor los
+    # llama desde sus hilos.
+    __slots__ = ('proceso', 'conexion')
+
+    def __init__(self, contexto: Any, precalentar: List[str], opciones_salida: Dict[str, Any]):
+        self.conexion, extremo = contexto.Pipe()
+        self.proceso = contexto.Process(target=trabajar, args=(extremo, precalentar, opciones_salida), daemon=True)
+        self.proceso.start()
+        extremo.close()
+
+    def esperar_listo(self) -> None:
+        try:
+            listo = self.conexion.recv()
+        except EOFError:
+            listo = None
+        if listo != LISTO:
+            self.terminar()
+            raise RuntimeError("El proceso trabajador no pudo arrancar")
+
+    def atender(self, peticion: Dict[str, Any], tiempo_limite: float,
+                al_escribir: Optional[Callable[[List[str]], None]] = None) -> Optional[Dict[str, Any]]:
+        # La respuesta, o None si no llega a tiempo. EOFError si el proceso
+        # termina sin responder. Las líneas de salida que llegan antes (en
+        # las peticiones con 'flujo') se pasan a al_escribir.
+        self.conexion.send(peticion)
+        limite = time.monotonic() + tiempo_limite
+        while True:
+            if not self.conexion.poll(max(limite - time.monotonic(), 0)):
+                return None
+            tipo, contenido = self.conexion.recv()
+            if tipo == RESPUESTA:
+                return contenido
+            al_escribir(contenido)
+
+    def terminar(self) -> None:
+        self.proceso.kill()
+        self.proceso.join()
+        self.conexion.close()
+
+    def cerrar(self) -> None:
+        try:
+            self.conexion.send(None)
+        except OSError:
+            pass
+        self.proceso.join(1)
+        if self.proceso.is_alive():
+            self.terminar()
+        else:
+            self.conexion.close()
+
+class EjecutorBase:
+    # Lo común a los ejecutores: admite como mucho `procesos` programas a la
+    # vez (procesos trabajadores o sesiones en el bucle de eventos) y `cola`
+    # más en espera, y reparte ejecutar, flujo y lote sobre despachar(), que
+    # define cada uno. Se usa desde un único bucle de eventos: iniciar() antes
+    # de la primera petición y cerrar() al terminar. Cada programa escribe
+    # como mucho `max_salida` caracteres, y en flujo() su salida se envía
+    # cada `intervalo_salida` segundos como mucho.
+    def __init__(self, procesos: int = PROCESOS, cola: Optional[int] = None, tiempo_limite: float = TIEMPO_LIMITE,
+                 max_salida: int = MAX_TOTAL, intervalo_salida: float = INTERVALO):
+        if procesos < 1:
+            raise ValueError("El ejecutor necesita al menos un proceso")
+        self.procesos = procesos
+        self.cola = COLA_POR_PROCESO * procesos if cola is None else cola
+        self.tiempo_limite = tiempo_limite
+        self.opciones_salida = {'max_total': max_salida, 'intervalo': intervalo_salida}
+        # Peticiones en ejecución o en cola
+        self.pendientes = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.agotadas = 0
+
+    async def iniciar(self) -> None:
+        pass
+
+    def admitir(self) -> None:
+        if self.pendientes >= self.procesos + self.cola:
+            self.rechazadas += 1
+            raise Saturado(f"Hay {self.pendientes} programas en ejecución o en espera; inténtalo más tarde")
+
+    async def ejecutar(self, codigo: str, optimizar: bool = False, motor: str = 'arbol', verificar: bool = False) -> Dict[str, Any]:
+        # La respuesta de interpretar(), calculada en un proceso trabajador
+        self.admitir()
+        self.pendientes += 1
+        peticion = {'codigo': codigo, 'optimizar': optimizar, 'motor': motor, 'verificar': verificar}
+        # Si quien espera se cancela (el cliente se desconecta), la petición
+        # termina igualmente y el proceso vuelve a quedar libre
+        return await asyncio.shield(self.despachar(peticion))
+
+    def flujo(self, codigo: str, optimizar: bool = False, motor: str = 'arbol', verificar: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+        # Como ejecutar, pero según avanza el programa: (LINEAS, líneas) cada
+        # vez que el proceso vacía la salida y, al final, (RESPUESTA,
+        # respuesta), ya sin las líneas. La petición se admite (o se lanza
+        # Saturado) al llamarlo, antes de empezar a leer; si quien lee lo deja,
+        # el programa termina igualmente.
+        self.admitir()
+        self.pendientes += 1
+        eventos: 'asyncio.Queue[Tuple[str, Any]]' = asyncio.Queue()
+        bucle = asyncio.get_running_loop()
+        def al_escribir(lineas: List[str]) -> None:
+            # Desde el hilo que espera al proceso
+            bucle.call_soon_threadsafe(eventos.put_nowait, (LINEAS, lineas))
+        def al_terminar(tarea: 'asyncio.Future[Dict[str, Any]]') -> None:
+            # Después de las líneas: llegan al bucle antes que el fin del hilo
+            excepcion = tarea.exception()
+            eventos.put_nowait((RESPUESTA, error(str(excepcion)) if excepcion else tarea.result()))
+
+        peticion = {'codigo': codigo, 'optimizar': optimizar, 'motor': motor, 'verificar': verificar, 'flujo': True}
+        tarea = asyncio.ensure_future(self.despachar(peticion, al_escribir))
+        tarea.add_done_callback(al_terminar)
+        return self.recibir(eventos)
+
+    @staticmethod
+    async def recibir(eventos: 'asyncio.Queue[Tuple[str, Any]]') -> AsyncIterator[Tuple[str, Any]]:
+        while True:
+            evento = await eventos.get()
+            yield evento
+            if evento[0] == RESPUESTA:
+                return
+
+    async def lote(self, peticiones: Sequence[Dict[str, Any]]) -> AsyncIterator[Tuple[List[int], Dict[str, Any]]]:
+        # Las respuestas de un lote de peticiones (diccionarios con CAMPOS)
+        # según terminan, cada una con las posiciones del lote que la
+        # comparten: las peticiones iguales se ejecutan una sola vez. Ocupa
+        # como mucho todos los procesos, y las peticiones sueltas que llegan
+        # mientras tanto se turnan con las del lote; sólo se rechaza (con
+        # Saturado) si la cola ya está llena al empezar.
+        self.admitir()
+        posiciones: Dict[Tuple, List[int]] = {}
+        for indice, peticion in enumerate(peticiones):
+            posiciones.setdefault(tuple(peticion[campo] for campo in CAMPOS), []).append(indice)
+
+        terminadas: 'asyncio.Queue[Tuple[List[int], Dict[str, Any]]]' = asyncio.Queue()
+        distintas = iter(posiciones.items())
+        async def repartir() -> None:
+            # Cada tarea toma la siguiente petición sin empezar
+            for clave, indices in distintas:
+                self.pendientes += 1
+                try:
+                    respuesta = await asyncio.shield(self.despachar(dict(zip(CAMPOS, clave))))
+                except Exception as e:
+                    respuesta = error(str(e))
+                terminadas.put_nowait((indices, respuesta))
+
+        tareas = [asyncio.ensure_future(repartir()) for _ in range(min(self.procesos, len(posiciones)))]
+        try:
+            for _ in range(len(posiciones)):
+                yield await terminadas.get()
+        finally:
+            # Si quien lee deja de hacerlo, no se empiezan más
+            for tarea in tareas:
+                tarea.cancel()
+
+    async def ejecutar_lote(self, peticiones: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Las respuestas de lote(), en el orden de las peticiones
+        respuestas: List[Optional[Dict[str, Any]]] = [None] * len(peticiones)
+        async for indices, respuesta in self.lote(peticiones):
+            for indice in indices:
+                respuestas[indice] = respuesta
+        return respuestas
+
+    async def despachar(self, peticion: Dict[str, Any], al_escribir: Optional[Callable[[List[str]], None]] = None) -> Dict[str, Any]:
+        # La respuesta a una petición ya admitida; al terminar descuenta
+        # self.pendientes
+        raise NotImplementedError
+
+    def cerrar(self) -> None:
+        pass
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            'procesos': self.procesos,
+            'cola': self.cola,
+            'tiempo_limite': self.tiempo_limite,
+            'pendientes': self.pendientes,
+            'completadas': self.completadas,
+            'rechazadas': self.rechazadas,
+            'agotadas': self.agotadas,
+        }
+
+class Ejecutor(EjecutorBase):
+    # Grupo de `procesos` trabajadores que han preparado los programas de
+    # `precalentar`
+    def __init__(self, procesos: int = PROCESOS, cola: Optional[int] = None, tiempo_limite: float = TIEMPO_LIMITE,
+                 precalentar: Sequence[str] = (), max_salida: int = MAX_TOTAL, intervalo_salida: float = INTERVALO):
+        super().__init__(procesos, cola, tiempo_limite, max_salida, intervalo_salida)
+        self.precalentar = list(precalentar)
+        # Lo que una petición puede esperar un proceso libre: las que caben
+        # por delante, repartidas entre los procesos, con su tiempo límite
+        self.espera_maxima = tiempo_limite * math.ceil((procesos + self.cola) / procesos)
+        self.contexto = multiprocessing.get_context('spawn')
+        # Un hilo por proceso para esperar su respuesta y otro para sustituirlo
+        self.hilos = ThreadPoolExecutor(max_workers=2 * procesos, thread_name_prefix='ejecutor')
+        self.libres: Optional['asyncio.Queue[Trabajador]'] = None
+        self.trabajadores: Set[Trabajador] = set()
+        self.sustituciones: Set['asyncio.Future[None]'] = set()
+        self.caidas = 0
+        self.sin_proceso = 0
+        self.fallos_arranque = 0
+
+    async def iniciar(self) -> None:
+        self.libres = asyncio.Queue()
+        bucle = asyncio.get_running_loop()
+        trabajadores = await asyncio.gather(*(bucle.run_in_executor(self.hilos, self.crear) for _ in range(self.procesos)))
+        for trabajador in trabajadores:
+            self.libres.put_nowait(trabajador)
+
+    def crear(self) -> Trabajador:
+        trabajador = Trabajador(self.contexto, self.precalentar, self.opciones_salida)
+        self.trabajadores.add(trabajador)
+        try:
+            trabajador.esperar_listo()
+        except BaseException:
+            self.trabajadores.discard(trabajador)
+            raise
+        return trabajador
+
+    def retirar(self, trabajador: Trabajador) -> None:
+        self.trabajadores.discard(trabajador)
+        try:
+            trabajador.terminar()
+        except OSError:
+            registro.exception("No se pudo terminar un proceso trabajador")
+
+    async def despachar(self, peticion: Dict[str, Any], al_escribir: Optional[Callable[[List[str]], None]] = None) -> Dict[str, Any]:
+        try:
+            try:
+                trabajador = await asyncio.wait_for(self.libres.get(), self.espera_maxima)
+            except asyncio.TimeoutError:
+                self.sin_proceso += 1
+                return error(f"Ningún proceso quedó libre en {self.espera_maxima:g} s")
+            bucle = asyncio.get_running_loop()
+            try:
+                respuesta = await bucle.run_in_executor(self.hilos, trabajador.atender, peticion, self.tiempo_limite, al_escribir)
+            except (EOFError, OSError):
+                self.caidas += 1
+                self.reponer(trabajador)
+                return error("El proceso que ejecutaba el programa terminó inesperadamente")
+            if respuesta is None:
+                self.agotadas += 1
+                self.reponer(trabajador)
+                return error(f"El programa superó el tiempo límite de {self.tiempo_limite:g} s")
+            self.completadas += 1
+            self.libres.put_nowait(trabajador)
+            return respuesta
+        finally:
+            self.pendientes -= 1
+
+    def reponer(self, trabajador: Trabajador) -> None:
+        # Mata el proceso y pone otro en su lugar sin que la petición espere,
+        # reintentándolo hasta que arranque
+        async def reponer() -> None:
+            bucle = asyncio.get_running_loop()
+            await bucle.run_in_executor(self.hilos, self.retirar, trabajador)
+            espera = ESPERA_REPOSICION
+            while True:
+                try:
+                    nuevo = await bucle.run_in_executor(self.hilos, self.crear)
+                except Exception:
+                    self.fallos_arranque += 1
+                    registro.exception("No se pudo arrancar un proceso trabajador; se reintenta en %g s", espera)
+                    await asyncio.sleep(espera)
+                    espera = min(espera * 2, MAX_ESPERA_REPOSICION)
+                else:
+                    self.libres.put_nowait(nuevo)
+                    return
+        tarea = asyncio.ensure_future(reponer())
+        self.sustituciones.add(tarea)
+        tarea.add_done_callback(self.sustituciones.discard)
+
+    def cerrar(self) -> None:
+        for tarea in list(self.sustituciones):
+            tarea.cancel()
+        for trabajador in list(self.trabajadores):
+            trabajador.cerrar()
+        self.trabajadores.clear()
+        self.hilos.shutdown(wait=False)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        estadisticas = super().estadisticas()
+        estadisticas.update({
+            'modo': 'procesos',
+            'libres': self.libres.qsize() if self.libres is not None else 0,
+            'caidas': self.caidas,
+            'sin_proceso': self.sin_proceso,
+            'fallos_arranque': self.fallos_arranque,
+        })
+        return estadisticas
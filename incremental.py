@@ -0,0 +1,290 @@
+# incremental.py
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import ast_nodes as ast
+from lexer import Lexer
+from parser import Parser
+
+def relativizar(sentencia: ast.Nodo, linea: int, columna: int) -> None:
+    # Hace relativas a `linea` y `columna`, donde empieza `sentencia`, las
+    # posiciones de sus nodos
+    pendientes: List[Any] = [sentencia]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, ast.Nodo):
+            if hasattr(valor, 'linea'):
+                if valor.linea == linea:
+                    valor.columna -= columna - 1
+                valor.linea -= linea - 1
+            pendientes.extend(getattr(valor, campo) for campo in valor.campos)
+        elif isinstance(valor, (list, tuple)):
+            pendientes.extend(valor)
+        elif isinstance(valor, dict):
+            pendientes.extend(valor.values())
+
+class Origenes(Sequence[Tuple[int, int]]):
+    # Programa.origenes de un DocumentoIncremental: la línea y la columna de
+    # cada sentencia, según los inicios actuales
+    def __init__(self, documento: 'DocumentoIncremental'):
+        self.documento = documento
+
+    def __len__(self) -> int:
+        return len(self.documento.cuerpo)
+
+    def __getitem__(self, indice: int) -> Tuple[int, int]:
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return self.documento.linea(indice), self.documento.columna(indice)
+
+class DocumentoIncremental:
+    # Fuente de un editor junto con su árbol. De cada sentencia de primer
+    # nivel de Programa.cuerpo se guarda dónde empieza su primer token, en qué
+    # línea y su texto hasta la siguiente. Al aplicar una edición se vuelve a
+    # tokenizar y analizar desde poco antes de la zona dañada sólo hasta que
+    # el análisis llega al inicio de una sentencia antigua posterior a la
+    # edición; como el lexer y el parser no arrastran estado entre
+    # sentencias, a partir de ahí el resultado es el mismo y se reutilizan los
+    # nodos existentes.
+    #
+    # Los inicios y las líneas se guardan partidos por un cursor, como un
+    # buffer con hueco: antes del cursor, desplazamiento y número de saltos de
+    # línea desde el principio de la fuente; después, distancia hasta el
+    # final en caracteres y en saltos, en orden inverso. Una edición junto al
+    # cursor no cambia ninguno de los dos lados, así que no hay que desplazar
+    # los del resto del archivo.
+    #
+    # La fuente no se guarda entera: cada edición sólo toca los textos de las
+    # sentencias que vuelve a analizar. El cuerpo y los textos se sustituyen
+    # en su sitio, así que el Programa es siempre el mismo objeto.
+    #
+    # Por lo mismo, las posiciones de los nodos son relativas al inicio de su
+    # sentencia (ver ast.Programa), y Programa.origenes las calcula a partir
+    # de los inicios al pedirlas.
+    def __init__(self, fuente: str):
+        self.lexer = Lexer()
+        self.cabecera = ''  # texto anterior a la primera sentencia
+        self.textos: List[str] = []
+        self.cuerpo: List[ast.Nodo] = []
+        self.programa = ast.Programa(self.cuerpo, Origenes(self))
+        self.antes: List[int] = []
+        self.lineas_antes: List[int] = []
+        self.despues: List[int] = []
+        self.lineas_despues: List[int] = []
+        self.longitud = len(fuente)
+        self.saltos = fuente.count('\n')
+
+        # Si el documento no analiza, el error y la distancia desde el inicio
+        # de la sentencia que falló hasta el final de la fuente
+        self.error: Optional[SyntaxError] = None
+        self.distancia_error = 0
+
+        # Trabajo hecho en la última edición
+        self.sentencias_reanalizadas = 0
+        self.caracteres_reanalizados = 0
+
+        self.reanalizar(0, fuente)
+
+    @property
+    def fuente(self) -> str:
+        return self.cabecera + ''.join(self.textos)
+
+    def inicio(self, indice: int) -> int:
+        # Desplazamiento del primer token de la sentencia `indice`
+        if indice < len(self.antes):
+            return self.antes[indice]
+        return self.longitud - self.despues[len(self.cuerpo) - 1 - indice]
+
+    def linea(self, indice: int) -> int:
+        # Línea, contando desde 1, en la que empieza la sentencia `indice`
+        if indice < len(self.lineas_antes):
+            return self.lineas_antes[indice] + 1
+        return self.saltos - self.lineas_despues[len(self.cuerpo) - 1 - indice] + 1
+
+    def columna(self, indice: int, previo: str = '') -> int:
+        # Columna del carácter que sigue a `previo`, escrito donde empieza el
+        # texto de la sentencia `indice`
+        columna = 1
+        texto = previo
+        while True:
+            salto = texto.rfind('\n')
+            if salto >= 0:
+                return columna + len(texto) - salto - 1
+            columna += len(texto)
+            indice -= 1
+            if indice < -1:
+                return columna
+            texto = self.textos[indice] if indice >= 0 else self.cabecera
+
+    def contar_anteriores(self, posicion: int) -> int:
+        # Número de sentencias que empiezan antes de `posicion`
+        if self.antes and self.antes[-1] >= posicion:
+            return bisect_left(self.antes, posicion)
+        return len(self.antes) + len(self.despues) - bisect_right(self.despues, self.longitud - posicion)
+
+    def mover_cursor(self, indice: int) -> None:
+        antes, lineas_antes = self.antes, self.lineas_antes
+        despues, lineas_despues = self.despues, self.lineas_despues
+        while len(antes) > indice:
+            despues.append(self.longitud - antes.pop())
+            lineas_despues.append(self.saltos - lineas_antes.pop())
+        while len(antes) < indice:
+            antes.append(self.longitud - despues.pop())
+            lineas_antes.append(self.saltos - lineas_despues.pop())
+
+    def editar(self, desplazamiento: int, borrados: int, insertado: str) -> ast.Programa:
+        if desplazamiento < 0 or borrados < 0 or desplazamiento + borrados > self.longitud:
+            raise ValueError(f"Edición fuera del documento: desplazamiento {desplazamiento}, borrados {borrados}")
+
+        # Tras el cursor quedan las sentencias cuyo texto no cambia
+        fin_edicion = desplazamiento + borrados
+        cursor = self.contar_anteriores(fin_edicion)
+        self.mover_cursor(cursor)
+
+        # Se empieza una sentencia antes de la que contiene la edición: que
+        # ésta pase a empezar por '(' o por un operador cambia dónde acaba la
+        # anterior.
+        desde = max(0, self.contar_anteriores(desplazamiento) - 2)
+
+        # La edición cae dentro del texto de las sentencias entre `desde` y el
+        # cursor (y de la cabecera si se empieza por la primera)
+        inicio = self.antes[desde] if desde > 0 else 0
+        viejo = ''.join(self.textos[desde:cursor])
+        if desde == 0:
+            viejo = self.cabecera + viejo
+        a, b = desplazamiento - inicio, fin_edicion - inicio
+        self.longitud += len(insertado) - borrados
+        self.saltos += insertado.count('\n') - viejo.count('\n', a, b)
+
+        self.reanalizar(desde, viejo[:a] + insertado + viejo[b:])
+        if self.error is not None:
+            raise self.error
+        return self.programa
+
+    def crear_parser(self, bloques: Iterator[str], inicio: int, linea: int, columna: int) -> Parser:
+        return Parser(self.lexer.tokenizar_bloques(bloques, inicio, linea, columna))
+
+    def reanalizar(self, desde: int, texto: str) -> None:
+        # Vuelve a analizar a partir de la sentencia `desde` (anterior al
+        # cursor), cuyo texto hasta el cursor es ahora `texto`, hasta
+        # resincronizar con una sentencia posterior al cursor
+        antes, lineas_antes = self.antes, self.lineas_antes
+        despues, lineas_despues = self.despues, self.lineas_despues
+        textos = self.textos
+        fin = self.longitud
+        cursor = len(antes)
+        inicio = antes[desde] if desde > 0 else 0
+        linea = lineas_antes[desde] if desde > 0 else 0
+        columna = self.columna(desde) if desde > 0 else 1
+        del antes[desde:]
+        del lineas_antes[desde:]
+
+        # Tras el texto nuevo, el lexer va leyendo el de las sentencias
+        # posteriores al cursor a medida que lo necesita
+        leidos = [texto]
+        siguiente = cursor
+        def leer() -> Iterator[str]:
+            nonlocal siguiente
+            yield texto
+            while siguiente < len(textos):
+                leidos.append(textos[siguiente])
+                siguiente += 1
+                yield leidos[-1]
+
+        error_previo = self.error
+        self.error = None
+        self.sentencias_reanalizadas = 0
+
+        nuevos: List[ast.Nodo] = []
+        descartados = 0
+        reutilizando = False
+        posicion = inicio
+        # Sentencias que siguen a un error previo: texto, inicios y líneas
+        cola = ''
+        reanudacion = 0
+        finales: List[ast.Nodo] = []
+        inicios_finales: List[int] = []
+        lineas_finales: List[int] = []
+        try:
+            parser = self.crear_parser(leer(), inicio, linea + 1, columna)
+            while parser.tipo_actual not in (None, 'EOF'):
+                posicion = parser.token_actual.inicio
+                linea = parser.token_actual.linea - 1
+                columna = parser.token_actual.columna
+
+                if not reutilizando:
+                    # ¿Empieza aquí una sentencia antigua posterior a la edición?
+                    while despues and fin - despues[-1] < posicion:
+                        despues.pop()
+                        lineas_despues.pop()
+                        descartados += 1
+                    if despues and fin - despues[-1] == posicion:
+                        reutilizando = True
+                        self.sustituir(desde, cursor + descartados, ''.join(leidos)[:posicion - inicio],
+                                       inicio, nuevos)
+                        if error_previo is None:
+                            break
+                        # Tras las sentencias reutilizadas venía un error cuyo
+                        # texto no ha cambiado; se analiza desde allí para
+                        # obtenerlo con la posición actualizada. Ese texto
+                        # está al final del de la última sentencia.
+                        posicion = reanudacion = fin - self.distancia_error
+                        ultimo = len(textos) - 1
+                        corte = len(textos[ultimo]) - self.distancia_error
+                        textos[ultimo], cola = textos[ultimo][:corte], textos[ultimo][corte:]
+                        parser = self.crear_parser(iter((cola,)), posicion, self.saltos - cola.count('\n') + 1,
+                                                   self.columna(ultimo, textos[ultimo]))
+                        continue
+
+                nodo = parser.analizar_declaracion()
+                relativizar(nodo, linea + 1, columna)
+                self.sentencias_reanalizadas += 1
+                if reutilizando:
+                    finales.append(nodo)
+                    inicios_finales.append(posicion)
+                    lineas_finales.append(linea)
+                else:
+                    antes.append(posicion)
+                    lineas_antes.append(linea)
+                    nuevos.append(nodo)
+            else:
+                posicion = fin
+        except SyntaxError as e:
+            self.error = e
+            self.distancia_error = fin - posicion
+
+        if not reutilizando:
+            # Sin resincronizar, no queda ninguna sentencia antigua válida
+            descartados += len(despues)
+            despues.clear()
+            lineas_despues.clear()
+            leidos.extend(textos[siguiente:])
+            self.sustituir(desde, cursor + descartados, ''.join(leidos), inicio, nuevos)
+        elif error_previo is not None:
+            previo, trozos = self.trocear(cola, reanudacion, inicios_finales)
+            textos[-1] += previo
+            textos.extend(trozos)
+            self.cuerpo.extend(finales)
+            despues[:0] = [fin - p for p in reversed(inicios_finales)]
+            lineas_despues[:0] = [self.saltos - l for l in reversed(lineas_finales)]
+
+        self.caracteres_reanalizados = posicion - inicio
+
+    def sustituir(self, desde: int, hasta: int, texto: str, inicio: int, nuevos: List[ast.Nodo]) -> None:
+        # Pone `nuevos`, cuyo texto es `texto` a partir de `inicio` y cuyos
+        # inicios ya están antes del cursor, en lugar de las sentencias entre
+        # `desde` y `hasta`
+        previo, trozos = self.trocear(texto, inicio, self.antes[desde:])
+        if desde > 0:
+            self.textos[desde - 1] += previo
+        else:
+            self.cabecera = previo
+        self.textos[desde:hasta] = trozos
+        self.cuerpo[desde:hasta] = nuevos
+
+    @staticmethod
+    def trocear(texto: str, inicio: int, inicios: List[int]):
+        # Parte `texto`, que empieza en `inicio`, en lo anterior a la primera
+        # sentencia y el texto de cada una hasta la siguiente
+        cortes = [p - inicio for p in inicios] + [len(texto)]
+        return texto[:cortes[0]], [texto[a:b] for a, b in zip(cortes, cortes[1:])]
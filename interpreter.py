@@ -1,353 +1,942 @@
 # interpreter.py
-from typing import Dict, Any, List, Optional, Union
+import asyncio
+import operator
+from itertools import repeat
+from typing import Callable, Dict, Any, Iterator, List, Optional, Set, Tuple, Union
 import ast_nodes as ast
+from biblioteca import PRIMITIVAS, Primitiva
+from listas import ListaNumerica, crear_lista, operar_elementos
 from parser import Parser
-
-class Valor:
-    def __init__(self, tipo: str, valor: Any):
-        self.tipo = tipo
-        self.valor = valor
-    
-    def __repr__(self):
-        return f"Valor({self.tipo}, {self.valor})"
+from salida import Salida, escribiendo_en
+from valores import NULO, Valor, booleano, entero, numero
 
 class Entorno:
     def __init__(self, padre=None):
         self.variables: Dict[str, Valor] = {}
         self.funciones: Dict[str, ast.DeclaracionFuncion] = {}
         self.padre = padre
+        # El antecesor más cercano con funciones declaradas: la búsqueda de
+        # funciones se salta los entornos de llamadas y bucles que no declaran
+        # ninguna, y con recursión profunda no recorre toda la cadena. Un
+        # entorno sólo declara funciones mientras ejecuta su propio código, así
+        # que lo que se calcula al crearlo no cambia mientras existe.
+        self.padre_funciones: Optional['Entorno'] = None if padre is None else (padre if padre.funciones else padre.padre_funciones)
     
     def definir_variable(self, nombre: str, valor: Valor) -> None:
         self.variables[nombre] = valor
     
+    # Las búsquedas suben por la cadena sin recursión: con llamadas anidadas
+    # la cadena es tan larga como la pila de llamadas del programa
+    
     def asignar_variable(self, nombre: str, valor: Valor) -> None:
-        if nombre in self.variables:
-            self.variables[nombre] = valor
-        elif self.padre:
-            self.padre.asignar_variable(nombre, valor)
-        else:
-            raise NameError(f"Variable '{nombre}' no definida")
+        entorno = self
+        while entorno is not None:
+            if nombre in entorno.variables:
+                entorno.variables[nombre] = valor
+                return
+            entorno = entorno.padre
+        raise NameError(f"Variable '{nombre}' no definida")
     
     def obtener_variable(self, nombre: str) -> Valor:
-        if nombre in self.variables:
-            return self.variables[nombre]
-        elif self.padre:
-            return self.padre.obtener_variable(nombre)
-        else:
-            raise NameError(f"Variable '{nombre}' no definida")
+        entorno = self
+        while entorno is not None:
+            if nombre in entorno.variables:
+                return entorno.variables[nombre]
+            entorno = entorno.padre
+        raise NameError(f"Variable '{nombre}' no definida")
     
     def definir_funcion(self, nombre: str, funcion: ast.DeclaracionFuncion) -> None:
         self.funciones[nombre] = funcion
     
     def obtener_funcion(self, nombre: str) -> ast.DeclaracionFuncion:
-        if nombre in self.funciones:
-            return self.funciones[nombre]
-        elif self.padre:
-            return self.padre.obtener_funcion(nombre)
-        else:
-            raise NameError(f"Función '{nombre}' no definida")
+        entorno = self
+        while entorno is not None:
+            if nombre in entorno.funciones:
+                return entorno.funciones[nombre]
+            entorno = entorno.padre_funciones
+        raise NameError(f"Función '{nombre}' no definida")
 
 class RetornoExcepcion(Exception):
+    # `devolver` fuera de una función: termina el programa
     def __init__(self, valor: Optional[Valor] = None):
         self.valor = valor
         super().__init__(self)
 
+class Retorno:
+    # Señal de terminación de `devolver` en el recorrido del árbol: la
+    # sentencia la devuelve en lugar de un Valor, y cada bloque deja de
+    # ejecutar sentencias y la pasa hacia arriba hasta ejecutar_funcion
+    __slots__ = ('valor',)
+    
+    def __init__(self, valor: Valor):
+        self.valor = valor
+
+# Semántica de los operadores, compartida por el evaluador, el optimizador
+# (que pliega constantes aplicando exactamente estas reglas) y los motores
+# que compilan el árbol, que enlazan directamente la función de cada operador
+
+NUMERICOS = ['entero', 'decimal']
+
+SIMBOLOS = {
+    'MAS': '+', 'MENOS': '-', 'MULTIPLICACION': '*', 'DIVISION': '/', 'MODULO': '%', 'POTENCIA': '^',
+    'IGUAL_IGUAL': '==', 'DIFERENTE': '!=', 'MAYOR': '>', 'MENOR': '<', 'MAYOR_IGUAL': '>=', 'MENOR_IGUAL': '<=',
+    'Y': 'y', 'O': 'o', 'NO': 'no',
+}
+
+def no_soportada(izquierda: Valor, derecha: Valor) -> TypeError:
+    return TypeError(f"Operación no soportada entre '{izquierda.tipo}' y '{derecha.tipo}'")
+
+def con_lista(izquierda: Valor, derecha: Valor) -> bool:
+    # Operación entre una lista y un número, que se aplica a cada elemento
+    # de la lista (listas.operar_elementos)
+    return (izquierda.tipo == 'lista' and derecha.tipo in NUMERICOS) or (derecha.tipo == 'lista' and izquierda.tipo in NUMERICOS)
+
+def tipo_numerico(izquierda: Valor, derecha: Valor) -> str:
+    # Tipo del resultado de una operación aritmética ('lista' entre una lista
+    # y un número), o TypeError si alguno de los operandos no es numérico
+    if izquierda.tipo in NUMERICOS and derecha.tipo in NUMERICOS:
+        return 'decimal' if 'decimal' in [izquierda.tipo, derecha.tipo] else 'entero'
+    if con_lista(izquierda, derecha):
+        return 'lista'
+    raise no_soportada(izquierda, derecha)
+
+def sumar(izquierda: Valor, derecha: Valor) -> Valor:
+    if izquierda.tipo in NUMERICOS and derecha.tipo in NUMERICOS:
+        resultado = izquierda.valor + derecha.valor
+        tipo = 'decimal' if 'decimal' in [izquierda.tipo, derecha.tipo] else 'entero'
+        return numero(tipo, resultado)
+    elif izquierda.tipo == 'cadena' or derecha.tipo == 'cadena':
+        # Concatenación
+        return Valor('cadena', str(izquierda.valor) + str(derecha.valor))
+    elif con_lista(izquierda, derecha):
+        return operar_elementos('MAS', sumar, izquierda, derecha)
+    raise no_soportada(izquierda, derecha)
+
+def restar(izquierda: Valor, derecha: Valor) -> Valor:
+    tipo = tipo_numerico(izquierda, derecha)
+    if tipo == 'lista':
+        return operar_elementos('MENOS', restar, izquierda, derecha)
+    return numero(tipo, izquierda.valor - derecha.valor)
+
+def multiplicar(izquierda: Valor, derecha: Valor) -> Valor:
+    tipo = tipo_numerico(izquierda, derecha)
+    if tipo == 'lista':
+        return operar_elementos('MULTIPLICACION', multiplicar, izquierda, derecha)
+    return numero(tipo, izquierda.valor * derecha.valor)
+
+def dividir(izquierda: Valor, derecha: Valor) -> Valor:
+    tipo = tipo_numerico(izquierda, derecha)
+    if tipo == 'lista':
+        return operar_elementos('DIVISION', dividir, izquierda, derecha)
+    if derecha.valor == 0:
+        raise ZeroDivisionError("División por cero")
+    # Entre enteros, división entera
+    if tipo == 'entero':
+        return entero(izquierda.valor // derecha.valor)
+    return Valor(tipo, izquierda.valor / derecha.valor)
+
+def modulo(izquierda: Valor, derecha: Valor) -> Valor:
+    tipo = tipo_numerico(izquierda, derecha)
+    if tipo == 'lista':
+        return operar_elementos('MODULO', modulo, izquierda, derecha)
+    if derecha.valor == 0:
+        raise ZeroDivisionError("División por cero")
+    return numero(tipo, izquierda.valor % derecha.valor)
+
+def potencia(izquierda: Valor, derecha: Valor) -> Valor:
+    tipo = tipo_numerico(izquierda, derecha)
+    if tipo == 'lista':
+        return operar_elementos('POTENCIA', potencia, izquierda, derecha)
+    if tipo == 'entero' and derecha.valor >= 0:
+        return entero(izquierda.valor ** derecha.valor)
+    resultado = float(izquierda.valor) ** derecha.valor
+    if isinstance(resultado, complex):
+        raise ValueError("La potencia no tiene resultado real")
+    return Valor('decimal', resultado)
+
+def son_iguales(izquierda: Valor, derecha: Valor) -> bool:
+    # Los números se comparan por valor aunque uno sea decimal; las listas y
+    # los diccionarios, elemento a elemento con esta misma comparación
+    tipo = izquierda.tipo
+    if tipo in NUMERICOS and derecha.tipo in NUMERICOS:
+        return izquierda.valor == derecha.valor
+    if tipo != derecha.tipo:
+        return False
+    if tipo == 'lista':
+        a, b = izquierda.valor, derecha.valor
+        if isinstance(a, ListaNumerica) and isinstance(b, ListaNumerica):
+            return a == b
+        return len(a) == len(b) and all(map(son_iguales, a, b))
+    if tipo == 'diccionario':
+        a, b = izquierda.valor, derecha.valor
+        return len(a) == len(b) and all(clave in b and son_iguales(valor, b[clave]) for clave, valor in a.items())
+    return izquierda.valor == derecha.valor
+
+def igual(izquierda: Valor, derecha: Valor) -> Valor:
+    return booleano(son_iguales(izquierda, derecha))
+
+def diferente(izquierda: Valor, derecha: Valor) -> Valor:
+    return booleano(not son_iguales(izquierda, derecha))
+
+def comparables(izquierda: Valor, derecha: Valor) -> str:
+    # Tipo del resultado de una comparación de orden, como tipo_numerico
+    if izquierda.tipo in NUMERICOS and derecha.tipo in NUMERICOS or izquierda.tipo == derecha.tipo == 'cadena':
+        return 'booleano'
+    if con_lista(izquierda, derecha):
+        return 'lista'
+    raise no_soportada(izquierda, derecha)
+
+def mayor(izquierda: Valor, derecha: Valor) -> Valor:
+    if comparables(izquierda, derecha) == 'lista':
+        return operar_elementos('MAYOR', mayor, izquierda, derecha)
+    return booleano(izquierda.valor > derecha.valor)
+
+def menor(izquierda: Valor, derecha: Valor) -> Valor:
+    if comparables(izquierda, derecha) == 'lista':
+        return operar_elementos('MENOR', menor, izquierda, derecha)
+    return booleano(izquierda.valor < derecha.valor)
+
+def mayor_igual(izquierda: Valor, derecha: Valor) -> Valor:
+    if comparables(izquierda, derecha) == 'lista':
+        return operar_elementos('MAYOR_IGUAL', mayor_igual, izquierda, derecha)
+    return booleano(izquierda.valor >= derecha.valor)
+
+def menor_igual(izquierda: Valor, derecha: Valor) -> Valor:
+    if comparables(izquierda, derecha) == 'lista':
+        return operar_elementos('MENOR_IGUAL', menor_igual, izquierda, derecha)
+    return booleano(izquierda.valor <= derecha.valor)
+
+def conjuncion(izquierda: Valor, derecha: Valor) -> Valor:
+    if izquierda.tipo == derecha.tipo == 'booleano':
+        return booleano(izquierda.valor and derecha.valor)
+    raise no_soportada(izquierda, derecha)
+
+def disyuncion(izquierda: Valor, derecha: Valor) -> Valor:
+    if izquierda.tipo == derecha.tipo == 'booleano':
+        return booleano(izquierda.valor or derecha.valor)
+    raise no_soportada(izquierda, derecha)
+
+def opuesto(operando: Valor) -> Valor:
+    if operando.tipo in ['entero', 'decimal']:
+        return numero(operando.tipo, -operando.valor)
+    else:
+        raise TypeError(f"Operador '-' no aplicable a tipo '{operando.tipo}'")
+
+def negacion(operando: Valor) -> Valor:
+    if operando.tipo == 'booleano':
+        return booleano(not operando.valor)
+    else:
+        raise TypeError(f"Operador 'no' no aplicable a tipo '{operando.tipo}'")
+
+OPERACIONES_BINARIAS: Dict[str, Callable[[Valor, Valor], Valor]] = {
+    'MAS': sumar,
+    'MENOS': restar,
+    'MULTIPLICACION': multiplicar,
+    'DIVISION': dividir,
+    'MODULO': modulo,
+    'POTENCIA': potencia,
+    'IGUAL_IGUAL': igual,
+    'DIFERENTE': diferente,
+    'MAYOR': mayor,
+    'MENOR': menor,
+    'MAYOR_IGUAL': mayor_igual,
+    'MENOR_IGUAL': menor_igual,
+    'Y': conjuncion,
+    'O': disyuncion,
+}
+
+OPERACIONES_UNARIAS: Dict[str, Callable[[Valor], Valor]] = {
+    'MENOS': opuesto,
+    'NO': negacion,
+}
+
+# Operadores con un camino rápido en los motores compilados cuando los dos
+# operandos son enteros: el resultado es el de la operación de Python,
+# convertido en Valor con la función indicada (que comparte los enteros
+# pequeños y los booleanos). Cualquier otro caso (y los errores) pasa por la
+# función general del operador.
+ENTEROS_RAPIDOS: Dict[str, Tuple[Callable, Callable[[Any], Valor]]] = {
+    'MAS': (operator.add, entero),
+    'MENOS': (operator.sub, entero),
+    'MULTIPLICACION': (operator.mul, entero),
+    'IGUAL_IGUAL': (operator.eq, booleano),
+    'DIFERENTE': (operator.ne, booleano),
+    'MAYOR': (operator.gt, booleano),
+    'MENOR': (operator.lt, booleano),
+    'MAYOR_IGUAL': (operator.ge, booleano),
+    'MENOR_IGUAL': (operator.le, booleano),
+}
+
+def operacion_binaria(operador: str) -> Callable[[Valor, Valor], Valor]:
+    if operador not in OPERACIONES_BINARIAS:
+        raise NotImplementedError(f"Operador no implementado: {operador}")
+    return OPERACIONES_BINARIAS[operador]
+
+def operacion_unaria(operador: str) -> Callable[[Valor], Valor]:
+    if operador not in OPERACIONES_UNARIAS:
+        raise NotImplementedError(f"Operador no implementado: {operador}")
+    return OPERACIONES_UNARIAS[operador]
+
+def operar_binario(operador: str, izquierda: Valor, derecha: Valor) -> Valor:
+    return operacion_binaria(operador)(izquierda, derecha)
+
+# Especialización de las operaciones binarias del recorrido del árbol. El
+# sitio de cada OperacionBinaria (Interprete.sitios) guarda el par de tipos de
+# operandos para el que está especializada y la función rápida de ese par, que
+# se salta las comprobaciones de tipo y la promoción de la función general. Si
+# llegan operandos de otros tipos, el sitio se especializa para ellos; después
+# de MAX_CAMBIOS cambios se queda con la función general. Las funciones
+# rápidas dan los mismos resultados y errores que las generales: los casos
+# especiales (dividir entre cero) pasan por la general.
+
+MAX_CAMBIOS = 4
+
+def dividir_enteros(izquierda: Valor, derecha: Valor) -> Valor:
+    if derecha.valor == 0:
+        return dividir(izquierda, derecha)
+    return entero(izquierda.valor // derecha.valor)
+
+def dividir_decimales(izquierda: Valor, derecha: Valor) -> Valor:
+    if derecha.valor == 0:
+        return dividir(izquierda, derecha)
+    return Valor('decimal', izquierda.valor / derecha.valor)
+
+def modulo_enteros(izquierda: Valor, derecha: Valor) -> Valor:
+    if derecha.valor == 0:
+        return modulo(izquierda, derecha)
+    return entero(izquierda.valor % derecha.valor)
+
+def modulo_decimales(izquierda: Valor, derecha: Valor) -> Valor:
+    if derecha.valor == 0:
+        return modulo(izquierda, derecha)
+    return Valor('decimal', izquierda.valor % derecha.valor)
+
+def concatenar(izquierda: Valor, derecha: Valor) -> Valor:
+    return Valor('cadena', str(izquierda.valor) + str(derecha.valor))
+
+def tabla_especializadas() -> Dict[Tuple[str, str, str], Callable[[Valor, Valor], Valor]]:
+    # Función rápida por (operador, tipo izquierdo, tipo derecho)
+    tabla: Dict[Tuple[str, str, str], Callable[[Valor, Valor], Valor]] = {}
+    aritmeticas = {'MAS': operator.add, 'MENOS': operator.sub, 'MULTIPLICACION': operator.mul}
+    comparaciones = {
+        'IGUAL_IGUAL': operator.eq, 'DIFERENTE': operator.ne, 'MAYOR': operator.gt, 'MENOR': operator.lt,
+        'MAYOR_IGUAL': operator.ge, 'MENOR_IGUAL': operator.le,
+    }
+    con_decimal = [('decimal', 'decimal'), ('entero', 'decimal'), ('decimal', 'entero')]
+    
+    for operador, funcion in aritmeticas.items():
+        tabla[operador, 'entero', 'entero'] = lambda a, b, f=funcion: entero(f(a.valor, b.valor))
+        for tipos in con_decimal:
+            tabla[(operador,) + tipos] = lambda a, b, f=funcion: Valor('decimal', f(a.valor, b.valor))
+    tabla['DIVISION', 'entero', 'entero'] = dividir_enteros
+    tabla['MODULO', 'entero', 'entero'] = modulo_enteros
+    for tipos in con_decimal:
+        tabla[('DIVISION',) + tipos] = dividir_decimales
+        tabla[('MODULO',) + tipos] = modulo_decimales
+    
+    for operador, funcion in comparaciones.items():
+        for tipos in [('entero', 'entero'), ('cadena', 'cadena')] + con_decimal:
+            tabla[(operador,) + tipos] = lambda a, b, f=funcion: booleano(f(a.valor, b.valor))
+    for operador in ('IGUAL_IGUAL', 'DIFERENTE'):
+        tabla[operador, 'booleano', 'booleano'] = tabla[operador, 'entero', 'entero']
+    tabla['Y', 'booleano', 'booleano'] = lambda a, b: booleano(a.valor and b.valor)
+    tabla['O', 'booleano', 'booleano'] = lambda a, b: booleano(a.valor or b.valor)
+    
+    for tipos in [('cadena', 'cadena'), ('cadena', 'entero'), ('cadena', 'decimal'), ('entero', 'cadena'), ('decimal', 'cadena')]:
+        tabla[('MAS',) + tipos] = concatenar
+    return tabla
+
+ESPECIALIZADAS = tabla_especializadas()
+
+class SitioBinario:
+    # Estado de especialización de una OperacionBinaria con sus contadores:
+    # aciertos (operandos de los tipos especializados), fallos (el resto) y
+    # cambios de especialización. Es del intérprete, no del nodo: el árbol
+    # de la caché lo comparten intérpretes de varios hilos.
+    __slots__ = ('operador', 'general', 'izquierda', 'derecha', 'rapida', 'aciertos', 'fallos', 'cambios')
+    
+    def __init__(self, operador: str):
+        self.operador = operador
+        self.general = operacion_binaria(operador)
+        self.izquierda: Optional[str] = None
+        self.derecha: Optional[str] = None
+        self.rapida: Optional[Callable[[Valor, Valor], Valor]] = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.cambios = 0
+    
+    def operar(self, izquierda: Valor, derecha: Valor) -> Valor:
+        # Operandos que no son de los tipos especializados
+        self.fallos += 1
+        rapida = ESPECIALIZADAS.get((self.operador, izquierda.tipo, derecha.tipo)) if self.cambios < MAX_CAMBIOS else None
+        if rapida is None:
+            return self.general(izquierda, derecha)
+        self.izquierda, self.derecha, self.rapida = izquierda.tipo, derecha.tipo, rapida
+        self.cambios += 1
+        return rapida(izquierda, derecha)
+    
+    def informe(self) -> Dict[str, Any]:
+        total = self.aciertos + self.fallos
+        return {
+            'operador': self.operador,
+            'tipos': None if self.rapida is None else [self.izquierda, self.derecha],
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'cambios': self.cambios,
+            'tasa_aciertos': self.aciertos / total if total else 0.0,
+        }
+
+def informe_especializacion(programa: ast.Nodo, sitios: Dict[ast.Nodo, SitioBinario]) -> List[Dict[str, Any]]:
+    # Contadores de cada OperacionBinaria de `programa` que tiene sitio, en
+    # el orden del código
+    informe = []
+    pendientes: List[Any] = [programa]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, ast.Nodo):
+            if isinstance(valor, ast.OperacionBinaria) and valor in sitios:
+                informe.append(sitios[valor].informe())
+            pendientes.extend(reversed([getattr(valor, campo) for campo in valor.campos]))
+        elif isinstance(valor, (list, tuple)):
+            pendientes.extend(reversed(valor))
+        elif isinstance(valor, dict):
+            pendientes.extend(reversed(list(valor.values())))
+    return informe
+
+def operar_unario(operador: str, operando: Valor) -> Valor:
+    return operacion_unaria(operador)(operando)
+
+def iterar_valores(coleccion: Valor) -> Iterator[Valor]:
+    # Elementos que recorre `para cada` en los motores compilados: las listas
+    # ya contienen Valor; los caracteres y las claves se envuelven como cadena
+    if coleccion.tipo not in ['lista', 'cadena', 'diccionario']:
+        raise TypeError(f"Tipo '{coleccion.tipo}' no es iterable")
+    if coleccion.tipo == 'lista':
+        return iter(coleccion.valor)
+    return map(Valor, repeat('cadena'), coleccion.valor)
+
+# Motores de ejecución: 'arbol' recorre el árbol con Interprete.evaluar,
+# 'cierres' lo compila antes a funciones de Python (cierres.py), 'bytecode'
+# a código para la máquina virtual de maquina.py y 'python' a código fuente
+# de Python (transpilador.py)
+MOTORES = ('arbol', 'cierres', 'bytecode', 'python')
+
+# Llamadas anidadas que el recorrido del árbol hace con la pila de Python; las
+# más profundas siguen en el trampolín de trampolin.py
+LLAMADAS_RECURSIVAS = 32
+
+# Profundidad máxima de llamadas por defecto en el recorrido del árbol
+MAX_LLAMADAS = 200000
+
+class Demostradas:
+    # Las comprobaciones de tipos de un programa que tipos.verificar ha
+    # demostrado que no pueden fallar, para que los motores se las salten:
+    # las declaraciones de variable y los retornos de función cuyo tipo
+    # siempre es el declarado, y para cada llamada, la DeclaracionFuncion
+    # contra la que ha comprobado el número y los tipos de los argumentos.
+    # Van aparte y no en los nodos porque el árbol de cache_ast lo comparten
+    # también las ejecuciones que no verifican.
+    __slots__ = ('declaraciones', 'retornos', 'llamadas')
+    
+    def __init__(self):
+        self.declaraciones: Set[ast.DeclaracionVariable] = set()
+        self.retornos: Set[ast.DeclaracionFuncion] = set()
+        self.llamadas: Dict[ast.LlamadaFuncion, ast.DeclaracionFuncion] = {}
+
+# Las de un programa que no se ha verificado: se comprueba todo
+NINGUNA = Demostradas()
+
+def evalua(tipo: type) -> Callable:
+    # Marca un método de Interprete como manejador de los nodos de clase `tipo`
+    def decorar(metodo: Callable) -> Callable:
+        metodo.tipo_nodo = tipo
+        return metodo
+    return decorar
+
+def manejadores_declarados(clase: type) -> Dict[type, Callable]:
+    return {metodo.tipo_nodo: metodo for metodo in vars(clase).values() if hasattr(metodo, 'tipo_nodo')}
+
 class Interprete:
+    # Manejadores de evaluación indexados por la clase exacta del nodo: cada
+    # visita cuesta una consulta a un diccionario en lugar de una cadena de
+    # isinstance. Se declaran con @evalua; las subclases heredan la tabla (con
+    # sus métodos redefinidos) y pueden añadir tipos nuevos con @evalua o con
+    # registrar_manejador.
+    manejadores: Dict[type, Callable[['Interprete', ast.Nodo, 'Entorno'], 'Valor']] = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.manejadores = {tipo: getattr(cls, metodo.__name__, metodo) for tipo, metodo in cls.manejadores.items()}
+        cls.manejadores.update(manejadores_declarados(cls))
+    
     def __init__(self):
         self.entorno_global = Entorno()
+        self.informe_optimizacion = None
+        self.informe_traduccion = None
+        self.informe_tipos = None
+        # Lo que la verificación del programa en curso permite saltarse
+        self.omitir = NINGUNA
+        # Funciones con memoria del último programa (memoria.memorizables) y
+        # sus tablas de resultados en esta ejecución
+        self.memorizadas: List[ast.DeclaracionFuncion] = []
+        self.memorias: Dict[ast.DeclaracionFuncion, Any] = {}
+        # Profundidad máxima de llamadas anidadas (None: MAX_LLAMADAS en el
+        # recorrido del árbol y maquina.MAX_MARCOS en el motor 'bytecode')
+        self.max_marcos: Optional[int] = None
+        # Dónde escribe `mostrar` durante ejecutar (None: la salida estándar)
+        self.salida: Optional[Salida] = None
+        # Llamadas en curso del recorrido del árbol, en total y las que están
+        # sobre la pila de Python desde el último trampolín
+        self.llamadas = 0
+        self.recursivas = 0
+        # Sitio de cada OperacionBinaria evaluada (SitioBinario); se guardan
+        # aquí y no en el nodo para que los intérpretes que comparten un
+        # árbol de la caché no se afecten
+        self.sitios: Dict[ast.OperacionBinaria, SitioBinario] = {}
         self.inicializar_entorno_global()
     
     def inicializar_entorno_global(self) -> None:
-        # Funciones nativas
-        # Ejemplos: mostrar, alerta, etc.
-        pass
+        # Funciones nativas (biblioteca.py): las del programa con el mismo
+        # nombre las tapan
+        self.entorno_global.funciones.update(PRIMITIVAS)
     
     def evaluar(self, nodo: ast.Nodo, entorno: Entorno) -> Valor:
-        # Programa
-        if isinstance(nodo, ast.Programa):
-            resultado = None
-            for statement in nodo.cuerpo:
-                resultado = self.evaluar(statement, entorno)
-            return resultado or Valor('nulo', None)
+        try:
+            manejador = self.manejadores[type(nodo)]
+        except KeyError:
+            manejador = self.buscar_manejador(type(nodo))
+        return manejador(self, nodo, entorno)
+    
+    @classmethod
+    def buscar_manejador(cls, tipo: type) -> Callable[['Interprete', ast.Nodo, Entorno], Valor]:
+        # Subclases de un nodo conocido (p. ej. las vistas de arena_ast): se
+        # usa el manejador de la clase base y se guarda para la próxima vez
+        for base in tipo.__mro__[1:]:
+            if base in cls.manejadores:
+                cls.manejadores[tipo] = cls.manejadores[base]
+                return cls.manejadores[tipo]
+        raise NotImplementedError(f"Tipo de nodo no implementado: {tipo.__name__}")
+    
+    @classmethod
+    def registrar_manejador(cls, tipo: type, manejador: Callable[['Interprete', ast.Nodo, Entorno], Valor]) -> None:
+        cls.manejadores[tipo] = manejador
+    
+    @evalua(ast.Programa)
+    def evaluar_programa(self, nodo: ast.Programa, entorno: Entorno) -> Valor:
+        resultado = None
+        for statement in nodo.cuerpo:
+            resultado = self.evaluar(statement, entorno)
+            if type(resultado) is Retorno:
+                # `devolver` fuera de una función termina el programa
+                raise RetornoExcepcion(resultado.valor)
+        return resultado or NULO
+    
+    @evalua(ast.DeclaracionVariable)
+    def evaluar_declaracion_variable(self, nodo: ast.DeclaracionVariable, entorno: Entorno) -> Valor:
+        valor = self.evaluar(nodo.valor, entorno)
         
-        # Declaración de variable
-        elif isinstance(nodo, ast.DeclaracionVariable):
-            valor = self.evaluar(nodo.valor, entorno)
-            
-            # Verificar tipo si se especificó
-            if nodo.tipo and nodo.tipo != valor.tipo:
-                raise TypeError(f"Se esperaba tipo '{nodo.tipo}' pero se obtuvo '{valor.tipo}'")
-            
-            entorno.definir_variable(nodo.nombre, valor)
-            return valor
-        
-        # Asignación de variable
-        elif isinstance(nodo, ast.AsignacionVariable):
-            valor = self.evaluar(nodo.valor, entorno)
-            entorno.asignar_variable(nodo.nombre, valor)
-            return valor
-        
-        # Valor literal
-        elif isinstance(nodo, ast.ValorLiteral):
-            return Valor(nodo.tipo, nodo.valor)
-        
-        # Identificador
-        elif isinstance(nodo, ast.Identificador):
-            return entorno.obtener_variable(nodo.nombre)
-        
-        # Operación binaria
-        elif isinstance(nodo, ast.OperacionBinaria):
-            izquierda = self.evaluar(nodo.izquierda, entorno)
-            derecha = self.evaluar(nodo.derecha, entorno)
-            
-            # Lógica para operaciones basadas en el operador y tipos
-            if nodo.operador == 'MAS':
-                if izquierda.tipo in ['entero', 'decimal'] and derecha.tipo in ['entero', 'decimal']:
-                    resultado = izquierda.valor + derecha.valor
-                    tipo = 'decimal' if 'decimal' in [izquierda.tipo, derecha.tipo] else 'entero'
-                    return Valor(tipo, resultado)
-                elif izquierda.tipo == 'cadena' or derecha.tipo == 'cadena':
-                    # Concatenación
-                    return Valor('cadena', str(izquierda.valor) + str(derecha.valor))
-                else:
-                    raise TypeError(f"Operación no soportada entre '{izquierda.tipo}' y '{derecha.tipo}'")
-            
-            # Implementar el resto de operadores...
-            
-        # Operación unaria
-        elif isinstance(nodo, ast.OperacionUnaria):
-            operando = self.evaluar(nodo.operando, entorno)
-            
-            if nodo.operador == 'MENOS':
-                if operando.tipo in ['entero', 'decimal']:
-                    return Valor(operando.tipo, -operando.valor)
-                else:
-                    raise TypeError(f"Operador '-' no aplicable a tipo '{operando.tipo}'")
-            elif nodo.operador == 'NO':
-                if operando.tipo == 'booleano':
-                    return Valor('booleano', not operando.valor)
-                else:
-                    raise TypeError(f"Operador 'no' no aplicable a tipo '{operando.tipo}'")
-        
-        # Condicional
-        elif isinstance(nodo, ast.Condicional):
+        # Verificar tipo si se especificó (y tipos.verificar no lo ha demostrado)
+        if nodo.tipo and nodo.tipo != valor.tipo and nodo not in self.omitir.declaraciones:
+            raise TypeError(f"Se esperaba tipo '{nodo.tipo}' pero se obtuvo '{valor.tipo}'")
+        
+        entorno.definir_variable(nodo.nombre, valor)
+        return valor
+    
+    @evalua(ast.AsignacionVariable)
+    def evaluar_asignacion_variable(self, nodo: ast.AsignacionVariable, entorno: Entorno) -> Valor:
+        valor = self.evaluar(nodo.valor, entorno)
+        entorno.asignar_variable(nodo.nombre, valor)
+        return valor
+    
+    @evalua(ast.ValorLiteral)
+    def evaluar_valor_literal(self, nodo: ast.ValorLiteral, entorno: Entorno) -> Valor:
+        return nodo.constante
+    
+    @evalua(ast.Identificador)
+    def evaluar_identificador(self, nodo: ast.Identificador, entorno: Entorno) -> Valor:
+        return entorno.obtener_variable(nodo.nombre)
+    
+    @evalua(ast.OperacionBinaria)
+    def evaluar_operacion_binaria(self, nodo: ast.OperacionBinaria, entorno: Entorno) -> Valor:
+        izquierda = self.evaluar(nodo.izquierda, entorno)
+        derecha = self.evaluar(nodo.derecha, entorno)
+        
+        # Como operar_en_sitio, sin la llamada
+        sitio = self.sitios.get(nodo)
+        if sitio is None:
+            sitio = self.sitios[nodo] = SitioBinario(nodo.operador)
+        if izquierda.tipo == sitio.izquierda and derecha.tipo == sitio.derecha:
+            sitio.aciertos += 1
+            return sitio.rapida(izquierda, derecha)
+        return sitio.operar(izquierda, derecha)
+    
+    def operar_en_sitio(self, nodo: ast.OperacionBinaria, izquierda: Valor, derecha: Valor) -> Valor:
+        sitio = self.sitios.get(nodo)
+        if sitio is None:
+            sitio = self.sitios[nodo] = SitioBinario(nodo.operador)
+        if izquierda.tipo == sitio.izquierda and derecha.tipo == sitio.derecha:
+            sitio.aciertos += 1
+            return sitio.rapida(izquierda, derecha)
+        return sitio.operar(izquierda, derecha)
+    
+    @evalua(ast.OperacionUnaria)
+    def evaluar_operacion_unaria(self, nodo: ast.OperacionUnaria, entorno: Entorno) -> Valor:
+        operando = self.evaluar(nodo.operando, entorno)
+        return operar_unario(nodo.operador, operando)
+    
+    @evalua(ast.Condicional)
+    def evaluar_condicional(self, nodo: ast.Condicional, entorno: Entorno) -> Valor:
+        condicion = self.evaluar(nodo.condicion, entorno)
+        
+        if condicion.tipo != 'booleano':
+            raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{condicion.tipo}'")
+        
+        if condicion.valor:
+            # Ejecutar bloque 'si'
+            cuerpo = nodo.cuerpo
+        elif nodo.sino:
+            # Ejecutar bloque 'sino'
+            cuerpo = nodo.sino
+        else:
+            return NULO
+        
+        resultado = None
+        for statement in cuerpo:
+            resultado = self.evaluar(statement, entorno)
+            if type(resultado) is Retorno:
+                return resultado
+        return resultado or NULO
+    
+    @evalua(ast.BucleWhile)
+    def evaluar_bucle_while(self, nodo: ast.BucleWhile, entorno: Entorno) -> Valor:
+        resultado = NULO
+        
+        while True:
             condicion = self.evaluar(nodo.condicion, entorno)
             
             if condicion.tipo != 'booleano':
                 raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{condicion.tipo}'")
             
-            if condicion.valor:
-                # Ejecutar bloque 'si'
-                resultado = None
-                for statement in nodo.cuerpo:
-                    try:
-                        resultado = self.evaluar(statement, entorno)
-                    except RetornoExcepcion as r:
-                        raise r
-                return resultado or Valor('nulo', None)
-            elif nodo.sino:
-                # Ejecutar bloque 'sino'
-                resultado = None
-                for statement in nodo.sino:
-                    try:
-                        resultado = self.evaluar(statement, entorno)
-                    except RetornoExcepcion as r:
-                        raise r
-                return resultado or Valor('nulo', None)
-            else:
-                return Valor('nulo', None)
-        
-        # Bucle while
-        elif isinstance(nodo, ast.BucleWhile):
-            resultado = Valor('nulo', None)
+            if not condicion.valor:
+                break
             
-            while True:
-                condicion = self.evaluar(nodo.condicion, entorno)
-                
-                if condicion.tipo != 'booleano':
-                    raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{condicion.tipo}'")
-                
-                if not condicion.valor:
-                    break
-                
-                for statement in nodo.cuerpo:
-                    try:
-                        resultado = self.evaluar(statement, entorno)
-                    except RetornoExcepcion as r:
-                        raise r
-            
-            return resultado
+            for statement in nodo.cuerpo:
+                resultado = self.evaluar(statement, entorno)
+                if type(resultado) is Retorno:
+                    return resultado
         
-        # Bucle for
-        elif isinstance(nodo, ast.BucleFor):
-            # Inicialización
-            self.evaluar(nodo.inicializacion, entorno)
-            resultado = Valor('nulo', None)
-            
-            while True:
-                # Condición
-                condicion = self.evaluar(nodo.condicion, entorno)
-                
-                if condicion.tipo != 'booleano':
-                    raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{condicion.tipo}'")
-                
-                if not condicion.valor:
-                    break
-                
-                # Cuerpo
-                for statement in nodo.cuerpo:
-                    try:
-                        resultado = self.evaluar(statement, entorno)
-                    except RetornoExcepcion as r:
-                        raise r
-                
-                # Incremento
-                self.evaluar(nodo.incremento, entorno)
-            
-            return resultado
+        return resultado
+    
+    @evalua(ast.BucleFor)
+    def evaluar_bucle_for(self, nodo: ast.BucleFor, entorno: Entorno) -> Valor:
+        # Inicialización
+        self.evaluar(nodo.inicializacion, entorno)
+        resultado = NULO
         
-        # Bucle foreach
-        elif isinstance(nodo, ast.BucleForEach):
-            iterable = self.evaluar(nodo.iterable, entorno)
-            resultado = Valor('nulo', None)
+        while True:
+            # Condición
+            condicion = self.evaluar(nodo.condicion, entorno)
             
-            # Verificar que sea un tipo iterable
-            if iterable.tipo not in ['lista', 'cadena', 'diccionario']:
-                raise TypeError(f"Tipo '{iterable.tipo}' no es iterable")
+            if condicion.tipo != 'booleano':
+                raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{condicion.tipo}'")
             
-            iter_values = iterable.valor
-            if iterable.tipo == 'diccionario':
-                iter_values = iter_values.keys()
+            if not condicion.valor:
+                break
             
-            for valor in iter_values:
-                # Crear nuevo entorno para cada iteración
-                entorno_bucle = Entorno(entorno)
-                
-                # Definir variable de iteración
-                if iterable.tipo == 'lista':
-                    entorno_bucle.definir_variable(nodo.variable, valor)
-                elif iterable.tipo == 'cadena':
-                    entorno_bucle.definir_variable(nodo.variable, Valor('cadena', valor))
-                elif iterable.tipo == 'diccionario':
-                    entorno_bucle.definir_variable(nodo.variable, Valor('cadena', valor))
-                
-                # Ejecutar cuerpo
-                for statement in nodo.cuerpo:
-                    try:
-                        resultado = self.evaluar(statement, entorno_bucle)
-                    except RetornoExcepcion as r:
-                        raise r
+            # Cuerpo
+            for statement in nodo.cuerpo:
+                resultado = self.evaluar(statement, entorno)
+                if type(resultado) is Retorno:
+                    return resultado
             
-            return resultado
+            # Incremento
+            self.evaluar(nodo.incremento, entorno)
         
-        # Declaración de función
-        elif isinstance(nodo, ast.DeclaracionFuncion):
-            entorno.definir_funcion(nodo.nombre, nodo)
-            return Valor('funcion', nodo.nombre)
+        return resultado
+    
+    @evalua(ast.BucleForEach)
+    def evaluar_bucle_foreach(self, nodo: ast.BucleForEach, entorno: Entorno) -> Valor:
+        iterable = self.evaluar(nodo.iterable, entorno)
+        resultado = NULO
         
-        # Llamada a función
-        elif isinstance(nodo, ast.LlamadaFuncion):
-            funcion = entorno.obtener_funcion(nodo.nombre)
-            
-            # Verificar número de argumentos
-            if len(nodo.argumentos) != len(funcion.parametros):
-                raise TypeError(f"Función '{nodo.nombre}' espera {len(funcion.parametros)} argumentos, pero se proporcionaron {len(nodo.argumentos)}")
-            
-            # Evaluar argumentos
-            valores_args = []
-            for arg in nodo.argumentos:
-                valores_args.append(self.evaluar(arg, entorno))
-            
-            # Crear nuevo entorno para la función
-            entorno_funcion = Entorno(entorno)
-            
-            # Asociar argumentos con parámetros
-            for i, param in enumerate(funcion.parametros):
-                # Verificar tipo si se especificó
-                if param['tipo'] and param['tipo'] != valores_args[i].tipo:
-                    raise TypeError(f"Parámetro '{param['nombre']}' espera tipo '{param['tipo']}', pero se proporcionó '{valores_args[i].tipo}'")
-                
-                entorno_funcion.definir_variable(param['nombre'], valores_args[i])
-            
-            # Ejecutar cuerpo de la función
-            resultado = Valor('nulo', None)
-            try:
-                for statement in funcion.cuerpo:
-                    resultado = self.evaluar(statement, entorno_funcion)
-            except RetornoExcepcion as r:
-                return r.valor or Valor('nulo', None)
+        # Verificar que sea un tipo iterable
+        if iterable.tipo not in ['lista', 'cadena', 'diccionario']:
+            raise TypeError(f"Tipo '{iterable.tipo}' no es iterable")
+        
+        iter_values = iterable.valor
+        if iterable.tipo == 'diccionario':
+            iter_values = iter_values.keys()
+        
+        for valor in iter_values:
+            # Crear nuevo entorno para cada iteración
+            entorno_bucle = Entorno(entorno)
             
-            # Verificar tipo de retorno si se especificó
-            if funcion.tipo_retorno and resultado.tipo != funcion.tipo_retorno:
-                raise TypeError(f"Función '{nodo.nombre}' debe retornar tipo '{funcion.tipo_retorno}', pero retornó '{resultado.tipo}'")
+            # Definir variable de iteración
+            if iterable.tipo == 'lista':
+                entorno_bucle.definir_variable(nodo.variable, valor)
+            elif iterable.tipo == 'cadena':
+                entorno_bucle.definir_variable(nodo.variable, Valor('cadena', valor))
+            elif iterable.tipo == 'diccionario':
+                entorno_bucle.definir_variable(nodo.variable, Valor('cadena', valor))
             
-            return resultado
-        
-        # Retorno de función
-        elif isinstance(nodo, ast.RetornoFuncion):
-            valor = Valor('nulo', None) if nodo.valor is None else self.evaluar(nodo.valor, entorno)
-            raise RetornoExcepcion(valor)
-        
-        # Lista de valores
-        elif isinstance(nodo, ast.ListaValores):
-            valores = []
-            for expr in nodo.valores:
-                valores.append(self.evaluar(expr, entorno))
-            return Valor('lista', valores)
-        
-        # Diccionario
-        elif isinstance(nodo, ast.Diccionario):
-            diccionario = {}
-            for clave, valor in nodo.pares:
-                clave_eval = self.evaluar(clave, entorno)
-                valor_eval = self.evaluar(valor, entorno)
-                
-                # Verificar que la clave sea inmutable
-                if clave_eval.tipo not in ['entero', 'decimal', 'cadena', 'booleano']:
-                    raise TypeError(f"La clave del diccionario debe ser inmutable, no '{clave_eval.tipo}'")
-                
-                diccionario[clave_eval.valor] = valor_eval
+            # Ejecutar cuerpo
+            for statement in nodo.cuerpo:
+                resultado = self.evaluar(statement, entorno_bucle)
+                if type(resultado) is Retorno:
+                    return resultado
+        
+        return resultado
+    
+    @evalua(ast.DeclaracionFuncion)
+    def evaluar_declaracion_funcion(self, nodo: ast.DeclaracionFuncion, entorno: Entorno) -> Valor:
+        entorno.definir_funcion(nodo.nombre, nodo)
+        return Valor('funcion', nodo.nombre)
+    
+    @evalua(ast.LlamadaFuncion)
+    def evaluar_llamada_funcion(self, nodo: ast.LlamadaFuncion, entorno: Entorno) -> Valor:
+        funcion = entorno.obtener_funcion(nodo.nombre)
+        if type(funcion) is Primitiva:
+            funcion.comprobar(len(nodo.argumentos))
+            return funcion.llamar([self.evaluar(arg, entorno) for arg in nodo.argumentos])
+        # Número y tipos de los argumentos ya demostrados por tipos.verificar
+        verificada = self.omitir.llamadas.get(nodo) is funcion
+        
+        # Verificar número de argumentos
+        if not verificada and len(nodo.argumentos) != len(funcion.parametros):
+            raise TypeError(f"Función '{nodo.nombre}' espera {len(funcion.parametros)} argumentos, pero se proporcionaron {len(nodo.argumentos)}")
+        
+        # Evaluar argumentos
+        valores_args = []
+        for arg in nodo.argumentos:
+            valores_args.append(self.evaluar(arg, entorno))
+        
+        # Funciones puras: el resultado guardado, si lo hay (memoria.py)
+        if self.memorias:
+            memoria = self.memorias.get(funcion)
+            if memoria is not None:
+                return memoria.llamar(valores_args, self.llamadas, self.llamar_funcion, funcion, nodo.nombre, valores_args, entorno, verificada)
+        return self.llamar_funcion(funcion, nodo.nombre, valores_args, entorno, verificada)
+    
+    def llamar_funcion(self, funcion: ast.DeclaracionFuncion, nombre: str, valores_args: List[Valor], entorno: Entorno, verificada: bool = False) -> Valor:
+        entorno_funcion = self.entorno_llamada(funcion, valores_args, entorno, verificada)
+        
+        if self.llamadas >= self.limite_llamadas():
+            raise RecursionError(f"Se superó el límite de {self.limite_llamadas()} llamadas anidadas")
+        if self.recursivas >= LLAMADAS_RECURSIVAS:
+            # Demasiado hondo para la pila de Python: esta llamada y las que
+            # haga siguen en el trampolín
+            from trampolin import ejecutar_en_trampolin
+            return ejecutar_en_trampolin(self, funcion, nombre, entorno_funcion)
+        
+        self.llamadas += 1
+        self.recursivas += 1
+        try:
+            return self.ejecutar_funcion(funcion, nombre, entorno_funcion)
+        finally:
+            self.llamadas -= 1
+            self.recursivas -= 1
+    
+    def entorno_llamada(self, funcion: ast.DeclaracionFuncion, valores_args: List[Valor], entorno: Entorno, verificada: bool = False) -> Entorno:
+        # Crear nuevo entorno para la función
+        entorno_funcion = Entorno(entorno)
+        
+        # Asociar argumentos con parámetros
+        for i, param in enumerate(funcion.parametros):
+            # Verificar tipo si se especificó
+            if not verificada and param['tipo'] and param['tipo'] != valores_args[i].tipo:
+                raise TypeError(f"Parámetro '{param['nombre']}' espera tipo '{param['tipo']}', pero se proporcionó '{valores_args[i].tipo}'")
             
-            return Valor('diccionario', diccionario)
-        
-        # Elemento HTML
-        elif isinstance(nodo, ast.ElementoHTML):
-            # Evaluar atributos
-            atributos_eval = {}
-            for nombre, valor in nodo.atributos.items():
-                atributos_eval[nombre] = self.evaluar(valor, entorno)
+            entorno_funcion.definir_variable(param['nombre'], valores_args[i])
+        
+        return entorno_funcion
+    
+    def limite_llamadas(self) -> int:
+        return MAX_LLAMADAS if self.max_marcos is None else self.max_marcos
+    
+    def ejecutar_funcion(self, funcion: ast.DeclaracionFuncion, nombre: str, entorno_funcion: Entorno) -> Valor:
+        # Ejecutar cuerpo de la función
+        resultado = NULO
+        for statement in funcion.cuerpo:
+            resultado = self.evaluar(statement, entorno_funcion)
+            if type(resultado) is Retorno:
+                return resultado.valor
+        
+        # Verificar tipo de retorno si se especificó (y no está demostrado)
+        if funcion.tipo_retorno and resultado.tipo != funcion.tipo_retorno and funcion not in self.omitir.retornos:
+            raise TypeError(f"Función '{nombre}' debe retornar tipo '{funcion.tipo_retorno}', pero retornó '{resultado.tipo}'")
+        
+        return resultado
+    
+    @evalua(ast.RetornoFuncion)
+    def evaluar_retorno_funcion(self, nodo: ast.RetornoFuncion, entorno: Entorno) -> Retorno:
+        valor = NULO if nodo.valor is None else self.evaluar(nodo.valor, entorno)
+        return Retorno(valor)
+    
+    @evalua(ast.ListaValores)
+    def evaluar_lista_valores(self, nodo: ast.ListaValores, entorno: Entorno) -> Valor:
+        valores = []
+        for expr in nodo.valores:
+            valores.append(self.evaluar(expr, entorno))
+        return crear_lista(valores)
+    
+    @evalua(ast.Diccionario)
+    def evaluar_diccionario(self, nodo: ast.Diccionario, entorno: Entorno) -> Valor:
+        diccionario = {}
+        for clave, valor in nodo.pares:
+            clave_eval = self.evaluar(clave, entorno)
+            valor_eval = self.evaluar(valor, entorno)
             
-            # Evaluar contenido
-            contenido_eval = []
-            for item in nodo.contenido:
-                contenido_eval.append(self.evaluar(item, entorno))
+            # Verificar que la clave sea inmutable
+            if clave_eval.tipo not in ['entero', 'decimal', 'cadena', 'booleano']:
+                raise TypeError(f"La clave del diccionario debe ser inmutable, no '{clave_eval.tipo}'")
             
-            # Construir HTML (simplificado)
-            return Valor('html', {
-                'tipo': nodo.tipo,
-                'atributos': atributos_eval,
-                'contenido': contenido_eval
-            })
-        
-        # Estilo CSS
-        elif isinstance(nodo, ast.EstiloCSS):
-            # Construir CSS (simplificado)
-            return Valor('css', {
-                'selector': nodo.selector,
-                'propiedades': nodo.propiedades
-            })
+            diccionario[clave_eval.valor] = valor_eval
+        
+        return Valor('diccionario', diccionario)
+    
+    @evalua(ast.ElementoHTML)
+    def evaluar_elemento_html(self, nodo: ast.ElementoHTML, entorno: Entorno) -> Valor:
+        # Evaluar atributos
+        atributos_eval = {}
+        for nombre, valor in nodo.atributos.items():
+            atributos_eval[nombre] = self.evaluar(valor, entorno)
+        
+        # Evaluar contenido
+        contenido_eval = []
+        for item in nodo.contenido:
+            contenido_eval.append(self.evaluar(item, entorno))
+        
+        # Construir HTML (simplificado)
+        return Valor('html', {
+            'tipo': nodo.tipo,
+            'atributos': atributos_eval,
+            'contenido': contenido_eval
+        })
+    
+    @evalua(ast.EstiloCSS)
+    def evaluar_estilo_css(self, nodo: ast.EstiloCSS, entorno: Entorno) -> Valor:
+        # Construir CSS (simplificado)
+        return Valor('css', {
+            'selector': nodo.selector,
+            'propiedades': nodo.propiedades
+        })
+    
+    def ejecutar(self, codigo: str, optimizar: bool = False, motor: str = 'arbol', verificar: bool = False) -> Any:
+        programa = self.preparar(codigo, optimizar, motor, verificar)
+        with escribiendo_en(self.salida):
+            if motor == 'arbol':
+                return self.evaluar(programa, self.entorno_global)
+            return self.ejecutar_compilado(programa, motor)
+    
+    async def ejecutar_cooperativo(self, codigo: str, optimizar: bool = False, verificar: bool = False,
+                                   quantum: Optional[int] = None, rebanada: Optional[float] = None) -> Valor:
+        # Como ejecutar con el motor 'arbol', pero sin bloquear el bucle de
+        # eventos: se prepara en un hilo y el programa cede el bucle cada
+        # cierto número de pasos para que avancen los demás (cooperativo.py)
+        from cooperativo import evaluar_cooperativo
+        
+        programa = await asyncio.to_thread(self.preparar, codigo, optimizar, 'arbol', verificar)
+        with escribiendo_en(self.salida):
+            return await evaluar_cooperativo(self, programa, self.entorno_global, quantum, rebanada)
+    
+    def preparar(self, codigo: str, optimizar: bool = False, motor: str = 'arbol', verificar: bool = False) -> Any:
+        # Todo lo que hace ejecutar salvo ejecutar: el árbol (motor 'arbol') o
+        # el programa compilado, ya en la caché compartida
+        from cache_ast import cache_global
+        
+        if motor not in MOTORES:
+            raise ValueError(f"Motor de ejecución desconocido: '{motor}'")
         
+        # El árbol y sus derivados vienen de la caché compartida: evaluar no
+        # los modifica, y el optimizador devuelve un árbol nuevo
+        if optimizar:
+            from optimizador import Optimizador
+            ast, self.informe_optimizacion = cache_global.derivado(codigo, 'optimizado', Optimizador().optimizar)
         else:
-            raise NotImplementedError(f"Tipo de nodo no implementado: {type(nodo).__name__}")
+            ast = cache_global.obtener(codigo)
+        
+        if verificar:
+            self.informe_tipos = cache_global.derivado(codigo, ('tipos', optimizar), lambda _: self.verificar_tipos(ast))
+            self.omitir = self.informe_tipos.omitir
+        else:
+            self.omitir = NINGUNA
+        self.preparar_memoria(cache_global.derivado(codigo, ('memoria', optimizar), lambda _: self.memorizables(ast)))
+        
+        if motor == 'arbol':
+            return ast
+        # Las comprobaciones que se saltan quedan en el código compilado
+        return cache_global.derivado(codigo, (motor, optimizar, verificar), lambda _: self.compilar(ast, motor))
     
-    def ejecutar(self, codigo: str) -> Any:
-        from lexer import Lexer
+    def ejecutar_archivo(self, ruta: str, motor: str = 'arbol', verificar: bool = False) -> Any:
+        from compilado import analizar_archivo
         
-        lexer = Lexer()
-        tokens = lexer.tokenizar(codigo)
+        if motor not in MOTORES:
+            raise ValueError(f"Motor de ejecución desconocido: '{motor}'")
         
-        parser = Parser(tokens)
-        ast = parser.analizar()
+        ast = analizar_archivo(ruta)
+        if verificar:
+            self.informe_tipos = self.verificar_tipos(ast)
+            self.omitir = self.informe_tipos.omitir
+        else:
+            self.omitir = NINGUNA
+        self.preparar_memoria(self.memorizables(ast))
+        with escribiendo_en(self.salida):
+            if motor == 'arbol':
+                return self.evaluar(ast, self.entorno_global)
+            return self.ejecutar_compilado(self.compilar(ast, motor), motor)
+    
+    def verificar_tipos(self, programa: ast.Programa) -> Any:
+        # Verificación de tipos antes de ejecutar: devuelve la Verificacion,
+        # con las comprobaciones que los motores pueden saltarse, o lanza
+        # tipos.ErrorTipos si encuentra errores
+        from tipos import ErrorTipos, verificar
         
-        return self.evaluar(ast, self.entorno_global)
-    
\ No newline at end of file
+        verificacion = verificar(programa)
+        if verificacion.errores:
+            raise ErrorTipos(verificacion.errores)
+        return verificacion
+    
+    def memorizables(self, programa: ast.Programa) -> List[ast.DeclaracionFuncion]:
+        # Las funciones del programa con memoria de resultados (memoria.py)
+        from memoria import memorizables
+        return memorizables(programa)
+    
+    def preparar_memoria(self, memorizadas: List[ast.DeclaracionFuncion]) -> None:
+        # Tablas vacías para la ejecución que empieza: no se comparten con
+        # otras ejecuciones del mismo código
+        from memoria import tablas
+        self.memorizadas = memorizadas
+        self.memorias = tablas(memorizadas)
+    
+    def informe_memoria(self) -> List[Dict[str, Any]]:
+        # Contadores de la memoria de cada función en la última ejecución
+        return [memoria.informe() for memoria in self.memorias.values()]
+    
+    def compilar(self, programa: ast.Programa, motor: str) -> Any:
+        # Forma ejecutable del programa para uno de los motores compilados,
+        # sin las comprobaciones de self.omitir
+        if motor == 'cierres':
+            from cierres import compilar_programa
+        elif motor == 'python':
+            from transpilador import traducir_programa as compilar_programa
+        else:
+            from bytecode import compilar_programa
+        return compilar_programa(programa, self.omitir)
+    
+    def ejecutar_compilado(self, compilado: Any, motor: str) -> Valor:
+        if motor == 'cierres':
+            return compilado(self.entorno_global, self.memorias)
+        if motor == 'python':
+            self.informe_traduccion = compilado.informe()
+            return compilado.ejecutar(self.entorno_global, self.memorias)
+        from maquina import MaquinaVirtual
+        return MaquinaVirtual(self.max_marcos, self.memorias).ejecutar(compilado, self.entorno_global)
+
+Interprete.manejadores = manejadores_declarados(Interprete)
+
+
+if __name__ == "__main__":
+    import sys
+    
+    for ruta in sys.argv[1:]:
+        print(Interprete().ejecutar_archivo(ruta))
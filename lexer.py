@@ -1,109 +1,262 @@
 # lexer.py
 import re
-from typing import List, Tuple, Optional
+from array import array
+from typing import Iterator, List, Optional, TextIO, Tuple, Union
 
 class Token:
-    def __init__(self, tipo: str, valor: str, linea: int, columna: int):
+    def __init__(self, tipo: str, valor: str, linea: int, columna: int, inicio: Optional[int] = None):
         self.tipo = tipo
         self.valor = valor
         self.linea = linea
         self.columna = columna
+        self.inicio = inicio  # Desplazamiento en la fuente, si se conoce
     
     def __repr__(self):
         return f"Token({self.tipo}, '{self.valor}', {self.linea}, {self.columna})"
 
 class Lexer:
-    def __init__(self):
-        # Palabras clave
-        self.palabras_clave = {
-            'variable': 'VARIABLE',
-            'si': 'SI',
-            'sino': 'SINO',
-            'para': 'PARA',
-            'mientras': 'MIENTRAS',
-            'funcion': 'FUNCION',
-            'devolver': 'DEVOLVER',
-            'mostrar': 'MOSTRAR',
-            'verdadero': 'VERDADERO',
-            'falso': 'FALSO',
-            'nulo': 'NULO',
-            'y': 'Y',
-            'o': 'O',
-            'no': 'NO',
-            'cada': 'CADA',
-            'en': 'EN'
-        }
-        
-        # Patrones de token usando expresiones regulares
-        self.patrones = [
-            (r'[ \t]+', None),  # Espacios y tabulaciones
-            (r'\n', 'SALTO_LINEA'),
-            (r'#.*', None),  # Comentarios
-            (r'\(', 'PARENTESIS_IZQ'),
-            (r'\)', 'PARENTESIS_DER'),
-            (r'\{', 'LLAVE_IZQ'),
-            (r'\}', 'LLAVE_DER'),
-            (r'\[', 'CORCHETE_IZQ'),
-            (r'\]', 'CORCHETE_DER'),
-            (r';', 'PUNTO_COMA'),
-            (r',', 'COMA'),
-            (r':', 'DOS_PUNTOS'),
-            (r'\.', 'PUNTO'),
-            (r'=', 'IGUAL'),
-            (r'\+', 'MAS'),
-            (r'-', 'MENOS'),
-            (r'\*', 'MULTIPLICACION'),
-            (r'/', 'DIVISION'),
-            (r'%', 'MODULO'),
-            (r'\^', 'POTENCIA'),
-            (r'==', 'IGUAL_IGUAL'),
-            (r'!=', 'DIFERENTE'),
-            (r'>', 'MAYOR'),
-            (r'<', 'MENOR'),
-            (r'>=', 'MAYOR_IGUAL'),
-            (r'<=', 'MENOR_IGUAL'),
-            (r'"[^"]*"|\'[^\']*\'', 'CADENA'),
-            (r'\d+\.\d+', 'DECIMAL'),
-            (r'\d+', 'ENTERO'),
-            (r'[a-zA-ZñÑáéíóúÁÉÍÓÚ_][a-zA-ZñÑáéíóúÁÉÍÓÚ0-9_]*', 'IDENTIFICADOR')
-        ]
+    # Palabras clave
+    palabras_clave = {
+        'variable': 'VARIABLE',
+        'si': 'SI',
+        'sino': 'SINO',
+        'para': 'PARA',
+        'mientras': 'MIENTRAS',
+        'funcion': 'FUNCION',
+        'devolver': 'DEVOLVER',
+        'mostrar': 'MOSTRAR',
+        'verdadero': 'VERDADERO',
+        'falso': 'FALSO',
+        'nulo': 'NULO',
+        'y': 'Y',
+        'o': 'O',
+        'no': 'NO',
+        'cada': 'CADA',
+        'en': 'EN'
+    }
+    
+    # Patrones de token usando expresiones regulares. El orden define la
+    # prioridad: los operadores de dos caracteres van antes que los de uno.
+    patrones = [
+        (r'[ \t]+', 'ESPACIO'),  # Espacios y tabulaciones
+        (r'\n', 'SALTO_LINEA'),
+        (r'#.*', 'COMENTARIO'),  # Comentarios
+        (r'==', 'IGUAL_IGUAL'),
+        (r'!=', 'DIFERENTE'),
+        (r'>=', 'MAYOR_IGUAL'),
+        (r'<=', 'MENOR_IGUAL'),
+        (r'\(', 'PARENTESIS_IZQ'),
+        (r'\)', 'PARENTESIS_DER'),
+        (r'\{', 'LLAVE_IZQ'),
+        (r'\}', 'LLAVE_DER'),
+        (r'\[', 'CORCHETE_IZQ'),
+        (r'\]', 'CORCHETE_DER'),
+        (r';', 'PUNTO_COMA'),
+        (r',', 'COMA'),
+        (r':', 'DOS_PUNTOS'),
+        (r'\.', 'PUNTO'),
+        (r'=', 'IGUAL'),
+        (r'\+', 'MAS'),
+        (r'-', 'MENOS'),
+        (r'\*', 'MULTIPLICACION'),
+        (r'/', 'DIVISION'),
+        (r'%', 'MODULO'),
+        (r'\^', 'POTENCIA'),
+        (r'>', 'MAYOR'),
+        (r'<', 'MENOR'),
+        (r'"[^"]*"|\'[^\']*\'', 'CADENA'),
+        (r'\d+\.\d+', 'DECIMAL'),
+        (r'\d+', 'ENTERO'),
+        (r'[a-zA-ZñÑáéíóúÁÉÍÓÚ_][a-zA-ZñÑáéíóúÁÉÍÓÚ0-9_]*', 'IDENTIFICADOR')
+    ]
+    
+    # Tipos que se consumen sin generar token
+    ignorados = frozenset({'ESPACIO', 'COMENTARIO'})
+    
+    # Una sola expresión con grupos nombrados, compilada una vez por clase;
+    # `lastgroup` indica qué patrón coincidió.
+    regex = re.compile('|'.join(f'(?P<{tipo}>{patron})' for patron, tipo in patrones))
+    
+    # Tipos de token internados como enteros pequeños (índices en esta tupla)
+    tipos = tuple(dict.fromkeys([tipo for _, tipo in patrones] + list(palabras_clave.values()) + ['EOF']))
+    id_tipo = {tipo: i for i, tipo in enumerate(tipos)}
     
     def tokenizar(self, codigo: str) -> List[Token]:
-        tokens = []
-        linea = 1
-        columna = 1
+        return list(self.tokenizar_stream(codigo))
+    
+    def escanear(self, codigo: str, inicio: int = 0, linea: int = 1, columna: int = 1,
+                 final: bool = True) -> Iterator[Tuple[Optional[str], int, int, int, int]]:
+        # Recorrido común a todas las formas de tokenizar: a partir de
+        # `inicio`, que debe ser un límite de token, cede (tipo, inicio, fin,
+        # línea, columna) de cada token que no se ignora, con las palabras
+        # clave ya reconocidas, y al final el EOF. Sin `final` el texto sigue
+        # en otro bloque: se exige que cada coincidencia deje al menos dos
+        # caracteres detrás (un token cortado por el borde del bloque, '12.'
+        # de '12.5' o '=' de '==', podría crecer) y, en lugar del EOF, cede
+        # (None, posición, posición, línea, columna) con dónde continuar.
+        coincidir = self.regex.match
+        palabras_clave = self.palabras_clave
+        ignorados = self.ignorados
         
-        i = 0
-        while i < len(codigo):
-            match = None
+        i = inicio
+        n = len(codigo)
+        limite = n if final else n - 2
+        while i < n:
+            match = coincidir(codigo, i)
             
-            # Intentar coincidir con un patrón
-            for patron, tipo in self.patrones:
-                regex = re.compile(patron)
-                match = regex.match(codigo, i)
-                if match:
-                    texto = match.group(0)
-                    if tipo:
-                        # Comprobar si es una palabra clave
-                        if tipo == 'IDENTIFICADOR' and texto in self.palabras_clave:
-                            tokens.append(Token(self.palabras_clave[texto], texto, linea, columna))
-                        else:
-                            tokens.append(Token(tipo, texto, linea, columna))
-                    
-                    # Actualizar posición
-                    if tipo == 'SALTO_LINEA':
-                        linea += 1
-                        columna = 1
-                    else:
-                        columna += len(texto)
-                    
-                    i = match.end()
+            if not match or match.end() > limite:
+                if not final:
                     break
+                if not match:
+                    raise SyntaxError(f"Carácter no reconocido: '{codigo[i]}' en línea {linea}, columna {columna}")
+            
+            tipo = match.lastgroup
+            fin = match.end()
+            
+            if tipo not in ignorados:
+                if tipo == 'IDENTIFICADOR':
+                    tipo = palabras_clave.get(codigo[i:fin], tipo)
+                yield tipo, i, fin, linea, columna
             
-            if not match:
-                # Si no hay coincidencia, reportar error
-                raise SyntaxError(f"Carácter no reconocido: '{codigo[i]}' en línea {linea}, columna {columna}")
+            if tipo == 'SALTO_LINEA':
+                linea += 1
+                columna = 1
+            elif tipo == 'CADENA' and codigo.find('\n', i, fin) >= 0:
+                # Las cadenas pueden ocupar varias líneas
+                linea += codigo.count('\n', i, fin)
+                columna = fin - codigo.rfind('\n', i, fin)
+            else:
+                columna += fin - i
+            
+            i = fin
+        
+        if final:
+            yield 'EOF', n, n, linea, columna
+        else:
+            yield None, i, i, linea, columna
+    
+    def tokenizar_compacto(self, codigo: str) -> 'BufferTokens':
+        buffer = BufferTokens(codigo)
+        tipos = buffer.tipos.append
+        inicios = buffer.inicios.append
+        fines = buffer.fines.append
+        lineas = buffer.lineas.append
+        columnas = buffer.columnas.append
+        id_tipo = self.id_tipo
         
-        # Añadir token de fin de archivo
-        tokens.append(Token('EOF', '', linea, columna))
-        return tokens
\ No newline at end of file
+        for tipo, inicio, fin, linea, columna in self.escanear(codigo):
+            tipos(id_tipo[tipo])
+            inicios(inicio)
+            fines(fin)
+            lineas(linea)
+            columnas(columna)
+        return buffer
+    
+    def tokenizar_desde(self, codigo: str, inicio: int = 0, linea: int = 1, columna: int = 1) -> Iterator[Token]:
+        # Tokeniza perezosamente a partir de `inicio`, que debe ser un límite
+        # de token; cada token lleva su desplazamiento en `inicio`.
+        for tipo, inicio, fin, linea, columna in self.escanear(codigo, inicio, linea, columna):
+            yield Token(tipo, codigo[inicio:fin], linea, columna, inicio)
+    
+    def tokenizar_stream(self, fuente: Union[str, TextIO], tamano_bloque: int = 65536) -> Iterator[Token]:
+        # Acepta una cadena o un archivo de texto; los archivos se leen por
+        # bloques y sólo se conserva en memoria la parte aún no consumida.
+        if isinstance(fuente, str):
+            return self.tokenizar_bloques(iter((fuente,)))
+        return self.tokenizar_bloques(iter(lambda: fuente.read(tamano_bloque), ''))
+    
+    def tokenizar_bloques(self, bloques: Iterator[str], inicio: int = 0, linea: int = 1, columna: int = 1) -> Iterator[Token]:
+        # Como tokenizar_desde, con el texto que empieza en `inicio` repartido
+        # en bloques que se piden a medida que hacen falta
+        buffer = ''
+        i = 0
+        final = False
+        while True:
+            for tipo, desde, hasta, linea, columna in self.escanear(buffer, i, linea, columna, final):
+                if tipo is None:
+                    i = desde
+                    break
+                yield Token(tipo, buffer[desde:hasta], linea, columna, inicio + desde)
+            
+            if final:
+                return
+            
+            # Descartar lo consumido y leer el siguiente bloque
+            bloque = next(bloques, None)
+            if bloque is None:
+                final = True
+                bloque = ''
+            inicio += i
+            buffer = buffer[i:] + bloque
+            i = 0
+
+class TokenCompacto:
+    # Vista de un token dentro de un BufferTokens. El tipo se resuelve al
+    # crearla (es el nombre internado, así que compararlo es casi gratis);
+    # valor, línea y columna se leen del buffer sólo cuando se piden.
+    __slots__ = ('tipo', 'buffer', 'indice')
+    
+    def __init__(self, buffer: 'BufferTokens', indice: int):
+        self.tipo = Lexer.tipos[buffer.tipos[indice]]
+        self.buffer = buffer
+        self.indice = indice
+    
+    @property
+    def valor(self) -> str:
+        buffer = self.buffer
+        return buffer.fuente[buffer.inicios[self.indice]:buffer.fines[self.indice]]
+    
+    @property
+    def linea(self) -> int:
+        return self.buffer.lineas[self.indice]
+    
+    @property
+    def columna(self) -> int:
+        return self.buffer.columnas[self.indice]
+    
+    def __repr__(self):
+        return f"Token({self.tipo}, '{self.valor}', {self.linea}, {self.columna})"
+
+class BufferTokens:
+    # Tokens guardados en columnas paralelas respaldadas por `array`: tipo
+    # (índice en Lexer.tipos), desplazamientos de inicio y fin en la fuente,
+    # línea y columna. El texto se recorta de la fuente bajo demanda.
+    def __init__(self, fuente: str):
+        self.fuente = fuente
+        self.tipos = array('B')
+        self.inicios = array('I')
+        self.fines = array('I')
+        self.lineas = array('I')
+        self.columnas = array('I')
+    
+    def agregar(self, tipo: int, inicio: int, fin: int, linea: int, columna: int) -> None:
+        self.tipos.append(tipo)
+        self.inicios.append(inicio)
+        self.fines.append(fin)
+        self.lineas.append(linea)
+        self.columnas.append(columna)
+    
+    def valor(self, indice: int) -> str:
+        return self.fuente[self.inicios[indice]:self.fines[indice]]
+    
+    def tipo(self, indice: int) -> str:
+        return Lexer.tipos[self.tipos[indice]]
+    
+    def __len__(self) -> int:
+        return len(self.tipos)
+    
+    def __getitem__(self, indice: int) -> TokenCompacto:
+        if indice < 0:
+            indice += len(self.tipos)
+        if not 0 <= indice < len(self.tipos):
+            raise IndexError(indice)
+        return TokenCompacto(self, indice)
+    
+    def __iter__(self) -> Iterator[TokenCompacto]:
+        for indice in range(len(self.tipos)):
+            yield TokenCompacto(self, indice)
+    
+    def nbytes(self) -> int:
+        # Memoria ocupada por las columnas (sin contar la fuente)
+        return sum(columna.itemsize * len(columna) for columna in
+                   (self.tipos, self.inicios, self.fines, self.lineas, self.columnas))
@@ -0,0 +1,290 @@
+# listas.py
+import math
+import operator
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from valores import FALSO, VERDADERO, Valor, entero
+
+# Listas numéricas. Una lista cuyos elementos son todos enteros o todos
+# decimales guarda los números sin envolver en una ListaNumerica: un array de
+# NumPy (está en requirements.txt) o, si no está instalado, una lista de
+# Python de int o float; las dos dan los mismos resultados, y test_listas.py
+# las compara. Los Valor de los elementos se crean sólo al leerlos. Las
+# operaciones entre una lista y un número se aplican a cada elemento (en
+# bloque si la lista es numérica) y las reducciones (suma, mínimo, máximo y
+# media) recorren los números directamente. Las listas de `rango`
+# (biblioteca.py) son un Rango, que ni siquiera guarda los números. El resto
+# de listas son listas de Python de Valor y dan los mismos resultados elemento
+# a elemento.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NUMERICOS = ('entero', 'decimal')
+
+# Los enteros sólo van a un array de NumPy (int64) si su valor absoluto no pasa
+# de LIMITE_ENTERO: así se comparan con los decimales sin perder precisión, y
+# las operaciones cuyo resultado podría pasar del límite se hacen con los int
+# de Python, que no se desbordan
+LIMITE_ENTERO = 2 ** 53
+
+def decimal(numero: float) -> Valor:
+    return Valor('decimal', numero)
+
+def caja(tipo: str) -> Callable[[Any], Valor]:
+    return entero if tipo == 'entero' else decimal
+
+class ListaNumerica:
+    # `tipo` es el de todos los elementos y `datos` los números, en un array
+    # de NumPy o en una lista de Python. Se comporta como la lista de Valor
+    # equivalente: se recorre, se indexa, se compara y se escribe igual.
+    __slots__ = ('tipo', 'datos')
+
+    def __init__(self, tipo: str, datos: Any):
+        self.tipo = tipo
+        self.datos = datos
+
+    def numeros(self) -> List[Any]:
+        # Los números como int o float de Python
+        datos = self.datos
+        return datos if type(datos) is list else datos.tolist()
+
+    def __len__(self) -> int:
+        return len(self.datos)
+
+    def __iter__(self) -> Iterator[Valor]:
+        return map(caja(self.tipo), self.numeros())
+
+    def __getitem__(self, indice: int) -> Valor:
+        numero = self.datos[indice]
+        return entero(int(numero)) if self.tipo == 'entero' else decimal(float(numero))
+
+    def __eq__(self, otra: Any) -> Any:
+        # Los números se comparan por valor, como en son_iguales
+        if isinstance(otra, ListaNumerica):
+            return self.numeros() == otra.numeros()
+        if isinstance(otra, list):
+            return len(otra) == len(self) and all(
+                valor.tipo in NUMERICOS and valor.valor == numero for numero, valor in zip(self.numeros(), otra)
+            )
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+class Rango(ListaNumerica):
+    # Lista de enteros consecutivos (o con un paso fijo) que guarda el range
+    # de Python: `para cada` la recorre creando el Valor de cada elemento, sin
+    # llegar a tener la lista
+    __slots__ = ()
+
+    def __init__(self, numeros: range):
+        super().__init__('entero', numeros)
+
+    def numeros(self) -> List[int]:
+        return list(self.datos)
+
+    def __iter__(self) -> Iterator[Valor]:
+        return map(entero, self.datos)
+
+def empaquetar(tipo: str, numeros: List[Any]) -> ListaNumerica:
+    # ListaNumerica con una lista no vacía de números de tipo `tipo`
+    if numpy is not None:
+        if tipo == 'decimal':
+            return ListaNumerica(tipo, numpy.array(numeros, dtype=numpy.float64))
+        if -LIMITE_ENTERO <= min(numeros) and max(numeros) <= LIMITE_ENTERO:
+            return ListaNumerica(tipo, numpy.array(numeros, dtype=numpy.int64))
+    return ListaNumerica(tipo, numeros)
+
+def crear_lista(valores: List[Valor]) -> Valor:
+    # El Valor de una lista con estos elementos
+    if valores:
+        tipo = valores[0].tipo
+        if tipo in NUMERICOS and all(valor.tipo == tipo for valor in valores):
+            return Valor('lista', empaquetar(tipo, [valor.valor for valor in valores]))
+    return Valor('lista', valores)
+
+# Operaciones entre una lista y un número
+
+ARITMETICAS: Dict[str, Callable[[Any, Any], Any]] = {
+    'MAS': operator.add,
+    'MENOS': operator.sub,
+    'MULTIPLICACION': operator.mul,
+}
+
+COMPARACIONES: Dict[str, Callable[[Any, Any], Any]] = {
+    'MAYOR': operator.gt,
+    'MENOR': operator.lt,
+    'MAYOR_IGUAL': operator.ge,
+    'MENOR_IGUAL': operator.le,
+}
+
+def operar_elementos(operador: str, operar: Callable[[Valor, Valor], Valor], izquierda: Valor, derecha: Valor) -> Valor:
+    # `operador` entre una lista y un número (en cualquier orden): la lista de
+    # los resultados de `operar`, la función general del operador, con cada
+    # elemento. Las listas numéricas lo calculan en bloque.
+    en_izquierda = izquierda.tipo == 'lista'
+    lista, numero = (izquierda, derecha) if en_izquierda else (derecha, izquierda)
+    numerica = lista.valor
+    if type(numerica) is Rango and len(numerica):
+        numerica = empaquetar('entero', numerica.numeros())
+    if type(numerica) is ListaNumerica:
+        resultado = en_bloque(operador, numerica, numero, en_izquierda)
+        if resultado is not None:
+            return resultado
+    if en_izquierda:
+        return crear_lista([operar(elemento, numero) for elemento in lista.valor])
+    return crear_lista([operar(numero, elemento) for elemento in lista.valor])
+
+def lista_booleanos(resultados: List[bool]) -> Valor:
+    return Valor('lista', [VERDADERO if resultado else FALSO for resultado in resultados])
+
+def division_por_cero(lista: ListaNumerica, escalar: Any, en_izquierda: bool) -> bool:
+    # Si algún divisor es cero
+    if en_izquierda:
+        return escalar == 0
+    datos = lista.datos
+    return 0 in datos if type(datos) is list else not datos.all()
+
+def en_bloque(operador: str, lista: ListaNumerica, numero: Valor, en_izquierda: bool) -> Optional[Valor]:
+    # Resultado de la operación con todos los números de `lista` a la vez, o
+    # None si tiene que calcularse elemento a elemento
+    tipo = 'decimal' if 'decimal' in (lista.tipo, numero.tipo) else 'entero'
+    escalar = numero.valor
+    if operador in ('DIVISION', 'MODULO') and division_por_cero(lista, escalar, en_izquierda):
+        raise ZeroDivisionError("División por cero")
+    datos = lista.datos
+    if type(datos) is not list:
+        resultado = con_numpy(operador, tipo, datos, escalar, en_izquierda)
+        if resultado is not None:
+            return resultado
+        datos = datos.tolist()
+
+    if operador in COMPARACIONES:
+        comparar = COMPARACIONES[operador]
+        if en_izquierda:
+            return lista_booleanos([comparar(x, escalar) for x in datos])
+        return lista_booleanos([comparar(escalar, x) for x in datos])
+
+    if operador in ARITMETICAS:
+        operar = ARITMETICAS[operador]
+    elif operador == 'DIVISION':
+        # Entre enteros, división entera
+        operar = operator.floordiv if tipo == 'entero' else operator.truediv
+    elif operador == 'MODULO':
+        operar = operator.mod
+    elif operador == 'POTENCIA' and tipo == 'entero' and (escalar >= 0 if en_izquierda else min(datos) >= 0):
+        # Sólo con exponentes no negativos el resultado es entero
+        operar = operator.pow
+    else:
+        return None
+    if en_izquierda:
+        numeros = [operar(x, escalar) for x in datos]
+    else:
+        numeros = [operar(escalar, x) for x in datos]
+    return Valor('lista', empaquetar(tipo, numeros))
+
+def con_numpy(operador: str, tipo: str, datos: Any, escalar: Any, en_izquierda: bool) -> Optional[Valor]:
+    # en_bloque con un array de NumPy, o None si el resultado podría no ser
+    # exacto: potencias y enteros que pueden pasar de LIMITE_ENTERO
+    if type(escalar) is int and not -LIMITE_ENTERO <= escalar <= LIMITE_ENTERO:
+        return None
+    izquierda, derecha = (datos, escalar) if en_izquierda else (escalar, datos)
+
+    if operador in COMPARACIONES:
+        return lista_booleanos(COMPARACIONES[operador](izquierda, derecha).tolist())
+
+    if operador == 'POTENCIA':
+        return None
+    if tipo == 'entero':
+        # |a // b| no pasa de |a|, ni |a % b| de |b|: sólo pueden desbordarse
+        # la suma, la resta y el producto
+        mayor = max(-int(datos.min()), int(datos.max()))
+        if operador in ('MAS', 'MENOS') and mayor + abs(escalar) > LIMITE_ENTERO:
+            return None
+        if operador == 'MULTIPLICACION' and mayor * abs(escalar) > LIMITE_ENTERO:
+            return None
+
+    if operador in ARITMETICAS:
+        operar = ARITMETICAS[operador]
+    elif operador == 'DIVISION':
+        operar = operator.floordiv if tipo == 'entero' else operator.truediv
+    else:
+        operar = operator.mod
+    # Como los float de Python: los desbordamientos dan infinito sin avisar
+    with numpy.errstate(all='ignore'):
+        return Valor('lista', ListaNumerica(tipo, operar(izquierda, derecha)))
+
+# Reducciones. Son las funciones de la biblioteca del lenguaje que recorren
+# una lista de números: con una ListaNumerica, en bloque; con cualquier otra
+# lista, comprobando que cada elemento sea un número.
+
+def numeros_lista(nombre: str, lista: Valor) -> Tuple[str, Any]:
+    # El tipo de los números de `lista` ('decimal' si hay alguno) y los números
+    if lista.tipo != 'lista':
+        raise TypeError(f"'{nombre}' espera una lista, no '{lista.tipo}'")
+    valor = lista.valor
+    if isinstance(valor, ListaNumerica):
+        return valor.tipo, valor.datos
+    tipo = 'entero'
+    for elemento in valor:
+        if elemento.tipo not in NUMERICOS:
+            raise TypeError(f"'{nombre}' espera una lista de números, no con elementos de tipo '{elemento.tipo}'")
+        if elemento.tipo == 'decimal':
+            tipo = 'decimal'
+    return tipo, [elemento.valor for elemento in valor]
+
+def sumar_numeros(tipo: str, datos: Any) -> Any:
+    # Los enteros se suman exactamente y los decimales con math.fsum, que no
+    # depende del orden: da lo mismo con NumPy que sin él. Los de un Rango,
+    # como serie aritmética.
+    if type(datos) is range:
+        return len(datos) * (datos[0] + datos[-1]) // 2 if datos else 0
+    if type(datos) is not list:
+        if tipo == 'entero' and len(datos) * max(-int(datos.min()), int(datos.max())) < 2 ** 63:
+            return int(datos.sum())
+        datos = datos.tolist()
+    return sum(datos) if tipo == 'entero' else math.fsum(datos)
+
+def suma(lista: Valor) -> Valor:
+    tipo, datos = numeros_lista('suma', lista)
+    if not len(datos):
+        return entero(0)
+    return caja(tipo)(sumar_numeros(tipo, datos))
+
+def extremo(nombre: str, lista: Valor, elegir: Callable) -> Valor:
+    tipo, datos = numeros_lista(nombre, lista)
+    if not len(datos):
+        raise ValueError(f"'{nombre}' de una lista vacía")
+    if type(lista.valor) is list:
+        # El elemento mismo, con su tipo
+        return elegir(lista.valor, key=lambda elemento: elemento.valor)
+    if type(datos) is range:
+        # Los extremos de un Rango son el primero y el último
+        return entero(elegir(datos[0], datos[-1]))
+    if type(datos) is not list:
+        return caja(tipo)((datos.min() if elegir is min else datos.max()).item())
+    return caja(tipo)(elegir(datos))
+
+def minimo(lista: Valor) -> Valor:
+    return extremo('minimo', lista, min)
+
+def maximo(lista: Valor) -> Valor:
+    return extremo('maximo', lista, max)
+
+def media(lista: Valor) -> Valor:
+    tipo, datos = numeros_lista('media', lista)
+    if not len(datos):
+        raise ValueError("'media' de una lista vacía")
+    return decimal(sumar_numeros(tipo, datos) / len(datos))
+
+REDUCCIONES: Dict[str, Callable[[Valor], Valor]] = {
+    'suma': suma,
+    'minimo': minimo,
+    'maximo': maximo,
+    'media': media,
+}
@@ -1,20 +1,69 @@
 # main.py
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from interpreter import Interprete
+from pydantic import BaseModel, Field
 from parser import Parser
-from html_renderer import HTMLRenderer
+from cache_ast import analizar_codigo, cache_global
+from biblioteca import PRIMITIVAS
+from ejecutor import LINEAS, MAX_LOTE, PROCESOS, TIEMPO_LIMITE, Ejecutor, Saturado
+from salida import INTERVALO, MAX_TOTAL
+from cooperativo import QUANTUM, REBANADA, SESIONES, EjecutorCooperativo
+import ast_nodes as ast
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 
 
 
-import traceback
+import asyncio
+import json
+import os
 import uvicorn
+from typing import List
 
-app = FastAPI()
+def programas_precalentar(rutas: str) -> list:
+    # Los programas de los ficheros de INTERPRETE_PRECALENTAR (separados por
+    # os.pathsep), que cada proceso deja preparados en su caché al arrancar
+    programas = []
+    for ruta in filter(None, rutas.split(os.pathsep)):
+        with open(ruta, encoding='utf-8') as fichero:
+            programas.append(fichero.read())
+    return programas
+
+# Dónde se ejecutan los programas: en procesos trabajadores (por defecto) o,
+# con INTERPRETE_MODO=cooperativo, en el bucle de eventos del servidor,
+# turnándose (cooperativo.py; sólo el motor 'arbol'). Se ajusta por entorno.
+comunes = dict(
+    cola=int(os.environ['INTERPRETE_COLA']) if os.environ.get('INTERPRETE_COLA') else None,
+    tiempo_limite=float(os.environ.get('INTERPRETE_TIEMPO_LIMITE', TIEMPO_LIMITE)),
+    max_salida=int(os.environ.get('INTERPRETE_MAX_SALIDA', MAX_TOTAL)),
+    intervalo_salida=float(os.environ.get('INTERPRETE_INTERVALO_SALIDA', INTERVALO)),
+)
+modo = os.environ.get('INTERPRETE_MODO', 'procesos')
+if modo == 'procesos':
+    ejecutor = Ejecutor(
+        procesos=int(os.environ.get('INTERPRETE_PROCESOS', PROCESOS)),
+        precalentar=programas_precalentar(os.environ.get('INTERPRETE_PRECALENTAR', '')),
+        **comunes,
+    )
+elif modo == 'cooperativo':
+    ejecutor = EjecutorCooperativo(
+        sesiones=int(os.environ.get('INTERPRETE_SESIONES', SESIONES)),
+        quantum=int(os.environ.get('INTERPRETE_QUANTUM', QUANTUM)),
+        rebanada=float(os.environ.get('INTERPRETE_REBANADA', REBANADA)),
+        **comunes,
+    )
+else:
+    raise ValueError(f"INTERPRETE_MODO desconocido: '{modo}' (debe ser 'procesos' o 'cooperativo')")
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    await ejecutor.iniciar()
+    yield
+    ejecutor.cerrar()
+
+app = FastAPI(lifespan=ciclo_de_vida)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +79,13 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 class CodigoEntrada(BaseModel):
     codigo: str
+    optimizar: bool = True
+    motor: str = 'arbol'  # 'arbol', 'cierres', 'bytecode' o 'python' (sólo 'arbol' en modo cooperativo)
+    verificar: bool = False  # comprobar los tipos antes de ejecutar
+
+class LoteEntrada(BaseModel):
+    programas: List[CodigoEntrada] = Field(max_length=MAX_LOTE)
+    flujo: bool = False  # devolver cada resultado al terminar, en NDJSON
 
 @app.get("/")
 async def home():
@@ -37,43 +93,66 @@ async def home():
             
 @app.post("/interpretar")
 async def interpretar_codigo(entrada: CodigoEntrada):
+    # Lo ejecuta `ejecutor`, en un proceso o turnándose con los demás en el
+    # bucle de eventos: el servidor sigue atendiendo a los demás clientes
     try:
-        interprete = Interprete()
-        resultado = interprete.ejecutar(entrada.codigo)
-        
-        # Construir respuesta
-        respuesta = {
-            "estado": "exito",
-            "resultado": str(resultado.valor) if resultado else "nulo",
-            "tipo": resultado.tipo if resultado else "nulo"
-        }
-        
-        # Si el resultado es HTML o CSS, incluirlo
-        if resultado and resultado.tipo == 'html':
-            respuesta["html"] = HTMLRenderer.convertir_a_html(resultado)
-        elif resultado and resultado.tipo == 'css':
-            respuesta["css"] = HTMLRenderer.convertir_a_css(resultado)
-        
-        return respuesta
-    except Exception as e:
-        traceback_str = traceback.format_exc()
-        # Extraer información relevante para un mensaje de error amigable
-        mensaje_error = str(e)
-        
-        # Buscar información de línea y columna en el mensaje de error
-        linea = None
-        columna = None
-        if hasattr(e, 'linea') and hasattr(e, 'columna'):
-            linea = e.linea
-            columna = e.columna
-        
-        return {
-            "estado": "error",
-            "error": mensaje_error,
-            "traceback": traceback_str,
-            "linea": linea,
-            "columna": columna
-        }
+        return await ejecutor.ejecutar(entrada.codigo, optimizar=entrada.optimizar, motor=entrada.motor,
+                                       verificar=entrada.verificar)
+    except Saturado as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+@app.post("/interpretar/stream")
+async def interpretar_stream(entrada: CodigoEntrada):
+    # Como /interpretar, pero en Server-Sent Events mientras se ejecuta: un
+    # evento `salida` con las líneas de `mostrar` cada vez que el proceso las
+    # envía y, al final, un evento `resultado` con la respuesta
+    try:
+        eventos = ejecutor.flujo(entrada.codigo, optimizar=entrada.optimizar, motor=entrada.motor,
+                                 verificar=entrada.verificar)
+    except Saturado as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    
+    async def sse():
+        try:
+            async for tipo, contenido in eventos:
+                if tipo == LINEAS:
+                    yield f"event: salida\ndata: {json.dumps({'lineas': contenido}, ensure_ascii=False)}\n\n"
+                else:
+                    yield f"event: resultado\ndata: {json.dumps(contenido, ensure_ascii=False)}\n\n"
+        finally:
+            await eventos.aclose()
+    # Sin caché ni búfer en un proxy: cada evento llega al enviarlo
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/interpretar/lote")
+async def interpretar_lote(entrada: LoteEntrada):
+    # Muchos programas en una petición: los iguales se ejecutan una vez y los
+    # distintos en paralelo. Sin `flujo`, los resultados van en el orden de
+    # los programas; con `flujo`, una línea JSON por programa (con su
+    # `indice`) según terminan.
+    peticiones = [programa.model_dump() for programa in entrada.programas]
+    try:
+        if not entrada.flujo:
+            return {"estado": "exito", "resultados": await ejecutor.ejecutar_lote(peticiones)}
+        # Se rechaza aquí, antes de empezar a responder
+        resultados = ejecutor.lote(peticiones)
+        primero = await anext(resultados, None)
+    except Saturado as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    
+    async def lineas():
+        terminado = primero
+        try:
+            while terminado is not None:
+                indices, respuesta = terminado
+                for indice in indices:
+                    yield json.dumps({"indice": indice, **respuesta}, ensure_ascii=False) + "\n"
+                terminado = await anext(resultados, None)
+        finally:
+            # Si el cliente se desconecta, no se empiezan más programas
+            await resultados.aclose()
+    return StreamingResponse(lineas(), media_type="application/x-ndjson")
 
 """@app.get("/ast")
 async def obtener_ast(codigo: str):
@@ -108,39 +187,53 @@ async def obtener_ast(codigo: str):
 
 
 @app.get("/ast")
-async def obtener_ast(codigo: str):
+async def obtener_ast(codigo: str, optimizar: bool = False):
     try:
-        from lexer import Lexer
-        lexer = Lexer()
-        tokens = lexer.tokenizar(codigo)
+        # Analizar y optimizar puede llevar un rato: en un hilo, para no parar
+        # el bucle de eventos
+        def preparar():
+            ast_root = analizar_codigo(codigo)
+            if optimizar:
+                from optimizador import Optimizador
+                ast_root, _ = Optimizador().optimizar(ast_root)
+            return ast_root
+        ast_root = await asyncio.to_thread(preparar)
         
-        parser = Parser(tokens)
-        ast_root = parser.analizar()
-        
-        # Convertir AST a una estructura JSON mejorada
-        def serializar_ast(nodo):
-            if nodo is None:
-                return None
-            
-            result = {
-                "tipo": type(nodo).__name__,
-                "linea": getattr(nodo, "linea", None),  # Agregar línea si existe
-                "columna": getattr(nodo, "columna", None),
-            }
-            
-            for key, value in vars(nodo).items():
-                if isinstance(value, list):
-                    result[key] = [serializar_ast(item) if hasattr(item, '__dict__') else item for item in value]
-                elif hasattr(value, '__dict__'):
-                    result[key] = serializar_ast(value)
-                else:
-                    result[key] = value
-            
-            return result
+        # Convertir AST a una estructura JSON mejorada. Los nodos también
+        # pueden estar en tuplas (los pares de Diccionario) y en diccionarios
+        # (los atributos de ElementoHTML).
+        def serializar_ast(valor):
+            if isinstance(valor, ast.Nodo):
+                result = {
+                    "tipo": type(valor).__name__,
+                    "linea": getattr(valor, "linea", None),  # Agregar línea si existe
+                    "columna": getattr(valor, "columna", None),
+                }
+                for key in valor.campos:
+                    result[key] = serializar_ast(getattr(valor, key))
+                return result
+            if isinstance(valor, (list, tuple)):
+                return [serializar_ast(item) for item in valor]
+            if isinstance(valor, dict):
+                return {key: serializar_ast(item) for key, item in valor.items()}
+            return valor
         
         return {"estado": "exito", "ast": serializar_ast(ast_root)}
     except Exception as e:
         return {"estado": "error", "error": str(e)}
+
+@app.get("/cache")
+async def estadisticas_cache():
+    return cache_global.estadisticas()
+
+@app.get("/ejecutor")
+async def estadisticas_ejecutor():
+    return ejecutor.estadisticas()
+
+@app.get("/biblioteca")
+async def funciones_nativas():
+    # Las funciones nativas del lenguaje, con sus argumentos y lo que hacen
+    return [nativa.como_dict() for nativa in PRIMITIVAS.values()]
     
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
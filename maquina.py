@@ -0,0 +1,258 @@
+# maquina.py
+from typing import Dict, List, Optional, Tuple
+
+from bytecode import (
+    ASIGNAR, BINARIA, BUSCAR_FUNCION, CARGAR, COMPROBAR_CLAVE, COMPROBAR_TIPO, CONSTANTE, DECLARAR,
+    DEFINIR_FUNCION, DEVOLVER, DICCIONARIO, ELEMENTO_HTML, ENTRAR, ESTILO_CSS, FIN, GUARDAR_RESULTADO,
+    ITERAR, LISTA, LLAMAR, OPERADORES_BINARIOS, OPERADORES_UNARIOS, SACAR, SALIR, SALTAR, SALTAR_SI_FALSO,
+    SIGUIENTE, UNARIA, Codigo,
+)
+from biblioteca import Primitiva
+from interpreter import ENTEROS_RAPIDOS, OPERACIONES_BINARIAS, OPERACIONES_UNARIAS, Entorno, RetornoExcepcion, Valor, iterar_valores
+import ast_nodes as ast
+from listas import crear_lista
+from memoria import Memoria
+
+# Máquina de pila que ejecuta el código de bytecode.py. El bucle principal no
+# es recursivo: cada llamada a una función del lenguaje apila un Marco con el
+# estado de quien llama, y DEVOLVER/FIN lo recuperan. La profundidad de las
+# llamadas la limita `max_marcos`, no el límite de recursión de Python.
+# `memorias` son las tablas de memoria.py de la ejecución, por declaración.
+
+# Profundidad de llamadas por defecto
+MAX_MARCOS = 10000
+
+# Por posición de operador: la función general y el camino rápido entre enteros
+FUNCIONES_BINARIAS = tuple(OPERACIONES_BINARIAS[operador] for operador in OPERADORES_BINARIOS)
+RAPIDAS_BINARIAS = tuple(ENTEROS_RAPIDOS.get(operador) for operador in OPERADORES_BINARIOS)
+FUNCIONES_UNARIAS = tuple(OPERACIONES_UNARIAS[operador] for operador in OPERADORES_UNARIOS)
+
+class Marco:
+    # Estado guardado de quien llama mientras se ejecuta la función llamada, y
+    # dónde guardar el resultado si la función tiene memoria (la profundidad
+    # de la llamada es el número de marcos que quedan al volver)
+    __slots__ = ('codigo', 'posicion', 'entorno', 'pila', 'memoria', 'clave')
+
+    def __init__(self, codigo: Codigo, posicion: int, entorno: Entorno, pila: List, memoria: Optional[Memoria] = None, clave: Optional[Tuple] = None):
+        self.codigo = codigo
+        self.posicion = posicion
+        self.entorno = entorno
+        self.pila = pila
+        self.memoria = memoria
+        self.clave = clave
+
+class MaquinaVirtual:
+    def __init__(self, max_marcos: Optional[int] = None, memorias: Optional[Dict[ast.DeclaracionFuncion, Memoria]] = None):
+        self.max_marcos = MAX_MARCOS if max_marcos is None else max_marcos
+        self.memorias = memorias or {}
+
+    def ejecutar(self, codigo: Codigo, entorno: Entorno) -> Valor:
+        marcos: List[Marco] = []
+        max_marcos = self.max_marcos
+        memorias = self.memorias
+        instrucciones = codigo.instrucciones
+        constantes = codigo.constantes
+        nombres = codigo.nombres
+        pila: List = []
+        posicion = 0
+
+        while True:
+            operacion = instrucciones[posicion]
+            argumento = instrucciones[posicion + 1]
+            posicion += 2
+
+            if operacion == CARGAR:
+                nombre = nombres[argumento]
+                actual = entorno
+                while actual is not None:
+                    variables = actual.variables
+                    if nombre in variables:
+                        pila.append(variables[nombre])
+                        break
+                    actual = actual.padre
+                else:
+                    raise NameError(f"Variable '{nombre}' no definida")
+
+            elif operacion == CONSTANTE:
+                pila.append(constantes[argumento])
+
+            elif operacion == BINARIA:
+                derecha = pila.pop()
+                izquierda = pila[-1]
+                rapida = RAPIDAS_BINARIAS[argumento]
+                if rapida is not None and izquierda.tipo == 'entero' and derecha.tipo == 'entero':
+                    pila[-1] = rapida[1](rapida[0](izquierda.valor, derecha.valor))
+                else:
+                    pila[-1] = FUNCIONES_BINARIAS[argumento](izquierda, derecha)
+
+            elif operacion == SALTAR_SI_FALSO:
+                condicion = pila.pop()
+                if condicion.tipo != 'booleano':
+                    raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{condicion.tipo}'")
+                if not condicion.valor:
+                    posicion = argumento
+
+            elif operacion == SALTAR:
+                posicion = argumento
+
+            elif operacion == SACAR:
+                pila.pop()
+
+            elif operacion == ASIGNAR:
+                nombre = nombres[argumento]
+                actual = entorno
+                while actual is not None:
+                    if nombre in actual.variables:
+                        actual.variables[nombre] = pila[-1]
+                        break
+                    actual = actual.padre
+                else:
+                    raise NameError(f"Variable '{nombre}' no definida")
+
+            elif operacion == DECLARAR:
+                entorno.variables[nombres[argumento]] = pila[-1]
+
+            elif operacion == GUARDAR_RESULTADO:
+                valor = pila.pop()
+                pila[-argumento] = valor
+
+            elif operacion == BUSCAR_FUNCION:
+                nombre, cantidad = constantes[argumento]
+                # Como Entorno.obtener_funcion, pero sin recursión: con
+                # llamadas profundas la cadena de entornos es igual de larga
+                actual = entorno
+                while actual is not None:
+                    if nombre in actual.funciones:
+                        funcion = actual.funciones[nombre]
+                        break
+                    actual = actual.padre
+                else:
+                    raise NameError(f"Función '{nombre}' no definida")
+                if type(funcion) is Primitiva:
+                    funcion.comprobar(cantidad)
+                elif cantidad != len(funcion.parametros):
+                    raise TypeError(f"Función '{nombre}' espera {len(funcion.parametros)} argumentos, pero se proporcionaron {cantidad}")
+                pila.append(funcion)
+
+            elif operacion == LLAMAR:
+                if len(marcos) >= max_marcos:
+                    raise RecursionError(f"Se superó el límite de {max_marcos} llamadas anidadas")
+                argumentos = pila[len(pila) - argumento:]
+                del pila[len(pila) - argumento:]
+                funcion = pila.pop()
+                if type(funcion) is Primitiva:
+                    # Sin marco: se ejecuta aquí mismo
+                    pila.append(funcion.llamar(argumentos))
+                    continue
+
+                memoria = memorias.get(funcion.declaracion) if memorias else None
+                clave = None
+                if memoria is not None:
+                    clave = memoria.clave(argumentos)
+                    if clave is not None:
+                        resultado = memoria.buscar(clave, len(marcos))
+                        if resultado is not None:
+                            pila.append(resultado)
+                            continue
+
+                entorno_funcion = Entorno(entorno)
+                variables = entorno_funcion.variables
+                for param, valor in zip(funcion.parametros, argumentos):
+                    if param['tipo'] and param['tipo'] != valor.tipo:
+                        raise TypeError(f"Parámetro '{param['nombre']}' espera tipo '{param['tipo']}', pero se proporcionó '{valor.tipo}'")
+                    variables[param['nombre']] = valor
+
+                marcos.append(Marco(codigo, posicion, entorno, pila, memoria, clave))
+                codigo = funcion
+                instrucciones = codigo.instrucciones
+                constantes = codigo.constantes
+                nombres = codigo.nombres
+                entorno = entorno_funcion
+                pila = []
+                posicion = 0
+
+            elif operacion == DEVOLVER or operacion == FIN:
+                resultado = pila.pop()
+                if not marcos:
+                    # `devolver` fuera de una función sale del programa como
+                    # en el intérprete
+                    if operacion == DEVOLVER:
+                        raise RetornoExcepcion(resultado)
+                    return resultado
+                # Sólo el final normal de la función comprueba el tipo
+                if operacion == FIN and codigo.tipo_retorno and resultado.tipo != codigo.tipo_retorno:
+                    raise TypeError(f"Función '{codigo.nombre}' debe retornar tipo '{codigo.tipo_retorno}', pero retornó '{resultado.tipo}'")
+
+                marco = marcos.pop()
+                if marco.clave is not None:
+                    marco.memoria.guardar(marco.clave, resultado, len(marcos))
+                codigo = marco.codigo
+                instrucciones = codigo.instrucciones
+                constantes = codigo.constantes
+                nombres = codigo.nombres
+                entorno = marco.entorno
+                pila = marco.pila
+                posicion = marco.posicion
+                pila.append(resultado)
+
+            elif operacion == COMPROBAR_TIPO:
+                tipo = constantes[argumento]
+                if tipo != pila[-1].tipo:
+                    raise TypeError(f"Se esperaba tipo '{tipo}' pero se obtuvo '{pila[-1].tipo}'")
+
+            elif operacion == UNARIA:
+                pila[-1] = FUNCIONES_UNARIAS[argumento](pila[-1])
+
+            elif operacion == SIGUIENTE:
+                try:
+                    pila.append(next(pila[-1]))
+                except StopIteration:
+                    pila.pop()
+                    posicion = argumento
+
+            elif operacion == ENTRAR:
+                entorno = Entorno(entorno)
+                entorno.variables[nombres[argumento]] = pila.pop()
+
+            elif operacion == SALIR:
+                entorno = entorno.padre
+
+            elif operacion == ITERAR:
+                pila[-1] = iterar_valores(pila[-1])
+
+            elif operacion == DEFINIR_FUNCION:
+                funcion = codigo.funciones[argumento]
+                entorno.funciones[funcion.nombre] = funcion
+                pila.append(Valor('funcion', funcion.nombre))
+
+            elif operacion == LISTA:
+                valores = pila[len(pila) - argumento:]
+                del pila[len(pila) - argumento:]
+                pila.append(crear_lista(valores))
+
+            elif operacion == COMPROBAR_CLAVE:
+                clave = pila[-2]
+                if clave.tipo not in ['entero', 'decimal', 'cadena', 'booleano']:
+                    raise TypeError(f"La clave del diccionario debe ser inmutable, no '{clave.tipo}'")
+
+            elif operacion == DICCIONARIO:
+                elementos = pila[len(pila) - 2 * argumento:]
+                del pila[len(pila) - 2 * argumento:]
+                pila.append(Valor('diccionario', {clave.valor: valor for clave, valor in zip(elementos[::2], elementos[1::2])}))
+
+            elif operacion == ELEMENTO_HTML:
+                tipo, atributos, cantidad = constantes[argumento]
+                valores = pila[len(pila) - len(atributos) - cantidad:]
+                del pila[len(pila) - len(atributos) - cantidad:]
+                pila.append(Valor('html', {
+                    'tipo': tipo,
+                    'atributos': dict(zip(atributos, valores)),
+                    'contenido': valores[len(atributos):],
+                }))
+
+            elif operacion == ESTILO_CSS:
+                selector, propiedades = constantes[argumento]
+                pila.append(Valor('css', {'selector': selector, 'propiedades': propiedades}))
+
+            else:
+                raise ValueError(f"Código de operación desconocido: {operacion}")
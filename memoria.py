@@ -0,0 +1,285 @@
+# memoria.py
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import ast_nodes as ast
+from biblioteca import PRIMITIVAS
+from valores import Valor
+
+# Memorización de funciones puras. memorizables() busca las funciones cuyo
+# resultado sólo depende de sus argumentos (la lista se guarda con el árbol en
+# la caché) y tablas() da a cada una, en cada ejecución, una Memoria: una
+# tabla LRU de resultados por argumentos que todos los motores consultan antes
+# de ejecutar el cuerpo. Las tablas no están en el nodo: cada ejecución
+# empieza con las suyas vacías, así que lo que haya hecho otra (con otro
+# motor, otro límite de llamadas u otro intérprete) no cambia su resultado.
+#
+# Un resultado sólo vale a la profundidad de llamadas a la que se calculó o
+# menos: si a esa profundidad la llamada no superó el límite, tampoco lo
+# supera más arriba. Más abajo se vuelve a calcular, y se guarda con la nueva
+# profundidad si termina, así que la memoria no evita ningún error de límite
+# que la ejecución daría sin ella. Los motores con límite propio cuentan como
+# él (Interprete.llamadas, los marcos de la máquina); en 'cierres' y 'python',
+# que sólo tienen el límite de recursión de Python, se cuentan las llamadas
+# anidadas, que lo aproximan.
+#
+# El lenguaje tiene ámbito dinámico: una función puede leer y modificar las
+# variables de quien la llama. Una función es pura si
+#   - sólo lee sus parámetros y las variables que ya ha declarado ella,
+#   - sólo asigna esas mismas variables,
+#   - no declara funciones y
+#   - sólo llama a sí misma (si su nombre no se declara más veces), a otras
+#     funciones puras declaradas una sola vez en el cuerpo del programa o a
+#     funciones nativas puras (biblioteca.py; no `mostrar`) que el programa
+#     no tapa.
+# Las declaraciones dentro de un `si` o de un bucle no cuentan fuera de él.
+#
+# `funcion memorizada f(...)` memoriza f aunque el análisis no la demuestre
+# pura, y `funcion sin_memoria f(...)` no la memoriza nunca.
+
+# Resultados por función
+CAPACIDAD = 1024
+
+# Tipos de los argumentos que pueden formar la clave
+CLAVES = frozenset({'entero', 'decimal', 'cadena', 'booleano', 'nulo'})
+
+class Memoria:
+    # Resultados de una función por argumentos, con la profundidad a la que se
+    # calcularon y los más recientes al final, y sus contadores: aciertos,
+    # fallos, profundas (fallos con resultado guardado, pero calculado más
+    # arriba), descartes (resultados que salen por superar la capacidad) y
+    # llamadas sin clave (con listas, diccionarios...)
+    __slots__ = ('nombre', 'capacidad', 'resultados', 'aciertos', 'fallos', 'profundas', 'descartes', 'sin_clave')
+
+    def __init__(self, nombre: str, capacidad: int = CAPACIDAD):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.resultados: 'OrderedDict[Tuple, Tuple[Valor, int]]' = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.profundas = 0
+        self.descartes = 0
+        self.sin_clave = 0
+
+    def clave(self, argumentos: List[Valor]) -> Optional[Tuple]:
+        # Tipo y valor de cada argumento. Los ceros decimales no forman clave:
+        # 0.0 y -0.0 son iguales como clave pero dan resultados distintos.
+        clave: List[Any] = []
+        for argumento in argumentos:
+            tipo = argumento.tipo
+            if tipo not in CLAVES or (tipo == 'decimal' and argumento.valor == 0):
+                self.sin_clave += 1
+                return None
+            clave.append(tipo)
+            clave.append(argumento.valor)
+        return tuple(clave)
+
+    def buscar(self, clave: Tuple, profundidad: int) -> Optional[Valor]:
+        # El resultado guardado, si se calculó a `profundidad` o más abajo
+        resultados = self.resultados
+        guardado = resultados.get(clave)
+        if guardado is None:
+            self.fallos += 1
+            return None
+        if guardado[1] < profundidad:
+            self.fallos += 1
+            self.profundas += 1
+            return None
+        self.aciertos += 1
+        resultados.move_to_end(clave)
+        return guardado[0]
+
+    def guardar(self, clave: Tuple, resultado: Valor, profundidad: int) -> None:
+        resultados = self.resultados
+        anterior = resultados.get(clave)
+        if anterior is not None and anterior[1] > profundidad:
+            profundidad = anterior[1]
+        resultados[clave] = (resultado, profundidad)
+        resultados.move_to_end(clave)
+        if len(resultados) > self.capacidad:
+            resultados.popitem(last=False)
+            self.descartes += 1
+
+    def llamar(self, argumentos: List[Valor], profundidad: int, invocar: Callable[..., Valor], *datos: Any) -> Valor:
+        # El resultado guardado para `argumentos`, o el de invocar(*datos),
+        # que ejecuta la llamada; `profundidad` es la de quien llama
+        clave = self.clave(argumentos)
+        if clave is None:
+            return invocar(*datos)
+        resultado = self.buscar(clave, profundidad)
+        if resultado is None:
+            resultado = invocar(*datos)
+            self.guardar(clave, resultado, profundidad)
+        return resultado
+
+    def informe(self) -> Dict[str, Any]:
+        consultas = self.aciertos + self.fallos
+        return {
+            'funcion': self.nombre,
+            'capacidad': self.capacidad,
+            'resultados': len(self.resultados),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'profundas': self.profundas,
+            'descartes': self.descartes,
+            'sin_clave': self.sin_clave,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+        }
+
+# Análisis de pureza
+
+def analiza(tipo: type) -> Callable:
+    # Marca un método de Pureza como análisis de los nodos de clase `tipo`
+    def decorar(metodo: Callable) -> Callable:
+        metodo.tipo_nodo = tipo
+        return metodo
+    return decorar
+
+class Pureza:
+    # Recorre el cuerpo de una función con las variables que ya tiene
+    # declaradas. `llamadas` son los nombres de las funciones a las que llama;
+    # un nodo sin análisis (o una declaración de función) la hace impura.
+    reglas: Dict[type, Callable] = {}
+
+    def __init__(self, funcion: ast.DeclaracionFuncion):
+        self.llamadas: Set[str] = set()
+        self.pura = self.bloque(funcion.cuerpo, {parametro['nombre'] for parametro in funcion.parametros})
+
+    def analizar(self, nodo: Optional[ast.Nodo], definidas: Set[str]) -> bool:
+        if nodo is None:
+            return True
+        regla = next((self.reglas[clase] for clase in type(nodo).__mro__ if clase in self.reglas), None)
+        return regla is not None and regla(self, nodo, definidas)
+
+    def bloque(self, sentencias: Optional[List[ast.Nodo]], definidas: Set[str]) -> bool:
+        # Las sentencias en orden; las declaraciones se añaden a `definidas`
+        return all(self.analizar(sentencia, definidas) for sentencia in sentencias or [])
+
+    def todos(self, nodos: List[ast.Nodo], definidas: Set[str]) -> bool:
+        return all(self.analizar(nodo, definidas) for nodo in nodos)
+
+    @analiza(ast.ValorLiteral)
+    def analizar_literal(self, nodo: ast.ValorLiteral, definidas: Set[str]) -> bool:
+        return True
+
+    @analiza(ast.Identificador)
+    def analizar_identificador(self, nodo: ast.Identificador, definidas: Set[str]) -> bool:
+        return nodo.nombre in definidas
+
+    @analiza(ast.DeclaracionVariable)
+    def analizar_declaracion_variable(self, nodo: ast.DeclaracionVariable, definidas: Set[str]) -> bool:
+        if not self.analizar(nodo.valor, definidas):
+            return False
+        definidas.add(nodo.nombre)
+        return True
+
+    @analiza(ast.AsignacionVariable)
+    def analizar_asignacion_variable(self, nodo: ast.AsignacionVariable, definidas: Set[str]) -> bool:
+        return nodo.nombre in definidas and self.analizar(nodo.valor, definidas)
+
+    @analiza(ast.OperacionBinaria)
+    def analizar_operacion_binaria(self, nodo: ast.OperacionBinaria, definidas: Set[str]) -> bool:
+        return self.analizar(nodo.izquierda, definidas) and self.analizar(nodo.derecha, definidas)
+
+    @analiza(ast.OperacionUnaria)
+    def analizar_operacion_unaria(self, nodo: ast.OperacionUnaria, definidas: Set[str]) -> bool:
+        return self.analizar(nodo.operando, definidas)
+
+    @analiza(ast.Condicional)
+    def analizar_condicional(self, nodo: ast.Condicional, definidas: Set[str]) -> bool:
+        return (self.analizar(nodo.condicion, definidas) and self.bloque(nodo.cuerpo, set(definidas))
+                and self.bloque(nodo.sino, set(definidas)))
+
+    @analiza(ast.BucleWhile)
+    def analizar_bucle_while(self, nodo: ast.BucleWhile, definidas: Set[str]) -> bool:
+        return self.analizar(nodo.condicion, definidas) and self.bloque(nodo.cuerpo, set(definidas))
+
+    @analiza(ast.BucleFor)
+    def analizar_bucle_for(self, nodo: ast.BucleFor, definidas: Set[str]) -> bool:
+        interior = set(definidas)
+        return (self.analizar(nodo.inicializacion, interior) and self.analizar(nodo.condicion, interior)
+                and self.bloque(nodo.cuerpo, set(interior)) and self.analizar(nodo.incremento, interior))
+
+    @analiza(ast.BucleForEach)
+    def analizar_bucle_foreach(self, nodo: ast.BucleForEach, definidas: Set[str]) -> bool:
+        return self.analizar(nodo.iterable, definidas) and self.bloque(nodo.cuerpo, definidas | {nodo.variable})
+
+    @analiza(ast.LlamadaFuncion)
+    def analizar_llamada_funcion(self, nodo: ast.LlamadaFuncion, definidas: Set[str]) -> bool:
+        self.llamadas.add(nodo.nombre)
+        return self.todos(nodo.argumentos, definidas)
+
+    @analiza(ast.RetornoFuncion)
+    def analizar_retorno_funcion(self, nodo: ast.RetornoFuncion, definidas: Set[str]) -> bool:
+        return self.analizar(nodo.valor, definidas)
+
+    @analiza(ast.ListaValores)
+    def analizar_lista_valores(self, nodo: ast.ListaValores, definidas: Set[str]) -> bool:
+        return self.todos(nodo.valores, definidas)
+
+    @analiza(ast.Diccionario)
+    def analizar_diccionario(self, nodo: ast.Diccionario, definidas: Set[str]) -> bool:
+        return all(self.analizar(clave, definidas) and self.analizar(valor, definidas) for clave, valor in nodo.pares)
+
+    @analiza(ast.ElementoHTML)
+    def analizar_elemento_html(self, nodo: ast.ElementoHTML, definidas: Set[str]) -> bool:
+        return self.todos(list(nodo.atributos.values()), definidas) and self.todos(nodo.contenido, definidas)
+
+    @analiza(ast.EstiloCSS)
+    def analizar_estilo_css(self, nodo: ast.EstiloCSS, definidas: Set[str]) -> bool:
+        return True
+
+Pureza.reglas = {metodo.tipo_nodo: metodo for metodo in vars(Pureza).values() if hasattr(metodo, 'tipo_nodo')}
+
+def declaraciones(programa: ast.Nodo) -> List[ast.DeclaracionFuncion]:
+    # Todas las declaraciones de función del árbol, en el orden del código
+    encontradas = []
+    pendientes: List[Any] = [programa]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, ast.Nodo):
+            if isinstance(valor, ast.DeclaracionFuncion):
+                encontradas.append(valor)
+            pendientes.extend(reversed([getattr(valor, campo) for campo in valor.campos]))
+        elif isinstance(valor, (list, tuple)):
+            pendientes.extend(reversed(valor))
+        elif isinstance(valor, dict):
+            pendientes.extend(reversed(list(valor.values())))
+    return encontradas
+
+def puras(programa: ast.Programa) -> List[ast.DeclaracionFuncion]:
+    # Las declaraciones de función puras del programa
+    todas = declaraciones(programa)
+    veces: Dict[str, int] = {}
+    for funcion in todas:
+        veces[funcion.nombre] = veces.get(funcion.nombre, 0) + 1
+    # Las únicas que se encuentran por su nombre desde cualquier parte
+    globales = {nodo.nombre: nodo for nodo in programa.cuerpo if isinstance(nodo, ast.DeclaracionFuncion) and veces[nodo.nombre] == 1}
+
+    analisis = {funcion: Pureza(funcion) for funcion in todas}
+    candidatas = {funcion for funcion in todas if analisis[funcion].pura}
+    # Se descartan las que llaman a funciones que no son candidatas hasta que
+    # no cambia nada (así las recursiones entre funciones puras se aceptan)
+    cambios = True
+    while cambios:
+        cambios = False
+        for funcion in list(candidatas):
+            for nombre in analisis[funcion].llamadas:
+                propia = nombre == funcion.nombre and veces[nombre] == 1
+                nativa = nombre in PRIMITIVAS and PRIMITIVAS[nombre].pura and nombre not in veces
+                if not propia and not nativa and globales.get(nombre) not in candidatas:
+                    candidatas.discard(funcion)
+                    cambios = True
+                    break
+    return [funcion for funcion in todas if funcion in candidatas]
+
+def memorizables(programa: ast.Programa) -> List[ast.DeclaracionFuncion]:
+    # Las funciones puras y las marcadas con `memorizada`, salvo las marcadas
+    # con `sin_memoria`
+    pura = set(puras(programa))
+    return [funcion for funcion in declaraciones(programa)
+            if funcion.memorizar is not False and (funcion.memorizar or funcion in pura)]
+
+def tablas(funciones: List[ast.DeclaracionFuncion], capacidad: int = CAPACIDAD) -> Dict[ast.DeclaracionFuncion, Memoria]:
+    # Una Memoria vacía para cada función, para una ejecución
+    return {funcion: Memoria(funcion.nombre, capacidad) for funcion in funciones}
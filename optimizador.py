@@ -0,0 +1,229 @@
+# optimizador.py
+from typing import Any, Dict, List, Optional, Tuple
+
+import ast_nodes as ast
+from interpreter import SIMBOLOS, Valor, operar_binario, operar_unario
+
+# Campos que son bloques de sentencias; el resto de listas son expresiones
+BLOQUES = {
+    ast.Programa: ('cuerpo',),
+    ast.Condicional: ('cuerpo', 'sino'),
+    ast.BucleWhile: ('cuerpo',),
+    ast.BucleFor: ('cuerpo',),
+    ast.BucleForEach: ('cuerpo',),
+    ast.DeclaracionFuncion: ('cuerpo',),
+}
+
+# Las constantes plegadas se quedan en el árbol (y en los programas
+# compilados): no se pliegan resultados mayores que esto
+MAX_TAMANO_CONSTANTE = 4096
+
+def describir(nodo: ast.Nodo) -> str:
+    if isinstance(nodo, ast.ValorLiteral):
+        if nodo.tipo == 'cadena':
+            return f'"{nodo.valor}"'
+        if nodo.tipo == 'booleano':
+            return 'verdadero' if nodo.valor else 'falso'
+        if nodo.tipo == 'nulo':
+            return 'nulo'
+        return str(nodo.valor)
+    return type(nodo).__name__
+
+def es_booleano(nodo: ast.Nodo, valor: bool) -> bool:
+    return isinstance(nodo, ast.ValorLiteral) and nodo.tipo == 'booleano' and nodo.valor is valor
+
+class Informe:
+    # Qué ha reescrito cada pasada
+    def __init__(self):
+        self.cambios: List[str] = []
+        self.conteo: Dict[str, int] = {}
+
+    def registrar(self, pasada: str, descripcion: str) -> None:
+        self.cambios.append(f"{pasada}: {descripcion}")
+        self.conteo[pasada] = self.conteo.get(pasada, 0) + 1
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {'cambios': self.cambios, 'conteo': self.conteo}
+
+class Pasada:
+    # Una pasada recibe cada nodo con sus hijos ya optimizados y devuelve el
+    # nodo que lo sustituye (el mismo si no cambia). Cada bloque de sentencias
+    # pasa además por `bloque` después de optimizar sus sentencias. Nunca se
+    # modifica un nodo: los árboles pueden venir de la caché compartida.
+    nombre = ''
+
+    def nodo(self, nodo: ast.Nodo, informe: Informe) -> ast.Nodo:
+        return nodo
+
+    def bloque(self, sentencias: List[ast.Nodo], informe: Informe) -> List[ast.Nodo]:
+        return sentencias
+
+class PlegadoConstantes(Pasada):
+    # Operaciones entre literales, calculadas con las mismas funciones que usa
+    # el intérprete. Si la operación falla (tipos incompatibles, división por
+    # cero...) se deja como está para que el error salga al ejecutar.
+    nombre = 'plegado_constantes'
+
+    def nodo(self, nodo: ast.Nodo, informe: Informe) -> ast.Nodo:
+        if isinstance(nodo, ast.OperacionBinaria):
+            izquierda, derecha = nodo.izquierda, nodo.derecha
+            if not (isinstance(izquierda, ast.ValorLiteral) and isinstance(derecha, ast.ValorLiteral)):
+                return nodo
+            descripcion = f"{describir(izquierda)} {SIMBOLOS[nodo.operador]} {describir(derecha)}"
+            if self.demasiado_grande(nodo.operador, izquierda, derecha):
+                return nodo
+            try:
+                resultado = operar_binario(nodo.operador, Valor(izquierda.tipo, izquierda.valor), Valor(derecha.tipo, derecha.valor))
+            except (TypeError, ValueError, ArithmeticError):
+                return nodo
+        elif isinstance(nodo, ast.OperacionUnaria):
+            operando = nodo.operando
+            if not isinstance(operando, ast.ValorLiteral):
+                return nodo
+            descripcion = f"{SIMBOLOS[nodo.operador]}{' ' if nodo.operador == 'NO' else ''}{describir(operando)}"
+            try:
+                resultado = operar_unario(nodo.operador, Valor(operando.tipo, operando.valor))
+            except (TypeError, ValueError, ArithmeticError):
+                return nodo
+        else:
+            return nodo
+
+        if isinstance(resultado.valor, (str, int)) and not isinstance(resultado.valor, bool):
+            tamano = len(resultado.valor) if isinstance(resultado.valor, str) else resultado.valor.bit_length()
+            if tamano > MAX_TAMANO_CONSTANTE:
+                return nodo
+
+        literal = ast.ValorLiteral(resultado.valor, resultado.tipo)
+        informe.registrar(self.nombre, f"{descripcion} -> {describir(literal)}")
+        return literal
+
+    @staticmethod
+    def demasiado_grande(operador: str, izquierda: ast.ValorLiteral, derecha: ast.ValorLiteral) -> bool:
+        # Si el resultado seguro que pasaría de MAX_TAMANO_CONSTANTE, sin
+        # calcularlo: una potencia entera tiene al menos (bits de la base - 1)
+        # * exponente + 1 bits, y calcular `3 ^ 50000000` lleva casi un minuto.
+        # El resto de operaciones no dan resultados mucho mayores que sus
+        # operandos.
+        if operador != 'POTENCIA' or not izquierda.tipo == derecha.tipo == 'entero' or derecha.valor <= 0:
+            return False
+        return (abs(izquierda.valor).bit_length() - 1) * derecha.valor + 1 > MAX_TAMANO_CONSTANTE
+
+class PodaRamas(Pasada):
+    # Condicionales con condición literal y bucles que no llegan a entrar.
+    # Una sentencia sólo aporta su valor si es la última del bloque (el valor
+    # de un Programa, de una función o de un bloque anidado), así que si la
+    # que se elimina era la última se deja un `nulo` en su lugar.
+    nombre = 'poda_ramas'
+
+    def bloque(self, sentencias: List[ast.Nodo], informe: Informe) -> List[ast.Nodo]:
+        resultado: List[ast.Nodo] = []
+        cambiado = False
+        for i, sentencia in enumerate(sentencias):
+            sustitutas = self.sustituir(sentencia, informe)
+            if sustitutas is None:
+                resultado.append(sentencia)
+                continue
+            cambiado = True
+            # Un condicional vale lo que la última sentencia de su rama; los
+            # bucles eliminados no llegan a ejecutar el cuerpo y valen `nulo`
+            if i == len(sentencias) - 1 and not (isinstance(sentencia, ast.Condicional) and sustitutas):
+                sustitutas = sustitutas + [ast.ValorLiteral(None, 'nulo')]
+            resultado.extend(sustitutas)
+        return resultado if cambiado else sentencias
+
+    def sustituir(self, sentencia: ast.Nodo, informe: Informe) -> Optional[List[ast.Nodo]]:
+        # Sentencias que reemplazan a `sentencia`, o None si se queda
+        if isinstance(sentencia, ast.Condicional):
+            if es_booleano(sentencia.condicion, True):
+                informe.registrar(self.nombre, "si (verdadero): se mantiene sólo el bloque 'si'")
+                return list(sentencia.cuerpo)
+            if es_booleano(sentencia.condicion, False):
+                informe.registrar(self.nombre, "si (falso): se mantiene sólo el bloque 'sino'")
+                return list(sentencia.sino or [])
+        elif isinstance(sentencia, ast.BucleWhile):
+            if es_booleano(sentencia.condicion, False):
+                informe.registrar(self.nombre, "mientras (falso): bucle eliminado")
+                return []
+        elif isinstance(sentencia, ast.BucleFor):
+            if es_booleano(sentencia.condicion, False):
+                informe.registrar(self.nombre, "para con condición falsa: sólo queda la inicialización")
+                return [sentencia.inicializacion]
+        return None
+
+# Pasadas disponibles, por nombre, en el orden en que se aplican
+PASADAS: Dict[str, type] = {
+    PlegadoConstantes.nombre: PlegadoConstantes,
+    PodaRamas.nombre: PodaRamas,
+}
+
+class Optimizador:
+    # Aplica las pasadas en un único recorrido de abajo arriba y devuelve un
+    # árbol nuevo; los subárboles que no cambian se comparten con el original.
+    def __init__(self, pasadas: Optional[List[str]] = None):
+        nombres = list(PASADAS) if pasadas is None else pasadas
+        for nombre in nombres:
+            if nombre not in PASADAS:
+                raise ValueError(f"Pasada de optimización desconocida: '{nombre}'")
+        self.pasadas: List[Pasada] = [PASADAS[nombre]() for nombre in nombres]
+
+    def optimizar(self, programa: ast.Programa) -> Tuple[ast.Programa, Informe]:
+        informe = Informe()
+        if getattr(programa, 'origenes', None) is None:
+            return self.optimizar_nodo(programa, informe), informe
+        # Con las posiciones relativas a cada sentencia (ver ast.Programa) no
+        # se aplican las pasadas de bloque al primer nivel, que cambiarían a
+        # qué origen corresponde cada una; dentro de ellas sí. El resultado
+        # no depende de las ediciones posteriores del original.
+        cuerpo = self.optimizar_valor(programa.cuerpo, informe)
+        return ast.Programa(list(cuerpo), list(programa.origenes)), informe
+
+    def optimizar_nodo(self, nodo: ast.Nodo, informe: Informe) -> ast.Nodo:
+        bloques = BLOQUES.get(type(nodo), ())
+        valores = []
+        cambiado = False
+        for campo in nodo.campos:
+            valor = getattr(nodo, campo)
+            if campo in bloques and valor is not None:
+                nuevo = self.optimizar_bloque(valor, informe)
+            else:
+                nuevo = self.optimizar_valor(valor, informe)
+            cambiado = cambiado or nuevo is not valor
+            valores.append(nuevo)
+        if cambiado:
+            nuevo = type(nodo)(*valores)
+            if hasattr(nodo, 'linea'):
+                nuevo.linea, nuevo.columna = nodo.linea, nodo.columna
+            nodo = nuevo
+
+        for pasada in self.pasadas:
+            nodo = pasada.nodo(nodo, informe)
+        return nodo
+
+    def optimizar_bloque(self, sentencias: List[ast.Nodo], informe: Informe) -> List[ast.Nodo]:
+        nuevas = self.optimizar_valor(sentencias, informe)
+        for pasada in self.pasadas:
+            nuevas = pasada.bloque(nuevas, informe)
+        return nuevas
+
+    def optimizar_valor(self, valor: Any, informe: Informe) -> Any:
+        # Listas, pares y diccionarios de nodos se copian sólo si algo cambia.
+        # Sin comprensiones, que cuestan un marco de pila más por nivel de
+        # anidamiento de la expresión.
+        if isinstance(valor, ast.Nodo):
+            return self.optimizar_nodo(valor, informe)
+        if isinstance(valor, (list, tuple)):
+            nuevos = []
+            for elemento in valor:
+                nuevos.append(self.optimizar_valor(elemento, informe))
+            if all(nuevo is viejo for nuevo, viejo in zip(nuevos, valor)):
+                return valor
+            return nuevos if isinstance(valor, list) else tuple(nuevos)
+        if isinstance(valor, dict) and any(isinstance(elemento, ast.Nodo) for elemento in valor.values()):
+            nuevos = {clave: self.optimizar_valor(elemento, informe) for clave, elemento in valor.items()}
+            if all(nuevos[clave] is elemento for clave, elemento in valor.items()):
+                return valor
+            return nuevos
+        return valor
+
+def optimizar(programa: ast.Programa, pasadas: Optional[List[str]] = None) -> Tuple[ast.Programa, Informe]:
+    return Optimizador(pasadas).optimizar(programa)
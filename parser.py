@@ -1,29 +1,119 @@
 # parser.py
-from typing import List, Dict, Any, Optional, Tuple
-from lexer import Token
+from array import array
+from collections import deque
+from itertools import compress
+from typing import List, Dict, Any, Optional, Tuple, Deque, Iterable
+from lexer import Lexer, Token, BufferTokens, TokenCompacto
 import ast_nodes as ast
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
+    # Operadores binarios: tipo de token -> (precedencia, asociativo por la derecha)
+    operadores_binarios = {
+        'O': (1, False),
+        'Y': (2, False),
+        'IGUAL_IGUAL': (3, False),
+        'DIFERENTE': (3, False),
+        'MAYOR': (3, False),
+        'MENOR': (3, False),
+        'MAYOR_IGUAL': (3, False),
+        'MENOR_IGUAL': (3, False),
+        'MAS': (4, False),
+        'MENOS': (4, False),
+        'MULTIPLICACION': (5, False),
+        'DIVISION': (5, False),
+        'MODULO': (5, False),
+        'POTENCIA': (7, True)
+    }
+    
+    # Operadores unarios prefijos: ligan más que '*' y menos que '^' (-2 ^ 2 es -(2 ^ 2))
+    operadores_unarios = {
+        'MENOS': 6,
+        'NO': 6
+    }
+    
+    # Modificadores de `funcion` (no son palabras clave): valor de
+    # DeclaracionFuncion.memorizar
+    modificadores_funcion = {
+        'memorizada': True,
+        'sin_memoria': False,
+    }
+    
+    # Altura máxima de una expresión: operaciones, llamadas, listas y
+    # diccionarios unos dentro de otros. El optimizador, la verificación de
+    # tipos y los motores recorren el árbol con recursión de Python; una
+    # expresión más alta se rechaza aquí con un SyntaxError, igual para todos
+    # los motores, en vez de agotar la pila en alguna de esas fases.
+    max_anidamiento = 200
+    
+    def __init__(self, tokens: Iterable[Token]):
+        # Los tokens se consumen de forma perezosa: basta una lista o el
+        # generador de Lexer.tokenizar_stream. Los saltos de línea no son
+        # significativos para la gramática y se descartan aquí.
+        self.tokens = filter(lambda token: token.tipo != 'SALTO_LINEA', tokens)
+        self.siguientes: Deque[Token] = deque()  # Tokens leídos por adelantado
         self.posicion_actual = 0
-        self.token_actual = self.tokens[0]
+        self.token_actual = next(self.tokens, None)
+        self.tipo_actual = self.token_actual.tipo if self.token_actual else None
+        self.preparar_anidamiento()
+    
+    def preparar_anidamiento(self) -> None:
+        # `nivel`: expresiones que se están analizando unas dentro de otras;
+        # `altura`: la mayor altura de las subexpresiones ya analizadas del
+        # operando en curso (los argumentos de una llamada, los elementos de
+        # una lista...)
+        self.nivel = 0
+        self.altura = 0
+    
+    def anidamiento_excedido(self, posicion: Tuple[int, int]) -> SyntaxError:
+        linea, columna = posicion
+        return SyntaxError(f"Expresión demasiado anidada (más de {self.max_anidamiento} niveles) en línea {linea}, columna {columna}")
     
     def avanzar(self) -> None:
         self.posicion_actual += 1
-        if self.posicion_actual < len(self.tokens):
-            self.token_actual = self.tokens[self.posicion_actual]
+        self.anterior = self.token_actual
+        if self.siguientes:
+            self.token_actual = self.siguientes.popleft()
         else:
-            self.token_actual = None
+            self.token_actual = next(self.tokens, None)
+        self.tipo_actual = self.token_actual.tipo if self.token_actual else None
+    
+    def ver_siguiente(self, distancia: int = 1) -> Optional[Token]:
+        # Token situado `distancia` posiciones después del actual, sin consumirlo
+        while len(self.siguientes) < distancia:
+            token = next(self.tokens, None)
+            if token is None:
+                return None
+            self.siguientes.append(token)
+        return self.siguientes[distancia - 1]
+    
+    def valor_actual(self) -> str:
+        return self.token_actual.valor
+    
+    def siguiente_es(self, tipo: str) -> bool:
+        siguiente = self.ver_siguiente()
+        return siguiente is not None and siguiente.tipo == tipo
+    
+    def posicion(self) -> Tuple[int, int]:
+        # Línea y columna del token actual
+        return self.token_actual.linea, self.token_actual.columna
+    
+    def posicion_anterior(self) -> Tuple[int, int]:
+        # Línea y columna del último token consumido
+        return self.anterior.linea, self.anterior.columna
+    
+    @staticmethod
+    def ubicar(nodo: ast.Nodo, posicion: Tuple[int, int]) -> ast.Nodo:
+        nodo.linea, nodo.columna = posicion
+        return nodo
     
     def coincidir(self, tipo: str) -> bool:
-        if self.token_actual and self.token_actual.tipo == tipo:
+        if self.tipo_actual == tipo:
             self.avanzar()
             return True
         return False
     
     def esperar(self, tipo: str) -> Token:
-        if self.token_actual and self.token_actual.tipo == tipo:
+        if self.tipo_actual == tipo:
             token = self.token_actual
             self.avanzar()
             return token
@@ -31,11 +121,20 @@ class Parser:
     
     def analizar(self) -> ast.Programa:
         nodos = []
-        while self.token_actual and self.token_actual.tipo != 'EOF':
+        while self.tipo_actual not in (None, 'EOF'):
             nodos.append(self.analizar_declaracion())
         return ast.Programa(nodos)
     
     def analizar_declaracion(self) -> ast.Nodo:
+        # Las expresiones usadas como sentencia conservan la posición de su
+        # operador o de su llamada
+        posicion = self.posicion()
+        nodo = self.analizar_sentencia()
+        if not hasattr(nodo, 'linea'):
+            self.ubicar(nodo, posicion)
+        return nodo
+    
+    def analizar_sentencia(self) -> ast.Nodo:
         if self.coincidir('VARIABLE'):
             return self.analizar_declaracion_variable()
         elif self.coincidir('SI'):
@@ -52,10 +151,19 @@ class Parser:
             return self.analizar_retorno()
         else:
             self.coincidir('PUNTO_COMA')
-            return self.analizar_expresion()
-            return expr
+            nodo = self.analizar_asignacion()
+            self.coincidir('PUNTO_COMA')
+            return nodo
+    
+    def analizar_asignacion(self) -> ast.Nodo:
+        # `nombre = expresion`, o una expresión cualquiera
+        if self.tipo_actual == 'IDENTIFICADOR' and self.siguiente_es('IGUAL'):
+            nombre = self.esperar('IDENTIFICADOR').valor
+            self.esperar('IGUAL')
+            return ast.AsignacionVariable(nombre, self.analizar_expresion())
+        return self.analizar_expresion()
     
-    def analizar_declaracion_variable(self) -> ast.DeclaracionVariable:
+    def analizar_declaracion_variable(self, punto_coma: bool = True) -> ast.DeclaracionVariable:
         nombre = self.esperar('IDENTIFICADOR').valor
         tipo = None
         
@@ -65,7 +173,8 @@ class Parser:
         self.esperar('IGUAL')
         valor = self.analizar_expresion()
 
-        self.coincidir('PUNTO_COMA')
+        if punto_coma:
+            self.coincidir('PUNTO_COMA')
         
         return ast.DeclaracionVariable(nombre, tipo, valor)
     
@@ -76,7 +185,7 @@ class Parser:
         
         self.esperar('LLAVE_IZQ')
         cuerpo = []
-        while self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+        while self.tipo_actual not in (None, 'LLAVE_DER'):
             cuerpo.append(self.analizar_declaracion())
         self.esperar('LLAVE_DER')
         
@@ -89,7 +198,7 @@ class Parser:
                 # Caso 'sino'
                 self.esperar('LLAVE_IZQ')
                 sino = []
-                while self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+                while self.tipo_actual not in (None, 'LLAVE_DER'):
                     sino.append(self.analizar_declaracion())
                 self.esperar('LLAVE_DER')
         
@@ -102,7 +211,7 @@ class Parser:
         
         self.esperar('LLAVE_IZQ')
         cuerpo = []
-        while self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+        while self.tipo_actual not in (None, 'LLAVE_DER'):
             cuerpo.append(self.analizar_declaracion())
         self.esperar('LLAVE_DER')
         
@@ -110,16 +219,24 @@ class Parser:
     
     def analizar_bucle_for(self) -> ast.BucleFor:
         self.esperar('PARENTESIS_IZQ')
-        inicializacion = self.analizar_declaracion()
+        # El ';' que sigue a la inicialización es del bucle
+        if self.coincidir('VARIABLE'):
+            inicializacion = self.analizar_declaracion_variable(punto_coma=False)
+        else:
+            inicializacion = self.analizar_asignacion()
         self.esperar('PUNTO_COMA')
+        # Antes la inicialización se leía como una sentencia que se llevaba
+        # su propio ';', y había que escribir `para (variable i = 0;; ...)`;
+        # se sigue aceptando.
+        self.coincidir('PUNTO_COMA')
         condicion = self.analizar_expresion()
         self.esperar('PUNTO_COMA')
-        incremento = self.analizar_expresion()
+        incremento = self.analizar_asignacion()
         self.esperar('PARENTESIS_DER')
         
         self.esperar('LLAVE_IZQ')
         cuerpo = []
-        while self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+        while self.tipo_actual not in (None, 'LLAVE_DER'):
             cuerpo.append(self.analizar_declaracion())
         self.esperar('LLAVE_DER')
         
@@ -132,19 +249,27 @@ class Parser:
         
         self.esperar('LLAVE_IZQ')
         cuerpo = []
-        while self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+        while self.tipo_actual not in (None, 'LLAVE_DER'):
             cuerpo.append(self.analizar_declaracion())
         self.esperar('LLAVE_DER')
         
         return ast.BucleForEach(variable, iterable, cuerpo)
     
     def analizar_declaracion_funcion(self) -> ast.DeclaracionFuncion:
+        # `funcion memorizada nombre(...)` o `funcion sin_memoria nombre(...)`
+        memorizar = None
+        if self.tipo_actual == 'IDENTIFICADOR' and self.siguiente_es('IDENTIFICADOR'):
+            linea, columna = self.posicion()
+            modificador = self.esperar('IDENTIFICADOR').valor
+            if modificador not in self.modificadores_funcion:
+                raise SyntaxError(f"Modificador de función desconocido: '{modificador}' en línea {linea}, columna {columna}")
+            memorizar = self.modificadores_funcion[modificador]
         nombre = self.esperar('IDENTIFICADOR').valor
         
         self.esperar('PARENTESIS_IZQ')
         parametros = []
         
-        if self.token_actual and self.token_actual.tipo != 'PARENTESIS_DER':
+        if self.tipo_actual not in (None, 'PARENTESIS_DER'):
             # Primer parámetro
             param_nombre = self.esperar('IDENTIFICADOR').valor
             param_tipo = None
@@ -168,77 +293,133 @@ class Parser:
         
         self.esperar('LLAVE_IZQ')
         cuerpo = []
-        while self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+        while self.tipo_actual not in (None, 'LLAVE_DER'):
             cuerpo.append(self.analizar_declaracion())
         self.esperar('LLAVE_DER')
         
-        return ast.DeclaracionFuncion(nombre, parametros, tipo_retorno, cuerpo)
+        return ast.DeclaracionFuncion(nombre, parametros, tipo_retorno, cuerpo, memorizar)
     
     def analizar_retorno(self) -> ast.RetornoFuncion:
         valor = None
-        if self.token_actual and self.token_actual.tipo != 'PUNTO_COMA':
+        if self.tipo_actual not in (None, 'PUNTO_COMA'):
             valor = self.analizar_expresion()
         return ast.RetornoFuncion(valor)
     
-    # Implementar métodos para analizar expresiones (factor, término, etc.)
-    # Estos métodos dependen de la precedencia de los operadores
+    # Expresiones: precedencia por tabla con pilas explícitas de operandos y
+    # operadores, de modo que los paréntesis y los operadores unarios
+    # anidados no consumen pila de Python. Junto a cada operando se lleva la
+    # altura de su árbol, para rechazar las expresiones de más de
+    # max_anidamiento niveles.
     
     def analizar_expresion(self) -> ast.Nodo:
-        # Simplificado para este ejemplo
-        return self.analizar_comparacion()
-    
-    def analizar_comparacion(self) -> ast.Nodo:
-        expr = self.analizar_suma()
-        
-        while self.token_actual and self.token_actual.tipo in ['IGUAL_IGUAL', 'DIFERENTE', 'MAYOR', 'MENOR', 'MAYOR_IGUAL', 'MENOR_IGUAL']:
-            operador = self.token_actual.tipo
+        binarios = self.operadores_binarios
+        unarios = self.operadores_unarios
+        maximo = self.max_anidamiento
+        operandos: List[ast.Nodo] = []
+        alturas: List[int] = []
+        operadores: List[Optional[Tuple[int, str, bool, Tuple[int, int]]]] = []  # None marca un '('
+        abiertos = 0
+        exterior = self.altura
+        self.nivel += 1
+        if self.nivel > maximo:
+            raise self.anidamiento_excedido(self.posicion_anterior())
+        
+        while True:
+            # Prefijos: paréntesis de apertura y operadores unarios
+            while True:
+                tipo = self.tipo_actual
+                if tipo == 'PARENTESIS_IZQ':
+                    operadores.append(None)
+                    abiertos += 1
+                elif tipo in unarios:
+                    operadores.append((unarios[tipo], tipo, True, self.posicion()))
+                else:
+                    break
+                self.avanzar()
+            
+            # Operando; los identificadores y enteros se resuelven aquí mismo
+            if tipo == 'IDENTIFICADOR':
+                nombre = self.valor_actual()
+                self.avanzar()
+                if self.tipo_actual == 'PARENTESIS_IZQ':
+                    self.altura = 0
+                    operandos.append(self.analizar_llamada_funcion(nombre))
+                    alturas.append(self.altura + 1)
+                else:
+                    operandos.append(ast.Identificador(nombre))
+                    alturas.append(1)
+            elif tipo == 'ENTERO':
+                operandos.append(ast.ValorLiteral(int(self.valor_actual()), 'entero'))
+                alturas.append(1)
+                self.avanzar()
+            else:
+                self.altura = 0
+                operandos.append(self.analizar_primario())
+                alturas.append(self.altura + 1)
+            
+            # Cierres de los paréntesis abiertos en esta expresión
+            while abiertos and self.tipo_actual == 'PARENTESIS_DER':
+                self.reducir(operandos, alturas, operadores, 0)
+                operadores.pop()
+                abiertos -= 1
+                self.avanzar()
+            
+            tipo = self.tipo_actual
+            if tipo not in binarios:
+                break
+            
+            precedencia, asociativo_derecha = binarios[tipo]
+            if operadores and operadores[-1] is not None and operadores[-1][0] >= precedencia:
+                self.reducir(operandos, alturas, operadores, precedencia + 1 if asociativo_derecha else precedencia)
+            operadores.append((precedencia, tipo, False, self.posicion()))
             self.avanzar()
-            derecha = self.analizar_suma()
-            expr = ast.OperacionBinaria(expr, operador, derecha)
         
-        return expr
+        self.reducir(operandos, alturas, operadores, 0)
+        if abiertos:
+            self.esperar('PARENTESIS_DER')
+        if alturas[0] > maximo:
+            raise self.anidamiento_excedido(self.posicion_anterior())
+        self.nivel -= 1
+        self.altura = max(exterior, alturas[0])
+        return operandos[0]
     
-    def analizar_suma(self) -> ast.Nodo:
-        expr = self.analizar_termino()
-        
-        while self.token_actual and self.token_actual.tipo in ['MAS', 'MENOS']:
-            operador = self.token_actual.tipo
-            self.avanzar()
-            derecha = self.analizar_termino()
-            expr = ast.OperacionBinaria(expr, operador, derecha)
-        
-        return expr
+    def reducir(self, operandos: List[ast.Nodo], alturas: List[int], operadores: List[Optional[Tuple[int, str, bool, Tuple[int, int]]]], minimo: int) -> None:
+        # Aplica los operadores de la pila con precedencia >= minimo, hasta el
+        # primer paréntesis abierto. Cada operación queda en la posición de
+        # su operador.
+        while operadores and operadores[-1] is not None and operadores[-1][0] >= minimo:
+            _, operador, unario, posicion = operadores.pop()
+            if unario:
+                nodo = ast.OperacionUnaria(operador, operandos[-1])
+                altura = alturas[-1] + 1
+            else:
+                derecha = operandos.pop()
+                nodo = ast.OperacionBinaria(operandos[-1], operador, derecha)
+                altura = max(alturas.pop(), alturas[-1]) + 1
+            if altura > self.max_anidamiento:
+                raise self.anidamiento_excedido(posicion)
+            nodo.linea, nodo.columna = posicion
+            operandos[-1] = nodo
+            alturas[-1] = altura
     
-    def analizar_termino(self) -> ast.Nodo:
-        expr = self.analizar_factor()
-        
-        while self.token_actual and self.token_actual.tipo in ['MULTIPLICACION', 'DIVISION', 'MODULO']:
-            operador = self.token_actual.tipo
+    def analizar_primario(self) -> ast.Nodo:
+        tipo = self.tipo_actual
+        if tipo == 'IDENTIFICADOR':
+            nombre = self.valor_actual()
             self.avanzar()
-            derecha = self.analizar_factor()
-            expr = ast.OperacionBinaria(expr, operador, derecha)
-        
-        return expr
-    
-    def analizar_factor(self) -> ast.Nodo:
-        if self.coincidir('PARENTESIS_IZQ'):
-            expr = self.analizar_expresion()
-            self.esperar('PARENTESIS_DER')
-            return expr
-        elif self.coincidir('MENOS'):
-          return ast.OperacionUnaria('MENOS', self.analizar_factor())
-        elif self.coincidir('NO'):
-            return ast.OperacionUnaria('NO', self.analizar_factor())
-        elif self.token_actual.tipo == 'ENTERO':
-            valor = int(self.token_actual.valor)
+            if self.tipo_actual == 'PARENTESIS_IZQ':
+                return self.analizar_llamada_funcion(nombre)
+            return ast.Identificador(nombre)
+        elif tipo == 'ENTERO':
+            valor = int(self.valor_actual())
             self.avanzar()
             return ast.ValorLiteral(valor, 'entero')
-        elif self.token_actual.tipo == 'DECIMAL':
-            valor = float(self.token_actual.valor)
+        elif tipo == 'DECIMAL':
+            valor = float(self.valor_actual())
             self.avanzar()
             return ast.ValorLiteral(valor, 'decimal')
-        elif self.token_actual.tipo == 'CADENA':
-            valor = self.token_actual.valor[1:-1]  # Quitar comillas
+        elif tipo == 'CADENA':
+            valor = self.valor_actual()[1:-1]  # Quitar comillas
             self.avanzar()
             return ast.ValorLiteral(valor, 'cadena')
         elif self.coincidir('VERDADERO'):
@@ -247,13 +428,10 @@ class Parser:
             return ast.ValorLiteral(False, 'booleano')
         elif self.coincidir('NULO'):
             return ast.ValorLiteral(None, 'nulo')
-        elif self.token_actual.tipo == 'IDENTIFICADOR':
-            if self.tokens[self.posicion_actual + 1].tipo == 'PARENTESIS_IZQ':
-                return self.analizar_llamada_funcion()
-            else:
-                nombre = self.token_actual.valor
-                self.avanzar()
-                return ast.Identificador(nombre)
+        elif self.coincidir('MOSTRAR'):
+            # Llamada a la función nativa `mostrar` (biblioteca.py): como es
+            # palabra clave, ninguna función del programa puede taparla
+            return self.analizar_llamada_funcion('mostrar')
         elif self.coincidir('CORCHETE_IZQ'):
             return self.analizar_lista()
         elif self.coincidir('LLAVE_IZQ'):
@@ -261,23 +439,24 @@ class Parser:
         else:
             raise SyntaxError(f"Token inesperado: {self.token_actual.tipo} en línea {self.token_actual.linea}, columna {self.token_actual.columna}")
     
-    def analizar_llamada_funcion(self) -> ast.LlamadaFuncion:
-        nombre = self.esperar('IDENTIFICADOR').valor
+    def analizar_llamada_funcion(self, nombre: str) -> ast.LlamadaFuncion:
+        # El identificador ya se consumió en analizar_primario
+        posicion = self.posicion_anterior()
         self.esperar('PARENTESIS_IZQ')
         argumentos = []
         
-        if self.token_actual and self.token_actual.tipo != 'PARENTESIS_DER':
+        if self.tipo_actual not in (None, 'PARENTESIS_DER'):
             argumentos.append(self.analizar_expresion())
             while self.coincidir('COMA'):
                 argumentos.append(self.analizar_expresion())
         
         self.esperar('PARENTESIS_DER')
-        return ast.LlamadaFuncion(nombre, argumentos)
+        return self.ubicar(ast.LlamadaFuncion(nombre, argumentos), posicion)
     
     def analizar_lista(self) -> ast.ListaValores:
         valores = []
         
-        if self.token_actual and self.token_actual.tipo != 'CORCHETE_DER':
+        if self.tipo_actual not in (None, 'CORCHETE_DER'):
             valores.append(self.analizar_expresion())
             while self.coincidir('COMA'):
                 valores.append(self.analizar_expresion())
@@ -288,7 +467,7 @@ class Parser:
     def analizar_diccionario(self) -> ast.Diccionario:
         pares = []
         
-        if self.token_actual and self.token_actual.tipo != 'LLAVE_DER':
+        if self.tipo_actual not in (None, 'LLAVE_DER'):
             clave = self.analizar_expresion()
             self.esperar('DOS_PUNTOS')
             valor = self.analizar_expresion()
@@ -308,7 +487,7 @@ class Parser:
         atributos = {}
         
         # Análisis de atributos
-        while self.token_actual and self.token_actual.tipo == 'IDENTIFICADOR' and self.tokens[self.posicion_actual + 1].tipo == 'IGUAL':
+        while self.tipo_actual == 'IDENTIFICADOR' and self.siguiente_es('IGUAL'):
             nombre_attr = self.esperar('IDENTIFICADOR').valor
             self.esperar('IGUAL')
             valor_attr = self.analizar_expresion()
@@ -317,11 +496,69 @@ class Parser:
         # Contenido
         contenido = []
         if self.coincidir('PARENTESIS_IZQ'):
-            if self.token_actual and self.token_actual.tipo != 'PARENTESIS_DER':
+            if self.tipo_actual not in (None, 'PARENTESIS_DER'):
                 contenido.append(self.analizar_expresion())
                 while self.coincidir('COMA'):
                     contenido.append(self.analizar_expresion())
             self.esperar('PARENTESIS_DER')
         
         return ast.ElementoHTML(tipo, atributos, contenido)
-    
\ No newline at end of file
+    
+
+
+class ParserCompacto(Parser):
+    # Parser que recorre un BufferTokens por índice, sin crear un objeto por
+    # token: sólo se construye una vista TokenCompacto cuando la gramática
+    # necesita el valor o la posición del token actual.
+    def __init__(self, buffer: BufferTokens):
+        salto_linea = Lexer.id_tipo['SALTO_LINEA']
+        self.buffer = buffer
+        self.tipos = buffer.tipos
+        self.nombres = Lexer.tipos
+        # Índices en el buffer de los tokens significativos (sin saltos de línea)
+        self.indices = array('I', compress(range(len(buffer.tipos)), map(salto_linea.__ne__, buffer.tipos)))
+        self.posicion_actual = -1
+        self.avanzar()
+        self.preparar_anidamiento()
+    
+    @property
+    def token_actual(self) -> Optional[TokenCompacto]:
+        if self.tipo_actual is None:
+            return None
+        return TokenCompacto(self.buffer, self.indice)
+    
+    def avanzar(self) -> None:
+        self.posicion_actual += 1
+        try:
+            self.indice = indice = self.indices[self.posicion_actual]
+            self.tipo_actual = self.nombres[self.tipos[indice]]
+        except IndexError:
+            self.tipo_actual = None
+    
+    def valor_actual(self) -> str:
+        buffer = self.buffer
+        return buffer.fuente[buffer.inicios[self.indice]:buffer.fines[self.indice]]
+    
+    def posicion(self) -> Tuple[int, int]:
+        return self.buffer.lineas[self.indice], self.buffer.columnas[self.indice]
+    
+    def posicion_anterior(self) -> Tuple[int, int]:
+        indice = self.indices[self.posicion_actual - 1]
+        return self.buffer.lineas[indice], self.buffer.columnas[indice]
+    
+    def esperar(self, tipo: str) -> Token:
+        if self.tipo_actual == tipo:
+            token = TokenCompacto(self.buffer, self.indice)
+            self.avanzar()
+            return token
+        return super().esperar(tipo)
+    
+    def ver_siguiente(self, distancia: int = 1) -> Optional[TokenCompacto]:
+        posicion = self.posicion_actual + distancia
+        if posicion >= len(self.indices):
+            return None
+        return TokenCompacto(self.buffer, self.indices[posicion])
+    
+    def siguiente_es(self, tipo: str) -> bool:
+        posicion = self.posicion_actual + 1
+        return posicion < len(self.indices) and self.nombres[self.tipos[self.indices[posicion]]] == tipo
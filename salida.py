@@ -0,0 +1,156 @@
+# salida.py
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from valores import Valor
+
+# Salida de `mostrar`. Mientras Interprete.ejecutar ejecuta un programa, la
+# Salida del intérprete es la de SALIDA (un ContextVar: cada hilo o tarea ve
+# la suya, y la función nativa no necesita recibir el intérprete). Sin Salida,
+# `mostrar` escribe en la salida estándar.
+#
+# Una Salida guarda las líneas en un búfer. Con `destino`, lo vacía llamando
+# a destino(lineas) cuando pasa de `max_bufer` caracteres, cuando han pasado
+# `intervalo` segundos desde el último vaciado (al escribir o, con vaciando(),
+# desde otro hilo) y al terminar. Sin destino, las líneas se quedan en
+# `lineas` para la respuesta. En los dos casos, a partir de `max_total`
+# caracteres la salida se recorta: un programa que escribe sin parar no
+# llena la memoria del servidor.
+
+# Caracteres en el búfer antes de vaciarlo
+MAX_BUFER = 64 * 1024
+
+# Segundos como mucho entre vaciados
+INTERVALO = 0.1
+
+# Caracteres de salida por programa
+MAX_TOTAL = 1024 * 1024
+
+class Salida:
+    def __init__(self, destino: Optional[Callable[[List[str]], None]] = None, max_bufer: int = MAX_BUFER,
+                 intervalo: float = INTERVALO, max_total: int = MAX_TOTAL):
+        self.destino = destino
+        self.max_bufer = max_bufer
+        self.intervalo = intervalo
+        self.max_total = max_total
+        self.lineas: List[str] = []
+        self.en_bufer = 0
+        self.total = 0
+        # Líneas que no se han escrito por superar max_total, y si se ha
+        # perdido algo (esas líneas o el final de la que llegó al límite)
+        self.descartadas = 0
+        self.recortada = False
+        # La primera línea se envía en cuanto se escribe
+        self.ultimo_vaciado = float('-inf')
+        # El vaciado periódico llega desde otro hilo
+        self.bloqueo = threading.Lock()
+
+    def restante(self) -> int:
+        return max(self.max_total - self.total, 0)
+
+    def escribir(self, linea: str) -> None:
+        with self.bloqueo:
+            restante = self.max_total - self.total
+            if restante <= 0:
+                self.descartadas += 1
+                self.recortada = True
+                return
+            if len(linea) > restante:
+                linea = linea[:restante]
+                self.recortada = True
+            self.lineas.append(linea)
+            self.total += len(linea)
+            self.en_bufer += len(linea)
+            if self.destino is not None and (self.en_bufer >= self.max_bufer
+                                             or time.monotonic() - self.ultimo_vaciado >= self.intervalo):
+                self.vaciar_bufer()
+
+    def vaciar(self) -> None:
+        with self.bloqueo:
+            self.vaciar_bufer()
+
+    def vaciar_bufer(self) -> None:
+        # Con el bloqueo ya tomado
+        if self.destino is not None and self.lineas:
+            lineas, self.lineas = self.lineas, []
+            self.en_bufer = 0
+            self.destino(lineas)
+        self.ultimo_vaciado = time.monotonic()
+
+@contextmanager
+def vaciando(salida: Salida) -> Iterator[Salida]:
+    # Vacía `salida` cada `intervalo` segundos desde otro hilo mientras dura
+    # el bloque (aunque el programa no escriba nada más) y al terminarlo
+    terminado = threading.Event()
+    def vaciar_periodicamente() -> None:
+        while not terminado.wait(salida.intervalo):
+            salida.vaciar()
+    hilo = threading.Thread(target=vaciar_periodicamente, name='salida', daemon=True)
+    hilo.start()
+    try:
+        yield salida
+    finally:
+        terminado.set()
+        hilo.join()
+        salida.vaciar()
+
+SALIDA: ContextVar[Optional[Salida]] = ContextVar('salida', default=None)
+
+@contextmanager
+def escribiendo_en(salida: Optional[Salida]) -> Iterator[None]:
+    # `mostrar` escribe en `salida` mientras dura el bloque
+    token = SALIDA.set(salida)
+    try:
+        yield
+    finally:
+        SALIDA.reset(token)
+
+def fragmentos(valor: Valor) -> Iterator[str]:
+    # El texto de `valor` a trozos: las listas (que pueden ser un Rango
+    # enorme) se recorren sólo hasta donde se vaya a escribir
+    tipo = valor.tipo
+    if tipo == 'lista':
+        yield '['
+        for indice, elemento in enumerate(valor.valor):
+            if indice:
+                yield ', '
+            yield from fragmentos(elemento)
+        yield ']'
+    elif tipo == 'diccionario':
+        yield '{'
+        for indice, (clave, elemento) in enumerate(valor.valor.items()):
+            if indice:
+                yield ', '
+            yield f'{clave}: '
+            yield from fragmentos(elemento)
+        yield '}'
+    elif tipo == 'booleano':
+        yield 'verdadero' if valor.valor else 'falso'
+    elif tipo == 'nulo':
+        yield 'nulo'
+    elif tipo in ('html', 'css'):
+        from html_renderer import HTMLRenderer
+        yield HTMLRenderer.convertir_a_html(valor) if tipo == 'html' else HTMLRenderer.convertir_a_css(valor)
+    else:
+        yield str(valor.valor)
+
+def texto(valores: Iterable[Valor], limite: Optional[int] = None) -> str:
+    # Los valores separados por espacios, como los escribe `mostrar`; con
+    # `limite`, sólo los primeros `limite` caracteres
+    partes: List[str] = []
+    largo = 0
+    for indice, valor in enumerate(valores):
+        for fragmento in fragmentos(valor) if not indice else _con_espacio(valor):
+            if limite is not None and largo + len(fragmento) >= limite:
+                partes.append(fragmento[:limite - largo])
+                return ''.join(partes)
+            partes.append(fragmento)
+            largo += len(fragmento)
+    return ''.join(partes)
+
+def _con_espacio(valor: Valor) -> Iterator[str]:
+    yield ' '
+    yield from fragmentos(valor)
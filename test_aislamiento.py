@@ -0,0 +1,91 @@
+# test_aislamiento.py
+# Los intérpretes que ejecutan el mismo código comparten el árbol de la
+# caché; lo que aprende uno al ejecutarlo no debe cambiar lo que hace otro.
+from cache_ast import cache_global
+from interpreter import Interprete, informe_especializacion
+from valores import Valor
+
+def test_sitios_por_interprete():
+    codigo = 'variable total = x\npara (variable i = 0; i < 10; i = i + 1) { total = total + x }\ntotal'
+    programa = cache_global.obtener(codigo)
+    enteros, cadenas = Interprete(), Interprete()
+    enteros.entorno_global.definir_variable('x', Valor('entero', 2))
+    cadenas.entorno_global.definir_variable('x', Valor('cadena', 'a'))
+
+    assert enteros.ejecutar(codigo).valor == 22
+    assert informe_especializacion(programa, cadenas.sitios) == []
+    assert cadenas.ejecutar(codigo).valor == 'a' * 11
+
+    # `total + x` es la última operación del código
+    suma_enteros = informe_especializacion(programa, enteros.sitios)[-1]
+    suma_cadenas = informe_especializacion(programa, cadenas.sitios)[-1]
+    assert suma_enteros['tipos'] == ['entero', 'entero']
+    assert suma_cadenas['tipos'] == ['cadena', 'cadena']
+    assert (suma_enteros['aciertos'], suma_enteros['fallos'], suma_enteros['cambios']) == (9, 1, 1)
+    assert (suma_cadenas['aciertos'], suma_cadenas['fallos'], suma_cadenas['cambios']) == (9, 1, 1)
+    # El árbol de la caché no guarda nada de las ejecuciones
+    assert cache_global.obtener(codigo) is programa
+    assert not any(hasattr(nodo, 'sitio') for nodo in programa.cuerpo)
+
+def test_verificar_no_marca_el_arbol():
+    from bytecode import desensamblar
+
+    codigo = 'variable x: entero = 1 + 2\nx'
+    programa = cache_global.obtener(codigo)
+    verificado = Interprete().preparar(codigo, motor='bytecode', verificar=True)
+    sin_verificar = Interprete().preparar(codigo, motor='bytecode')
+    assert 'COMPROBAR_TIPO' not in desensamblar(verificado)
+    assert 'COMPROBAR_TIPO' in desensamblar(sin_verificar)
+    # Lo demostrado queda en la Verificacion, no en el nodo
+    interprete = Interprete()
+    interprete.ejecutar(codigo, verificar=True)
+    assert programa.cuerpo[0] in interprete.omitir.declaraciones
+    interprete.ejecutar(codigo)
+    assert not interprete.omitir.declaraciones
+
+CUENTA = '''
+funcion cuenta(n) {
+    si (n == 0) { devolver 0 }
+    devolver 1 + cuenta(n - 1)
+}
+'''
+
+def resultado(interprete, codigo, motor):
+    try:
+        return repr(interprete.ejecutar(codigo, motor=motor))
+    except RecursionError:
+        return 'RecursionError'
+
+def test_memoria_por_ejecucion():
+    codigo = CUENTA + 'cuenta(1000)'
+    # El motor 'cierres' no llega a esa profundidad con la pila de Python, y
+    # los resultados de otra ejecución no pueden cambiarlo
+    assert resultado(Interprete(), codigo, 'cierres') == 'RecursionError'
+    arbol = Interprete()
+    assert arbol.ejecutar(codigo).valor == 1000
+    assert resultado(Interprete(), codigo, 'cierres') == 'RecursionError'
+
+    # Cada ejecución empieza con la tabla vacía y sus propios contadores
+    assert arbol.informe_memoria()[0]['fallos'] == 1001
+    arbol.ejecutar(CUENTA + 'cuenta(10) + cuenta(10)')
+    informe = arbol.informe_memoria()[0]
+    assert (informe['aciertos'], informe['fallos'], informe['resultados']) == (1, 11, 11)
+    assert not hasattr(cache_global.obtener(codigo).cuerpo[0], 'memoria')
+
+def test_memoria_no_evita_el_limite():
+    # cuenta(50) cabe desde arriba, pero no debajo de las 41 llamadas de
+    # hondo: el resultado guardado no vale a esa profundidad
+    codigo = '''
+        funcion hondo(k, n) {
+            si (k == 0) { devolver cuenta(n) }
+            devolver hondo(k - 1, n)
+        }
+        mostrar(cuenta(50))
+        hondo(40, 50)
+    '''
+    for motor in ('arbol', 'bytecode'):
+        sin_memoria, con_memoria = Interprete(), Interprete()
+        sin_memoria.max_marcos = con_memoria.max_marcos = 80
+        assert resultado(sin_memoria, CUENTA.replace('funcion', 'funcion sin_memoria') + codigo, motor) == 'RecursionError'
+        assert resultado(con_memoria, CUENTA + codigo, motor) == 'RecursionError'
+        assert con_memoria.informe_memoria()[0]['profundas'] > 0
@@ -0,0 +1,80 @@
+# test_compilado.py
+import random
+
+import pytest
+
+import ast_nodes as ast
+from arena_ast import ArenaAST
+from compilado import CABECERA, analizar_archivo, deserializar, serializar
+from interpreter import Interprete
+from lexer import Lexer
+from parser import Parser
+from tipos import ErrorTipos
+
+CODIGO = '''variable a = 1
+funcion doble(x: entero): entero {
+    devolver x * 2
+}
+variable b: cadena = a + doble(1)
+variable c: cadena = a + 1
+'''
+
+def posiciones(nodo):
+    # (clase, línea, columna) de cada nodo, en orden
+    resultado = []
+    pendientes = [nodo]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, ast.Nodo):
+            resultado.append((type(valor).__name__, getattr(valor, 'linea', None), getattr(valor, 'columna', None)))
+            pendientes.extend(reversed([getattr(valor, campo) for campo in valor.campos]))
+        elif isinstance(valor, (list, tuple)):
+            pendientes.extend(reversed(valor))
+    return resultado
+
+def test_posiciones_en_la_arena_y_el_formato_binario():
+    programa = Parser(Lexer().tokenizar(CODIGO)).analizar()
+    arena, raiz = ArenaAST.desde_arbol(programa)
+    esperadas = posiciones(programa)
+    assert any(linea is not None for _, linea, _ in esperadas)
+    assert posiciones(arena.arbol(raiz)) == esperadas
+    assert posiciones(arena.vista(raiz)) == esperadas
+    assert posiciones(deserializar(serializar(programa, CODIGO), CODIGO)) == esperadas
+
+def test_errores_de_tipo_desde_la_cache_en_disco(tmp_path):
+    ruta = tmp_path / 'p.txt'
+    ruta.write_text(CODIGO, encoding='utf-8')
+    errores = []
+    for _ in range(2):
+        with pytest.raises(ErrorTipos) as error:
+            Interprete().ejecutar_archivo(str(ruta), verificar=True)
+        errores.append((str(error.value), error.value.linea, error.value.columna))
+    assert (tmp_path / '__compilados__' / 'p.txt.lpc').exists()
+    assert errores[0] == errores[1]
+    assert errores[0][1] == 6
+    assert posiciones(analizar_archivo(str(ruta))) == posiciones(Parser(Lexer().tokenizar(CODIGO)).analizar())
+
+def test_archivo_danado(tmp_path):
+    # Un .lpc dañado no llega al intérprete: deserializar lanza ValueError y
+    # analizar_archivo vuelve a analizar la fuente
+    datos = serializar(Parser(Lexer().tokenizar(CODIGO)).analizar(), CODIGO)
+    with pytest.raises(ValueError, match='Literal inválido'):
+        deserializar(datos.replace(b'entero', b'cadena'), CODIGO)
+
+    azar = random.Random(3)
+    for _ in range(2000):
+        danados = bytearray(datos)
+        for _ in range(azar.randint(1, 3)):
+            danados[azar.randrange(CABECERA.size, len(danados))] = azar.randrange(256)
+        try:
+            deserializar(bytes(danados), CODIGO)
+        except ValueError:
+            pass
+
+    ruta = tmp_path / 'p.txt'
+    ruta.write_text(CODIGO, encoding='utf-8')
+    analizar_archivo(str(ruta))
+    compilado = tmp_path / '__compilados__' / 'p.txt.lpc'
+    compilado.write_bytes(compilado.read_bytes().replace(b'entero', b'cadena'))
+    assert posiciones(analizar_archivo(str(ruta))) == posiciones(Parser(Lexer().tokenizar(CODIGO)).analizar())
+    assert compilado.read_bytes() == datos
@@ -0,0 +1,33 @@
+# test_cooperativo.py
+# El modo cooperativo no para el bucle de eventos para preparar un programa,
+# y su ejecutor no arranca la maquinaria de los procesos.
+import asyncio
+import threading
+
+from cooperativo import EjecutorCooperativo
+from interpreter import Interprete
+
+def test_preparar_fuera_del_bucle(monkeypatch):
+    hilos = []
+    preparar = Interprete.preparar
+    def registrar(self, *argumentos):
+        hilos.append(threading.get_ident())
+        return preparar(self, *argumentos)
+    monkeypatch.setattr(Interprete, 'preparar', registrar)
+
+    async def ejecutar():
+        ejecutor = EjecutorCooperativo(sesiones=2)
+        await ejecutor.iniciar()
+        try:
+            return await ejecutor.ejecutar('variable x: entero = 20\nx + 22', verificar=True)
+        finally:
+            ejecutor.cerrar()
+
+    respuesta = asyncio.run(ejecutar())
+    assert respuesta['estado'] == 'exito' and respuesta['resultado'] == '42'
+    assert hilos and threading.get_ident() not in hilos
+
+def test_sin_procesos():
+    ejecutor = EjecutorCooperativo(sesiones=3)
+    assert not hasattr(ejecutor, 'hilos') and not hasattr(ejecutor, 'contexto')
+    assert ejecutor.estadisticas()['modo'] == 'cooperativo'
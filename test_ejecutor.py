@@ -0,0 +1,62 @@
+# test_ejecutor.py
+# Un proceso que no arranca al sustituir a otro se vuelve a intentar, y una
+# petición no espera para siempre a que quede uno libre. Los trabajadores son
+# falsos: no se arranca ningún proceso. El resultado de la respuesta se
+# escribe como en `mostrar`, con un límite.
+import asyncio
+
+import ejecutor
+from ejecutor import Ejecutor
+
+class TrabajadorFalso:
+    def terminar(self):
+        pass
+
+def test_reponer_reintenta(monkeypatch, caplog):
+    monkeypatch.setattr(ejecutor, 'ESPERA_REPOSICION', 0.001)
+    intentos = []
+    def crear():
+        intentos.append(None)
+        if len(intentos) < 3:
+            raise RuntimeError("El proceso trabajador no pudo arrancar")
+        return TrabajadorFalso()
+
+    async def reponer():
+        grupo = Ejecutor(procesos=1)
+        grupo.crear = crear
+        grupo.libres = asyncio.Queue()
+        try:
+            grupo.reponer(TrabajadorFalso())
+            return grupo, await asyncio.wait_for(grupo.libres.get(), 5)
+        finally:
+            grupo.cerrar()
+
+    grupo, nuevo = asyncio.run(reponer())
+    assert type(nuevo) is TrabajadorFalso
+    assert len(intentos) == 3 and grupo.fallos_arranque == 2
+    assert caplog.text.count('No se pudo arrancar un proceso trabajador') == 2
+
+def test_espera_acotada():
+    async def despachar():
+        # Sin ningún proceso libre ni que vaya a quedar libre
+        grupo = Ejecutor(procesos=1, cola=1, tiempo_limite=0.01)
+        grupo.libres = asyncio.Queue()
+        try:
+            grupo.admitir()
+            grupo.pendientes += 1
+            return grupo, await grupo.despachar({'codigo': '1', 'optimizar': False, 'motor': 'arbol', 'verificar': False})
+        finally:
+            grupo.cerrar()
+
+    grupo, respuesta = asyncio.run(despachar())
+    assert respuesta['estado'] == 'error' and '0.02 s' in respuesta['error']
+    assert grupo.sin_proceso == 1 and grupo.pendientes == 0
+
+def test_resultado_acotado():
+    # Una lista de `rango` no se escribe entera para la respuesta
+    respuesta = ejecutor.interpretar('rango(3000000)')
+    assert len(respuesta['resultado']) == ejecutor.MAX_RESULTADO and respuesta['resultado_recortado']
+    assert respuesta['resultado'].startswith('[0, 1, 2, ')
+
+    respuesta = ejecutor.interpretar('[1, "a", verdadero, {"k": [2.5]}]')
+    assert respuesta['resultado'] == '[1, a, verdadero, {k: [2.5]}]' and 'resultado_recortado' not in respuesta
@@ -0,0 +1,38 @@
+# test_incremental.py
+# Tras cada edición, el documento tiene que dar lo mismo que analizar su
+# fuente desde cero, también en las posiciones de los errores de tipo.
+from incremental import DocumentoIncremental
+from lexer import Lexer
+from optimizador import optimizar
+from parser import Parser
+from tipos import verificar
+
+def errores(programa):
+    return [(error.mensaje, error.linea, error.columna) for error in verificar(programa).errores]
+
+def desde_cero(fuente):
+    return errores(Parser(Lexer().tokenizar(fuente)).analizar())
+
+def test_posiciones_de_sentencias_reutilizadas():
+    documento = DocumentoIncremental('variable a = 1\nvariable b: entero = "x"')
+    assert errores(documento.programa)[0][1:] == (2, 1)
+
+    documento.editar(0, 0, '\n\n\n\n')
+    assert documento.sentencias_reanalizadas == 0
+    assert errores(documento.programa)[0][1:] == (6, 1)
+
+    documento.editar(documento.longitud, 0, '\nfuncion f(): entero {\n  "x"\n}\nsi (verdadero) { variable c: cadena = 3 }')
+    documento.editar(4, 0, '  ')
+    documento.editar(0, 2, '')
+    assert errores(documento.programa) == desde_cero(documento.fuente)
+    assert [error[1:] for error in errores(documento.programa)] == [(4, 1), (5, 1), (8, 18)]
+
+def test_optimizar_conserva_los_origenes():
+    documento = DocumentoIncremental('mostrar(1)\nsi (verdadero) {\n  variable c: cadena = 1 + 2\n}')
+    documento.editar(0, 0, '\n\n')
+    optimizado, _ = optimizar(documento.programa)
+    esperados = desde_cero(documento.fuente)
+    assert errores(optimizado) == esperados
+    # Las ediciones posteriores no cambian el árbol optimizado
+    documento.editar(0, 0, '\n')
+    assert errores(optimizado) == esperados
@@ -0,0 +1,81 @@
+# test_lexer.py
+# Las formas de tokenizar (la lista de tokenizar, el generador de
+# tokenizar_stream leyendo un archivo por bloques y el BufferTokens de
+# tokenizar_compacto) tienen que dar los mismos tokens, en las mismas
+# posiciones, que probar los patrones uno a uno en orden.
+import io
+import random
+import re
+
+from lexer import Lexer
+from test_motores import PROGRAMAS
+
+def tokens_de_referencia(codigo):
+    # Como el analizador léxico original: en cada posición, el primer patrón
+    # de la lista que coincide
+    patrones = [(re.compile(patron), tipo) for patron, tipo in Lexer.patrones]
+    tokens = []
+    linea, columna = 1, 1
+    i = 0
+    while i < len(codigo):
+        for patron, tipo in patrones:
+            match = patron.match(codigo, i)
+            if match:
+                break
+        else:
+            raise SyntaxError(f"Carácter no reconocido: '{codigo[i]}' en línea {linea}, columna {columna}")
+        texto = match.group(0)
+        if tipo not in Lexer.ignorados:
+            tokens.append((Lexer.palabras_clave.get(texto, tipo) if tipo == 'IDENTIFICADOR' else tipo, texto, linea, columna))
+        if tipo == 'SALTO_LINEA':
+            linea, columna = linea + 1, 1
+        elif '\n' in texto:
+            linea += texto.count('\n')
+            columna = len(texto) - texto.rfind('\n')
+        else:
+            columna += len(texto)
+        i = match.end()
+    tokens.append(('EOF', '', linea, columna))
+    return tokens
+
+def como_tuplas(tokens):
+    return [(token.tipo, token.valor, token.linea, token.columna) for token in tokens]
+
+def tokens_o_error(tokenizar, codigo):
+    try:
+        return tokenizar(codigo)
+    except SyntaxError as e:
+        return str(e)
+
+def todas_las_formas(codigo):
+    lexer = Lexer()
+    formas = {
+        'tokenizar': lambda c: como_tuplas(lexer.tokenizar(c)),
+        'compacto': lambda c: como_tuplas(lexer.tokenizar_compacto(c)),
+    }
+    # Bloques pequeños: los tokens quedan partidos por el borde del bloque
+    for tamano in (1, 2, 3, 7, 64):
+        formas[f'stream_{tamano}'] = lambda c, t=tamano: como_tuplas(lexer.tokenizar_stream(io.StringIO(c), t))
+    return {forma: tokens_o_error(tokenizar, codigo) for forma, tokenizar in formas.items()}
+
+PIEZAS = [
+    'variable', 'si', 'sino', 'mostrar', 'y', 'o', 'no', 'en', 'enes', 'variables', 'x', 'año', '_a1',
+    '0', '12', '12.5', '3.', '.5', '==', '=', '!=', '>=', '<=', '>', '<', '+', '-', '*', '/', '%', '^',
+    '(', ')', '{', '}', '[', ']', ';', ',', ':', '.', '"texto"', "'otro'", '"dos\nlíneas"', '""', '"',
+    '@', '# comentario', ' ', '  ', '\t', '\n', '\n\n',
+]
+
+def test_mismos_tokens_que_la_referencia():
+    # También el mismo error, en la misma posición, con un carácter que no
+    # es de ningún token
+    azar = random.Random(7)
+    codigos = list(PROGRAMAS.values())
+    for _ in range(500):
+        codigos.append(''.join(azar.choice(PIEZAS) for _ in range(azar.randint(1, 40))))
+    errores = 0
+    for codigo in codigos:
+        esperados = tokens_o_error(tokens_de_referencia, codigo)
+        errores += isinstance(esperados, str)
+        for forma, tokens in todas_las_formas(codigo).items():
+            assert tokens == esperados, (forma, codigo)
+    assert 0 < errores < len(codigos) / 2
@@ -0,0 +1,51 @@
+# test_listas.py
+# Las listas numéricas dan lo mismo guardadas en un array de NumPy que en una
+# lista de Python (sin NumPy instalado).
+import numpy
+import pytest
+
+import listas
+from interpreter import Interprete
+
+GRANDE = 2 ** 53  # listas.LIMITE_ENTERO
+
+EXPRESIONES = [
+    # Aritmética en los dos órdenes
+    '[1, 2, 3] + 1', '10 - [1, 2, 3]', '[1, -2, 3] * 3', '[1.5, -2.5] * 2', '0.5 + [1.5, 2.5]',
+    '[7, -7, 8] / 2', '[7, -7, 8] / -2', '12 / [5, -5]', '[7, -7] % 3', '-7 % [3, -3]',
+    '[1.5, -2.5] / 2', '[5.5, -5.5] % -2', '[1, 2] / 0.5', '[2, 3] ^ 2', '2 ^ [1, -1]', '[4.0, 9.0] ^ 0.5',
+    # División por cero
+    '[1, 2] / 0', '1 / [1, 0]', '[1.5] % 0.0', '2.5 % [0.0, 1.0]',
+    # Cerca del límite de los enteros en un array y de los de 64 bits
+    f'[{GRANDE}, 1] + 1', f'[{GRANDE}, -{GRANDE}] - 1', f'[{GRANDE}, 1] * 2', f'[1, 2] + {GRANDE + 1}',
+    '[3037000499, 2] * 3037000499', f'[{2 ** 62}, {2 ** 62}] * 4', f'[{GRANDE}] / 3', f'[-{GRANDE}] % 7',
+    '[10.0 ^ 300, 1.0] * 10000000000.0', '[-(10.0 ^ 300)] - 10.0 ^ 308 * 1000', '[1.5, 2.5] * 100000000000000000000',
+    # Comparaciones
+    '[1, 2, 3] > 2', '2 >= [1, 2, 3]', '[1.5, 2.5] < 2', '[1, 2] <= 1.5',
+    f'[{GRANDE - 1}, 1] < {GRANDE}.0', f'[{GRANDE + 1}] > {GRANDE}', '[1, 2] == [1.0, 2.0]', '[1, 2] + 0 == [1, 2]',
+    # Reducciones
+    'suma([1, 2, 3])', 'suma([0.1, 0.2, 0.3])', f'suma([{GRANDE}, {GRANDE}, {GRANDE}])',
+    f'suma([{2 ** 62}, {2 ** 62}])', 'suma([1, 2] * 0)', 'media([1, 2])', 'media([0.1, 0.7])',
+    'minimo([3, -1, 2])', 'maximo([1.5, 2.5, -3.5])', f'maximo([{GRANDE}, 1])', 'minimo([5] - 5)',
+    # Recorrido
+    'ordenar([3, 1, 2] * 2)', 'variable t = 0\npara cada x en [1, 2] * 3 { t = t + x }\nt',
+]
+
+def evaluar(codigo):
+    try:
+        return repr(Interprete().ejecutar(codigo))
+    except Exception as e:
+        return type(e).__name__, str(e)
+
+@pytest.mark.parametrize('expresion', EXPRESIONES)
+def test_numpy_y_listas_de_python(expresion, monkeypatch):
+    con_numpy = evaluar(expresion)
+    monkeypatch.setattr(listas, 'numpy', None)
+    assert evaluar(expresion) == con_numpy
+
+def test_representaciones(monkeypatch):
+    assert type(Interprete().ejecutar('[1, 2] * 2').valor.datos) is numpy.ndarray
+    # Los enteros que pasan del límite se quedan en una lista de Python
+    assert type(Interprete().ejecutar(f'[{GRANDE + 1}, 1]').valor.datos) is list
+    monkeypatch.setattr(listas, 'numpy', None)
+    assert type(Interprete().ejecutar('[1, 2] * 2').valor.datos) is list
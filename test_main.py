@@ -0,0 +1,112 @@
+# test_main.py
+# Los endpoints de la API, con el ejecutor en modo cooperativo para no
+# arrancar procesos trabajadores: /ast, los lotes (en orden, en NDJSON y sin
+# repetir programas) y los Server-Sent Events de /interpretar/stream. Con el
+# ejecutor saturado, el 429 llega antes de empezar a responder.
+import importlib
+import json
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    # main.py monta `static/` y `templates/` relativos al directorio actual
+    (tmp_path / 'static').mkdir()
+    (tmp_path / 'templates').mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('INTERPRETE_MODO', 'cooperativo')
+    sys.modules.pop('main', None)
+    modulo = importlib.import_module('main')
+    yield modulo
+    sys.modules.pop('main', None)
+
+@pytest.fixture
+def cliente(main):
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+def test_ast_con_diccionario(cliente):
+    respuesta = cliente.get('/ast', params={'codigo': 'variable d = {"a": 1, "b": [2]}'}).json()
+    assert respuesta['estado'] == 'exito'
+    pares = respuesta['ast']['cuerpo'][0]['valor']['pares']
+    assert [[clave['valor'], valor['tipo']] for clave, valor in pares] == [['a', 'entero'], ['b', 'ListaValores']]
+    assert pares[1][1]['valores'][0]['valor'] == 2
+
+def test_ast_sin_plegar_potencias_enormes(cliente):
+    # 3 ^ 50000000 tardaría casi un minuto en calcularse para nada: el
+    # resultado no cabe en una constante y la operación se queda en el árbol
+    respuesta = cliente.get('/ast', params={'codigo': '3 ^ 50000000 + 2 ^ 10', 'optimizar': True}).json()
+    suma = respuesta['ast']['cuerpo'][0]
+    assert suma['izquierda']['tipo'] == 'OperacionBinaria' and suma['derecha']['valor'] == 1024
+
+LOTE = ['mostrar("uno")\n1', '2 + 2', 'mostrar("uno")\n1', 'x', '2 + 2']
+
+def programas(codigos):
+    return [{'codigo': codigo, 'optimizar': False} for codigo in codigos]
+
+def test_lote_en_orden_y_sin_repetir(cliente, main):
+    respuesta = cliente.post('/interpretar/lote', json={'programas': programas(LOTE)}).json()
+    resultados = respuesta['resultados']
+    assert respuesta['estado'] == 'exito' and len(resultados) == len(LOTE)
+    assert [r.get('resultado') for r in resultados] == ['1', '4', '1', None, '4']
+    assert resultados[0]['salida'] == ['uno'] and resultados[3]['estado'] == 'error'
+    # Tres programas distintos
+    assert main.ejecutor.completadas == 3
+
+def test_lote_en_ndjson(cliente, main):
+    respuesta = cliente.post('/interpretar/lote', json={'programas': programas(LOTE), 'flujo': True})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'].startswith('application/x-ndjson')
+    assert respuesta.text.endswith('\n')
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    # Una línea por programa, cada una con su índice
+    assert sorted(linea['indice'] for linea in lineas) == list(range(len(LOTE)))
+    por_indice = {linea.pop('indice'): linea for linea in lineas}
+    assert por_indice[0] == por_indice[2] and por_indice[1] == por_indice[4]
+    assert por_indice[1]['resultado'] == '4' and por_indice[3]['estado'] == 'error'
+    # Los iguales llegan juntos
+    indices = [linea['indice'] for linea in map(json.loads, respuesta.text.splitlines())]
+    assert abs(indices.index(0) - indices.index(2)) == 1 and abs(indices.index(1) - indices.index(4)) == 1
+    assert main.ejecutor.completadas == 3
+
+def test_lote_demasiado_grande(cliente, main):
+    respuesta = cliente.post('/interpretar/lote', json={'programas': programas(['1'] * (main.MAX_LOTE + 1))})
+    assert respuesta.status_code == 422
+    assert main.ejecutor.completadas == 0
+
+def test_eventos_del_stream(cliente):
+    respuesta = cliente.post('/interpretar/stream', json={'codigo': 'mostrar("a")\nmostrar("b", 1)\n42'})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'].startswith('text/event-stream')
+    assert respuesta.headers['cache-control'] == 'no-cache'
+    assert respuesta.text.endswith('\n\n')
+    eventos = []
+    for bloque in respuesta.text[:-2].split('\n\n'):
+        evento, datos = bloque.split('\n')
+        assert evento.startswith('event: ') and datos.startswith('data: ')
+        eventos.append((evento[len('event: '):], json.loads(datos[len('data: '):])))
+    assert [tipo for tipo, _ in eventos[:-1]] == ['salida'] * (len(eventos) - 1)
+    assert [linea for _, datos in eventos[:-1] for linea in datos['lineas']] == ['a', 'b 1']
+    tipo, resultado = eventos[-1]
+    assert tipo == 'resultado' and resultado['resultado'] == '42' and 'salida' not in resultado
+
+@pytest.mark.parametrize('ruta, cuerpo', [
+    ('/interpretar/stream', {'codigo': '1'}),
+    ('/interpretar/lote', {'programas': programas(['1']), 'flujo': True}),
+    ('/interpretar/lote', {'programas': programas(['1'])}),
+])
+def test_saturado_antes_de_responder(cliente, main, ruta, cuerpo):
+    # Con todos los turnos y la cola ocupados, un 429 normal (no un flujo
+    # que se corta): la petición no llega a ejecutarse
+    ejecutor = main.ejecutor
+    ejecutor.pendientes = ejecutor.procesos + ejecutor.cola
+    try:
+        respuesta = cliente.post(ruta, json=cuerpo)
+    finally:
+        ejecutor.pendientes = 0
+    assert respuesta.status_code == 429 and respuesta.headers['retry-after'] == '1'
+    assert respuesta.headers['content-type'] == 'application/json'
+    assert 'inténtalo más tarde' in respuesta.json()['detail']
+    assert ejecutor.completadas == 0 and ejecutor.rechazadas == 1
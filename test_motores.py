@@ -0,0 +1,147 @@
+# test_motores.py
+# Los cuatro motores, con y sin optimizar, tienen que dar la misma salida,
+# el mismo resultado y los mismos errores que el recorrido del árbol sin
+# optimizar.
+import pytest
+
+from interpreter import MOTORES, Interprete
+from salida import Salida
+
+PROGRAMAS = {
+    'aritmetica': '''
+        variable a = 7
+        variable b: entero = 2
+        mostrar(a + b, a - b, a * b, a / b, a % b, a ^ b, -a)
+        mostrar(7.5 / 2, 1 + 2.5, 2 ^ 0.5, 10 % 3.5)
+        mostrar(100000 * 100000, 3000 + 4000, -1000 - 5000)
+        mostrar("a" + "b", "x" + 1, 1 + "x")
+    ''',
+    'comparaciones': '''
+        mostrar(1 < 2, 2 <= 2, 3 > 4, 4 >= 5, 1 == 1.0, "a" != "b", "a" < "b")
+        mostrar(verdadero y falso, verdadero o falso, no verdadero, nulo == nulo)
+        mostrar([1, 2] == [1, 2], 1 == "1")
+    ''',
+    'igualdad_de_colecciones': '''
+        variable a = "x"
+        variable b = "x"
+        mostrar(["x"] == ["x"], [a, "x"] == [b, "x"], ["x"] != ["y"], [[1, "a"]] == [[1.0, "a"]])
+        mostrar([1, "a"] == [1, "a", 2], [1, 2.0] == [1.0, 2], rango(3) == [0, 1, 2], [nulo] == [nulo])
+        mostrar({"k": 5} == {"k": 5}, {"k": 100000} == {"k": 100000}, {"k": "v"} != {"k": "w"})
+        mostrar({"a": [1, {"b": 2}]} == {"a": [1, {"b": 2}]}, {"a": 1} == {"b": 1}, {"a": 1} == [1])
+        mostrar(contiene([["x"], [1]], ["x"]), contiene([{"k": 100000}], {"k": 100000}))
+    ''',
+    'condicionales': '''
+        para cada n en rango(6) {
+            si (n % 3 == 0) { mostrar("fizz", n) }
+            sino si (n % 3 == 1) { mostrar("uno", n) }
+            sino { mostrar(n) }
+        }
+    ''',
+    'bucles': '''
+        variable total = 0
+        para (variable i = 0; i < 10; i = i + 1) {
+            variable j = 0
+            mientras (j < i) {
+                total = total + j
+                j = j + 1
+            }
+        }
+        mostrar(total)
+    ''',
+    'para_con_doble_punto_y_coma': '''
+        para (variable i = 0;; i < 3; i = i + 1) { mostrar(i) }
+    ''',
+    'recursion': '''
+        funcion fib(n) {
+            si (n < 2) { devolver n }
+            devolver fib(n - 1) + fib(n - 2)
+        }
+        funcion suma(n) {
+            si (n == 0) { devolver 0 }
+            devolver n + suma(n - 1)
+        }
+        mostrar(fib(15), suma(100))
+    ''',
+    'funciones': '''
+        funcion doble(x: entero): entero { devolver x * 2 }
+        funcion saludo(nombre) { mostrar("hola " + nombre) }
+        mostrar(doble(21), saludo("mundo"))
+        funcion sin_retorno() { variable x = 1 }
+        mostrar(sin_retorno())
+    ''',
+    'ambito_dinamico': '''
+        variable contador = 0
+        funcion incrementar() { contador = contador + 1 }
+        funcion usar_local() {
+            variable contador = 100
+            incrementar()
+            devolver contador
+        }
+        incrementar()
+        mostrar(usar_local(), contador)
+    ''',
+    'colecciones': '''
+        variable lista = [3, 1, 2]
+        variable dic = {"a": 1, "b": [1, 2]}
+        mostrar(lista, ordenar(lista), longitud(lista), dic, claves(dic), valores(dic))
+        variable suma = 0
+        para cada x en lista { suma = suma + x }
+        mostrar(suma, contiene(lista, 2), unir(["a", "b"], "-"), rango(1, 10, 3))
+    ''',
+    'primitiva_tapada': '''
+        funcion longitud(x) { devolver 42 }
+        mostrar(longitud([1, 2, 3]))
+    ''',
+    'funcion_redefinida': '''
+        funcion f() { devolver 1 }
+        mostrar(f())
+        funcion f() { devolver "dos" }
+        mostrar(f())
+    ''',
+    'division_por_cero': '''
+        mostrar("antes")
+        mostrar(1 / 0)
+    ''',
+    'variable_no_definida': '''
+        mostrar(1)
+        mostrar(nada)
+    ''',
+    'tipo_incorrecto': '''
+        variable x: entero = "texto"
+    ''',
+    'argumentos': '''
+        funcion f(a, b) { devolver a + b }
+        mostrar(f(1))
+    ''',
+    'operacion_no_soportada': '''
+        mostrar([1] - 1)
+    ''',
+}
+
+def ejecutar(codigo, motor, optimizar, verificar=False):
+    interprete = Interprete()
+    interprete.salida = Salida()
+    try:
+        resultado = repr(interprete.ejecutar(codigo, optimizar, motor, verificar))
+    except Exception as e:
+        resultado = (type(e).__name__, str(e))
+    return interprete.salida.lineas, resultado
+
+@pytest.mark.parametrize('motor', MOTORES)
+@pytest.mark.parametrize('optimizar', (False, True))
+@pytest.mark.parametrize('nombre', sorted(PROGRAMAS))
+def test_mismo_comportamiento(nombre, motor, optimizar):
+    codigo = PROGRAMAS[nombre]
+    assert ejecutar(codigo, motor, optimizar) == ejecutar(codigo, 'arbol', False)
+
+def test_igualdad_de_colecciones():
+    # Las listas y los diccionarios se comparan por contenido (antes, según
+    # si los dos lados compartían el Valor de cada elemento)
+    lineas, _ = ejecutar(PROGRAMAS['igualdad_de_colecciones'], 'arbol', False)
+    assert lineas == [
+        'verdadero verdadero verdadero verdadero',
+        'falso verdadero verdadero verdadero',
+        'verdadero verdadero verdadero',
+        'verdadero falso falso',
+        'verdadero verdadero',
+    ]
@@ -0,0 +1,132 @@
+# test_parser.py
+# El analizador de expresiones por tabla de precedencias tiene que dar los
+# mismos árboles que la gramática recursiva a la que sustituyó, y las
+# expresiones demasiado anidadas se rechazan con un SyntaxError en vez de
+# agotar la pila de Python en alguna fase posterior.
+import random
+
+import pytest
+
+import ast_nodes as ast
+from interpreter import Interprete, MOTORES
+from lexer import Lexer
+from parser import Parser, ParserCompacto
+
+class GramaticaRecursiva:
+    # La gramática de expresiones anterior, un método por nivel de
+    # precedencia (sin 'y', 'o' ni '^', que no tenía)
+    def __init__(self, tokens):
+        self.tokens = [token for token in tokens if token.tipo != 'SALTO_LINEA']
+        self.posicion = 0
+
+    @property
+    def tipo(self):
+        return self.tokens[self.posicion].tipo
+
+    def tomar(self):
+        token = self.tokens[self.posicion]
+        self.posicion += 1
+        return token
+
+    def esperar(self, tipo):
+        assert self.tomar().tipo == tipo
+
+    def binaria(self, tipos, siguiente):
+        expr = siguiente()
+        while self.tipo in tipos:
+            operador = self.tomar().tipo
+            expr = ast.OperacionBinaria(expr, operador, siguiente())
+        return expr
+
+    def expresion(self):
+        return self.binaria(('IGUAL_IGUAL', 'DIFERENTE', 'MAYOR', 'MENOR', 'MAYOR_IGUAL', 'MENOR_IGUAL'), self.suma)
+
+    def suma(self):
+        return self.binaria(('MAS', 'MENOS'), self.termino)
+
+    def termino(self):
+        return self.binaria(('MULTIPLICACION', 'DIVISION', 'MODULO'), self.factor)
+
+    def argumentos(self, cierre):
+        valores = []
+        if self.tipo != cierre:
+            valores.append(self.expresion())
+            while self.tipo == 'COMA':
+                self.tomar()
+                valores.append(self.expresion())
+        self.esperar(cierre)
+        return valores
+
+    def factor(self):
+        token = self.tomar()
+        if token.tipo == 'PARENTESIS_IZQ':
+            expr = self.expresion()
+            self.esperar('PARENTESIS_DER')
+            return expr
+        if token.tipo in ('MENOS', 'NO'):
+            return ast.OperacionUnaria(token.tipo, self.factor())
+        if token.tipo == 'ENTERO':
+            return ast.ValorLiteral(int(token.valor), 'entero')
+        if token.tipo == 'CORCHETE_IZQ':
+            return ast.ListaValores(self.argumentos('CORCHETE_DER'))
+        assert token.tipo == 'IDENTIFICADOR'
+        if self.tipo == 'PARENTESIS_IZQ':
+            self.tomar()
+            return ast.LlamadaFuncion(token.valor, self.argumentos('PARENTESIS_DER'))
+        return ast.Identificador(token.valor)
+
+def forma(valor):
+    # El árbol sin posiciones
+    if isinstance(valor, ast.Nodo):
+        return (type(valor).__name__,) + tuple(forma(getattr(valor, campo)) for campo in valor.campos)
+    if isinstance(valor, (list, tuple)):
+        return [forma(elemento) for elemento in valor]
+    return valor
+
+def expresion_aleatoria(azar, profundidad):
+    if profundidad == 0 or azar.random() < 0.2:
+        return azar.choice(['1', '23', 'a', 'b'])
+    opcion = azar.random()
+    if opcion < 0.15:
+        return azar.choice(['-', 'no ']) + expresion_aleatoria(azar, profundidad - 1)
+    if opcion < 0.25:
+        return '(' + expresion_aleatoria(azar, profundidad - 1) + ')'
+    if opcion < 0.3:
+        return 'f(' + ', '.join(expresion_aleatoria(azar, profundidad - 1) for _ in range(azar.randint(0, 2))) + ')'
+    if opcion < 0.35:
+        return '[' + ', '.join(expresion_aleatoria(azar, profundidad - 1) for _ in range(azar.randint(0, 2))) + ']'
+    operador = azar.choice(['+', '-', '*', '/', '%', '==', '!=', '<', '>', '<=', '>='])
+    return expresion_aleatoria(azar, profundidad - 1) + f' {operador} ' + expresion_aleatoria(azar, profundidad - 1)
+
+def test_mismos_arboles_que_la_gramatica_recursiva():
+    azar = random.Random(5)
+    for _ in range(500):
+        fuente = expresion_aleatoria(azar, 6)
+        esperado = forma(GramaticaRecursiva(Lexer().tokenizar(fuente)).expresion())
+        assert forma(Parser(Lexer().tokenizar(fuente)).analizar_expresion()) == esperado, fuente
+        assert forma(ParserCompacto(Lexer().tokenizar_compacto(fuente)).analizar_expresion()) == esperado, fuente
+
+ANIDADAS = {
+    'unario': lambda n: '- ' * n + '1',
+    'suma': lambda n: ' + '.join(['1'] * (n + 1)),
+    'parentesis': lambda n: '(1 + ' * n + '1' + ')' * n,
+    'lista': lambda n: '[' * n + '1' + ']' * n,
+    'diccionario': lambda n: '{"a": ' * n + '1' + '}' * n,
+}
+
+@pytest.mark.parametrize('forma_anidada', ANIDADAS)
+def test_limite_de_anidamiento(forma_anidada, capsys):
+    # `mostrar(...)` y el literal del fondo suman dos niveles a los n de la
+    # forma: justo en el límite se ejecuta en todos los motores
+    n = Parser.max_anidamiento - 2
+    codigo = 'mostrar(' + ANIDADAS[forma_anidada](n) + ')'
+    for motor in MOTORES:
+        for optimizar in (False, True):
+            for verificar in (False, True):
+                Interprete().ejecutar(codigo, optimizar, motor, verificar)
+    capsys.readouterr()
+
+    codigo = 'mostrar(' + ANIDADAS[forma_anidada](n + 1) + ')'
+    for motor in MOTORES:
+        with pytest.raises(SyntaxError, match='demasiado anidada'):
+            Interprete().ejecutar(codigo, False, motor)
@@ -0,0 +1,124 @@
+# test_tipos.py
+# Lo que tipos.verificar demuestra sólo sirve para saltarse comprobaciones
+# que no pueden fallar: con verificar=True cada motor tiene que dar la misma
+# salida, el mismo resultado y los mismos errores que sin verificar.
+import pytest
+
+from interpreter import MOTORES, Interprete
+from test_motores import ejecutar
+
+PROGRAMAS = {
+    'ambito_dinamico': '''
+        funcion f() { devolver x }
+        funcion g() {
+            variable x = "texto"
+            variable r: entero = f()
+            devolver r
+        }
+        variable x = 1
+        variable a: entero = f()
+        mostrar(a)
+        mostrar(g())
+    ''',
+    'llamada_que_reasigna': '''
+        variable n = 1
+        funcion cambiar() { n = "uno" }
+        variable antes: entero = n
+        cambiar()
+        variable despues: entero = n
+    ''',
+    'argumento_reasignado': '''
+        funcion doble(x: entero): entero { devolver x * 2 }
+        variable v = 2
+        funcion estropear() { v = "dos" }
+        mostrar(doble(v))
+        estropear()
+        mostrar(doble(v))
+    ''',
+    'funcion_tapada_localmente': '''
+        funcion f(x: entero): entero { devolver x }
+        mostrar(f(1))
+        funcion g() {
+            funcion f(x: cadena): cadena { devolver x }
+            devolver f(2)
+        }
+        mostrar(g())
+    ''',
+    'funcion_redefinida_en_bucle': '''
+        funcion h(): entero { 1 }
+        para (variable i = 0; i < 2; i = i + 1) {
+            variable r: entero = h()
+            mostrar(r)
+            funcion h() { "x" }
+        }
+    ''',
+    'primitiva_tapada': '''
+        variable l: entero = longitud([1, 2])
+        mostrar(l)
+        funcion longitud(x) { devolver "muchos" }
+        variable k: entero = longitud([1])
+    ''',
+    'declaracion_en_una_rama': '''
+        variable x = 1
+        funcion g(c) {
+            si (c) { variable x = "local" }
+            variable z: entero = x
+            devolver z
+        }
+        mostrar(g(falso))
+        mostrar(g(verdadero))
+    ''',
+    'bucle_mientras': '''
+        variable a = 1
+        variable i = 0
+        mientras (i < 3) {
+            variable b: entero = a
+            mostrar(b)
+            a = "texto"
+            i = i + 1
+        }
+    ''',
+    'bucle_para_cada': '''
+        para cada x en [1, 2, "tres"] {
+            variable z: entero = x
+            mostrar(z)
+        }
+    ''',
+    'retorno_tras_bucle': '''
+        funcion f(n): entero {
+            variable r = 0
+            para (variable i = 0; i < n; i = i + 1) {
+                si (i == 2) { r = "dos" }
+            }
+            r
+        }
+        mostrar(f(1))
+        mostrar(f(3))
+    ''',
+    'demostradas': '''
+        funcion cuadrado(x: entero): entero { x * x }
+        variable total: entero = 0
+        para (variable i = 0; i < 5; i = i + 1) {
+            variable c: entero = cuadrado(i)
+            total = total + c
+        }
+        mostrar(total)
+    ''',
+}
+
+@pytest.mark.parametrize('motor', MOTORES)
+@pytest.mark.parametrize('optimizar', (False, True))
+@pytest.mark.parametrize('nombre', sorted(PROGRAMAS))
+def test_verificar_no_cambia_el_comportamiento(nombre, motor, optimizar):
+    codigo = PROGRAMAS[nombre]
+    # Primero verificando: lo demostrado no puede afectar a las ejecuciones
+    # posteriores del mismo código sin verificar
+    verificado = ejecutar(codigo, motor, optimizar, True)
+    assert verificado == ejecutar(codigo, motor, optimizar, False)
+    assert verificado == ejecutar(codigo, 'arbol', False)
+
+def test_se_saltan_comprobaciones_demostradas():
+    interprete = Interprete()
+    interprete.ejecutar(PROGRAMAS['demostradas'], verificar=True)
+    demostradas = interprete.informe_tipos.demostradas
+    assert demostradas['declaraciones'] >= 2 and demostradas['llamadas'] >= 1 and demostradas['retornos'] == 1
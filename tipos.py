@@ -0,0 +1,573 @@
+# tipos.py
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import ast_nodes as ast
+from biblioteca import PRIMITIVAS
+from interpreter import NUMERICOS, Demostradas
+
+# Verificación de tipos antes de ejecutar.
+#
+# Se infiere el tipo de cada expresión a partir de los literales, de las
+# anotaciones (`variable x: entero`, los parámetros y el retorno de las
+# funciones) y de las reglas de los operadores. Un tipo desconocido es None:
+# el lenguaje tiene ámbito dinámico, así que lo que no se declara en el propio
+# ámbito depende de quién llame, y una llamada a función puede cambiar
+# cualquier variable que alguna función asigne.
+#
+# Con esos tipos, verificar() hace dos cosas:
+# - Informa de los errores de tipo seguros (los que ocurrirían al ejecutar la
+#   sentencia) con su línea y columna.
+# - Recoge las comprobaciones que no pueden fallar (Verificacion.omitir), para
+#   que los motores se las salten cuando se ejecuta con verificar=True. No se
+#   escriben en el árbol: el de cache_ast lo comparten también las
+#   ejecuciones que no verifican, que tienen que comprobarlo todo.
+
+# Tipos de clave válidos en un diccionario (como Interprete.evaluar_diccionario)
+CLAVES = ('entero', 'decimal', 'cadena', 'booleano')
+
+class ErrorTipo:
+    # Un error encontrado por el verificador y dónde está
+    __slots__ = ('mensaje', 'linea', 'columna')
+
+    def __init__(self, mensaje: str, linea: Optional[int], columna: Optional[int]):
+        self.mensaje = mensaje
+        self.linea = linea
+        self.columna = columna
+
+    def __str__(self) -> str:
+        if self.linea is None:
+            return self.mensaje
+        return f"{self.mensaje} en línea {self.linea}, columna {self.columna}"
+
+class ErrorTipos(TypeError):
+    # Lo que lanza Interprete.ejecutar(verificar=True) si el programa tiene
+    # errores de tipo. `linea` y `columna` son las del primero.
+    def __init__(self, errores: List[ErrorTipo]):
+        super().__init__('\n'.join(str(error) for error in errores))
+        self.errores = errores
+        self.linea = errores[0].linea
+        self.columna = errores[0].columna
+
+class Marco:
+    # Lo que se sabe de las variables de un entorno en un punto del programa:
+    # el tipo de cada una (None si no se conoce) y cuáles están declaradas
+    # seguro. Una variable que no está en `seguras` puede no haberse
+    # declarado aún (se declaró sólo en una rama de un `si`), y entonces su
+    # uso puede llegar a la de un entorno exterior.
+    __slots__ = ('tipos', 'seguras')
+
+    def __init__(self, tipos: Optional[Dict[str, Optional[str]]] = None, seguras: Optional[Set[str]] = None):
+        self.tipos = tipos if tipos is not None else {}
+        self.seguras = seguras if seguras is not None else set(self.tipos)
+
+    def copiar(self) -> 'Marco':
+        return Marco(dict(self.tipos), set(self.seguras))
+
+    def unir(self, otro: 'Marco') -> 'Marco':
+        # Lo que se sabe después de llegar por uno u otro camino
+        tipos: Dict[str, Optional[str]] = {}
+        for nombre in self.tipos.keys() | otro.tipos.keys():
+            if nombre in self.tipos and nombre in otro.tipos and self.tipos[nombre] == otro.tipos[nombre]:
+                tipos[nombre] = self.tipos[nombre]
+            else:
+                tipos[nombre] = None
+        return Marco(tipos, self.seguras & otro.seguras)
+
+    def __eq__(self, otro: Any) -> bool:
+        return isinstance(otro, Marco) and self.tipos == otro.tipos and self.seguras == otro.seguras
+
+# La cadena de entornos estáticos de un punto del programa, del más externo
+# al actual: la función (o el programa) y los `para cada` que la rodean
+Marcos = List[Marco]
+
+def copiar(marcos: Marcos) -> Marcos:
+    return [marco.copiar() for marco in marcos]
+
+def unir(marcos: Marcos, otros: Marcos) -> Marcos:
+    return [marco.unir(otro) for marco, otro in zip(marcos, otros)]
+
+def unir_tipos(tipos: List[Optional[str]]) -> Optional[str]:
+    return tipos[0] if tipos and all(tipo == tipos[0] for tipo in tipos) else None
+
+def tipo_numerico(izquierda: str, derecha: str) -> str:
+    return 'decimal' if 'decimal' in (izquierda, derecha) else 'entero'
+
+class Firma:
+    # Resultado de analizar una función: el tipo de lo que devuelven sus
+    # llamadas (None si no se conoce)
+    __slots__ = ('resultado',)
+
+    def __init__(self, resultado: Optional[str]):
+        self.resultado = resultado
+
+# Marca de una función cuyo cuerpo se está analizando (llamadas recursivas)
+EN_CURSO = Firma(None)
+
+class Verificacion:
+    # Resultado de verificar(): los errores, las comprobaciones demostradas
+    # innecesarias y cuántas son de cada clase
+    def __init__(self):
+        self.errores: List[ErrorTipo] = []
+        self.omitir = Demostradas()
+        self.comprobaciones: Dict[str, int] = {'declaraciones': 0, 'llamadas': 0, 'retornos': 0}
+        self.demostradas: Dict[str, int] = {'declaraciones': 0, 'llamadas': 0, 'retornos': 0}
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            'errores': [str(error) for error in self.errores],
+            'comprobaciones': self.comprobaciones,
+            'demostradas': self.demostradas,
+        }
+
+def infiere(tipo: type) -> Callable:
+    # Marca un método de Verificador como regla de los nodos de clase `tipo`
+    def decorar(metodo: Callable) -> Callable:
+        metodo.tipo_nodo = tipo
+        return metodo
+    return decorar
+
+class Verificador:
+    reglas: Dict[type, Callable[['Verificador', Any, Marcos], Optional[str]]] = {}
+
+    def verificar(self, programa: ast.Programa) -> Verificacion:
+        self.verificacion = Verificacion()
+        self.posicion: Tuple[Optional[int], Optional[int]] = (None, None)
+        # Errores y marcas sólo se registran en la pasada definitiva de cada
+        # bucle (las anteriores buscan el punto fijo con tipos provisionales)
+        self.registrar = True
+        self.funciones: Dict[ast.DeclaracionFuncion, Firma] = {}
+        self.retornos: Optional[List[Optional[str]]] = None
+        self.declaraciones_ok: Dict[ast.DeclaracionVariable, bool] = {}
+        self.llamadas_ok: Dict[ast.LlamadaFuncion, Optional[ast.DeclaracionFuncion]] = {}
+        self.retornos_ok: Dict[ast.DeclaracionFuncion, bool] = {}
+        self.origenes = getattr(programa, 'origenes', None)
+        self.origen = (1, 1)
+        self.recoger(programa)
+
+        marcos = [Marco()]
+        for indice, sentencia in enumerate(programa.cuerpo):
+            self.origen = self.origen_de(indice)
+            self.inferir(sentencia, marcos)
+        self.marcar()
+        return self.verificacion
+
+    def recoger(self, programa: ast.Programa) -> None:
+        # Las declaraciones de cada función, los nombres que asigna alguna
+        # función (una llamada puede cambiar su tipo en quien llama) y las
+        # funciones fijas: las declaradas una sola vez, en el programa
+        # principal y sólo detrás de otras declaraciones de función. Cuando
+        # se ejecuta cualquier llamada esas ya están declaradas, así que una
+        # llamada por su nombre llega siempre a ellas.
+        # También en qué sentencia de primer nivel está cada función, para
+        # situar sus errores si las posiciones son relativas a ella.
+        self.declaraciones: Dict[str, List[ast.DeclaracionFuncion]] = {}
+        self.sentencias: Dict[ast.DeclaracionFuncion, int] = {}
+        self.asignadas: Set[str] = set()
+        pendientes: List[Tuple[Any, bool, int]] = [(sentencia, False, indice)
+                                                   for indice, sentencia in enumerate(programa.cuerpo)]
+        while pendientes:
+            valor, en_funcion, indice = pendientes.pop()
+            if isinstance(valor, ast.Nodo):
+                if isinstance(valor, ast.DeclaracionFuncion):
+                    self.declaraciones.setdefault(valor.nombre, []).append(valor)
+                    self.sentencias[valor] = indice
+                    en_funcion = True
+                elif isinstance(valor, ast.AsignacionVariable) and en_funcion:
+                    self.asignadas.add(valor.nombre)
+                hijos = [getattr(valor, campo) for campo in valor.campos]
+            elif isinstance(valor, (list, tuple)):
+                hijos = list(valor)
+            elif isinstance(valor, dict):
+                hijos = list(valor.values())
+            else:
+                continue
+            pendientes.extend((hijo, en_funcion, indice) for hijo in hijos)
+
+        self.fijas: Dict[str, ast.DeclaracionFuncion] = {}
+        for sentencia in programa.cuerpo:
+            if not isinstance(sentencia, ast.DeclaracionFuncion):
+                break
+            if len(self.declaraciones[sentencia.nombre]) == 1:
+                self.fijas[sentencia.nombre] = sentencia
+
+    def marcar(self) -> None:
+        omitir = self.verificacion.omitir
+        demostradas = self.verificacion.demostradas
+        comprobaciones = self.verificacion.comprobaciones
+        for nodo, demostrada in self.declaraciones_ok.items():
+            comprobaciones['declaraciones'] += 1
+            if demostrada:
+                demostradas['declaraciones'] += 1
+                omitir.declaraciones.add(nodo)
+        for nodo, funcion in self.llamadas_ok.items():
+            comprobaciones['llamadas'] += 1
+            if funcion is not None:
+                demostradas['llamadas'] += 1
+                omitir.llamadas[nodo] = funcion
+        for nodo, demostrada in self.retornos_ok.items():
+            comprobaciones['retornos'] += 1
+            if demostrada:
+                demostradas['retornos'] += 1
+                omitir.retornos.add(nodo)
+
+    def origen_de(self, indice: int) -> Tuple[int, int]:
+        # Dónde empieza la sentencia de primer nivel `indice`
+        return self.origenes[indice] if self.origenes is not None else (1, 1)
+
+    def ubicar(self, nodo: ast.Nodo) -> Tuple[int, int]:
+        # Posición de `nodo` en la fuente, relativa o no a self.origen
+        linea, columna = self.origen
+        if nodo.linea == 1:
+            columna += nodo.columna - 1
+        else:
+            columna = nodo.columna
+        return linea + nodo.linea - 1, columna
+
+    def error(self, mensaje: str) -> None:
+        if self.registrar:
+            self.verificacion.errores.append(ErrorTipo(mensaje, *self.posicion))
+
+    def inferir(self, nodo: ast.Nodo, marcos: Marcos) -> Optional[str]:
+        # Tipo del valor de `nodo`, actualizando `marcos` con lo que cambie
+        tipo = type(nodo)
+        for base in tipo.__mro__:
+            if base in self.reglas:
+                regla = self.reglas[base]
+                break
+        else:
+            return None
+        if not hasattr(nodo, 'linea'):
+            return regla(self, nodo, marcos)
+        anterior = self.posicion
+        self.posicion = self.ubicar(nodo)
+        try:
+            return regla(self, nodo, marcos)
+        finally:
+            self.posicion = anterior
+
+    def bloque(self, sentencias: List[ast.Nodo], marcos: Marcos) -> Optional[str]:
+        # El tipo de la última sentencia (nulo si no hay ninguna)
+        tipo: Optional[str] = 'nulo'
+        for sentencia in sentencias:
+            tipo = self.inferir(sentencia, marcos)
+        return tipo
+
+    def condicion(self, nodo: ast.Nodo, marcos: Marcos) -> None:
+        tipo = self.inferir(nodo, marcos)
+        if tipo is not None and tipo != 'booleano':
+            self.error(f"La condición debe ser de tipo 'booleano', se obtuvo '{tipo}'")
+
+    def punto_fijo(self, marcos: Marcos, vuelta: Callable[[Marcos], None]) -> None:
+        # Deja en `marcos` lo que se sabe al empezar cualquier vuelta de un
+        # bucle: se une lo de la entrada con lo que deja cada vuelta hasta
+        # que no cambia. Cada unión sólo puede olvidar tipos, así que acaba.
+        registrar = self.registrar
+        self.registrar = False
+        try:
+            while True:
+                prueba = copiar(marcos)
+                vuelta(prueba)
+                unidos = unir(marcos, prueba)
+                if unidos == marcos:
+                    return
+                marcos[:] = unidos
+        finally:
+            self.registrar = registrar
+
+    # Variables
+
+    @staticmethod
+    def buscar(marcos: Marcos, nombre: str) -> Optional[str]:
+        tipos: List[Optional[str]] = []
+        for marco in reversed(marcos):
+            if nombre in marco.tipos:
+                tipos.append(marco.tipos[nombre])
+                if nombre in marco.seguras:
+                    return unir_tipos(tipos)
+        # Puede venir de un entorno de fuera (quien llama, el global...)
+        return None
+
+    @staticmethod
+    def asignar(marcos: Marcos, nombre: str, tipo: Optional[str]) -> None:
+        # Como Entorno.asignar_variable: el primer entorno que la tenga. Si
+        # en alguno puede no estar declarada, la asignación puede ir a ese o
+        # a uno más externo, y los dos pasan a tener cualquiera de los tipos.
+        exacta = True
+        for marco in reversed(marcos):
+            if nombre in marco.tipos:
+                anterior = marco.tipos[nombre]
+                marco.tipos[nombre] = tipo if exacta else unir_tipos([anterior, tipo])
+                if nombre in marco.seguras:
+                    return
+                exacta = False
+
+    def olvidar_asignadas(self, marcos: Marcos) -> None:
+        # Tras una llamada, las variables que alguna función asigna pueden
+        # tener cualquier tipo
+        for marco in marcos:
+            for nombre in self.asignadas & marco.tipos.keys():
+                marco.tipos[nombre] = None
+
+    # Reglas
+
+    @infiere(ast.ValorLiteral)
+    def inferir_literal(self, nodo: ast.ValorLiteral, marcos: Marcos) -> Optional[str]:
+        return nodo.tipo
+
+    @infiere(ast.Identificador)
+    def inferir_identificador(self, nodo: ast.Identificador, marcos: Marcos) -> Optional[str]:
+        return self.buscar(marcos, nodo.nombre)
+
+    @infiere(ast.DeclaracionVariable)
+    def inferir_declaracion_variable(self, nodo: ast.DeclaracionVariable, marcos: Marcos) -> Optional[str]:
+        tipo = self.inferir(nodo.valor, marcos)
+        if nodo.tipo:
+            if tipo is not None and tipo != nodo.tipo:
+                self.error(f"Se esperaba tipo '{nodo.tipo}' pero se obtuvo '{tipo}'")
+            if self.registrar:
+                self.declaraciones_ok[nodo] = self.declaraciones_ok.get(nodo, True) and tipo == nodo.tipo
+            # Si la comprobación pasa, la variable tiene el tipo declarado
+            tipo = nodo.tipo
+        marcos[-1].tipos[nodo.nombre] = tipo
+        marcos[-1].seguras.add(nodo.nombre)
+        return tipo
+
+    @infiere(ast.AsignacionVariable)
+    def inferir_asignacion_variable(self, nodo: ast.AsignacionVariable, marcos: Marcos) -> Optional[str]:
+        tipo = self.inferir(nodo.valor, marcos)
+        self.asignar(marcos, nodo.nombre, tipo)
+        return tipo
+
+    @infiere(ast.OperacionBinaria)
+    def inferir_operacion_binaria(self, nodo: ast.OperacionBinaria, marcos: Marcos) -> Optional[str]:
+        izquierda = self.inferir(nodo.izquierda, marcos)
+        derecha = self.inferir(nodo.derecha, marcos)
+        operador = nodo.operador
+
+        # Resultados que no dependen de los operandos (si no hay error)
+        if operador in ('IGUAL_IGUAL', 'DIFERENTE', 'Y', 'O'):
+            resultado: Optional[str] = 'booleano'
+        else:
+            resultado = None
+
+        if izquierda is None or derecha is None:
+            conocido = izquierda or derecha
+            if operador == 'MAS' and conocido is not None and conocido not in NUMERICOS and conocido != 'lista':
+                # Con un operando que no es número ni lista sólo puede concatenar
+                return 'cadena'
+            if conocido == 'cadena' and operador in ('MAYOR', 'MENOR', 'MAYOR_IGUAL', 'MENOR_IGUAL'):
+                return 'booleano'
+            # Con un número, el otro operando puede ser una lista
+            return resultado
+
+        numericos = izquierda in NUMERICOS and derecha in NUMERICOS
+        # Entre una lista y un número, la operación se aplica a cada elemento
+        con_lista = 'lista' in (izquierda, derecha) and (izquierda in NUMERICOS or derecha in NUMERICOS)
+        if operador == 'MAS':
+            if numericos:
+                return tipo_numerico(izquierda, derecha)
+            if 'cadena' in (izquierda, derecha):
+                return 'cadena'
+            if con_lista:
+                return 'lista'
+        elif operador in ('MENOS', 'MULTIPLICACION', 'DIVISION', 'MODULO'):
+            if numericos:
+                return tipo_numerico(izquierda, derecha)
+            if con_lista:
+                return 'lista'
+        elif operador == 'POTENCIA':
+            if numericos:
+                # Entre enteros, decimal si el exponente es negativo
+                return 'decimal' if 'decimal' in (izquierda, derecha) else None
+            if con_lista:
+                return 'lista'
+        elif operador in ('IGUAL_IGUAL', 'DIFERENTE'):
+            return resultado
+        elif operador in ('Y', 'O'):
+            if izquierda == derecha == 'booleano':
+                return resultado
+        elif numericos or izquierda == derecha == 'cadena':
+            return 'booleano'
+        elif con_lista:
+            return 'lista'
+        self.error(f"Operación no soportada entre '{izquierda}' y '{derecha}'")
+        return resultado
+
+    @infiere(ast.OperacionUnaria)
+    def inferir_operacion_unaria(self, nodo: ast.OperacionUnaria, marcos: Marcos) -> Optional[str]:
+        tipo = self.inferir(nodo.operando, marcos)
+        if nodo.operador == 'NO':
+            if tipo is not None and tipo != 'booleano':
+                self.error(f"Operador 'no' no aplicable a tipo '{tipo}'")
+            return 'booleano'
+        if tipo is not None and tipo not in NUMERICOS:
+            self.error(f"Operador '-' no aplicable a tipo '{tipo}'")
+            return None
+        return tipo
+
+    @infiere(ast.Condicional)
+    def inferir_condicional(self, nodo: ast.Condicional, marcos: Marcos) -> Optional[str]:
+        self.condicion(nodo.condicion, marcos)
+        rama_si = copiar(marcos)
+        self.bloque(nodo.cuerpo, rama_si)
+        rama_sino = copiar(marcos)
+        if nodo.sino:
+            self.bloque(nodo.sino, rama_sino)
+        marcos[:] = unir(rama_si, rama_sino)
+        return None
+
+    @infiere(ast.BucleWhile)
+    def inferir_bucle_while(self, nodo: ast.BucleWhile, marcos: Marcos) -> Optional[str]:
+        def vuelta(marcos: Marcos) -> None:
+            self.condicion(nodo.condicion, marcos)
+            self.bloque(nodo.cuerpo, marcos)
+        self.punto_fijo(marcos, vuelta)
+        # Se sale después de evaluar la condición
+        self.condicion(nodo.condicion, marcos)
+        self.bloque(nodo.cuerpo, copiar(marcos))
+        return None
+
+    @infiere(ast.BucleFor)
+    def inferir_bucle_for(self, nodo: ast.BucleFor, marcos: Marcos) -> Optional[str]:
+        self.inferir(nodo.inicializacion, marcos)
+        def vuelta(marcos: Marcos) -> None:
+            self.condicion(nodo.condicion, marcos)
+            self.bloque(nodo.cuerpo, marcos)
+            self.inferir(nodo.incremento, marcos)
+        self.punto_fijo(marcos, vuelta)
+        self.condicion(nodo.condicion, marcos)
+        cuerpo = copiar(marcos)
+        self.bloque(nodo.cuerpo, cuerpo)
+        self.inferir(nodo.incremento, cuerpo)
+        return None
+
+    @infiere(ast.BucleForEach)
+    def inferir_bucle_foreach(self, nodo: ast.BucleForEach, marcos: Marcos) -> Optional[str]:
+        iterable = self.inferir(nodo.iterable, marcos)
+        if iterable is not None and iterable not in ('lista', 'cadena', 'diccionario'):
+            self.error(f"Tipo '{iterable}' no es iterable")
+        # Los elementos de una lista pueden ser de cualquier tipo; los de una
+        # cadena o un diccionario (sus claves) se recorren como cadenas
+        elemento = None if iterable in (None, 'lista') else 'cadena'
+        def vuelta(marcos: Marcos) -> None:
+            # Cada vuelta tiene un entorno nuevo con la variable del bucle
+            self.bloque(nodo.cuerpo, marcos + [Marco({nodo.variable: elemento})])
+        self.punto_fijo(marcos, vuelta)
+        vuelta(copiar(marcos))
+        return None
+
+    @infiere(ast.DeclaracionFuncion)
+    def inferir_declaracion_funcion(self, nodo: ast.DeclaracionFuncion, marcos: Marcos) -> Optional[str]:
+        self.funcion(nodo)
+        return 'funcion'
+
+    def funcion(self, nodo: ast.DeclaracionFuncion) -> Firma:
+        # El cuerpo se analiza una vez, aparte: al llamarla, su entorno cuelga
+        # del de quien llama, así que fuera de los parámetros no sabe nada
+        firma = self.funciones.get(nodo)
+        if firma is not None:
+            return firma
+        self.funciones[nodo] = EN_CURSO
+
+        estado = (self.registrar, self.retornos, self.posicion, self.origen)
+        self.registrar = True
+        self.retornos = []
+        self.origen = self.origen_de(self.sentencias[nodo])
+        if hasattr(nodo, 'linea'):
+            self.posicion = self.ubicar(nodo)
+        try:
+            marco = Marco({parametro['nombre']: parametro['tipo'] for parametro in nodo.parametros})
+            final = self.bloque(nodo.cuerpo, [marco])
+            retornos = self.retornos
+            # Si la última sentencia es un `devolver`, el cuerpo nunca termina
+            # por el final
+            termina = not (nodo.cuerpo and isinstance(nodo.cuerpo[-1], ast.RetornoFuncion))
+            if nodo.tipo_retorno:
+                # Sólo se comprueba el valor con el que termina el cuerpo,
+                # no el de `devolver`
+                if final is not None and final != nodo.tipo_retorno and not retornos:
+                    self.error(f"Función '{nodo.nombre}' debe retornar tipo '{nodo.tipo_retorno}', pero retornó '{final}'")
+                self.retornos_ok[nodo] = final == nodo.tipo_retorno or not termina
+                final = nodo.tipo_retorno
+        finally:
+            self.registrar, self.retornos, self.posicion, self.origen = estado
+
+        firma = self.funciones[nodo] = Firma(unir_tipos(retornos + [final] if termina else retornos))
+        return firma
+
+    @infiere(ast.LlamadaFuncion)
+    def inferir_llamada_funcion(self, nodo: ast.LlamadaFuncion, marcos: Marcos) -> Optional[str]:
+        argumentos = [self.inferir(argumento, marcos) for argumento in nodo.argumentos]
+        self.olvidar_asignadas(marcos)
+
+        # Los argumentos se demuestran contra la única declaración con ese
+        # nombre; al ejecutar se usa la marca sólo si la llamada llega a ella
+        declaraciones = self.declaraciones.get(nodo.nombre)
+        if not declaraciones:
+            # Una función nativa (biblioteca.py) o una de fuera del programa
+            nativa = PRIMITIVAS.get(nodo.nombre)
+            if nativa is None:
+                return None
+            if not nativa.acepta(len(argumentos)):
+                self.error(f"Función '{nodo.nombre}' espera {nativa.esperados()} argumentos, pero se proporcionaron {len(argumentos)}")
+            return nativa.retorno
+        if len(declaraciones) > 1:
+            if self.registrar:
+                self.llamadas_ok[nodo] = None
+            return None
+        funcion = declaraciones[0]
+        fija = self.fijas.get(nodo.nombre) is funcion
+
+        demostrada = len(argumentos) == len(funcion.parametros)
+        if not demostrada and fija:
+            self.error(f"Función '{nodo.nombre}' espera {len(funcion.parametros)} argumentos, pero se proporcionaron {len(argumentos)}")
+        for parametro, tipo in zip(funcion.parametros, argumentos):
+            if parametro['tipo'] and tipo != parametro['tipo']:
+                demostrada = False
+                if fija and tipo is not None:
+                    self.error(f"Parámetro '{parametro['nombre']}' espera tipo '{parametro['tipo']}', pero se proporcionó '{tipo}'")
+        if self.registrar:
+            anterior = self.llamadas_ok.get(nodo, funcion)
+            self.llamadas_ok[nodo] = funcion if demostrada and anterior is funcion else None
+
+        firma = self.funcion(funcion)
+        return firma.resultado if fija else None
+
+    @infiere(ast.RetornoFuncion)
+    def inferir_retorno_funcion(self, nodo: ast.RetornoFuncion, marcos: Marcos) -> Optional[str]:
+        tipo = 'nulo' if nodo.valor is None else self.inferir(nodo.valor, marcos)
+        if self.retornos is not None:
+            self.retornos.append(tipo)
+        return None
+
+    @infiere(ast.ListaValores)
+    def inferir_lista(self, nodo: ast.ListaValores, marcos: Marcos) -> Optional[str]:
+        for valor in nodo.valores:
+            self.inferir(valor, marcos)
+        return 'lista'
+
+    @infiere(ast.Diccionario)
+    def inferir_diccionario(self, nodo: ast.Diccionario, marcos: Marcos) -> Optional[str]:
+        for clave, valor in nodo.pares:
+            tipo = self.inferir(clave, marcos)
+            self.inferir(valor, marcos)
+            if tipo is not None and tipo not in CLAVES:
+                self.error(f"La clave del diccionario debe ser inmutable, no '{tipo}'")
+        return 'diccionario'
+
+    @infiere(ast.ElementoHTML)
+    def inferir_elemento_html(self, nodo: ast.ElementoHTML, marcos: Marcos) -> Optional[str]:
+        for valor in nodo.atributos.values():
+            self.inferir(valor, marcos)
+        for item in nodo.contenido:
+            self.inferir(item, marcos)
+        return 'html'
+
+    @infiere(ast.EstiloCSS)
+    def inferir_estilo_css(self, nodo: ast.EstiloCSS, marcos: Marcos) -> Optional[str]:
+        return 'css'
+
+Verificador.reglas = {metodo.tipo_nodo: metodo for metodo in vars(Verificador).values() if hasattr(metodo, 'tipo_nodo')}
+
+def verificar(programa: ast.Programa) -> Verificacion:
+    return Verificador().verificar(programa)
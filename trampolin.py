@@ -0,0 +1,304 @@
+# trampolin.py
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+import ast_nodes as ast
+from biblioteca import Primitiva
+from interpreter import Entorno, Interprete, Retorno, RetornoExcepcion, Valor, operar_unario
+from listas import crear_lista
+from memoria import Memoria
+from valores import NULO
+
+# Llamadas profundas del recorrido del árbol sin recursión de Python.
+# Interprete.llamar_funcion hace las primeras LLAMADAS_RECURSIVAS llamadas
+# anidadas sobre la pila de Python y la siguiente la pasa aquí. En el
+# trampolín cada nodo se evalúa con un generador que, al llegar a una
+# LlamadaFuncion, no la ejecuta: cede una Llamada. El bucle de
+# ejecutar_en_trampolin guarda el generador de quien llama en una pila propia,
+# ejecuta el cuerpo de la función y, cuando termina, le envía el resultado.
+# La profundidad sólo la limita Interprete.limite_llamadas.
+#
+# Sólo tienen generador los nodos que pueden contener llamadas. El resto, y
+# las declaraciones de función (que las subclases del intérprete redefinen),
+# se evalúan con Interprete.evaluar.
+#
+# Los bucles ceden además PASO en cada vuelta. recorrer() cuenta esas vueltas
+# y las llamadas, y el modo cooperativo (cooperativo.py) lo usa para ceder el
+# bucle de eventos cada cierto número de pasos.
+
+# Lo que cede un bucle en cada vuelta
+PASO = object()
+
+# Lo que devuelve cada generador: cede Llamada (o PASO), recibe Valor
+Pasos = Generator[Any, Valor, Any]
+
+class Llamada:
+    # Petición de un generador al trampolín: ejecutar la función y enviarle
+    # el resultado
+    __slots__ = ('funcion', 'nombre', 'argumentos', 'entorno', 'verificada')
+
+    def __init__(self, funcion: Any, nombre: str, argumentos: List[Valor], entorno: Entorno, verificada: bool):
+        self.funcion = funcion
+        self.nombre = nombre
+        self.argumentos = argumentos
+        self.entorno = entorno
+        self.verificada = verificada
+
+# Generador de cada clase de nodo (None: se evalúa con Interprete.evaluar)
+PASOS: Dict[type, Optional[Callable[[Interprete, Any, Entorno], Pasos]]] = {}
+
+def pasos(tipo: type) -> Callable:
+    # Registra una función como generador de los nodos de clase `tipo`
+    def registrar(funcion: Callable) -> Callable:
+        PASOS[tipo] = funcion
+        return funcion
+    return registrar
+
+def manejador_pasos(tipo: type) -> Optional[Callable[[Interprete, Any, Entorno], Pasos]]:
+    # Las subclases de un nodo (p. ej. las vistas de arena_ast) usan el de su
+    # clase base; se guarda para la próxima vez
+    if tipo not in PASOS:
+        PASOS[tipo] = next((PASOS[base] for base in tipo.__mro__[1:] if PASOS.get(base) is not None), None)
+    return PASOS[tipo]
+
+def evaluar(interprete: Interprete, nodo: ast.Nodo, entorno: Entorno) -> Pasos:
+    manejador = manejador_pasos(type(nodo))
+    if manejador is None:
+        return interprete.evaluar(nodo, entorno)
+    return (yield from manejador(interprete, nodo, entorno))
+
+def bloque(interprete: Interprete, sentencias: List[ast.Nodo], entorno: Entorno) -> Pasos:
+    # El valor de la última sentencia (None si no hay), o el Retorno de un
+    # `devolver`, como los bloques de Interprete
+    resultado = None
+    for sentencia in sentencias:
+        resultado = yield from evaluar(interprete, sentencia, entorno)
+        if type(resultado) is Retorno:
+            break
+    return resultado
+
+def condicion(valor: Valor) -> bool:
+    if valor.tipo != 'booleano':
+        raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{valor.tipo}'")
+    return valor.valor
+
+def cuerpo_funcion(interprete: Interprete, funcion: ast.DeclaracionFuncion, nombre: str, entorno_funcion: Entorno) -> Pasos:
+    # Como Interprete.ejecutar_funcion
+    resultado = yield from bloque(interprete, funcion.cuerpo, entorno_funcion)
+    if type(resultado) is Retorno:
+        return resultado.valor
+    resultado = resultado or NULO
+    if funcion.tipo_retorno and resultado.tipo != funcion.tipo_retorno and funcion not in interprete.omitir.retornos:
+        raise TypeError(f"Función '{nombre}' debe retornar tipo '{funcion.tipo_retorno}', pero retornó '{resultado.tipo}'")
+    return resultado
+
+@pasos(ast.Programa)
+def programa(interprete: Interprete, nodo: ast.Programa, entorno: Entorno) -> Pasos:
+    # Como Interprete.evaluar_programa
+    resultado = yield from bloque(interprete, nodo.cuerpo, entorno)
+    if type(resultado) is Retorno:
+        raise RetornoExcepcion(resultado.valor)
+    return resultado or NULO
+
+@pasos(ast.DeclaracionVariable)
+def declaracion_variable(interprete: Interprete, nodo: ast.DeclaracionVariable, entorno: Entorno) -> Pasos:
+    valor = yield from evaluar(interprete, nodo.valor, entorno)
+    if nodo.tipo and nodo.tipo != valor.tipo and nodo not in interprete.omitir.declaraciones:
+        raise TypeError(f"Se esperaba tipo '{nodo.tipo}' pero se obtuvo '{valor.tipo}'")
+    entorno.definir_variable(nodo.nombre, valor)
+    return valor
+
+@pasos(ast.AsignacionVariable)
+def asignacion_variable(interprete: Interprete, nodo: ast.AsignacionVariable, entorno: Entorno) -> Pasos:
+    valor = yield from evaluar(interprete, nodo.valor, entorno)
+    entorno.asignar_variable(nodo.nombre, valor)
+    return valor
+
+@pasos(ast.OperacionBinaria)
+def operacion_binaria(interprete: Interprete, nodo: ast.OperacionBinaria, entorno: Entorno) -> Pasos:
+    izquierda = yield from evaluar(interprete, nodo.izquierda, entorno)
+    derecha = yield from evaluar(interprete, nodo.derecha, entorno)
+    return interprete.operar_en_sitio(nodo, izquierda, derecha)
+
+@pasos(ast.OperacionUnaria)
+def operacion_unaria(interprete: Interprete, nodo: ast.OperacionUnaria, entorno: Entorno) -> Pasos:
+    operando = yield from evaluar(interprete, nodo.operando, entorno)
+    return operar_unario(nodo.operador, operando)
+
+@pasos(ast.Condicional)
+def condicional(interprete: Interprete, nodo: ast.Condicional, entorno: Entorno) -> Pasos:
+    if condicion((yield from evaluar(interprete, nodo.condicion, entorno))):
+        cuerpo = nodo.cuerpo
+    elif nodo.sino:
+        cuerpo = nodo.sino
+    else:
+        return NULO
+    resultado = yield from bloque(interprete, cuerpo, entorno)
+    return resultado or NULO
+
+@pasos(ast.BucleWhile)
+def bucle_while(interprete: Interprete, nodo: ast.BucleWhile, entorno: Entorno) -> Pasos:
+    resultado = NULO
+    while condicion((yield from evaluar(interprete, nodo.condicion, entorno))):
+        yield PASO
+        resultado = (yield from bloque(interprete, nodo.cuerpo, entorno)) or resultado
+        if type(resultado) is Retorno:
+            return resultado
+    return resultado
+
+@pasos(ast.BucleFor)
+def bucle_for(interprete: Interprete, nodo: ast.BucleFor, entorno: Entorno) -> Pasos:
+    yield from evaluar(interprete, nodo.inicializacion, entorno)
+    resultado = NULO
+    while condicion((yield from evaluar(interprete, nodo.condicion, entorno))):
+        yield PASO
+        resultado = (yield from bloque(interprete, nodo.cuerpo, entorno)) or resultado
+        if type(resultado) is Retorno:
+            return resultado
+        yield from evaluar(interprete, nodo.incremento, entorno)
+    return resultado
+
+@pasos(ast.BucleForEach)
+def bucle_foreach(interprete: Interprete, nodo: ast.BucleForEach, entorno: Entorno) -> Pasos:
+    iterable = yield from evaluar(interprete, nodo.iterable, entorno)
+    resultado = NULO
+    if iterable.tipo not in ['lista', 'cadena', 'diccionario']:
+        raise TypeError(f"Tipo '{iterable.tipo}' no es iterable")
+    for valor in iterable.valor:
+        yield PASO
+        entorno_bucle = Entorno(entorno)
+        entorno_bucle.definir_variable(nodo.variable, valor if iterable.tipo == 'lista' else Valor('cadena', valor))
+        resultado = (yield from bloque(interprete, nodo.cuerpo, entorno_bucle)) or resultado
+        if type(resultado) is Retorno:
+            return resultado
+    return resultado
+
+@pasos(ast.LlamadaFuncion)
+def llamada_funcion(interprete: Interprete, nodo: ast.LlamadaFuncion, entorno: Entorno) -> Pasos:
+    funcion = entorno.obtener_funcion(nodo.nombre)
+    nativa = type(funcion) is Primitiva
+    verificada = interprete.omitir.llamadas.get(nodo) is funcion
+    if nativa:
+        funcion.comprobar(len(nodo.argumentos))
+    elif not verificada and len(nodo.argumentos) != len(funcion.parametros):
+        raise TypeError(f"Función '{nodo.nombre}' espera {len(funcion.parametros)} argumentos, pero se proporcionaron {len(nodo.argumentos)}")
+    valores_args = []
+    for arg in nodo.argumentos:
+        valores_args.append((yield from evaluar(interprete, arg, entorno)))
+    if nativa:
+        # No apila nada: se ejecuta aquí mismo
+        return funcion.llamar(valores_args)
+    return (yield Llamada(funcion, nodo.nombre, valores_args, entorno, verificada))
+
+@pasos(ast.RetornoFuncion)
+def retorno_funcion(interprete: Interprete, nodo: ast.RetornoFuncion, entorno: Entorno) -> Pasos:
+    valor = NULO if nodo.valor is None else (yield from evaluar(interprete, nodo.valor, entorno))
+    return Retorno(valor)
+
+@pasos(ast.ListaValores)
+def lista_valores(interprete: Interprete, nodo: ast.ListaValores, entorno: Entorno) -> Pasos:
+    valores = []
+    for expr in nodo.valores:
+        valores.append((yield from evaluar(interprete, expr, entorno)))
+    return crear_lista(valores)
+
+@pasos(ast.Diccionario)
+def diccionario(interprete: Interprete, nodo: ast.Diccionario, entorno: Entorno) -> Pasos:
+    resultado = {}
+    for clave, valor in nodo.pares:
+        clave_eval = yield from evaluar(interprete, clave, entorno)
+        valor_eval = yield from evaluar(interprete, valor, entorno)
+        if clave_eval.tipo not in ['entero', 'decimal', 'cadena', 'booleano']:
+            raise TypeError(f"La clave del diccionario debe ser inmutable, no '{clave_eval.tipo}'")
+        resultado[clave_eval.valor] = valor_eval
+    return Valor('diccionario', resultado)
+
+@pasos(ast.ElementoHTML)
+def elemento_html(interprete: Interprete, nodo: ast.ElementoHTML, entorno: Entorno) -> Pasos:
+    atributos_eval = {}
+    for nombre, valor in nodo.atributos.items():
+        atributos_eval[nombre] = yield from evaluar(interprete, valor, entorno)
+    contenido_eval = []
+    for item in nodo.contenido:
+        contenido_eval.append((yield from evaluar(interprete, item, entorno)))
+    return Valor('html', {
+        'tipo': nodo.tipo,
+        'atributos': atributos_eval,
+        'contenido': contenido_eval
+    })
+
+def ejecutar_en_trampolin(interprete: Interprete, funcion: Any, nombre: str, entorno_funcion: Entorno) -> Valor:
+    if not isinstance(funcion, ast.DeclaracionFuncion):
+        # Funciones que no son nodos (las traducidas de transpilador.py)
+        return interprete.ejecutar_funcion(funcion, nombre, entorno_funcion)
+
+    llamadas, recursivas = interprete.llamadas, interprete.recursivas
+    # Las llamadas que el intérprete haga desde aquí con recursión (en los
+    # nodos sin generador) vuelven a tener toda la pila de Python
+    interprete.recursivas = 0
+    interprete.llamadas += 1
+    try:
+        # Sin quantum, recorrer no cede nada: termina en el primer next
+        next(recorrer(interprete, cuerpo_funcion(interprete, funcion, nombre, entorno_funcion)))
+    except StopIteration as fin:
+        return fin.value
+    finally:
+        interprete.llamadas, interprete.recursivas = llamadas, recursivas
+
+def recorrer(interprete: Interprete, generador: Pasos, quantum: Optional[int] = None) -> Generator[None, None, Valor]:
+    # El bucle del trampolín: ejecuta `generador` y las llamadas que ceda, y
+    # devuelve su resultado. Con `quantum`, cede None cada `quantum` pasos
+    # (vueltas de bucle y llamadas a funciones del programa).
+    limite = interprete.limite_llamadas()
+    pendientes: List[Pasos] = []
+    # Por cada generador en curso, dónde guardar su resultado si es el de una
+    # función con memoria: (Memoria, clave, profundidad) o None
+    memorias = interprete.memorias
+    destinos: List[Optional[Tuple[Memoria, Tuple, int]]] = [None]
+    enviar: Optional[Valor] = None
+    restantes = quantum
+    while True:
+        try:
+            llamada = generador.send(enviar)
+        except StopIteration as fin:
+            destino = destinos.pop()
+            if destino is not None:
+                destino[0].guardar(destino[1], fin.value, destino[2])
+            if not pendientes:
+                return fin.value
+            generador = pendientes.pop()
+            interprete.llamadas -= 1
+            enviar = fin.value
+            continue
+
+        if restantes is not None:
+            restantes -= 1
+            if not restantes:
+                yield
+                restantes = quantum
+        if llamada is PASO:
+            enviar = None
+            continue
+
+        memoria = memorias.get(llamada.funcion) if memorias else None
+        destino = None
+        if memoria is not None:
+            clave = memoria.clave(llamada.argumentos)
+            if clave is not None:
+                enviar = memoria.buscar(clave, interprete.llamadas)
+                if enviar is not None:
+                    continue
+                destino = (memoria, clave, interprete.llamadas)
+
+        entorno_llamada = interprete.entorno_llamada(llamada.funcion, llamada.argumentos, llamada.entorno, llamada.verificada)
+        if not isinstance(llamada.funcion, ast.DeclaracionFuncion):
+            enviar = interprete.ejecutar_funcion(llamada.funcion, llamada.nombre, entorno_llamada)
+            if destino is not None:
+                memoria.guardar(clave, enviar, destino[2])
+            continue
+        if interprete.llamadas >= limite:
+            raise RecursionError(f"Se superó el límite de {limite} llamadas anidadas")
+        interprete.llamadas += 1
+        pendientes.append(generador)
+        destinos.append(destino)
+        generador = cuerpo_funcion(interprete, llamada.funcion, llamada.nombre, entorno_llamada)
+        enviar = None
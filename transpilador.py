@@ -0,0 +1,524 @@
+# transpilador.py
+import hashlib
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
+
+import ast_nodes as ast
+from biblioteca import Primitiva
+from interpreter import (
+    NINGUNA, OPERACIONES_BINARIAS, OPERACIONES_UNARIAS, Demostradas, Entorno, Interprete, RetornoExcepcion, Valor,
+    iterar_valores,
+)
+from listas import crear_lista
+from memoria import Memoria
+from valores import FALSO, NULO, VERDADERO, entero
+
+# Motor 'python': el programa se traduce a código fuente de Python que trabaja
+# con los mismos Valor y Entorno que el intérprete, se compila con compile() y
+# lo ejecuta el propio CPython. Cada función del lenguaje (y el cuerpo del
+# programa) se traduce a una función de Python; las que contienen nodos que
+# el traductor no maneja se dejan enteras a Interprete.evaluar.
+#
+# Las operaciones se hacen con las mismas funciones que usa el intérprete,
+# con un camino directo entre enteros para los operadores de ENTEROS_RAPIDOS,
+# así que los resultados y los errores son los mismos.
+
+# Símbolo de Python de cada operador con camino directo entre enteros
+SIMBOLOS_PYTHON = {
+    'MAS': '+', 'MENOS': '-', 'MULTIPLICACION': '*',
+    'IGUAL_IGUAL': '==', 'DIFERENTE': '!=', 'MAYOR': '>', 'MENOR': '<', 'MAYOR_IGUAL': '>=', 'MENOR_IGUAL': '<=',
+}
+
+# Operadores cuyo resultado siempre es un booleano (o un error)
+BOOLEANOS = {'IGUAL_IGUAL', 'DIFERENTE', 'MAYOR', 'MENOR', 'MAYOR_IGUAL', 'MENOR_IGUAL', 'Y', 'O'}
+
+# Nombre en el código generado de la función de cada operador
+FUNCIONES_BINARIAS = {operador: funcion.__name__ for operador, funcion in OPERACIONES_BINARIAS.items()}
+FUNCIONES_UNARIAS = {operador: funcion.__name__ for operador, funcion in OPERACIONES_UNARIAS.items()}
+
+# Objetos de código ya compilados, por hash del código fuente generado
+MAX_CODIGOS = 256
+
+class NoTraducible(Exception):
+    # Un nodo que el traductor no maneja: su función se deja al intérprete
+    pass
+
+class FuncionNativa:
+    # Lo que se guarda en Entorno.funciones para una función traducida: la
+    # interfaz de DeclaracionFuncion y la función de Python que ejecuta el
+    # cuerpo en un entorno con los parámetros ya definidos
+    __slots__ = ('nombre', 'parametros', 'tipo_retorno', 'codigo')
+
+    def __init__(self, nombre: str, parametros: List[Dict[str, Optional[str]]], tipo_retorno: Optional[str], codigo: Any):
+        self.nombre = nombre
+        self.parametros = parametros
+        self.tipo_retorno = tipo_retorno
+        self.codigo = codigo
+
+class InterpreteMixto(Interprete):
+    # Intérprete de una ejecución del programa traducido, para las partes no
+    # traducidas: las funciones declaradas con una traducción la usan, y las
+    # llamadas a funciones nativas las ejecutan. El código generado lo recibe
+    # como argumento y cuenta en él sus llamadas; sus memorias van por la
+    # función que se guarda en el entorno (la FuncionNativa o el nodo).
+    def __init__(self, funciones: Dict[ast.DeclaracionFuncion, Any], omitir: Demostradas):
+        super().__init__()
+        self.funciones = funciones
+        self.omitir = omitir
+
+    def evaluar_declaracion_funcion(self, nodo: ast.DeclaracionFuncion, entorno: Entorno) -> Valor:
+        entorno.definir_funcion(nodo.nombre, self.funciones.get(nodo, nodo))
+        return Valor('funcion', nodo.nombre)
+
+    def ejecutar_funcion(self, funcion: Any, nombre: str, entorno_funcion: Entorno) -> Valor:
+        if isinstance(funcion, FuncionNativa):
+            return funcion.codigo(entorno_funcion, self)
+        return super().ejecutar_funcion(funcion, nombre, entorno_funcion)
+
+# Funciones auxiliares que usa el código generado
+
+def leer(entorno: Optional[Entorno], nombre: str) -> Valor:
+    while entorno is not None:
+        if nombre in entorno.variables:
+            return entorno.variables[nombre]
+        entorno = entorno.padre
+    raise NameError(f"Variable '{nombre}' no definida")
+
+def asignar(entorno: Optional[Entorno], nombre: str, valor: Valor) -> None:
+    while entorno is not None:
+        if nombre in entorno.variables:
+            entorno.variables[nombre] = valor
+            return
+        entorno = entorno.padre
+    raise NameError(f"Variable '{nombre}' no definida")
+
+def comprobar_tipo(valor: Valor, tipo: str) -> Valor:
+    if tipo != valor.tipo:
+        raise TypeError(f"Se esperaba tipo '{tipo}' pero se obtuvo '{valor.tipo}'")
+    return valor
+
+def condicion(valor: Valor) -> bool:
+    if valor.tipo != 'booleano':
+        raise TypeError(f"La condición debe ser de tipo 'booleano', se obtuvo '{valor.tipo}'")
+    return valor.valor
+
+def buscar(entorno: Entorno, nombre: str, cantidad: int) -> Any:
+    # La función y su número de parámetros, antes de evaluar los argumentos
+    actual = entorno
+    while actual is not None:
+        if nombre in actual.funciones:
+            funcion = actual.funciones[nombre]
+            break
+        actual = actual.padre
+    else:
+        raise NameError(f"Función '{nombre}' no definida")
+    if type(funcion) is Primitiva:
+        funcion.comprobar(cantidad)
+    elif cantidad != len(funcion.parametros):
+        raise TypeError(f"Función '{nombre}' espera {len(funcion.parametros)} argumentos, pero se proporcionaron {cantidad}")
+    return funcion
+
+def llamar(interprete: InterpreteMixto, funcion: Any, nombre: str, entorno: Entorno, argumentos: List[Valor]) -> Valor:
+    if type(funcion) is Primitiva:
+        return funcion.llamar(argumentos)
+    if interprete.memorias:
+        memoria = interprete.memorias.get(funcion)
+        if memoria is not None:
+            return memoria.llamar(argumentos, interprete.llamadas, invocar, interprete, funcion, nombre, entorno, argumentos)
+    return invocar(interprete, funcion, nombre, entorno, argumentos)
+
+def invocar(interprete: InterpreteMixto, funcion: Any, nombre: str, entorno: Entorno, argumentos: List[Valor]) -> Valor:
+    entorno_funcion = Entorno(entorno)
+    variables = entorno_funcion.variables
+    for param, valor in zip(funcion.parametros, argumentos):
+        if param['tipo'] and param['tipo'] != valor.tipo:
+            raise TypeError(f"Parámetro '{param['nombre']}' espera tipo '{param['tipo']}', pero se proporcionó '{valor.tipo}'")
+        variables[param['nombre']] = valor
+    interprete.llamadas += 1
+    try:
+        if isinstance(funcion, FuncionNativa):
+            return funcion.codigo(entorno_funcion, interprete)
+        return interprete.ejecutar_funcion(funcion, nombre, entorno_funcion)
+    finally:
+        interprete.llamadas -= 1
+
+def par(clave: Valor, valor: Valor) -> Tuple[Valor, Valor]:
+    if clave.tipo not in ['entero', 'decimal', 'cadena', 'booleano']:
+        raise TypeError(f"La clave del diccionario debe ser inmutable, no '{clave.tipo}'")
+    return clave, valor
+
+def diccionario(*pares: Tuple[Valor, Valor]) -> Valor:
+    return Valor('diccionario', {clave.valor: valor for clave, valor in pares})
+
+AUXILIARES: Dict[str, Any] = {
+    'Valor': Valor,
+    'VERDADERO': VERDADERO,
+    'FALSO': FALSO,
+    'entero': entero,
+    'Entorno': Entorno,
+    'RetornoExcepcion': RetornoExcepcion,
+    'iterar_valores': iterar_valores,
+    'leer': leer,
+    'asignar': asignar,
+    'comprobar_tipo': comprobar_tipo,
+    'condicion': condicion,
+    'buscar': buscar,
+    'llamar': llamar,
+    'par': par,
+    'diccionario': diccionario,
+    'crear_lista': crear_lista,
+}
+AUXILIARES.update({funcion.__name__: funcion for funcion in OPERACIONES_BINARIAS.values()})
+AUXILIARES.update({funcion.__name__: funcion for funcion in OPERACIONES_UNARIAS.values()})
+
+class Ambito:
+    # Variables de Python con el Entorno y su diccionario en un punto del
+    # código generado (cada `para cada` abre uno nuevo)
+    def __init__(self, nivel: int, en_funcion: bool):
+        self.entorno = f"e{nivel}"
+        self.variables = f"v{nivel}"
+        self.nivel = nivel
+        self.en_funcion = en_funcion
+
+    def hijo(self) -> 'Ambito':
+        return Ambito(self.nivel + 1, self.en_funcion)
+
+class TraductorFuncion:
+    # Traduce el cuerpo de una función (o del programa) a una función de
+    # Python `nombre(e0, interprete)` que devuelve el Valor del cuerpo
+    def __init__(self, traductor: 'Traductor', nombre: str, en_funcion: bool):
+        self.traductor = traductor
+        self.nombre = nombre
+        self.en_funcion = en_funcion
+        self.lineas: List[str] = []
+        self.temporales = 0
+
+    def temporal(self) -> str:
+        self.temporales += 1
+        return f"_t{self.temporales}"
+
+    def emitir(self, sangria: int, linea: str) -> None:
+        self.lineas.append('    ' * sangria + linea)
+
+    def traducir(self, cuerpo: List[ast.Nodo], tipo_retorno: Optional[str] = None, nombre: str = '') -> List[str]:
+        ambito = Ambito(0, self.en_funcion)
+        self.emitir(0, f"def {self.nombre}(e0, interprete):")
+        self.emitir(1, "v0 = e0.variables")
+        self.bloque(cuerpo, 1, ambito, 'resultado')
+        if tipo_retorno:
+            # Sólo el final normal de la función comprueba el tipo
+            mensaje = repr(f"Función '{nombre}' debe retornar tipo '{tipo_retorno}', pero retornó '")
+            self.emitir(1, f"if resultado.tipo != {tipo_retorno!r}:")
+            self.emitir(2, f"raise TypeError({mensaje} + resultado.tipo + \"'\")")
+        self.emitir(1, "return resultado")
+        return self.lineas
+
+    def bloque(self, sentencias: List[ast.Nodo], sangria: int, ambito: Ambito, destino: Optional[str]) -> None:
+        # Con `destino`, el valor de la última sentencia (o nulo) queda en esa
+        # variable; el de las demás sólo se calcula
+        if not sentencias:
+            self.emitir(sangria, f"{destino} = {self.traductor.constante(NULO)}" if destino else "pass")
+            return
+        for i, sentencia in enumerate(sentencias):
+            self.sentencia(sentencia, sangria, ambito, destino if i == len(sentencias) - 1 else None)
+
+    def sentencia(self, nodo: ast.Nodo, sangria: int, ambito: Ambito, destino: Optional[str]) -> None:
+        e, v = ambito.entorno, ambito.variables
+        nulo = self.traductor.constante(NULO)
+
+        if isinstance(nodo, ast.DeclaracionVariable):
+            valor = self.expresion(nodo.valor, ambito)
+            if nodo.tipo and nodo not in self.traductor.omitir.declaraciones:
+                valor = f"comprobar_tipo({valor}, {nodo.tipo!r})"
+            destino = destino or self.temporal()
+            self.emitir(sangria, f"{destino} = {v}[{nodo.nombre!r}] = {valor}")
+
+        elif isinstance(nodo, ast.AsignacionVariable):
+            destino = destino or self.temporal()
+            self.emitir(sangria, f"{destino} = {self.expresion(nodo.valor, ambito)}")
+            self.emitir(sangria, f"if {nodo.nombre!r} in {v}:")
+            self.emitir(sangria + 1, f"{v}[{nodo.nombre!r}] = {destino}")
+            self.emitir(sangria, "else:")
+            self.emitir(sangria + 1, f"asignar({e}.padre, {nodo.nombre!r}, {destino})")
+
+        elif isinstance(nodo, ast.Condicional):
+            self.emitir(sangria, f"if {self.condicion(nodo.condicion, ambito)}:")
+            self.bloque(nodo.cuerpo, sangria + 1, ambito, destino)
+            if nodo.sino or destino:
+                self.emitir(sangria, "else:")
+                self.bloque(nodo.sino or [], sangria + 1, ambito, destino)
+
+        elif isinstance(nodo, ast.BucleWhile):
+            if destino:
+                self.emitir(sangria, f"{destino} = {nulo}")
+            self.emitir(sangria, f"while {self.condicion(nodo.condicion, ambito)}:")
+            self.bloque(nodo.cuerpo, sangria + 1, ambito, destino)
+
+        elif isinstance(nodo, ast.BucleFor):
+            self.sentencia(nodo.inicializacion, sangria, ambito, None)
+            if destino:
+                self.emitir(sangria, f"{destino} = {nulo}")
+            self.emitir(sangria, f"while {self.condicion(nodo.condicion, ambito)}:")
+            self.bloque(nodo.cuerpo, sangria + 1, ambito, destino)
+            self.sentencia(nodo.incremento, sangria + 1, ambito, None)
+
+        elif isinstance(nodo, ast.BucleForEach):
+            # Un entorno nuevo por vuelta, como en el intérprete
+            interior = ambito.hijo()
+            elemento = self.temporal()
+            iterable = self.expresion(nodo.iterable, ambito)
+            if destino:
+                self.emitir(sangria, f"{destino} = {nulo}")
+            self.emitir(sangria, f"for {elemento} in iterar_valores({iterable}):")
+            self.emitir(sangria + 1, f"{interior.entorno} = Entorno({e})")
+            self.emitir(sangria + 1, f"{interior.variables} = {interior.entorno}.variables")
+            self.emitir(sangria + 1, f"{interior.variables}[{nodo.variable!r}] = {elemento}")
+            self.bloque(nodo.cuerpo, sangria + 1, interior, destino)
+
+        elif isinstance(nodo, ast.DeclaracionFuncion):
+            indice = self.traductor.funcion(nodo)
+            self.emitir(sangria, f"{e}.funciones[{nodo.nombre!r}] = F[{indice}]")
+            if destino:
+                self.emitir(sangria, f"{destino} = Valor('funcion', {nodo.nombre!r})")
+
+        elif isinstance(nodo, ast.RetornoFuncion):
+            valor = nulo if nodo.valor is None else self.expresion(nodo.valor, ambito)
+            # Fuera de una función, `devolver` termina el programa como en el
+            # intérprete
+            self.emitir(sangria, f"return {valor}" if ambito.en_funcion else f"raise RetornoExcepcion({valor})")
+
+        else:
+            valor = self.expresion(nodo, ambito)
+            self.emitir(sangria, f"{destino} = {valor}" if destino else valor)
+
+    def condicion(self, nodo: ast.Nodo, ambito: Ambito) -> str:
+        # Expresión de Python que vale el bool de la condición
+        if isinstance(nodo, ast.OperacionBinaria) and nodo.operador in BOOLEANOS:
+            if nodo.operador in SIMBOLOS_PYTHON:
+                return self.operacion_rapida(nodo, ambito, condicion=True)
+            return f"{self.expresion(nodo, ambito)}.valor"
+        return f"condicion({self.expresion(nodo, ambito)})"
+
+    def operacion_rapida(self, nodo: ast.OperacionBinaria, ambito: Ambito, condicion: bool = False) -> str:
+        simbolo = SIMBOLOS_PYTHON[nodo.operador]
+        funcion = FUNCIONES_BINARIAS[nodo.operador]
+        a = self.temporal()
+        izquierda = self.expresion(nodo.izquierda, ambito)
+        derecha = nodo.derecha
+
+        if isinstance(derecha, ast.ValorLiteral) and derecha.tipo == 'entero':
+            constante = self.traductor.constante(derecha.constante)
+            rapida = f"{a}.valor {simbolo} {derecha.valor!r}"
+            general = f"{funcion}({a}, {constante})"
+            comprobacion = f"({a} := {izquierda}).tipo == 'entero'"
+        else:
+            b = self.temporal()
+            rapida = f"{a}.valor {simbolo} {b}.valor"
+            general = f"{funcion}({a}, {b})"
+            # La comparación encadenada evalúa siempre los dos operandos, en orden
+            comprobacion = f"({a} := {izquierda}).tipo == ({b} := {self.expresion(derecha, ambito)}).tipo == 'entero'"
+
+        if condicion:
+            return f"(({rapida}) if {comprobacion} else {general}.valor)"
+        # Con los mismos Valor compartidos que ENTEROS_RAPIDOS
+        if nodo.operador in BOOLEANOS:
+            return f"((VERDADERO if {rapida} else FALSO) if {comprobacion} else {general})"
+        return f"(entero({rapida}) if {comprobacion} else {general})"
+
+    def expresion(self, nodo: ast.Nodo, ambito: Ambito) -> str:
+        e, v = ambito.entorno, ambito.variables
+
+        if isinstance(nodo, ast.ValorLiteral):
+            return self.traductor.constante(nodo.constante)
+
+        if isinstance(nodo, ast.Identificador):
+            nombre = repr(nodo.nombre)
+            return f"({v}[{nombre}] if {nombre} in {v} else leer({e}.padre, {nombre}))"
+
+        if isinstance(nodo, ast.OperacionBinaria):
+            if nodo.operador not in OPERACIONES_BINARIAS:
+                raise NoTraducible(f"Operador no implementado: {nodo.operador}")
+            if nodo.operador in SIMBOLOS_PYTHON:
+                return self.operacion_rapida(nodo, ambito)
+            funcion = FUNCIONES_BINARIAS[nodo.operador]
+            return f"{funcion}({self.expresion(nodo.izquierda, ambito)}, {self.expresion(nodo.derecha, ambito)})"
+
+        if isinstance(nodo, ast.OperacionUnaria):
+            if nodo.operador not in OPERACIONES_UNARIAS:
+                raise NoTraducible(f"Operador no implementado: {nodo.operador}")
+            return f"{FUNCIONES_UNARIAS[nodo.operador]}({self.expresion(nodo.operando, ambito)})"
+
+        if isinstance(nodo, ast.LlamadaFuncion):
+            argumentos = ', '.join(self.expresion(argumento, ambito) for argumento in nodo.argumentos)
+            buscar = f"buscar({e}, {nodo.nombre!r}, {len(nodo.argumentos)})"
+            return f"llamar(interprete, {buscar}, {nodo.nombre!r}, {e}, [{argumentos}])"
+
+        if isinstance(nodo, ast.ListaValores):
+            return f"crear_lista([{', '.join(self.expresion(elemento, ambito) for elemento in nodo.valores)}])"
+
+        if isinstance(nodo, ast.Diccionario):
+            pares = ', '.join(
+                f"par({self.expresion(clave, ambito)}, {self.expresion(valor, ambito)})" for clave, valor in nodo.pares
+            )
+            return f"diccionario({pares})"
+
+        # ElementoHTML, EstiloCSS, sentencias en posición de expresión...
+        raise NoTraducible(f"Nodo no traducible: {type(nodo).__name__}")
+
+class Traductor:
+    # Traduce un Programa a un módulo de Python: una función por cada función
+    # del lenguaje que se pueda traducir y otra para el cuerpo del programa.
+    # Las constantes (K) y las funciones (F) no van en el código fuente sino en
+    # el espacio de nombres con el que se ejecuta.
+    def __init__(self, omitir: Demostradas = NINGUNA):
+        self.omitir = omitir
+        self.constantes: List[Valor] = []
+        self.id_constante: Dict[Tuple[str, type, Any], int] = {}
+        self.declaraciones: List[ast.DeclaracionFuncion] = []
+        self.id_declaracion: Dict[ast.DeclaracionFuncion, int] = {}
+        self.lineas: List[str] = []
+        self.nativas: Dict[int, str] = {}
+
+    def constante(self, valor: Valor) -> str:
+        clave = (valor.tipo, type(valor.valor), valor.valor)
+        try:
+            indice = self.id_constante.get(clave)
+        except TypeError:
+            indice, clave = None, None
+        if indice is None:
+            indice = len(self.constantes)
+            self.constantes.append(valor)
+            if clave is not None:
+                self.id_constante[clave] = indice
+        return f"K[{indice}]"
+
+    def funcion(self, nodo: ast.DeclaracionFuncion) -> int:
+        # Índice en F de la función declarada por `nodo`; se traduce al final
+        if nodo not in self.id_declaracion:
+            self.id_declaracion[nodo] = len(self.declaraciones)
+            self.declaraciones.append(nodo)
+        return self.id_declaracion[nodo]
+
+    def traducir(self, programa: ast.Programa) -> Tuple[str, bool]:
+        # Devuelve el código fuente y si el cuerpo del programa es nativo. Las
+        # funciones se recogen al pasar por sus declaraciones, también en las
+        # partes no traducidas
+        nativo = self.unidad('programa', programa.cuerpo, False)
+        if not nativo:
+            self.recoger_funciones(programa)
+        i = 0
+        while i < len(self.declaraciones):
+            nodo = self.declaraciones[i]
+            tipo_retorno = None if nodo in self.omitir.retornos else nodo.tipo_retorno
+            if self.unidad(f"funcion_{i}", nodo.cuerpo, True, tipo_retorno, nodo.nombre):
+                self.nativas[i] = f"funcion_{i}"
+            else:
+                self.recoger_funciones(nodo)
+            i += 1
+        return '\n'.join(self.lineas) + '\n', nativo
+
+    def unidad(self, nombre: str, cuerpo: List[ast.Nodo], en_funcion: bool, tipo_retorno: Optional[str] = None, nombre_funcion: str = '') -> bool:
+        funciones = len(self.declaraciones)
+        try:
+            lineas = TraductorFuncion(self, nombre, en_funcion).traducir(cuerpo, tipo_retorno, nombre_funcion)
+        except (NoTraducible, RecursionError):
+            # Las funciones vistas antes del fallo se vuelven a recoger al
+            # recorrer el cuerpo entero
+            del self.declaraciones[funciones:]
+            self.id_declaracion = {nodo: i for i, nodo in enumerate(self.declaraciones)}
+            return False
+        self.lineas.extend(lineas)
+        self.lineas.append('')
+        return True
+
+    def recoger_funciones(self, raiz: ast.Nodo) -> None:
+        # Funciones declaradas (a cualquier profundidad) en una parte que
+        # ejecutará el intérprete, sin entrar en los cuerpos de las funciones
+        pendientes = [getattr(raiz, campo) for campo in raiz.campos]
+        while pendientes:
+            valor = pendientes.pop()
+            if isinstance(valor, ast.DeclaracionFuncion):
+                self.funcion(valor)
+            elif isinstance(valor, ast.Nodo):
+                pendientes.extend(getattr(valor, campo) for campo in valor.campos)
+            elif isinstance(valor, (list, tuple)):
+                pendientes.extend(valor)
+            elif isinstance(valor, dict):
+                pendientes.extend(valor.values())
+
+class CacheCodigo:
+    # Objetos de código compilados por hash de su código fuente: dos programas
+    # que sólo se diferencian en las constantes comparten el objeto
+    def __init__(self, max_entradas: int = MAX_CODIGOS):
+        self.max_entradas = max_entradas
+        self.codigos: 'OrderedDict[bytes, CodeType]' = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.bloqueo = threading.Lock()
+
+    def compilar(self, fuente: str) -> CodeType:
+        clave = hashlib.blake2b(fuente.encode('utf-8'), digest_size=16).digest()
+        with self.bloqueo:
+            codigo = self.codigos.get(clave)
+            if codigo is not None:
+                self.codigos.move_to_end(clave)
+                self.aciertos += 1
+                return codigo
+            self.fallos += 1
+        codigo = compile(fuente, '<transpilado>', 'exec')
+        with self.bloqueo:
+            self.codigos[clave] = codigo
+            while len(self.codigos) > self.max_entradas:
+                self.codigos.popitem(last=False)
+        return codigo
+
+cache_codigo = CacheCodigo()
+
+class ProgramaTraducido:
+    def __init__(self, programa: ast.Programa, omitir: Demostradas = NINGUNA):
+        traductor = Traductor(omitir)
+        self.programa = programa
+        self.fuente, self.nativo = traductor.traducir(programa)
+        try:
+            codigo = cache_codigo.compilar(self.fuente)
+        except (SyntaxError, RecursionError, MemoryError):
+            # Demasiado anidado para el compilador de Python: todo al intérprete
+            self.fuente, self.nativo, traductor.nativas = '', False, {}
+            codigo = compile('', '<transpilado>', 'exec')
+
+        espacio = dict(AUXILIARES, K=traductor.constantes)
+        exec(codigo, espacio)
+        funciones: Dict[ast.DeclaracionFuncion, Any] = {}
+        for i, nodo in enumerate(traductor.declaraciones):
+            if i in traductor.nativas:
+                funciones[nodo] = FuncionNativa(nodo.nombre, nodo.parametros, nodo.tipo_retorno, espacio[traductor.nativas[i]])
+            else:
+                funciones[nodo] = nodo
+        espacio['F'] = [funciones[nodo] for nodo in traductor.declaraciones]
+        self.funciones = funciones
+        self.omitir = omitir
+        self.principal = espacio['programa'] if self.nativo else None
+
+        self.funciones_nativas = sorted({nodo.nombre for i, nodo in enumerate(traductor.declaraciones) if i in traductor.nativas})
+        self.funciones_interpretadas = sorted({nodo.nombre for i, nodo in enumerate(traductor.declaraciones) if i not in traductor.nativas})
+
+    def ejecutar(self, entorno: Entorno, memorias: Optional[Dict[ast.DeclaracionFuncion, Memoria]] = None) -> Valor:
+        # Cada ejecución con su InterpreteMixto, que lleva sus memorias por la
+        # función que el programa guarda en el entorno
+        interprete = InterpreteMixto(self.funciones, self.omitir)
+        interprete.memorias = {self.funciones.get(nodo, nodo): memoria for nodo, memoria in (memorias or {}).items()}
+        if self.principal is not None:
+            return self.principal(entorno, interprete)
+        return interprete.evaluar(self.programa, entorno)
+
+    def informe(self) -> Dict[str, Any]:
+        return {
+            'programa_nativo': self.nativo,
+            'funciones_nativas': self.funciones_nativas,
+            'funciones_interpretadas': self.funciones_interpretadas,
+        }
+
+def traducir_programa(programa: ast.Programa, omitir: Demostradas = NINGUNA) -> ProgramaTraducido:
+    return ProgramaTraducido(programa, omitir)
@@ -0,0 +1,51 @@
+# valores.py
+from typing import Any, Tuple
+
+# Valores del lenguaje. Un Valor no se modifica después de crearlo, así que
+# los más frecuentes se comparten en lugar de crear uno nuevo cada vez: nulo,
+# verdadero y falso son únicos, los enteros pequeños salen de una tabla y el
+# Valor de cada literal se construye una sola vez al crear el nodo
+# (ValorLiteral.constante).
+
+class Valor:
+    __slots__ = ('tipo', 'valor')
+
+    def __init__(self, tipo: str, valor: Any):
+        self.tipo = tipo
+        self.valor = valor
+
+    def __repr__(self):
+        return f"Valor({self.tipo}, {self.valor})"
+
+NULO = Valor('nulo', None)
+VERDADERO = Valor('booleano', True)
+FALSO = Valor('booleano', False)
+
+# Enteros compartidos, de ENTERO_MINIMO a ENTERO_MAXIMO
+ENTERO_MINIMO = -128
+ENTERO_MAXIMO = 1024
+ENTEROS: Tuple[Valor, ...] = tuple(Valor('entero', numero) for numero in range(ENTERO_MINIMO, ENTERO_MAXIMO + 1))
+
+def entero(numero: int) -> Valor:
+    if ENTERO_MINIMO <= numero <= ENTERO_MAXIMO:
+        return ENTEROS[numero - ENTERO_MINIMO]
+    return Valor('entero', numero)
+
+def booleano(condicion: bool) -> Valor:
+    return VERDADERO if condicion else FALSO
+
+def numero(tipo: str, valor: Any) -> Valor:
+    # Resultado de una operación aritmética de tipo 'entero' o 'decimal'
+    if tipo == 'entero':
+        return entero(valor)
+    return Valor(tipo, valor)
+
+def constante(tipo: str, valor: Any) -> Valor:
+    # El Valor de un literal, compartido cuando es uno de los anteriores
+    if tipo == 'nulo':
+        return NULO
+    if tipo == 'booleano':
+        return booleano(valor)
+    if tipo == 'entero':
+        return entero(valor)
+    return Valor(tipo, valor)